@@ -0,0 +1,66 @@
+"""
+Command line: ``python -m SPP4backtesting --help``.
+
+    python -m SPP4backtesting run spec.toml [--workers N] [--restart]
+    python -m SPP4backtesting strategies
+"""
+
+import argparse
+import sys
+
+
+def _run(args) -> int:
+    from .utils.jobs import load_spec, run_spec
+
+    try:
+        spec = load_spec(args.spec)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f'Invalid spec {args.spec}: {e}', file=sys.stderr)
+        return 2
+    log = (lambda line: None) if args.quiet else (lambda line: print(line, flush=True))
+    try:
+        table = run_spec(spec, restart=args.restart, workers=args.workers, log=log)
+    except KeyboardInterrupt:
+        print(f'\nInterrupted; finished windows are kept in {spec.output}, '
+              f'run the same command to resume.', file=sys.stderr)
+        return 130
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f'{len(table)} windows in {spec.output}')
+    return 0
+
+
+def _strategies(args) -> int:
+    from .strategies import registry
+    from .utils.param_space import describe
+
+    for name, info in registry.scan().items():
+        flags = ''.join(f' [{flag}]' for flag in ('vectorized', 'multi_asset') if getattr(info, flag))
+        print(f'{name:<28} {info.doc}{flags}')
+        for param, values in info.search_space.items():
+            print(f'{"":<4}{param:<24} {describe(values)}')
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m SPP4backtesting',
+                                     description='Run walk-forward jobs from spec files.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run (or resume) the jobs of a TOML spec')
+    run.add_argument('spec', help='spec file (see SPP4backtesting.utils.jobs)')
+    run.add_argument('--workers', type=int, help="worker processes (default: the spec's)")
+    run.add_argument('--restart', action='store_true', help='discard stored results and run everything')
+    run.add_argument('--quiet', action='store_true', help="don't print progress")
+    run.set_defaults(func=_run)
+
+    strategies = commands.add_parser('strategies', help='list the available strategies and their parameter spaces')
+    strategies.set_defaults(func=_strategies)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+Trading strategies, one module per family.
+
+Strategy classes can be imported from the package by name; their module is
+only imported on first access (see `registry`), so importing the package,
+or listing its strategies, doesn't load backtesting.py or TA-Lib.
+
+Example:
+    >>> from SPP4backtesting.strategies import BTSMAStrategy
+"""
+
+from . import registry
+
+
+def __getattr__(name):
+    try:
+        return registry.load(name)
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+
+
+def __dir__():
+    return sorted({*globals(), *registry.names()})
@@ -16,21 +16,25 @@ Arbitrage strategies typically require:
 Note:
     The implementations here are simplified for backtesting purposes. Production
     arbitrage systems require sophisticated infrastructure and risk management.
+    Strategies here trade several assets at once, so they run on
+    `utils.multi_asset.MultiAssetBacktest` rather than `Backtest`.
 
 Example:
     Basic usage of UsdtUsdcArbitrage:
     
-    >>> from strategies.arbitrage_strategies import UsdtUsdcArbitrage
-    >>> from utils.data_loader import load_crypto_data
-    >>> from backtesting import Backtest
+    >>> from SPP4backtesting.strategies.arbitrage_strategies import UsdtUsdcArbitrage
+    >>> from SPP4backtesting.utils.data_loader import load_data
+    >>> from SPP4backtesting.utils.multi_asset import MultiAssetBacktest, MultiAssetData
     >>> 
-    >>> # Note: This strategy requires data from both USDT and USDC pairs
-    >>> data = load_crypto_data('USDT-USD', period='1y', normalize=True)
-    >>> bt = Backtest(data, UsdtUsdcArbitrage, cash=10000, commission=0.001)
+    >>> data = MultiAssetData({symbol: load_data(symbol, '2024-01-01', interval='1m')
+    ...                        for symbol in ('USDT-USD', 'USDC-USD')})
+    >>> bt = MultiAssetBacktest(data, UsdtUsdcArbitrage, cash=10000,
+    ...                         commission=0.0001, slippage=0.00005)
     >>> stats = bt.run()
 """
 
-from base_strategies import BaseStrategy
+from .base_strategies import BaseStrategy, Book
+from ..utils.multi_asset import band_positions
 
 
 class UsdtUsdcArbitrage(BaseStrategy):
@@ -41,14 +45,21 @@ class UsdtUsdcArbitrage(BaseStrategy):
     (USDT and USDC). Since both are pegged to the US Dollar, significant deviations
     represent arbitrage opportunities.
     
-    The strategy would ideally:
-    1. Monitor prices of both USDT-USD and USDC-USD
-    2. When price difference exceeds threshold, buy the cheaper and sell the more expensive
-    3. Wait for prices to converge and close positions for profit
+    Both are pegged to the US Dollar, so their price ratio should stay at 1:
+    
+    1. Monitor the spread ``USDT / USDC - 1`` on every bar
+    2. When it exceeds the threshold, sell the more expensive coin and buy
+       the cheaper one, both legs in one order
+    3. Close both legs together once the spread is back within
+       `exit_threshold` of parity
     
     Attributes:
         threshold (float): Minimum price difference to trigger arbitrage. Default is 0.001 (0.1%).
             This threshold must exceed trading fees to be profitable.
+        exit_threshold (float): Spread at which positions are closed. Default is 0
+            (close once the spread crosses back to parity).
+        assets (Tuple[str, str]): Names of the USDT and USDC series in the
+            `MultiAssetData`.
     
     Optimization Ranges:
         threshold: [0.0005, 0.001, 0.002, 0.005] (0.05% to 0.5%)
@@ -56,7 +67,8 @@ class UsdtUsdcArbitrage(BaseStrategy):
     Trading Logic:
         - Entry: Price difference between USDT and USDC exceeds threshold
         - Exit: Prices converge back to parity
-        - Risk Management: Tight stop-loss since stablecoins should maintain parity
+        - Orders: Both legs are filled atomically at the next bar's open,
+          with commission and slippage on each leg
     
     Important Notes:
         - This is a simplified implementation for educational purposes
@@ -72,74 +84,50 @@ class UsdtUsdcArbitrage(BaseStrategy):
     Based on: btusdt-usdc.py (legacy implementation)
     
     Example:
-        >>> # This example shows the interface, but requires multi-asset data
-        >>> bt = Backtest(data, UsdtUsdcArbitrage, cash=10000, commission=0.001)
+        >>> bt = MultiAssetBacktest(data, UsdtUsdcArbitrage, cash=10000, commission=0.0001)
         >>> stats = bt.run(threshold=0.001)
+        >>> stats = bt.optimize(**UsdtUsdcArbitrage.opt_ranges)
     """
     
-    # Strategy parameter with default value
+    # Strategy parameters with default values
     threshold = 0.001  # Minimum price difference threshold (0.1%)
+    exit_threshold = 0.0  # Spread at which both legs are closed
+    assets = ('USDT-USD', 'USDC-USD')
     
     # Optimization parameter range
     opt_ranges = {
         'threshold': [0.0005, 0.001, 0.002, 0.005]  # 0.05%, 0.1%, 0.2%, 0.5%
     }
     
-    def init(self):
+    @classmethod
+    def book(cls, data, p):
         """
-        Initialize the strategy.
+        Long/short book of the two stablecoins from their spread.
         
-        Note:
-            This strategy requires data from two assets (USDT-USD and USDC-USD).
-            The current implementation is a placeholder showing the structure.
-            
-            A complete implementation would need:
-            - Access to both USDT and USDC price data
-            - Spread calculation between the two
-            - Position tracking for both assets
+        The spread is computed for all bars at once; target -1 (short USDT,
+        long USDC) while USDT trades rich, +1 while it trades cheap.
         """
-        # Placeholder: In production, would initialize:
-        # - Price feeds for both USDT-USD and USDC-USD
-        # - Spread calculator
-        # - Position trackers for both assets
-        pass
+        usdt, usdc = cls.assets
+        spread = data.spread(usdt, usdc)
+        exit_threshold = p.get('exit_threshold', cls.exit_threshold)
+        return Book(
+            target=band_positions(spread, p.threshold, exit_threshold),
+            legs={usdt: 1., usdc: -1.},
+        )
     
-    def next(self):
+    def init(self):
         """
-        Execute trading logic on each bar.
-        
-        Note:
-            This is a simplified placeholder implementation. A complete arbitrage
-            strategy would require:
-            
-            1. Real-time price data from both USDT-USD and USDC-USD
-            2. Spread calculation: abs(price_usdt - price_usdc)
-            3. Entry logic:
-               - If spread > threshold:
-                 * Buy the cheaper stablecoin
-                 * Sell the more expensive stablecoin
-            4. Exit logic:
-               - When spread returns to normal (< threshold)
-               - Close both positions simultaneously
-            5. Fee management:
-               - Ensure spread > (2 * trading_fee) for profitability
-            6. Slippage consideration:
-               - Account for market impact on both sides
+        Initialize the strategy.
         
-        Production Implementation Requirements:
-            - Multi-asset data support
-            - Simultaneous order execution
-            - Real-time spread monitoring
-            - Fee and slippage modeling
-            - Risk limits (max position size, max drawdown)
-            - Latency optimization
+        Raises:
+            NotImplementedError: Always. This strategy needs data from two
+                assets, which `Backtest` can't provide; run it with
+                `utils.multi_asset.MultiAssetBacktest`.
         """
-        # Placeholder for arbitrage logic
-        # 
-        # In a complete implementation, this would:
-        # 1. Calculate current spread between USDT and USDC
-        # 2. Check if spread exceeds threshold
-        # 3. Execute simultaneous buy/sell if opportunity exists
-        # 4. Monitor positions and close when spread normalizes
-        # 5. Account for fees and ensure profitability
-        pass
+        raise NotImplementedError(
+            f"{type(self).__name__} trades two assets; run it with "
+            "utils.multi_asset.MultiAssetBacktest"
+        )
+    
+    def next(self):
+        """Not used: trading logic lives in `book()`."""
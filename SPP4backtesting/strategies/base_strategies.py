@@ -1,6 +1,96 @@
 from backtesting import Strategy
+from backtesting.lib import resample_apply
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable, Tuple
+import numpy as np
+import pandas as pd
+from ..utils import prewarm, profiling, pruning, streaming
+from ..utils.indicator_cache import indicator_cache
+from ..utils.timeframes import timeframes
+
+
+@dataclass
+class Signals:
+    """
+    Entry signals of a strategy, precomputed over the whole dataset.
+    
+    Returned by `BaseStrategy.signals()` and consumed by the array-based
+    simulator in `utils.vectorized`. Signals are evaluated at the close of
+    each bar and filled at the next bar's open, exactly like orders placed
+    from `next()`.
+    
+    Attributes:
+        long (np.ndarray): Boolean mask of bars requesting a long entry.
+        short (np.ndarray): Boolean mask of bars requesting a short entry.
+            Ignored where `long` is also set (long takes precedence, as in
+            an ``if/elif`` chain).
+        warmup (int): Number of leading bars where indicators are still NaN.
+            Trading starts on bar ``warmup + 1``, as in backtesting.py.
+        sl (Optional[float]): Stop-loss as a fraction of the signal bar's
+            close (e.g. 0.05 for 5%). None disables it.
+        tp (Optional[float]): Take-profit as a fraction of the signal bar's
+            close. None disables it.
+        mode (str): How signals act on an open position:
+            - 'cross': every signal closes the current position and opens a
+              new one in its direction (crossover strategies).
+            - 'level': an opposite signal only closes the position; a new one
+              is opened on a later bar if the signal persists
+              (``if position.is_short: close()`` / ``if not position: buy()``).
+    """
+    long: np.ndarray
+    short: np.ndarray
+    warmup: int
+    sl: Optional[float] = None
+    tp: Optional[float] = None
+    mode: str = 'cross'
+
+
+@dataclass
+class Book:
+    """
+    Target positions of a multi-asset book, precomputed over the whole dataset.
+    
+    Returned by `BaseStrategy.book()` and simulated by
+    `utils.multi_asset.MultiAssetBacktest`. Every change of `target` is
+    filled at the next bar's open as one atomic order on all legs.
+    
+    Attributes:
+        target (np.ndarray): Per bar, +1 to hold the legs as weighted, -1 to
+            hold them reversed, 0 to be flat. Decided at the bar's close.
+        legs (Dict[str, float]): Asset name mapped to its signed weight,
+            e.g. ``{'USDT-USD': 1, 'USDC-USD': -1}`` for long USDT / short
+            USDC at target +1.
+        size (float): Gross exposure as a fraction of equity, split across
+            the legs in proportion to their absolute weights.
+    """
+    target: np.ndarray
+    legs: Dict[str, float]
+    size: float = 1.
+
+
+def crossover_mask(series1: np.ndarray, series2: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `backtesting.lib.crossover` over a whole array.
+    
+    Returns:
+        np.ndarray: Boolean mask, True on bars where `series1` just crossed
+            above `series2`.
+    """
+    mask = np.zeros(len(series1), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        mask[1:] = (series1[:-1] < series2[:-1]) & (series1[1:] > series2[1:])
+    return mask
+
+
+def warmup_nbars(*indicators: np.ndarray) -> int:
+    """
+    Number of leading NaN bars across indicators, as backtesting.py counts them.
+    
+    Multi-line indicators (e.g. MACD) may be passed as tuples or 2-D arrays.
+    """
+    return max((int(np.isnan(np.atleast_2d(np.asarray(ind, dtype=float))).argmin(axis=-1).max())
+                for ind in indicators), default=0)
 
 
 class BaseStrategy(Strategy, ABC):
@@ -14,7 +104,7 @@ class BaseStrategy(Strategy, ABC):
     Requirements for child classes:
         1. Inherit from BaseStrategy
         2. Define the opt_ranges class attribute as a dictionary mapping parameter names
-           to their optimization ranges (e.g., range objects, lists of values)
+           to their optimization ranges (e.g., range objects or lists of values)
         3. Implement the init() method to initialize indicators and strategy state
         4. Implement the next() method to define trading logic executed on each bar
     
@@ -22,6 +112,12 @@ class BaseStrategy(Strategy, ABC):
         opt_ranges (Dict[str, Any]): Dictionary mapping parameter names to their 
             optimization ranges. This is used by the optimization engine to explore
             different parameter combinations. Must be overridden in child classes.
+            Plain iterables only, so that ``bt.optimize(**opt_ranges)`` works.
+        opt_space (Optional[Dict[str, Any]]): Optional declarative version of
+            opt_ranges, preferred by optimize_auto. Its ranges may depend on
+            earlier parameters, e.g.
+            ``'slow_period': Range(Ref('fast_period') + 1, 50)``, so that only
+            valid combinations are enumerated (see utils.param_space).
     
     Example:
         >>> class MyStrategy(BaseStrategy):
@@ -47,6 +143,167 @@ class BaseStrategy(Strategy, ABC):
     # This attribute must be overridden in each strategy subclass
     opt_ranges: Dict[str, Any] = {}
     
+    # Declarative opt_ranges preferred by optimize_auto (see utils.param_space)
+    opt_space: Optional[Dict[str, Any]] = None
+    
+    # Share indicator outputs across optimization candidates (see utils.indicator_cache)
+    cache_indicators: bool = True
+    
+    # Parameters that only set stop-loss / take-profit levels (see exit_levels())
+    exit_params: Tuple[str, ...] = ()
+    
+    def __init__(self, broker, data, params):
+        super().__init__(broker, data, params)
+        # Time init()/next() when a utils.profiling session is active
+        if profiling.active is not None:
+            profiling.active.instrument(self)
+        # Check the run as it goes when a utils.pruning pruner watches it
+        if pruning.active is not None:
+            pruning.active.instrument(self)
+    
+    def __getstate__(self):
+        # Stats keep the strategy: drop the profiling/pruning wrappers, which don't pickle
+        state = self.__dict__.copy()
+        state.pop('init', None)
+        state.pop('next', None)
+        return state
+    
+    def I(self, func: Callable, *args, **kwargs) -> np.ndarray:
+        """
+        Declare an indicator, reusing a cached result when possible.
+        
+        Same as `Strategy.I`, except that `func` goes through the
+        process-wide `indicator_cache`, so every candidate of an optimization
+        sweep that asks for e.g. ``talib.SMA(Close, 20)`` on the same data
+        shares one computation. Set ``cache_indicators = False`` on a
+        subclass to opt out.
+        
+        In streaming runs (`utils.streaming.StreamRunner`), the indicator
+        is instead updated bar by bar, in O(1) for the TA-Lib functions
+        with an incremental version. In a `utils.prewarm` window, it is
+        computed over the full history and sliced to the window, so it
+        has no warmup.
+        """
+        if isinstance(self._data, streaming.StreamData):
+            return self._data.indicator(func, args, kwargs)
+        if self.cache_indicators:
+            func = indicator_cache.wrap(func)
+        if prewarm.active is not None:
+            prewarmed = prewarm.indicator(self, func, args, kwargs)
+            if prewarmed is not None:
+                value = super().I(prewarmed, *args, **kwargs)
+                prewarm.register(self, prewarmed, value)
+                return value
+        return super().I(func, *args, **kwargs)
+    
+    def resample_apply(self, rule: str, func: Callable, series, *args, **kwargs) -> np.ndarray:
+        """
+        Higher-timeframe indicator, precomputed once per dataset.
+        
+        Same arguments and result as `backtesting.lib.resample_apply`, but
+        the resampling, the indicator and its alignment back to the bars come
+        from the dataset's shared `utils.timeframes.MultiTimeframe`, so
+        every candidate of an optimization reuses them instead of
+        resampling again in `init()`. Series that aren't columns of the
+        data, or a custom `agg`, fall back to `resample_apply`. In
+        streaming runs, higher-timeframe bins feed the indicator as they
+        close (fixed-width rules only).
+        
+        Example:
+            >>> self.ema = self.resample_apply('7d', talib.EMA, self.data.Close, 20)
+        """
+        if isinstance(self._data, streaming.StreamData):
+            return self._data.indicator(func, (series,) + args, kwargs, rule=rule)
+        column = getattr(series, 'name', None)
+        data = self.data.df
+        if ('agg' in kwargs or column not in data.columns
+                or not isinstance(data.index, pd.DatetimeIndex)):
+            return resample_apply(rule, func, series, *args, **kwargs)
+        kwargs.setdefault('name', f"{func.__name__}({column[0]}[{rule}]"
+                                  f"{''.join(f',{a}' for a in args)})")
+        # In a prewarm window, bins come from the full history (sliced by I())
+        history = prewarm.history(self, column) if prewarm.active is not None else None
+        frame = history if history is not None else data
+        return self.I(timeframes(frame).apply, rule, func, *args, column=column, **kwargs)
+    
+    @classmethod
+    def signals(cls, data, p) -> Signals:
+        """
+        Compute entry signals for the whole dataset at once (vectorized mode).
+        
+        Optional hook used by `utils.vectorized.VectorizedBacktest`, which
+        simulates positions and equity from these arrays instead of calling
+        `next()` bar by bar. Strategies that don't override it can only be
+        run event-driven.
+        
+        Args:
+            data: Object exposing `Open`, `High`, `Low`, `Close` and `Volume`
+                as float64 NumPy arrays.
+            p: Dict-like of parameter values with attribute access
+                (e.g. ``p.n1``), defaults already filled in.
+        
+        Returns:
+            Signals: Entry masks, warmup length and SL/TP fractions.
+        
+        Example:
+            >>> @classmethod
+            ... def signals(cls, data, p):
+            ...     sma1 = indicator_cache.get(talib.SMA, data.Close, p.n1)
+            ...     sma2 = indicator_cache.get(talib.SMA, data.Close, p.n2)
+            ...     return Signals(long=crossover_mask(sma1, sma2),
+            ...                    short=crossover_mask(sma2, sma1),
+            ...                    warmup=warmup_nbars(sma1, sma2))
+        """
+        raise NotImplementedError(
+            f"{cls.__name__} does not implement vectorized signals()"
+        )
+    
+    @classmethod
+    def book(cls, data, p) -> Book:
+        """
+        Compute target positions of a multi-asset book (spread strategies).
+        
+        Optional hook used by `utils.multi_asset.MultiAssetBacktest` for
+        strategies trading several assets at once, which the single
+        `self.data` of backtesting.py can't hold.
+        
+        Args:
+            data: `utils.multi_asset.MultiAssetData` with all assets aligned.
+            p: Dict-like of parameter values with attribute access.
+        
+        Returns:
+            Book: Target per bar and leg weights.
+        """
+        raise NotImplementedError(
+            f"{cls.__name__} does not implement multi-asset book()"
+        )
+    
+    @classmethod
+    def exit_levels(cls, p) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Stop-loss and take-profit fractions for parameters `p`.
+        
+        Strategies listing `exit_params` implement this, and use it for the
+        `sl`/`tp` of their `signals()`. Since those parameters don't change
+        when entries fire, `VectorizedBacktest.optimize` computes the
+        signals once per combination of the other parameters and sweeps
+        every SL/TP level against them (see `utils.vectorized.simulate_exits`).
+        
+        Returns:
+            Tuple[Optional[float], Optional[float]]: ``(sl, tp)`` as in
+                `Signals`; None disables either.
+        
+        Example:
+            >>> exit_params = ('stop',)
+            ...
+            >>> @classmethod
+            ... def exit_levels(cls, p):
+            ...     return p.stop / 100, None
+        """
+        raise NotImplementedError(
+            f"{cls.__name__} does not implement exit_levels()"
+        )
+    
     @abstractmethod
     def init(self):
         """
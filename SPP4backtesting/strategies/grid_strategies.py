@@ -14,17 +14,22 @@ It can be risky in strongly trending markets if not properly managed.
 Example:
     Basic usage of GridStrategy:
     
-    >>> from strategies.grid_strategies import GridStrategy
-    >>> from utils.data_loader import load_crypto_data
+    >>> from SPP4backtesting.strategies.grid_strategies import GridStrategy
+    >>> from SPP4backtesting.utils.data_loader import load_crypto_data
     >>> from backtesting import Backtest
     >>> 
     >>> data = load_crypto_data('BTC-USD', period='1y', normalize=True)
     >>> bt = Backtest(data, GridStrategy, cash=10000, commission=0.001)
     >>> stats = bt.run()
+
+    With one open lot per grid level (see utils.grid):
+
+    >>> from SPP4backtesting.utils.grid import GridBacktest
+    >>> bt = GridBacktest(data, GridStrategy, cash=10000, commission=0.001)
+    >>> stats = bt.optimize(**GridStrategy.opt_ranges)
 """
 
-from base_strategies import BaseStrategy
-import talib
+from .base_strategies import BaseStrategy
 
 
 class GridStrategy(BaseStrategy):
@@ -54,10 +59,12 @@ class GridStrategy(BaseStrategy):
         - Grid Spacing: Each level is grid_profit % below the previous level
     
     Note:
-        This is a simplified grid implementation. Production grid bots typically
-        include features like:
+        This is a simplified grid implementation: under `Backtest` it holds a
+        single position at a time. `utils.grid.GridBacktest` runs the same
+        grid with one lot per level open simultaneously, and sweeps
+        grid_profit/grid_buy without a per-bar loop. Production grid bots
+        typically also include features like:
         - Grid rebalancing
-        - Multiple simultaneous positions
         - Stop-loss for the entire grid
         - Dynamic grid adjustment based on volatility
     
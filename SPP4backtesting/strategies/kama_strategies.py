@@ -16,8 +16,8 @@ generate too many false signals.
 Example:
     Basic usage of KamaStrategy:
     
-    >>> from strategies.kama_strategies import KamaStrategy
-    >>> from utils.data_loader import load_crypto_data
+    >>> from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+    >>> from SPP4backtesting.utils.data_loader import load_crypto_data
     >>> from backtesting import Backtest
     >>> 
     >>> data = load_crypto_data('BTC-USD', period='1y', normalize=True)
@@ -25,10 +25,10 @@ Example:
     >>> stats = bt.run()
 """
 
-from backtesting import Strategy
 from backtesting.lib import crossover
 import talib
-from base_strategies import BaseStrategy
+from .base_strategies import BaseStrategy, Signals, crossover_mask, warmup_nbars
+from ..utils.indicator_cache import indicator_cache
 
 class KamaStrategy(BaseStrategy):
     """
@@ -103,7 +103,7 @@ class KamaStrategy(BaseStrategy):
             self.sell()
 
 
-class KAMACrossover(Strategy):
+class KAMACrossover(BaseStrategy):
     """
     Dual KAMA Crossover Strategy with Stop-Loss and Take-Profit.
     
@@ -131,7 +131,10 @@ class KAMACrossover(Strategy):
         - Risk Management: Dynamic SL/TP on all positions
     
     Note:
-        Total optimization combinations: 9 × 9 × 9 × 9 = 6,561 (manageable)
+        Total optimization combinations: 23 × 45 × 9 × 48 = 447,120. `stop`
+        and `profit` only set exit levels, so vectorized optimization
+        simulates the 1,035 (n1, n2) signal sets and sweeps the 432 SL/TP
+        pairs against each of them.
     
     Example:
         >>> bt = Backtest(data, KAMACrossover, cash=10000, commission=0.001)
@@ -146,12 +149,14 @@ class KAMACrossover(Strategy):
     
     # Optimization parameter ranges
     opt_ranges = {
-        'n1': range(5, 50, 2),      # Fast KAMA: 5 to 47 (9 values)
-        'n2': range(10, 100, 2),    # Slow KAMA: 10 to 98 (9 values)
+        'n1': range(5, 50, 2),      # Fast KAMA: 5 to 49 (23 values)
+        'n2': range(10, 100, 2),    # Slow KAMA: 10 to 98 (45 values)
         'stop': range(2, 20, 2),    # Stop-loss: 2% to 18% (9 values)
-        'profit': range(4, 100, 2)  # Take-profit: 4% to 98% (9 values)
+        'profit': range(4, 100, 2)  # Take-profit: 4% to 98% (48 values)
     }
-    # Total combinations: 9 × 9 × 9 × 9 = 6,561 (manageable)
+    # Total combinations: 23 × 45 × 9 × 48 = 447,120, but only the 1,035
+    # (n1, n2) pairs generate signals; stop/profit are swept as exits
+    exit_params = ('stop', 'profit')
 
     def init(self):
         """
@@ -192,4 +197,24 @@ class KAMACrossover(Strategy):
             self.sell(
                 sl=(self.data.Close + self.data.Close * (self.stop / 100)),
                 tp=(self.data.Close - self.data.Close * (self.profit / 100))
-            )
\ No newline at end of file
+            )
+    
+    @classmethod
+    def signals(cls, data, p):
+        """
+        Vectorized equivalent of init()/next() for `VectorizedBacktest`.
+        """
+        kama1 = indicator_cache.get(talib.KAMA, data.Close, p.n1)
+        kama2 = indicator_cache.get(talib.KAMA, data.Close, p.n2)
+        sl, tp = cls.exit_levels(p)
+        return Signals(
+            long=crossover_mask(kama1, kama2),
+            short=crossover_mask(kama2, kama1),
+            warmup=warmup_nbars(kama1, kama2),
+            sl=sl,
+            tp=tp,
+        )
+    
+    @classmethod
+    def exit_levels(cls, p):
+        return p.stop / 100, p.profit / 100
@@ -14,8 +14,8 @@ false signals in choppy/sideways conditions.
 Example:
     Basic usage of LinearRegressionStrategy:
     
-    >>> from strategies.linear_regression_strategies import LinearRegressionStrategy
-    >>> from utils.data_loader import load_crypto_data
+    >>> from SPP4backtesting.strategies.linear_regression_strategies import LinearRegressionStrategy
+    >>> from SPP4backtesting.utils.data_loader import load_crypto_data
     >>> from backtesting import Backtest
     >>> 
     >>> data = load_crypto_data('BTC-USD', period='1y', normalize=True)
@@ -23,9 +23,8 @@ Example:
     >>> stats = bt.run()
 """
 
-from backtesting.lib import crossover, resample_apply
 import talib
-from strategies.base_strategies import BaseStrategy
+from .base_strategies import BaseStrategy
 
 class LinearRegressionStrategy(BaseStrategy):
     """
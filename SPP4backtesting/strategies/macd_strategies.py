@@ -4,10 +4,10 @@ Estrategias basadas en MACD (Moving Average Convergence Divergence).
 Consolida todas las estrategias que usan MACD como indicador principal.
 """
 
-from backtesting import Strategy
-from backtesting.lib import crossover, resample_apply
+from backtesting.lib import crossover
 import talib
-from base_strategies import BaseStrategy
+from .base_strategies import BaseStrategy, Signals, crossover_mask, warmup_nbars
+from ..utils.indicator_cache import indicator_cache
 
 class MacdAdxEmaStrategy(BaseStrategy):
     """
@@ -55,13 +55,14 @@ class MacdAdxEmaStrategy(BaseStrategy):
             self.data.Close,
             timeperiod=self.adxperiod
         )
-        self.ema1period30mf = resample_apply(
+        # EMAs semanales: el remuestreo se calcula una vez por dataset
+        self.ema1period30mf = self.resample_apply(
             '7d',
             talib.EMA,
-            self.data.Close.s,
+            self.data.Close,
             self.emafast
         )
-        self.ema2period30ml = resample_apply(
+        self.ema2period30ml = self.resample_apply(
             '7d',
             talib.EMA,
             self.data.Close,
@@ -93,7 +94,7 @@ class MacdAdxEmaStrategy(BaseStrategy):
             self.position.close()
 
 
-class MacdAdxStrategy(Strategy):
+class MacdAdxStrategy(BaseStrategy):
     """
     Estrategia MACD + ADX simplificada.
     
@@ -148,7 +149,7 @@ class MacdAdxStrategy(Strategy):
             self.position.close()
 
 
-class MacdStrategy(Strategy):
+class MacdStrategy(BaseStrategy):
     """
     Estrategia MACD simple.
     
@@ -187,9 +188,25 @@ class MacdStrategy(Strategy):
             if self.position.is_long:
                 self.position.close()
             self.sell()
+    
+    @classmethod
+    def signals(cls, data, p):
+        """Equivalente vectorizado de init()/next() para `VectorizedBacktest`."""
+        macd, signal, hist = indicator_cache.get(
+            talib.MACD,
+            data.Close,
+            fastperiod=p.fast,
+            slowperiod=p.slow,
+            signalperiod=p.signal
+        )
+        return Signals(
+            long=crossover_mask(macd, signal),
+            short=crossover_mask(signal, macd),
+            warmup=warmup_nbars((macd, signal, hist)),
+        )
 
 
-class MacdAdxSmaStrategy(Strategy):
+class MacdAdxSmaStrategy(BaseStrategy):
     """
     Estrategia MACD + ADX + SMA.
     
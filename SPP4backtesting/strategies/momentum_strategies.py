@@ -14,8 +14,8 @@ overbought/oversold conditions and potential trend reversals.
 Example:
     Basic usage of MomentumStrategy:
     
-    >>> from strategies.momentum_strategies import MomentumStrategy
-    >>> from utils.data_loader import load_crypto_data
+    >>> from SPP4backtesting.strategies.momentum_strategies import MomentumStrategy
+    >>> from SPP4backtesting.utils.data_loader import load_crypto_data
     >>> from backtesting import Backtest
     >>> 
     >>> data = load_crypto_data('BTC-USD', period='1y', normalize=True)
@@ -23,11 +23,10 @@ Example:
     >>> stats = bt.run()
 """
 
-from backtesting import Strategy
-from backtesting.lib import crossover
 import talib
 import numpy as np
-from base_strategies import BaseStrategy
+from .base_strategies import BaseStrategy, Signals, warmup_nbars
+from ..utils.indicator_cache import indicator_cache
 
 class MomentumStrategy(BaseStrategy):
     """
@@ -103,4 +102,22 @@ class MomentumStrategy(BaseStrategy):
             # Enter short position if not already in one
             if not self.position:
                 self.sell()
-
+    
+    @classmethod
+    def signals(cls, data, p):
+        """
+        Vectorized equivalent of init()/next() for `VectorizedBacktest`.
+        
+        Uses 'level' mode: an opposite signal closes the position and the new
+        one is only opened on a following bar, as next() does.
+        """
+        momentum = indicator_cache.get(talib.MOM, data.Close, timeperiod=p.period)
+        with np.errstate(invalid='ignore'):
+            long = momentum > p.threshold
+            short = momentum < -p.threshold
+        return Signals(
+            long=long,
+            short=short,
+            warmup=warmup_nbars(momentum),
+            mode='level',
+        )
@@ -0,0 +1,262 @@
+"""
+Registry of the strategies of this package, found without importing them.
+
+Importing a strategy module loads backtesting.py (and Bokeh with it),
+TA-Lib and pandas: about half a second before anything runs, in every
+process that only wants to know which strategies exist. The registry reads
+the modules' source instead: every `BaseStrategy` subclass is found by name,
+with its docstring summary, default parameters, `opt_ranges` and
+`opt_space`, and its
+module is only imported when the class itself is asked for (`load()`, or
+``from SPP4backtesting.strategies import <Name>``).
+
+`opt_ranges` and `opt_space` are evaluated from the class body with the
+`range` builtin and the names of `utils.param_space`, which only need
+NumPy; a class whose ranges use anything else is loaded to read them.
+
+Example:
+    >>> from SPP4backtesting.strategies import registry
+    >>> registry.names()
+    ['BTSMAStrategy', 'GridStrategy', 'KAMACrossover', ...]
+    >>> registry.info('BTSMAStrategy').opt_ranges        # no TA-Lib import
+    >>> strategy = registry.load('BTSMAStrategy')       # imports sma_strategies
+"""
+
+import ast
+import importlib
+import os
+import pkgutil
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+_PACKAGE = __name__.rpartition('.')[0]
+_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT = 'BaseStrategy'
+# Builtins opt_ranges expressions may use
+_BUILTINS = {'range': range, 'list': list, 'tuple': tuple, 'dict': dict, 'int': int,
+             'float': float, 'round': round, 'min': min, 'max': max, 'abs': abs}
+
+
+@dataclass
+class StrategyInfo:
+    """
+    A strategy as read from its source.
+
+    Attributes:
+        name: Class name.
+        module: Dotted name of the module defining it.
+        doc: First line of its docstring.
+        bases: Names of its base classes.
+        params: Class attributes set to plain constants (its parameters and
+            their defaults), inherited ones included.
+        methods: Methods defined by the class or its bases in this package,
+            e.g. ``'signals' in methods`` for vectorized support.
+    """
+    name: str
+    module: str
+    doc: str
+    bases: Tuple[str, ...]
+    params: Dict[str, Any] = field(default_factory=dict)
+    methods: FrozenSet[str] = frozenset()
+    # (expression, module names) of opt_ranges / opt_space, maybe inherited
+    _ranges: Optional[Tuple[ast.expr, Dict[str, Any]]] = field(default=None, repr=False)
+    _space: Optional[Tuple[ast.expr, Dict[str, Any]]] = field(default=None, repr=False)
+    _names: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def opt_ranges(self) -> Dict[str, Any]:
+        """The class's `opt_ranges`, evaluated without importing its module when possible."""
+        return self._evaluate('opt_ranges', self._ranges, {})
+
+    @property
+    def opt_space(self) -> Optional[Dict[str, Any]]:
+        """The class's declarative `opt_space`, if any (see `opt_ranges`)."""
+        return self._evaluate('opt_space', self._space, None)
+
+    @property
+    def search_space(self) -> Dict[str, Any]:
+        """What `optimize_auto` searches: `opt_space`, else `opt_ranges`."""
+        return self.opt_space or self.opt_ranges
+
+    def _evaluate(self, attribute: str, source, default):
+        if source is None:
+            return default
+        node, names = source
+        if any(isinstance(value, _ParamSpaceName) for value in names.values()):
+            from ..utils import param_space
+            names = {key: (getattr(param_space, value) if isinstance(value, _ParamSpaceName)
+                           else value) for key, value in names.items()}
+        try:
+            expression = ast.Expression(node)
+            return eval(compile(expression, f'<{self.module}.{self.name}>', 'eval'),
+                        {'__builtins__': _BUILTINS}, names)
+        except NameError:
+            return getattr(load(self.name), attribute)
+
+    @property
+    def vectorized(self) -> bool:
+        """Whether it implements `signals()`, i.e. runs under `VectorizedBacktest`."""
+        return 'signals' in self.methods
+
+    @property
+    def multi_asset(self) -> bool:
+        """Whether it implements `book()`, i.e. runs under `MultiAssetBacktest`."""
+        return 'book' in self.methods
+
+
+class _ParamSpaceName(str):
+    """Name imported from `utils.param_space`, resolved when ranges are evaluated."""
+
+
+def _constant(node: ast.expr):
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return _NOT_CONSTANT
+
+
+_NOT_CONSTANT = object()
+
+
+def _base_name(node: ast.expr) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _module_names(tree: ast.Module) -> Dict[str, Any]:
+    """Module-level constants and `utils.param_space` imports usable in opt_ranges."""
+    names = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and (node.module or '').endswith('param_space'):
+            for alias in node.names:
+                names[alias.asname or alias.name] = _ParamSpaceName(alias.name)
+        elif isinstance(node, ast.Assign):
+            value = _constant(node.value)
+            if value is not _NOT_CONSTANT:
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        names[target.id] = value
+    return names
+
+
+def _classes(module: str, path: str) -> List[Tuple[StrategyInfo, ast.ClassDef]]:
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    names = _module_names(tree)
+    found = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        doc = (ast.get_docstring(node) or '').strip().split('\n')[0]
+        bases = tuple(filter(None, map(_base_name, node.bases)))
+        found.append((StrategyInfo(node.name, module, doc, bases, _names=names), node))
+    return found
+
+
+def _body(info: StrategyInfo, node: ast.ClassDef):
+    """Fill `info` from its own class body."""
+    methods = set()
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            methods.add(item.name)
+        elif isinstance(item, (ast.Assign, ast.AnnAssign)) and item.value is not None:
+            targets = item.targets if isinstance(item, ast.Assign) else [item.target]
+            for target in targets:
+                if not isinstance(target, ast.Name) or target.id.startswith('_'):
+                    continue
+                if target.id == 'opt_ranges':
+                    info._ranges = item.value, info._names
+                    continue
+                if target.id == 'opt_space':
+                    info._space = item.value, info._names
+                    continue
+                value = _constant(item.value)
+                if value is not _NOT_CONSTANT:
+                    info.params[target.id] = value
+    info.methods = frozenset(methods)
+
+
+_registry: Optional[Dict[str, StrategyInfo]] = None
+_loaded: Dict[str, type] = {}
+
+
+def scan(refresh: bool = False) -> Dict[str, StrategyInfo]:
+    """
+    Every `BaseStrategy` subclass defined in the package, by class name.
+
+    The result is kept for the process; `refresh` reads the sources again.
+    """
+    global _registry
+    if _registry is not None and not refresh:
+        return _registry
+    candidates: Dict[str, Tuple[StrategyInfo, ast.ClassDef]] = {}
+    for module_info in sorted(pkgutil.iter_modules([_DIR]), key=lambda m: m.name):
+        if module_info.ispkg or module_info.name in ('registry', '__main__'):
+            continue
+        path = os.path.join(_DIR, f'{module_info.name}.py')
+        if not os.path.exists(path):
+            continue
+        for info, node in _classes(f'{_PACKAGE}.{module_info.name}', path):
+            candidates.setdefault(info.name, (info, node))
+
+    # BaseStrategy's own settings (exit_params, cache_indicators...) aren't parameters
+    root = candidates.get(_ROOT)
+    settings = set()
+    if root is not None:
+        _body(root[0], root[1])
+        settings = set(root[0].params)
+    registry: Dict[str, StrategyInfo] = {}
+
+    def resolve(name: str) -> Optional[StrategyInfo]:
+        # Strategies derive from BaseStrategy, directly or through other strategies
+        if name in registry:
+            return registry[name]
+        if name not in candidates or name == _ROOT:
+            return None
+        info, node = candidates[name]
+        parents = [resolve(base) for base in info.bases if base != name]
+        if _ROOT not in info.bases and not any(parents):
+            return None
+        _body(info, node)
+        for setting in settings:
+            info.params.pop(setting, None)
+        for parent in filter(None, parents):
+            info.params = {**parent.params, **info.params}
+            info.methods |= parent.methods
+            info._ranges = info._ranges or parent._ranges
+            info._space = info._space or parent._space
+        registry[name] = info
+        return info
+
+    for name in candidates:
+        resolve(name)
+    _registry = dict(sorted(registry.items()))
+    return _registry
+
+
+def names() -> List[str]:
+    """Names of the registered strategies, sorted."""
+    return list(scan())
+
+
+def info(name: str) -> StrategyInfo:
+    """
+    Raises:
+        KeyError: No strategy of that name.
+    """
+    try:
+        return scan()[name]
+    except KeyError:
+        raise KeyError(f'Unknown strategy {name!r}; available: {", ".join(names())}') from None
+
+
+def load(name: str) -> type:
+    """The strategy class `name`, importing its module on first use."""
+    strategy = _loaded.get(name)
+    if strategy is None:
+        module = importlib.import_module(info(name).module)
+        strategy = _loaded[name] = getattr(module, name)
+    return strategy
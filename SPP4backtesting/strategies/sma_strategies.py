@@ -1,11 +1,10 @@
 
-from backtesting import Strategy , Backtest
 from backtesting.lib import crossover
 import talib
-from .base_strategies import BaseStrategy
-import datetime as dt
-import multiprocessing
-from backtesting.lib import FractionalBacktest
+from .base_strategies import BaseStrategy, Signals, crossover_mask, warmup_nbars
+from ..utils import batched
+from ..utils.indicator_cache import indicator_cache
+from ..utils.param_space import Range, Ref
 
 class BTSMAStrategy(BaseStrategy):
     # Strategy parameters with default values
@@ -19,6 +18,16 @@ class BTSMAStrategy(BaseStrategy):
         'n2': range(2,51, 1),    # Slow SMA period: 2 to 200
         'stop': range(2, 80, 1),   # Stop-loss: 2% to 79%
     }
+    # Same grid, enumerating only n2 > n1 (see utils.param_space)
+    opt_space = {
+        'n1': range(2, 51, 1),
+        'n2': Range(Ref('n1') + 1, 51),    # Slow SMA period: n1+1 to 50
+        'stop': range(2, 80, 1),
+    }
+    # stop only sets the exit level: swept per (n1, n2) in vectorized mode
+    exit_params = ('stop',)
+    # SMA periods of the sweep, computed as one batch in vectorized mode
+    sma_periods = range(2, 51)
     
     def init(self):
         """
@@ -57,6 +66,32 @@ class BTSMAStrategy(BaseStrategy):
             self.sell(
                 sl=(self.data.Close + self.data.Close * (self.stop / 100)),
             )
+    
+    @classmethod
+    def signals(cls, data, p):
+        """
+        Vectorized equivalent of init()/next() for `VectorizedBacktest`.
+        """
+        periods = cls.sma_periods
+        if p.n1 in periods and p.n2 in periods:
+            # Rows of one (periods x bars) batch, shared by every candidate
+            sma1 = batched.get(talib.SMA, data.Close, timeperiod=p.n1, periods=periods)
+            sma2 = batched.get(talib.SMA, data.Close, timeperiod=p.n2, periods=periods)
+        else:
+            sma1 = indicator_cache.get(talib.SMA, data.Close, p.n1)
+            sma2 = indicator_cache.get(talib.SMA, data.Close, p.n2)
+        sl, tp = cls.exit_levels(p)
+        return Signals(
+            long=crossover_mask(sma1, sma2),
+            short=crossover_mask(sma2, sma1),
+            warmup=warmup_nbars(sma1, sma2),
+            sl=sl,
+            tp=tp,
+        )
+    
+    @classmethod
+    def exit_levels(cls, p):
+        return p.stop / 100, None
 
 
 class SmaAdxStrategy(BaseStrategy):
@@ -0,0 +1,190 @@
+"""
+Batched walk-forward runs over many symbols and strategies.
+
+`run_batch()` takes a universe of OHLCV frames and a list of strategy
+classes, splits every (symbol, strategy) walk-forward into its windows and
+schedules all (symbol, strategy, window) jobs on one worker pool. Jobs are
+submitted longest first (by bars in the train and test slices), so workers
+that finish early pick up the remaining short jobs and no single large
+symbol is left running alone at the end.
+
+Each symbol's OHLCV is placed once in shared memory
+(`utils.shared_data.SharedOHLCV`); workers read their windows as zero-copy
+views. Results come back as a tidy DataFrame indexed by
+``(symbol, strategy, window)``.
+
+Example:
+    >>> from SPP4backtesting.utils.batch import run_batch
+    >>> universe = {s: load_data(s, '2018-01-01') for s in symbols}
+    >>> table = run_batch(universe, [BTSMAStrategy, MomentumStrategy],
+    ...                   cash=10_000, commission=0.001, n_jobs=-1)
+    >>> table.xs('BTSMAStrategy', level='strategy')['Return [%]']
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Callable, Dict, Mapping, Optional, Sequence, Union
+
+import pandas as pd
+
+from . import pools, profiling
+from .result_store import ResultStore
+from .shared_data import SharedOHLCV, attach
+from .vectorized import CORE_STATS
+from .walk_forward import WalkForward, WindowResult
+
+# (symbol, strategy name) -> detached WalkForward, and symbol -> shared block
+# handle, inherited by pool workers (see init_worker)
+_worker_walk_forwards = {}
+_worker_handles = {}
+_worker_views = {}
+
+
+def init_worker(walk_forwards, handles):
+    """
+    Initializer of a pool whose workers run `run_job()`.
+
+    Args:
+        walk_forwards: ``(symbol, strategy name) -> WalkForward``, copies
+            without their data.
+        handles: ``symbol -> SharedOHLCV.handle`` of each symbol's bars.
+    """
+    global _worker_walk_forwards, _worker_handles
+    _worker_walk_forwards = walk_forwards
+    _worker_handles = handles
+    # Jobs already run one per core (see utils.pools)
+    pools.disable()
+
+
+def run_job(symbol, strategy, window):
+    """Window `window` of the walk-forward of (`symbol`, `strategy`), in an `init_worker()` pool."""
+    walk_forward = _worker_walk_forwards[symbol, strategy]
+    view = _worker_views.get(symbol)
+    if view is None:
+        view = _worker_views[symbol] = attach(_worker_handles[symbol])
+    walk_forward._shared = view
+    return profiling.capture(walk_forward.run_window, window)
+
+
+def _run_job_shared(walk_forward, handle, window):
+    # The executor's workers already run one job each (see utils.pools)
+    with attach(handle) as shared, pools.disabled():
+        walk_forward._shared = shared
+        return profiling.capture(walk_forward.run_window, window)
+
+
+def split_symbols(data: Union[Mapping[str, pd.DataFrame], pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Per-symbol OHLCV frames from a mapping or a MultiIndex DataFrame.
+
+    A DataFrame may have ``(symbol, field)`` MultiIndex columns or a
+    ``(symbol, datetime)`` MultiIndex index.
+    """
+    if isinstance(data, Mapping):
+        return dict(data)
+    if isinstance(data.columns, pd.MultiIndex):
+        return {symbol: data[symbol].dropna(how='all')
+                for symbol in data.columns.get_level_values(0).unique()}
+    if isinstance(data.index, pd.MultiIndex):
+        return {symbol: frame.droplevel(0) for symbol, frame in data.groupby(level=0, sort=False)}
+    raise TypeError('`data` must be a mapping of symbol to OHLCV, or a MultiIndex DataFrame')
+
+
+def summary_row(symbol, strategy, result: WindowResult, index, maximize) -> dict:
+    """Row of the batch summary table for one window's result (see `WindowResult.row`)."""
+    return {'symbol': symbol, 'strategy': strategy, **result.row(index, maximize, CORE_STATS)}
+
+
+def run_batch(data: Union[Mapping[str, pd.DataFrame], pd.DataFrame],
+              strategies: Sequence[type],
+              cash: float,
+              commission: float,
+              *,
+              maximize: str = 'Sortino Ratio',
+              constraints: Optional[Mapping[type, Callable]] = None,
+              vectorized: bool = False,
+              prewarm: bool = False,
+              search=None,
+              store: Optional[ResultStore] = None,
+              n_jobs: int = 1,
+              executor: Optional[Executor] = None,
+              return_stats: bool = False):
+    """
+    Walk-forward every strategy on every symbol, as one pool of window jobs.
+
+    Args:
+        data: Mapping of symbol to OHLCV DataFrame, or a MultiIndex frame
+            (see `split_symbols()`).
+        strategies: Strategy classes to run on every symbol.
+        cash, commission: As for `WalkForward`.
+        maximize: Objective of each window's optimization.
+        constraints: Optional constraint per strategy class. Strategies not
+            listed are optimized unconstrained.
+        vectorized, prewarm, search, store: As for `WalkForward`.
+        n_jobs: Worker processes (-1 for all cores). 1 runs serially.
+        executor: Existing `concurrent.futures.Executor` to submit jobs to.
+            Jobs are then pickled, so constraints must not be lambdas.
+        return_stats: Also return the ``(stats_train, stats_test)`` full
+            `Stats` of every job, keyed like the table. Otherwise they're
+            dropped in the workers and only their metrics come back.
+
+    Returns:
+        pd.DataFrame: One row per (symbol, strategy, window) with the
+            window dates, bar count, chosen params, the train objective and
+            the test `CORE_STATS`.
+    """
+    frames = split_symbols(data)
+    constraints = dict(constraints or {})
+    walk_forwards = {}
+    jobs = []
+    for symbol, frame in frames.items():
+        for strategy in strategies:
+            walk_forward = WalkForward(frame, strategy, cash, commission, maximize=maximize,
+                                       constraint=constraints.get(strategy), vectorized=vectorized,
+                                       prewarm=prewarm, search=search, store=store,
+                                       keep_equity=False, keep_stats=return_stats)
+            key = (symbol, strategy.__name__)
+            walk_forwards[key] = walk_forward
+            for window, ((a, b), (c, d)) in enumerate(walk_forward.window_bounds()):
+                # Symbols with too little history yield empty windows
+                if b > a and d > c:
+                    jobs.append((key, window, (b - a) + (d - c)))
+    # Longest jobs first, so the shortest ones fill the gaps at the end
+    jobs.sort(key=lambda job: -job[2])
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    results = {}
+    if executor is None and (n_jobs <= 1 or len(jobs) <= 1):
+        for key, window, _ in jobs:
+            results[key + (window,)] = walk_forwards[key].run_window(window)
+    else:
+        with ExitStack() as stack:
+            shared = {symbol: stack.enter_context(SharedOHLCV(frame)) for symbol, frame in frames.items()}
+            handles = {symbol: block.handle for symbol, block in shared.items()}
+            workers = {key: wf._detached() for key, wf in walk_forwards.items()}
+            if executor is None:
+                # With fork, workers inherit their state instead of unpickling it
+                context = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+                executor = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=min(n_jobs, len(jobs)), mp_context=context,
+                    initializer=init_worker, initargs=(workers, handles)))
+                futures = {key + (window,): executor.submit(run_job, key[0], key[1], window)
+                           for key, window, _ in jobs}
+            else:
+                futures = {key + (window,): executor.submit(_run_job_shared, workers[key],
+                                                            handles[key[0]], window)
+                           for key, window, _ in jobs}
+            results = {job: profiling.release(future.result()) for job, future in futures.items()}
+
+    rows = []
+    for (symbol, strategy, _), result in results.items():
+        rows.append(summary_row(symbol, strategy, result, walk_forwards[symbol, strategy].data.index, maximize))
+    table = pd.DataFrame(rows)
+    if len(table):
+        table = table.set_index(['symbol', 'strategy', 'window']).sort_index()
+    if return_stats:
+        return table, {job: result.stats for job, result in results.items()}
+    return table
@@ -0,0 +1,347 @@
+"""
+Indicators over many periods at once, as ``(periods, bars)`` arrays.
+
+A sweep needs the same indicator for every period of a range (SMA 2..50
+for `BTSMAStrategy`, MOM 5..29 for `MomentumStrategy`...), and calling
+TA-Lib once per period and candidate repeats the same pass over the data.
+The functions here take the input and all the periods, and return one row
+per period with TA-Lib's values and warm-up NaNs:
+
+- `SMA`, `MOM`, `LINEARREG`, `LINEARREG_SLOPE`: closed forms over window
+  sums, from cumulative sums. These are taken over blocks of bars, offset
+  by each block's first value, so rounding doesn't grow with the length
+  of the series.
+- `EMA`, `KAMA`, `ADX`: one loop over the bars, each step updating every
+  period. Their per-period inputs (efficiency ratios, directional
+  movement) are computed vectorized beforehand. The loop runs in Python,
+  so for a few periods TA-Lib's C loops are faster; the batch pays off
+  when every period is read as one matrix.
+
+`get()` returns one period's row of a batch computed once, through
+`indicator_cache`, for every candidate of the sweep; `BTSMAStrategy.signals`
+reads its fast and slow averages that way. `check_against_talib()`
+compares every function with TA-Lib's per-period output.
+
+Inputs must be free of NaNs, as OHLCV columns are.
+
+Example:
+    >>> sma = batched.SMA(data.Close, range(2, 51))          # (49, bars)
+    >>> fast = batched.get(talib.SMA, data.Close, timeperiod=p.n1, periods=range(2, 51))
+    >>> print(batched.check_against_talib(data))
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import talib
+
+from .indicator_cache import indicator_cache
+
+# Output bars of each block of window sums
+_BLOCK = 128
+# TA-Lib's TA_IS_ZERO() tolerance (KAMA's efficiency ratio, ADX's DI)
+_ZERO = 1e-14
+# KAMA's smoothing constants: 30 bars (slowest) to 2 bars (fastest)
+_KAMA_SLOWEST = 2. / (30 + 1)
+_KAMA_SPAN = 2. / (2 + 1) - _KAMA_SLOWEST
+
+
+def _real(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=float)
+
+
+def _periods(periods: Sequence[int], minimum: int) -> np.ndarray:
+    values = np.asarray(list(periods))
+    if values.ndim != 1 or not len(values):
+        raise ValueError('`periods` must be a non-empty sequence of integers')
+    if not np.issubdtype(values.dtype, np.integer) or values.min() < minimum:
+        raise ValueError(f'`periods` must be integers >= {minimum}, got {list(periods)}')
+    return values.astype(np.int64)
+
+
+def _window_sums(x: np.ndarray, periods: np.ndarray, weighted: bool = False):
+    """
+    Sum of the last `n` values at every bar, for every `n` of `periods`.
+
+    Sums are of the values minus an offset (the value on the first bar of
+    their block), which is returned alongside. With `weighted`, also the
+    sums of each value times its age in bars (0 for the current bar).
+
+    Returns:
+        tuple: ``(sums, offset)`` or ``(sums, age_sums, offset)``, arrays of
+            shape ``(len(periods), len(x))`` with NaN before the first full
+            window.
+    """
+    n_bars = len(x)
+    pad = int(periods.max()) - 1
+    n_blocks = max(1, -(-n_bars // _BLOCK))
+    padded = np.zeros(pad + n_blocks * _BLOCK)
+    padded[pad:pad + n_bars] = x
+    # Block b holds the bars its outputs' windows reach back to
+    blocks = np.lib.stride_tricks.sliding_window_view(padded, _BLOCK + pad)[::_BLOCK]
+    offset = blocks[:, pad:pad + 1]
+    local = blocks - offset
+    totals = np.zeros((n_blocks, _BLOCK + pad + 1))
+    np.cumsum(local, axis=1, out=totals[:, 1:])
+    if weighted:
+        positions = np.arange(_BLOCK + pad)
+        age_totals = np.zeros_like(totals)
+        np.cumsum(local * positions, axis=1, out=age_totals[:, 1:])
+    ends = pad + np.arange(_BLOCK) + 1
+
+    sums = np.full((len(periods), n_bars), np.nan)
+    age_sums = np.full_like(sums, np.nan) if weighted else None
+    for row, n in enumerate(periods):
+        window = totals[:, ends] - totals[:, ends - n]
+        sums[row, n - 1:] = window.ravel()[n - 1:n_bars]
+        if weighted:
+            # Age of a value = position of the current bar - its position
+            ages = (ends - 1) * window - (age_totals[:, ends] - age_totals[:, ends - n])
+            age_sums[row, n - 1:] = ages.ravel()[n - 1:n_bars]
+    offset = np.broadcast_to(np.repeat(offset.ravel(), _BLOCK)[:n_bars], sums.shape)
+    return (sums, age_sums, offset) if weighted else (sums, offset)
+
+
+def SMA(real, periods: Sequence[int]) -> np.ndarray:
+    """Simple moving average of `real` for every period, as ``talib.SMA``."""
+    x, periods = _real(real), _periods(periods, 2)
+    sums, offset = _window_sums(x, periods)
+    return sums / periods[:, None] + offset
+
+
+def MOM(real, periods: Sequence[int]) -> np.ndarray:
+    """Momentum of `real` for every period, as ``talib.MOM``."""
+    x, periods = _real(real), _periods(periods, 1)
+    out = np.empty((len(periods), len(x)))
+    for row, n in enumerate(periods):
+        out[row, :n] = np.nan
+        np.subtract(x[n:], x[:-n], out=out[row, n:])
+    return out
+
+
+def _linear_fit(real, periods: Sequence[int]):
+    """Slope and value at the current bar of the least-squares lines, as TA-Lib fits them."""
+    x, periods = _real(real), _periods(periods, 2)
+    sums, age_sums, offset = _window_sums(x, periods, weighted=True)
+    n = periods[:, None].astype(float)
+    sum_x = n * (n - 1) * .5
+    divisor = sum_x * sum_x - n * (periods * (periods - 1) * (2 * periods - 1) // 6)[:, None]
+    # Ages run backwards in time, and so does the sign of the divisor
+    slope = (n * age_sums - sum_x * sums) / divisor
+    intercept = (sums - slope * sum_x) / n
+    return slope, intercept + slope * (n - 1) + offset
+
+
+def LINEARREG(real, periods: Sequence[int]) -> np.ndarray:
+    """Least-squares line at the current bar for every period, as ``talib.LINEARREG``."""
+    return _linear_fit(real, periods)[1]
+
+
+def LINEARREG_SLOPE(real, periods: Sequence[int]) -> np.ndarray:
+    """Slope of the least-squares line for every period, as ``talib.LINEARREG_SLOPE``."""
+    return _linear_fit(real, periods)[0]
+
+
+def _starting(starts: np.ndarray, n_bars: int) -> Dict[int, np.ndarray]:
+    """Rows of each start bar, for the starts within the data."""
+    return {int(bar): np.flatnonzero(starts == bar) for bar in np.unique(starts) if bar < n_bars}
+
+
+def EMA(real, periods: Sequence[int]) -> np.ndarray:
+    """
+    Exponential moving average for every period, as ``talib.EMA``: seeded
+    with the mean of the first `n` values.
+    """
+    x, periods = _real(real), _periods(periods, 2)
+    # Bars first while looping, so each step writes one contiguous row
+    out = np.full((len(x), len(periods)), np.nan)
+    k = 2. / (periods + 1)
+    # TA-Lib adds up the seed values in order, as cumsum does
+    seeds = np.cumsum(x)
+    starting = _starting(periods - 1, len(x))
+    value = np.full(len(periods), np.nan)
+    step = np.empty_like(value)
+    for bar in range(int(periods.min()) - 1, len(x)):
+        np.subtract(x[bar], value, out=step)
+        step *= k
+        value += step
+        rows = starting.get(bar)
+        if rows is not None:
+            value[rows] = seeds[bar] / periods[rows]
+        out[bar] = value
+    return np.ascontiguousarray(out.T)
+
+
+def KAMA(real, periods: Sequence[int]) -> np.ndarray:
+    """
+    Kaufman adaptive moving average for every period, as ``talib.KAMA``
+    (fast/slow constants of 2 and 30 bars).
+    """
+    x, periods = _real(real), _periods(periods, 2)
+    n_bars = len(x)
+    out = np.full((len(periods), n_bars), np.nan)
+    # Smoothing factor of every bar and period, from the efficiency ratio
+    moves = np.zeros(n_bars)
+    np.cumsum(np.abs(np.diff(x)), out=moves[1:])
+    factor = np.full_like(out, np.nan)
+    for row, n in enumerate(periods):
+        change = x[n:] - x[:-n]
+        path = moves[n:] - moves[:-n]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where((path <= change) | ((-_ZERO < path) & (path < _ZERO)),
+                             1., np.abs(change / path))
+        factor[row, n:] = (ratio * _KAMA_SPAN + _KAMA_SLOWEST)**2
+
+    # The first value of each period is seeded by the bar before it
+    factor = np.ascontiguousarray(factor.T)
+    out = out.T.copy()
+    starting = _starting(periods, n_bars)
+    value = np.full(len(periods), np.nan)
+    step = np.empty_like(value)
+    for bar in range(int(periods.min()), n_bars):
+        rows = starting.get(bar)
+        if rows is not None:
+            value[rows] = x[bar - 1]
+        np.subtract(x[bar], value, out=step)
+        step *= factor[bar]
+        value += step
+        out[bar] = value
+    return np.ascontiguousarray(out.T)
+
+
+def ADX(high, low, close, periods: Sequence[int]) -> np.ndarray:
+    """Average directional index for every period, as ``talib.ADX``."""
+    high, low, close = _real(high), _real(low), _real(close)
+    periods = _periods(periods, 2)
+    n_bars = len(close)
+    out = np.full((len(periods), n_bars), np.nan)
+    if n_bars < 2:
+        return out
+
+    up = high[1:] - high[:-1]
+    down = low[:-1] - low[1:]
+    minus = (down > 0) & (up < down)
+    plus = ~minus & (up > 0) & (up > down)
+    true_range = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - close[:-1]),
+                                                           np.abs(low[1:] - close[:-1])))
+    moves = np.zeros((3, n_bars))
+    moves[:, 1:] = np.where(plus, up, 0.), np.where(minus, down, 0.), true_range
+
+    # Wilder's smoothing: sums of the first n - 1 bars, then decayed by 1 / n
+    smoothed = np.empty((n_bars, 3, len(periods)))
+    moves = np.ascontiguousarray(moves.T[:, :, None])
+    state = np.zeros((3, len(periods)))
+    step = np.empty_like(state)
+    longest = int(periods.max())
+    for bar in range(1, n_bars):
+        np.divide(state, periods, out=step)
+        if bar < longest:
+            step[:, bar < periods] = 0.
+        state -= step
+        state += moves[bar]
+        smoothed[bar] = state
+    plus_dm, minus_dm, true_range = smoothed[1:].transpose(1, 2, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        minus_di = 100. * (minus_dm / true_range)
+        plus_di = 100. * (plus_dm / true_range)
+        total = minus_di + plus_di
+        dx = 100. * (np.abs(minus_di - plus_di) / total)
+    bars = np.arange(1, n_bars)
+    valid = ((bars >= periods[:, None]) & ~((-_ZERO < true_range) & (true_range < _ZERO))
+             & ~((-_ZERO < total) & (total < _ZERO)))
+    dx = np.column_stack([np.zeros(len(periods)), np.where(valid, dx, 0.)])
+    valid = np.column_stack([np.zeros(len(periods), dtype=bool), valid])
+
+    # The first ADX averages the first n DX, then each DX is averaged in
+    first = 2 * periods - 1
+    starting = _starting(first, n_bars)
+    update = np.ascontiguousarray((valid & (np.arange(n_bars) > first[:, None])).T)
+    dx_bars = np.ascontiguousarray(dx.T)
+    out = out.T.copy()
+    value = np.full(len(periods), np.nan)
+    step = np.empty_like(value)
+    kept = periods - 1
+    for bar in range(int(first.min()), n_bars):
+        np.multiply(value, kept, out=step)
+        step += dx_bars[bar]
+        step /= periods
+        np.copyto(value, step, where=update[bar])
+        rows = starting.get(bar)
+        if rows is not None:
+            for row in rows:
+                n = periods[row]
+                value[row] = np.cumsum(dx[row, n:2 * n])[-1] / n
+        out[bar] = value
+    return np.ascontiguousarray(out.T)
+
+
+# TA-Lib function name -> batched version
+BATCHED: Dict[str, Callable] = {func.__name__: func for func in (
+    SMA, EMA, MOM, LINEARREG, LINEARREG_SLOPE, KAMA, ADX)}
+
+
+def get(func: Union[Callable, str], *inputs, timeperiod: int, periods: Sequence[int]) -> np.ndarray:
+    """
+    Row `timeperiod` of the batched `func` over all `periods`.
+
+    The batch is computed once per inputs and periods (`indicator_cache`)
+    and shared by every candidate asking for one of its periods; rows are
+    read-only views.
+
+    Args:
+        func: TA-Lib function (e.g. ``talib.SMA``) or its name, one of
+            `BATCHED`.
+        *inputs: Its input arrays (high, low, close for ADX).
+        timeperiod: The period wanted.
+        periods: Every period of the sweep, including `timeperiod`.
+    """
+    name = func if isinstance(func, str) else func.__name__
+    try:
+        batched = BATCHED[name]
+    except KeyError:
+        raise ValueError(f'No batched version of {name}; use one of {list(BATCHED)}') from None
+    period_values, rows = _period_rows(periods if isinstance(periods, (range, tuple)) else tuple(periods))
+    row = rows.get(timeperiod)
+    if row is None:
+        raise ValueError(f'`timeperiod` {timeperiod} is not one of `periods`')
+    inputs = tuple(_real(values) for values in inputs)
+    return indicator_cache.get(batched, *inputs, period_values)[row]
+
+
+@lru_cache(maxsize=64)
+def _period_rows(periods) -> Tuple[np.ndarray, Dict[int, int]]:
+    """
+    `periods` as one array per sweep, so `indicator_cache` keys it by its
+    memoized digest rather than element by element, and the row of each.
+    """
+    values = np.array([int(n) for n in periods], dtype=np.int64)
+    values.flags.writeable = False
+    return values, {int(n): row for row, n in enumerate(values)}
+
+
+def check_against_talib(data: pd.DataFrame, periods: Sequence[int] = range(2, 51)) -> pd.DataFrame:
+    """
+    Compare every batched indicator with TA-Lib, period by period, on `data`.
+
+    Returns:
+        pd.DataFrame: Per indicator, the largest absolute and relative
+            (to ``max(|value|, 1)``) difference over all periods, and
+            whether the warm-up NaNs fall on the same bars.
+    """
+    high, low, close = (_real(data[column]) for column in ('High', 'Low', 'Close'))
+    rows = {}
+    for name, batched in BATCHED.items():
+        inputs = (high, low, close) if name == 'ADX' else (close,)
+        got = batched(*inputs, periods)
+        expected = np.array([getattr(talib, name)(*inputs, timeperiod=n) for n in periods])
+        error = np.abs(got - expected)
+        valid = ~np.isnan(expected) & ~np.isnan(got)
+        rows[name] = {
+            'max_abs_error': float(error[valid].max()) if valid.any() else 0.,
+            'max_rel_error': (float((error / np.maximum(np.abs(expected), 1))[valid].max())
+                              if valid.any() else 0.),
+            'nan_match': bool(np.array_equal(np.isnan(expected), np.isnan(got))),
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
@@ -0,0 +1,406 @@
+"""
+Local market-data store and loaders.
+
+`MarketDataStore` keeps OHLCV bars on disk, partitioned by symbol and
+interval, one flat binary file per column (``Open.bin``, ``Close.bin``, ...)
+plus an int64 UTC nanosecond ``index.bin`` and a ``meta.json``:
+
+    <root>/BTC-USD/1d/{index,Open,High,Low,Close,Volume}.bin, meta.json
+
+Columns are memory-mapped on load, so reading a date range only touches the
+bars in it. New bars are appended in place (the last stored bar is
+rewritten when it's fetched again, e.g. a daily bar still in progress);
+only data preceding the stored range forces a rewrite of the partition.
+
+`load_data()` reads from the store and, when given a fetcher
+(`YFinanceFetcher`, `CSVFetcher` or any object with a `fetch()`
+method), downloads only the bars missing before or after the stored range.
+Without a fetcher, or when fetching fails, backtests run offline from
+what's stored.
+
+The default root is ``$SPP4BACKTESTING_DATA``, or
+``~/.cache/spp4backtesting/market_data``.
+
+Example:
+    >>> from SPP4backtesting.utils.data_loader import load_crypto_data, load_data, CSVFetcher
+    >>> data = load_crypto_data('BTC-USD', period='1y', normalize=True)
+    >>> data = load_data('BTC-USD', '2020-01-01', '2024-01-01', fetcher=CSVFetcher('csv/'))
+"""
+
+import datetime
+import json
+import os
+import warnings
+from pathlib import Path
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = Path(os.environ.get('SPP4BACKTESTING_DATA',
+                                   Path.home() / '.cache' / 'spp4backtesting' / 'market_data'))
+
+COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+_INTERVAL_UNITS = {'m': 'min', 'h': 'h', 'd': 'D', 'wk': 'W', 'mo': 'MS'}
+
+TimeLike = Union[str, pd.Timestamp, datetime.datetime, None]
+
+
+def interval_offset(interval: str) -> pd.DateOffset:
+    """Bar length of a yfinance-style interval (``'1m'``, ``'1h'``, ``'1d'``, ``'1wk'``, ``'1mo'``)."""
+    for suffix in ('wk', 'mo', 'm', 'h', 'd'):
+        if interval.endswith(suffix) and interval[:-len(suffix)].isdigit():
+            return pd.tseries.frequencies.to_offset(interval[:-len(suffix)] + _INTERVAL_UNITS[suffix])
+    raise ValueError(f'Unknown interval {interval!r}')
+
+
+def _timestamp(value: TimeLike, tz: Optional[str]) -> Optional[pd.Timestamp]:
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(tz or 'UTC')
+    return value
+
+
+def _to_ns(value: pd.Timestamp) -> int:
+    return int(value.tz_convert('UTC').as_unit('ns').value)
+
+
+def _normalize_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """OHLCV columns only (capitalized), sorted, without duplicate bars."""
+    data = data.rename(columns={c: c.capitalize() for c in data.columns if isinstance(c, str)})
+    missing = set(COLUMNS[:4]) - set(data.columns)
+    if missing:
+        raise ValueError(f'Data is missing columns {sorted(missing)}')
+    data = data.reindex(columns=COLUMNS)
+    if not isinstance(data.index, pd.DatetimeIndex):
+        data.index = pd.DatetimeIndex(data.index)
+    data = data[~data.index.duplicated(keep='last')].sort_index()
+    return data
+
+
+class MarketDataStore:
+    """
+    Columnar on-disk OHLCV store, partitioned by symbol and interval.
+
+    Args:
+        root: Directory holding the partitions. Defaults to `DEFAULT_ROOT`.
+        dtype: Float dtype of new partitions (``'float64'`` or
+            ``'float32'``). Existing partitions keep theirs.
+    """
+
+    def __init__(self, root: Union[str, os.PathLike, None] = None, dtype='float64'):
+        self.root = Path(root) if root is not None else DEFAULT_ROOT
+        self.dtype = np.dtype(dtype)
+
+    def __repr__(self):
+        return f'<MarketDataStore {self.root}>'
+
+    def _dir(self, symbol: str, interval: str) -> Path:
+        return self.root / symbol.replace('/', '_') / interval
+
+    def meta(self, symbol: str, interval: str) -> Optional[dict]:
+        """Partition metadata (``length``, ``dtype``, ``tz``, ``covered_from``...), or None."""
+        try:
+            return json.loads((self._dir(symbol, interval) / 'meta.json').read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, symbol, interval, meta):
+        path = self._dir(symbol, interval) / 'meta.json'
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(meta))
+        # Readers see the new length only once every column is written
+        os.replace(tmp, path)
+
+    def symbols(self):
+        """Stored symbols and their intervals."""
+        if not self.root.is_dir():
+            return {}
+        return {d.name: sorted(i.name for i in d.iterdir() if (i / 'meta.json').exists())
+                for d in sorted(self.root.iterdir()) if d.is_dir()}
+
+    def _index(self, symbol, interval, meta) -> np.ndarray:
+        if not meta['length']:
+            return np.empty(0, dtype=np.int64)
+        return np.memmap(self._dir(symbol, interval) / 'index.bin', dtype=np.int64,
+                         mode='r', shape=(meta['length'],))
+
+    def bounds(self, symbol: str, interval: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """First and last stored bar, or None if the partition is empty."""
+        meta = self.meta(symbol, interval)
+        if not meta or not meta['length']:
+            return None
+        index = self._index(symbol, interval, meta)
+        first, last = (pd.Timestamp(int(index[i]), tz='UTC').tz_convert(meta['tz']) for i in (0, -1))
+        return first, last
+
+    def _write(self, symbol, interval, meta, frame: pd.DataFrame, at: int):
+        """Write `frame` from row `at` on, truncating whatever followed."""
+        directory = self._dir(symbol, interval)
+        directory.mkdir(parents=True, exist_ok=True)
+        dtype = np.dtype(meta['dtype'])
+        arrays = {'index': (frame.index.tz_convert('UTC').as_unit('ns').asi8, np.dtype(np.int64))}
+        arrays.update((col, (frame[col].to_numpy(dtype=dtype, na_value=np.nan), dtype)) for col in COLUMNS)
+        for name, (values, dt) in arrays.items():
+            path = directory / f'{name}.bin'
+            with open(path, 'r+b' if path.exists() else 'wb') as f:
+                f.seek(at * dt.itemsize)
+                f.write(np.ascontiguousarray(values, dtype=dt).tobytes())
+                f.truncate()
+        meta['length'] = at + len(frame)
+        self._write_meta(symbol, interval, meta)
+
+    def append(self, symbol: str, interval: str, data: pd.DataFrame) -> int:
+        """
+        Add bars to a partition and return how many were written.
+
+        Bars after the stored range are appended in place; a bar with the
+        same timestamp as the last stored one replaces it. Bars inside the
+        stored range are ignored, and bars before it are merged in by
+        rewriting the partition.
+        """
+        data = _normalize_frame(data)
+        if data.empty:
+            return 0
+        if data.index.tz is None:
+            data.index = data.index.tz_localize('UTC')
+        meta = self.meta(symbol, interval)
+        if meta is None:
+            meta = dict(symbol=symbol, interval=interval, dtype=self.dtype.name,
+                        tz=str(data.index.tz), length=0, covered_from=None)
+        if not meta['length']:
+            self._write(symbol, interval, meta, data, 0)
+            return len(data)
+
+        first, last = self.bounds(symbol, interval)
+        if data.index[0] < first:
+            stored = self.load(symbol, interval)
+            merged = stored.combine_first(data.tz_convert(meta['tz']))
+            self._write(symbol, interval, meta, merged, 0)
+            return len(merged) - len(stored)
+
+        new = data[data.index >= last]
+        if new.empty:
+            return 0
+        replaces_last = new.index[0] == last
+        self._write(symbol, interval, meta, new, meta['length'] - replaces_last)
+        return len(new) - replaces_last
+
+    def load(self,
+             symbol: str,
+             interval: str = '1d',
+             start: TimeLike = None,
+             end: TimeLike = None,
+             columns: Sequence[str] = COLUMNS,
+             dtype=None) -> pd.DataFrame:
+        """
+        Bars of ``[start, end)`` from the store; only those rows are read from disk.
+
+        Naive `start`/`end` are taken in the partition's timezone.
+
+        Args:
+            columns: Subset of `COLUMNS` to load.
+            dtype: Cast columns to this dtype (defaults to the stored one).
+        """
+        meta = self.meta(symbol, interval)
+        if meta is None:
+            raise KeyError(f'No stored data for {symbol} {interval} in {self.root}')
+        index = self._index(symbol, interval, meta)
+        start, end = _timestamp(start, meta['tz']), _timestamp(end, meta['tz'])
+        i0 = 0 if start is None else int(np.searchsorted(index, _to_ns(start), 'left'))
+        i1 = len(index) if end is None else int(np.searchsorted(index, _to_ns(end), 'left'))
+
+        directory = self._dir(symbol, interval)
+        stored = np.dtype(meta['dtype'])
+        frame = {}
+        for col in columns:
+            if col not in COLUMNS:
+                raise ValueError(f'Unknown column {col!r}; stored columns are {COLUMNS}')
+            if i1 > i0:
+                values = np.memmap(directory / f'{col}.bin', dtype=stored, mode='r',
+                                   shape=(meta['length'],))[i0:i1]
+            else:
+                values = np.empty(0, dtype=stored)
+            frame[col] = np.array(values, dtype=dtype or stored)
+        dates = pd.DatetimeIndex(np.array(index[i0:i1]).view('M8[ns]'))
+        return pd.DataFrame(frame, index=dates.tz_localize('UTC').tz_convert(meta['tz']))
+
+    def mark_covered(self, symbol: str, interval: str, start: pd.Timestamp):
+        """Record that nothing exists before `start` beyond what's stored, so it isn't fetched again."""
+        meta = self.meta(symbol, interval)
+        if meta is None:
+            return
+        covered = meta.get('covered_from')
+        start_ns = _to_ns(start)
+        if covered is None or start_ns < covered:
+            meta['covered_from'] = start_ns
+            self._write_meta(symbol, interval, meta)
+
+
+class Fetcher:
+    """Source of bars for the gaps of a `MarketDataStore`."""
+
+    def fetch(self, symbol: str, interval: str, start: Optional[pd.Timestamp],
+              end: Optional[pd.Timestamp]) -> pd.DataFrame:
+        """OHLCV bars of ``[start, end)``; None bounds mean as far as available."""
+        raise NotImplementedError
+
+
+class YFinanceFetcher(Fetcher):
+    """Download bars with yfinance."""
+
+    def __init__(self, **history_kwargs):
+        self.history_kwargs = history_kwargs
+
+    def fetch(self, symbol, interval, start, end):
+        try:
+            import yfinance as yf
+        except ImportError:
+            raise ImportError('YFinanceFetcher needs yfinance: pip install yfinance') from None
+        ticker = yf.Ticker(symbol)
+        if start is None:
+            return ticker.history(period='max', end=end, interval=interval, **self.history_kwargs)
+        return ticker.history(start=start, end=end, interval=interval, **self.history_kwargs)
+
+
+class CSVFetcher(Fetcher):
+    """
+    Read bars from local CSV files, as a stand-in for a remote source.
+
+    Args:
+        path: File, or directory containing ``{symbol}_{interval}.csv`` or
+            ``{symbol}.csv``. May also be a pattern with ``{symbol}`` and
+            ``{interval}`` fields.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = str(path)
+
+    def _file(self, symbol, interval) -> Path:
+        if '{' in self.path:
+            return Path(self.path.format(symbol=symbol, interval=interval))
+        path = Path(self.path)
+        if path.is_dir():
+            candidates = [path / f'{symbol}_{interval}.csv', path / f'{symbol}.csv']
+            return next((p for p in candidates if p.exists()), candidates[0])
+        return path
+
+    def fetch(self, symbol, interval, start, end):
+        data = pd.read_csv(self._file(symbol, interval), index_col=0)
+        data.index = pd.to_datetime(data.index, utc=True)
+        if start is not None:
+            data = data[data.index >= start]
+        if end is not None:
+            data = data[data.index < end]
+        return data
+
+
+def _fill_gaps(store: MarketDataStore, fetcher: Fetcher, symbol, interval, start, end):
+    bounds = store.bounds(symbol, interval)
+    meta = store.meta(symbol, interval)
+    requests = []
+    if bounds is None:
+        requests.append((start, end, start))
+    else:
+        first, last = bounds
+        covered = meta.get('covered_from')
+        covered = first if covered is None else min(first, pd.Timestamp(covered, tz='UTC'))
+        if start is not None and start < covered:
+            requests.append((start, first, start))
+        # The last stored bar may have been incomplete: fetch from it on
+        if (end is None and last + interval_offset(interval) <= pd.Timestamp.now(tz='UTC')
+                or end is not None and end > last + interval_offset(interval)):
+            requests.append((last, end, None))
+
+    for fetch_start, fetch_end, covered_from in requests:
+        try:
+            data = fetcher.fetch(symbol, interval, fetch_start, fetch_end)
+        except Exception as e:
+            warnings.warn(f'Could not fetch {symbol} {interval} [{fetch_start}, {fetch_end}): {e!r}. '
+                          'Using stored data only.', stacklevel=3)
+            continue
+        if data is not None and len(data):
+            store.append(symbol, interval, data)
+            if covered_from is not None:
+                store.mark_covered(symbol, interval, covered_from)
+
+
+def load_data(symbol: str,
+              start: TimeLike = None,
+              end: TimeLike = None,
+              interval: str = '1d',
+              *,
+              fetcher: Optional[Fetcher] = None,
+              store: Optional[MarketDataStore] = None,
+              columns: Sequence[str] = COLUMNS,
+              dtype=None) -> pd.DataFrame:
+    """
+    OHLCV bars of `symbol` in ``[start, end)``, from the local store.
+
+    With a `fetcher`, bars missing before or after the stored range are
+    downloaded and appended to the store first. Fetch errors only warn, so
+    runs keep working offline.
+
+    Args:
+        symbol: Ticker, e.g. ``'BTC-USD'``.
+        start, end: Date range; None means from the first / to the last bar.
+        interval: Bar interval, yfinance style (``'1d'``, ``'1h'``...).
+        fetcher: Source used to fill gaps, e.g. `YFinanceFetcher()`.
+        store: Store to use. Defaults to `MarketDataStore()`.
+        columns: Columns to load.
+        dtype: Load columns as this dtype (e.g. ``'float32'``).
+
+    Returns:
+        pd.DataFrame: Bars with a DatetimeIndex, ready for `Backtest`.
+    """
+    store = store if store is not None else MarketDataStore()
+    if fetcher is not None:
+        meta = store.meta(symbol, interval)
+        tz = meta['tz'] if meta else None
+        _fill_gaps(store, fetcher, symbol, interval, _timestamp(start, tz), _timestamp(end, tz))
+    return store.load(symbol, interval, start, end, columns=columns, dtype=dtype)
+
+
+def _period_start(period: str, end: pd.Timestamp) -> Optional[pd.Timestamp]:
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return end.normalize().replace(month=1, day=1)
+    for suffix, unit in (('mo', 'months'), ('y', 'years'), ('wk', 'weeks'), ('d', 'days')):
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return end - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f'Unknown period {period!r}')
+
+
+def load_crypto_data(symbol: str,
+                     period: str = '1y',
+                     normalize: bool = True,
+                     interval: str = '1d',
+                     *,
+                     fetcher: Optional[Fetcher] = None,
+                     offline: bool = False,
+                     store: Optional[MarketDataStore] = None,
+                     dtype=None) -> pd.DataFrame:
+    """
+    Recent bars of `symbol`, yfinance style (``period='1y'``, ``'6mo'``, ``'max'``...).
+
+    Args:
+        normalize: Drop bars with missing prices (which `Backtest` rejects)
+            and make the index timezone-naive.
+        fetcher: Source for missing bars; a new `YFinanceFetcher` by default.
+        offline: Only read what's stored, without fetching.
+    """
+    if offline:
+        fetcher = None
+    elif fetcher is None:
+        fetcher = YFinanceFetcher()
+    end = pd.Timestamp.now(tz='UTC')
+    data = load_data(symbol, _period_start(period, end), None, interval,
+                     fetcher=fetcher, store=store, dtype=dtype)
+    if normalize:
+        data = data.dropna(subset=list(COLUMNS[:4]))
+        data.index = data.index.tz_localize(None)
+    return data
@@ -0,0 +1,317 @@
+"""
+Multi-position execution engine for grid strategies.
+
+`GridStrategy.next()` under backtesting.py checks every level on every bar
+and holds a single position. `GridBacktest` runs the grid as intended, with
+one lot per level open at the same time:
+
+- the buy levels ``P0 * (1 - i * grid_profit / 100)``, ``i = 1..grid_buy``
+  below the first close ``P0`` are kept in a sorted array;
+- a free level buys one lot as soon as a bar's low reaches it (at the
+  level, or at the open if the bar gaps below it), sized to an equal share
+  of the initial cash;
+- each lot has its own take-profit ``grid_profit`` % above its level and is
+  sold from the next bar on, once a bar's high reaches it; the level is
+  then free again from the following bar.
+
+Since every level trades its own share of the cash, levels are independent:
+their buy/sell cycles are found with array searches over the high/low paths
+for all levels (and all parameter combinations of a sweep) at once, and
+the lot book is a structured array. Python only loops over grid cycles,
+never over bars, so `GridBacktest.optimize()` sweeps `grid_profit` and
+`grid_buy` together.
+
+Lots still open at the end are marked to market in the equity curve but
+not counted as trades, like backtesting.py without ``finalize_trades``.
+
+Example:
+    >>> bt = GridBacktest(data, GridStrategy, cash=10_000, commission=0.001)
+    >>> stats = bt.run(grid_profit=2, grid_buy=10)
+    >>> stats._trades           # one row per closed lot
+    >>> stats, heatmap = bt.optimize(**GridStrategy.opt_ranges, return_heatmap=True)
+"""
+
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .param_space import _Params, compile_space, point_params
+from .vectorized import (CORE_STATS, OHLCV, _PeriodInfo, _StrategyResult, _SWEEP_CELLS,
+                         core_stats, core_stats_many)
+
+_LOT_DTYPE = np.dtype([
+    ('level', np.int64),
+    ('entry_bar', np.int64),
+    ('exit_bar', np.int64),
+    ('entry_price', float),
+    ('exit_price', float),
+    ('size', float),
+    ('pnl', float),
+])
+
+# Upper bound on the (queries × bars) window compared at once by _first_cross
+_SCAN_CELLS = 2**22
+
+
+def grid_levels(price: float, grid_profit: float, grid_buy: int) -> np.ndarray:
+    """Buy levels ``grid_profit`` % apart below `price`, sorted ascending."""
+    steps = np.arange(grid_buy, 0, -1)
+    return price * (1 - steps * grid_profit / 100)
+
+
+def _first_cross(values: np.ndarray, starts: np.ndarray, thresholds: np.ndarray,
+                 below: bool) -> np.ndarray:
+    """
+    For each query, the first bar ``t >= start`` with ``values[t] <= threshold``
+    (or ``>=`` if not `below`); ``len(values)`` if there is none.
+
+    Scans forward in windows that double in size, all queries at once.
+    """
+    n = len(values)
+    result = np.full(len(starts), n, dtype=np.int64)
+    position = np.asarray(starts, dtype=np.int64).copy()
+    pending = np.flatnonzero(position < n)
+    window = 64
+    while len(pending):
+        bars = position[pending, None] + np.arange(window)
+        seen = values[np.minimum(bars, n - 1)]
+        limit = thresholds[pending, None]
+        crossed = (seen <= limit) if below else (seen >= limit)
+        crossed &= bars < n
+        found = crossed.any(axis=1)
+        first = crossed.argmax(axis=1)
+        result[pending[found]] = bars[found, first[found]]
+        position[pending] += window
+        pending = pending[~found & (position[pending] < n)]
+        window = max(64, min(2 * window, _SCAN_CELLS // max(1, len(pending))))
+    return result
+
+
+def grid_lots(open_: np.ndarray,
+              high: np.ndarray,
+              low: np.ndarray,
+              close: np.ndarray,
+              grid_profit: np.ndarray,
+              grid_buy: np.ndarray,
+              cash: float,
+              commission: float = .0):
+    """
+    All lots traded by grids of several parameter combinations.
+
+    Args:
+        open_, high, low, close: Price arrays of equal length.
+        grid_profit, grid_buy: One value per combination.
+        cash: Initial cash, split equally between the levels of a grid.
+        commission: Relative commission on every fill.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Combination of every lot, and the
+            lots as a structured array (``level``, ``entry_bar``,
+            ``exit_bar`` (-1 while open), ``entry_price``, ``exit_price``,
+            ``size``, ``pnl``).
+    """
+    n = len(close)
+    grid_profit = np.atleast_1d(np.asarray(grid_profit, dtype=float))
+    grid_buy = np.atleast_1d(np.asarray(grid_buy, dtype=np.int64))
+    # One row per (combination, level)
+    combo = np.repeat(np.arange(len(grid_buy)), grid_buy)
+    step = np.arange(len(combo)) - np.repeat(np.cumsum(grid_buy) - grid_buy, grid_buy) + 1
+    pct = grid_profit[combo] / 100
+    level_price = close[0] * (1 - step * pct)
+    take_profit = level_price * (1 + pct)
+    lot_value = cash / grid_buy[combo]
+
+    combos, lots = [], []
+    free_from = np.full(len(combo), 1, dtype=np.int64)
+    active = np.arange(len(combo))
+    while len(active):
+        # Buy every free level its price reaches
+        entry = _first_cross(low, free_from[active], level_price[active], below=True)
+        active, entry = active[entry < n], entry[entry < n]
+        if not len(active):
+            break
+        entry_price = np.minimum(open_[entry], level_price[active])
+        size = lot_value[active] / (entry_price * (1 + commission))
+        # Sell at the lot's take-profit, from the next bar on
+        exit_ = _first_cross(high, entry + 1, take_profit[active], below=False)
+        sold = exit_ < n
+        exit_price = np.where(sold, np.maximum(open_[np.minimum(exit_, n - 1)], take_profit[active]),
+                              np.nan)
+        pnl = np.where(sold, size * exit_price * (1 - commission)
+                       - size * entry_price * (1 + commission), np.nan)
+        batch = np.empty(len(active), dtype=_LOT_DTYPE)
+        batch['level'] = step[active]
+        batch['entry_bar'] = entry
+        batch['exit_bar'] = np.where(sold, exit_, -1)
+        batch['entry_price'] = entry_price
+        batch['exit_price'] = exit_price
+        batch['size'] = size
+        batch['pnl'] = pnl
+        combos.append(combo[active])
+        lots.append(batch)
+        free_from[active] = exit_ + 1
+        active = active[sold]
+
+    if not lots:
+        return np.array([], dtype=np.int64), np.array([], dtype=_LOT_DTYPE)
+    combos, lots = np.concatenate(combos), np.concatenate(lots)
+    order = np.lexsort((lots['entry_bar'], combos))
+    return combos[order], lots[order]
+
+
+def grid_equity(close: np.ndarray, combos: np.ndarray, lots: np.ndarray, n_combos: int,
+                cash: float, commission: float = .0) -> np.ndarray:
+    """
+    Equity curves (combinations × bars) of the lots from `grid_lots()`.
+
+    Cash and units held change only on fills, so both are cumulative sums of
+    per-bar deltas; open lots are marked to market at each close.
+    """
+    n = len(close)
+    sold = lots['exit_bar'] >= 0
+    entry = combos * n + lots['entry_bar']
+    exit_ = combos[sold] * n + lots['exit_bar'][sold]
+    cost = lots['size'] * lots['entry_price'] * (1 + commission)
+    proceeds = lots['size'][sold] * lots['exit_price'][sold] * (1 - commission)
+    cash_delta = (np.bincount(exit_, proceeds, minlength=n_combos * n)
+                  - np.bincount(entry, cost, minlength=n_combos * n))
+    units_delta = (np.bincount(entry, lots['size'], minlength=n_combos * n)
+                   - np.bincount(exit_, lots['size'][sold], minlength=n_combos * n))
+    cash_held = cash + np.cumsum(cash_delta.reshape(n_combos, n), axis=1)
+    units_held = np.cumsum(units_delta.reshape(n_combos, n), axis=1)
+    return cash_held + units_held * close
+
+
+class GridBacktest:
+    """
+    Multi-position backtest of `GridStrategy`-style grids.
+
+    Mirrors the `VectorizedBacktest` interface (`run()`, `optimize()`), so
+    results carry `CORE_STATS` plus `_strategy`, `_equity_curve` and
+    `_trades` (one row per closed lot).
+
+    Args:
+        data: OHLCV DataFrame, as for `Backtest`.
+        strategy: Strategy class defining `grid_profit` (percent) and
+            `grid_buy` (number of levels), e.g. `GridStrategy`.
+        cash: Initial cash, split equally between the grid levels.
+        commission: Relative commission rate, applied on entry and exit.
+    """
+
+    def __init__(self, data: pd.DataFrame, strategy, *, cash: float = 10_000,
+                 commission: float = .0):
+        if not all(hasattr(strategy, name) for name in ('grid_profit', 'grid_buy')):
+            raise TypeError(f"{strategy.__name__} doesn't define `grid_profit` and `grid_buy`")
+        if len(data) == 0:
+            raise ValueError('OHLC `data` is empty')
+        self._data = data
+        self._strategy = strategy
+        self._cash = cash
+        self._commission = commission
+        self._arrays = OHLCV(data)
+        self._period = _PeriodInfo(data.index)
+
+    def _params(self, kwargs) -> _Params:
+        for key in kwargs:
+            if key not in ('grid_profit', 'grid_buy'):
+                raise AttributeError(f"GridBacktest has no parameter '{key}'")
+        params = _Params(grid_profit=self._strategy.grid_profit, grid_buy=self._strategy.grid_buy)
+        params.update(kwargs)
+        return params
+
+    def _lots(self, grid_profit, grid_buy):
+        a = self._arrays
+        return grid_lots(a.Open, a.High, a.Low, a.Close, grid_profit, grid_buy,
+                         cash=self._cash, commission=self._commission)
+
+    def run(self, **kwargs) -> pd.Series:
+        """
+        Run the grid with the given `grid_profit` and `grid_buy`.
+
+        Returns:
+            pd.Series: `CORE_STATS` plus `_strategy`, `_equity_curve`,
+                `_trades` (closed lots) and `_lots` (all lots, open ones
+                with ``ExitBar == -1``).
+        """
+        params = self._params(kwargs)
+        combos, lots = self._lots(params.grid_profit, params.grid_buy)
+        equity = grid_equity(self._arrays.Close, combos, lots, 1, self._cash, self._commission)[0]
+        closed = lots[lots['exit_bar'] >= 0]
+        s = core_stats(equity, closed, self._period)
+
+        index = self._data.index
+        s['_strategy'] = _StrategyResult(self._strategy, params)
+        s['_equity_curve'] = pd.DataFrame({'Equity': equity}, index=index)
+        book = pd.DataFrame({
+            'Level': lots['level'],
+            'Size': lots['size'],
+            'EntryBar': lots['entry_bar'],
+            'ExitBar': lots['exit_bar'],
+            'EntryPrice': lots['entry_price'],
+            'ExitPrice': lots['exit_price'],
+            'PnL': lots['pnl'],
+            'EntryTime': index[lots['entry_bar']],
+        })
+        s['_trades'] = book[book['ExitBar'] >= 0].reset_index(drop=True)
+        s['_lots'] = book
+        return pd.Series(s, dtype=object)
+
+    def optimize(self, *,
+                 maximize: Union[str, Callable[[pd.Series], float]] = 'Sortino Ratio',
+                 constraint: Optional[Callable[[dict], bool]] = None,
+                 return_heatmap: bool = False,
+                 **kwargs):
+        """
+        Grid search over `grid_profit` / `grid_buy`, all combinations at once.
+
+        Same selection rules as `Backtest.optimize`: candidates without
+        trades are ignored, ties go to the first combination in grid order.
+
+        Args:
+            maximize: Key of `CORE_STATS` or a function of the stats Series
+                (the latter is called once per combination).
+            constraint: Function of the parameters returning True when
+                admissible.
+            return_heatmap: Also return the objective for every candidate.
+            **kwargs: ``grid_profit`` and/or ``grid_buy`` mapped to the
+                values to try.
+        """
+        maximize_key = maximize if isinstance(maximize, str) else None
+        if maximize_key is not None and maximize_key not in CORE_STATS:
+            raise ValueError(f'`maximize` must be one of {CORE_STATS}')
+        if maximize_key is None and not callable(maximize):
+            raise TypeError('`maximize` must be str or a function that accepts result Series')
+
+        points = compile_space(kwargs, constraint)
+        if not len(points):
+            raise ValueError('No admissible parameter combinations to test')
+        combos = [point_params(points, i) for i in range(len(points))]
+        params = [self._params(p) for p in combos]
+        grid_profit = np.array([p.grid_profit for p in params], dtype=float)
+        grid_buy = np.array([p.grid_buy for p in params], dtype=np.int64)
+
+        close = self._arrays.Close
+        scores = np.full(len(combos), np.nan)
+        chunk = max(1, _SWEEP_CELLS // len(close))
+        for j in range(0, len(combos), chunk):
+            part = slice(j, j + chunk)
+            combo, lots = self._lots(grid_profit[part], grid_buy[part])
+            k = len(grid_buy[part])
+            equity = grid_equity(close, combo, lots, k, self._cash, self._commission)
+            closed = lots['exit_bar'] >= 0
+            n_trades = np.bincount(combo[closed], minlength=k)
+            n_wins = np.bincount(combo[closed & (lots['pnl'] > 0)], minlength=k)
+            stats = core_stats_many(equity, n_trades, n_wins, self._period)
+            score = (stats[maximize_key].to_numpy(dtype=float) if maximize_key is not None
+                     else np.array([maximize(row) for _, row in stats.iterrows()], dtype=float))
+            scores[part] = np.where(n_trades > 0, score, np.nan)
+
+        best = combos[0] if np.isnan(scores).all() else combos[int(np.nanargmax(scores))]
+        stats = self.run(**best)
+        if return_heatmap:
+            heatmap = pd.Series(scores, name=maximize_key,
+                                index=pd.MultiIndex.from_tuples([tuple(p.values()) for p in combos],
+                                                                names=list(kwargs)))
+            return stats, heatmap
+        return stats
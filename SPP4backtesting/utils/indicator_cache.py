@@ -0,0 +1,199 @@
+"""
+Indicator cache shared across optimization candidates.
+
+During `Backtest.optimize` every candidate calls `Strategy.init()` again, so
+identical indicators (e.g. ``talib.SMA(Close, 20)``) are recomputed for every
+parameter combination that happens to share them. `IndicatorCache` keys each
+result by the function, a fingerprint of the input arrays and the remaining
+arguments, and keeps results in an LRU bounded by total bytes.
+
+`BaseStrategy.I()` goes through the module-level `indicator_cache`
+transparently; vectorized `signals()` implementations call
+`indicator_cache.get()` directly.
+
+Notes:
+    - Only named module-level functions are cached (TA-Lib functions,
+      helpers defined at module scope). Lambdas and functions defined inside
+      other functions, such as the wrappers `resample_apply` builds, are
+      computed normally since their identity doesn't outlive the call.
+      Bound methods aren't cached either, since their result depends on the
+      instance.
+    - Arrays are fingerprinted by content. Input data is assumed not to be
+      modified in place while it is alive.
+    - Each process has its own cache; optimization workers fill theirs
+      independently.
+
+Example:
+    >>> from SPP4backtesting.utils.indicator_cache import indicator_cache
+    >>> sma = indicator_cache.get(talib.SMA, data.Close, 20)
+    >>> indicator_cache.hits, indicator_cache.misses
+    (0, 1)
+"""
+
+import functools
+import hashlib
+import types
+import weakref
+from collections import OrderedDict
+from numbers import Number
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _root(array: np.ndarray) -> np.ndarray:
+    """Outermost ndarray owning the memory `array` views into."""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator outputs, bounded by total size in bytes.
+
+    Args:
+        max_bytes: Upper bound on the summed `nbytes` of cached outputs.
+            Least recently used entries are evicted beyond it. 0 disables
+            caching.
+
+    Attributes:
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that computed the indicator.
+        nbytes (int): Current size of cached outputs in bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[object, int]]" = OrderedDict()
+        # Memoized content digests: memory address -> (weakref to owner, key, digest)
+        self._digests = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return (f'<IndicatorCache: {len(self)} entries, {self.nbytes / 2**20:.1f} MiB '
+                f'of {self.max_bytes / 2**20:.0f} MiB, {self.hits} hits, {self.misses} misses>')
+
+    def clear(self):
+        """Drop all cached outputs and reset counters."""
+        self._entries.clear()
+        self._digests.clear()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+
+    def _fingerprint(self, array: np.ndarray) -> Tuple:
+        array = np.asarray(array)
+        root = _root(array)
+        address = array.__array_interface__['data'][0]
+        memo_key = (address, array.shape, array.strides, array.dtype.str)
+        memo = self._digests.get(address)
+        # While the owner is alive its memory can't be reused by another array
+        if memo is not None and memo[0]() is root and memo[1] == memo_key:
+            return memo[2]
+        digest = (array.dtype.str, array.shape,
+                  hashlib.blake2b(np.ascontiguousarray(array).data, digest_size=16).digest())
+        try:
+            owner = weakref.ref(root, lambda _: self._digests.pop(address, None))
+        except TypeError:
+            return digest
+        self._digests[address] = (owner, memo_key, digest)
+        return digest
+
+    def fingerprint(self, array: np.ndarray) -> Tuple:
+        """Content digest of `array`, memoized while its memory is alive."""
+        return self._fingerprint(array)
+
+    def _arg_key(self, value) -> Hashable:
+        if value is None or isinstance(value, (Number, str, bool)):
+            return value
+        if isinstance(value, np.ndarray):
+            return self._fingerprint(value)
+        if isinstance(value, (tuple, list)):
+            return tuple(self._arg_key(v) for v in value)
+        raise _Uncacheable
+
+    def key(self, func: Callable, args: tuple, kwargs: dict) -> Optional[Hashable]:
+        """
+        Cache key for ``func(*args, **kwargs)``, or None if it can't be cached.
+        """
+        qualname = getattr(func, '__qualname__', None)
+        module = getattr(func, '__module__', None)
+        if not qualname or '<' in qualname:
+            return None
+        # Bound methods depend on their instance, which the key can't capture
+        owner = getattr(func, '__self__', None)
+        if owner is not None and not isinstance(owner, types.ModuleType):
+            return None
+        try:
+            return ((module, qualname),
+                    tuple(self._arg_key(a) for a in args),
+                    tuple(sorted((k, self._arg_key(v)) for k, v in kwargs.items())))
+        except _Uncacheable:
+            return None
+
+    def get(self, func: Callable, *args, **kwargs):
+        """
+        Return ``func(*args, **kwargs)``, computing it only on a cache miss.
+
+        Cached outputs are read-only NumPy arrays (or tuples of them, for
+        multi-output indicators like MACD).
+        """
+        key = self.key(func, args, kwargs) if self.max_bytes else None
+        if key is None:
+            return func(*args, **kwargs)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        value = func(*args, **kwargs)
+        if isinstance(value, tuple):
+            value = tuple(self._freeze(v) for v in value)
+            size = sum(getattr(v, 'nbytes', 0) for v in value)
+        else:
+            value = self._freeze(value)
+            size = getattr(value, 'nbytes', 0)
+
+        if size <= self.max_bytes:
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    @staticmethod
+    def _freeze(value):
+        if isinstance(value, np.ndarray):
+            value = value.view()
+            value.setflags(write=False)
+        return value
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+        Wrap `func` so its calls go through the cache.
+
+        The wrapper keeps `func`'s name, so indicator labels built by
+        `Strategy.I()` are unchanged.
+        """
+        @functools.wraps(func)
+        def cached(*args, **kwargs):
+            return self.get(func, *args, **kwargs)
+        return cached
+
+
+indicator_cache = IndicatorCache()
@@ -0,0 +1,519 @@
+"""
+Declarative walk-forward jobs, run from a TOML spec file.
+
+A spec lists the symbols, intervals and date ranges to load from the local
+`MarketDataStore`, the strategies (by class name, see
+`strategies.registry`), the walk-forward window sizes, the optimizer and
+the number of workers. `run_spec()` expands it into one job per
+(symbol, interval, range, strategy, window) and runs them on a pool of at
+most `workers` processes, longest first, as `utils.batch.run_batch` does.
+
+Every finished window is appended to ``results.jsonl`` in the output
+directory as soon as it completes. Rerunning the same spec skips the
+windows already there, so an interrupted run resumes where it stopped; a
+spec whose settings changed since is refused rather than mixed with the
+old results. When all jobs are done, the rows are also written as
+``results.csv``, indexed like `run_batch()`'s table.
+
+Spec format::
+
+    output = "runs/majors"          # default: <spec name>.results next to it
+    workers = 4                     # -1 for all cores
+    cash = 10_000
+    commission = 0.001
+    maximize = "Sortino Ratio"      # or a utils.objectives.Penalized table:
+                                    # maximize = {metric = "Sortino Ratio", per_trade = 0.02}
+    vectorized = false
+    prewarm = false                 # indicators warmed on the full history (utils.prewarm)
+    result_store = true             # cache backtests in a ResultStore (or a path)
+
+    [data]
+    symbols = ["BTC-USD", "ETH-USD"]
+    intervals = ["1d"]
+    start = "2018-01-01"            # or ranges = [["2018-01-01", "2022-01-01"], ...]
+    end = "2025-01-01"
+    root = "~/market_data"          # default: MarketDataStore's
+    fetch = "yfinance"              # or a CSV directory; default: store only
+                                    # (paths are relative to the spec file)
+
+    [walk_forward]                  # a utils.windows.WindowPlan
+    train = 1095                    # bars, or a calendar span: "3YS", "365D"
+    test = 383                      # default: 35 % of train
+    scheme = "rolling"              # or "anchored"
+    gap = 0                         # bars purged between train and test
+
+    [optimizer]
+    search = "tpe"                  # grid, random, halving, tpe
+    max_tries = 100
+    random_state = 0
+
+    [[strategies]]
+    name = "BTSMAStrategy"
+    constraint = "n1 < n2"
+
+    [[strategies]]
+    name = "MomentumStrategy"
+
+Example:
+    >>> from SPP4backtesting.utils.jobs import load_spec, run_spec
+    >>> table = run_spec(load_spec('majors.toml'))
+
+    or from the command line::
+
+        python -m SPP4backtesting run majors.toml
+"""
+
+import ast
+import json
+import math
+import multiprocessing as mp
+import os
+import time
+import tomllib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from . import batch, objectives, profiling
+from .data_loader import CSVFetcher, MarketDataStore, YFinanceFetcher, load_data
+from .result_store import ResultStore, canonical_json
+from .search import SEARCHES, get_search
+from .shared_data import SharedOHLCV
+from .walk_forward import WalkForward
+from .windows import WindowPlan
+
+RESULTS = 'results.jsonl'
+TABLE = 'results.csv'
+SPEC = 'spec.json'
+# Key of a job's row in the results file
+KEY = ('symbol', 'interval', 'start', 'end', 'strategy', 'window')
+
+
+# Syntax allowed in constraint expressions: comparisons, arithmetic,
+# boolean logic, numbers and parameter names
+_CONSTRAINT_NODES = (
+    ast.Expression, ast.Compare, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Name, ast.Load,
+    ast.Constant, ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+class Constraint:
+    """
+    Parameter constraint given as an expression of the parameter names,
+    e.g. ``'n1 < n2'``. Unlike a lambda, it can be pickled and keeps the
+    same `ResultStore` key from one run to the next.
+
+    Only comparisons, arithmetic, ``and``/``or``/``not``, numbers and
+    parameter names are allowed.
+
+    Raises:
+        ValueError: The expression is not valid Python or uses other syntax
+            (calls, attributes, subscripts...).
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f'Invalid constraint {expression!r}: {e.msg}') from None
+        for node in ast.walk(tree):
+            if not isinstance(node, _CONSTRAINT_NODES) or (
+                    isinstance(node, ast.Constant) and type(node.value) not in (int, float, bool)):
+                raise ValueError(f'Constraint {expression!r} may only use comparisons, arithmetic '
+                                 f'and parameter names, not {ast.unparse(node)!r}')
+        self._code = compile(tree, f'<constraint {expression!r}>', 'eval')
+
+    def __repr__(self):
+        return f'Constraint({self.expression!r})'
+
+    def __getstate__(self):
+        return self.expression
+
+    def __setstate__(self, expression):
+        self.__init__(expression)
+
+    def __call__(self, params):
+        # Params may hold whole columns, for a vectorized mask
+        return eval(self._code, {'__builtins__': {}}, dict(params))
+
+
+@dataclass
+class StrategySpec:
+    name: str
+    constraint: Optional[str] = None
+
+
+@dataclass
+class JobSpec:
+    """
+    A parsed spec file; see the module docstring for the format.
+
+    Attributes:
+        symbols, intervals: Series to run, every symbol at every interval.
+        ranges: ``(start, end)`` date ranges of the data, None for open ends.
+        strategies: Strategy names, with an optional constraint each.
+        windows: Settings of the walk-forward's `WindowPlan`.
+        search: Search strategy name and its arguments (``max_tries``...).
+        workers: Worker processes; 1 runs serially, -1 uses all cores.
+        output: Directory of the results.
+    """
+    symbols: List[str]
+    strategies: List[StrategySpec]
+    output: str
+    intervals: List[str] = field(default_factory=lambda: ['1d'])
+    ranges: List[Tuple[Optional[str], Optional[str]]] = field(default_factory=lambda: [(None, None)])
+    cash: float = 10_000
+    commission: float = 0.
+    maximize: Union[str, Dict] = 'Sortino Ratio'
+    vectorized: bool = False
+    prewarm: bool = False
+    windows: Dict = field(default_factory=lambda: WindowPlan(3 * 365).to_dict())
+    search: Dict = field(default_factory=dict)
+    workers: int = 1
+    root: Optional[str] = None
+    fetch: Optional[str] = None
+    result_store: Union[bool, str] = False
+
+    def settings(self) -> dict:
+        """Everything the results depend on, i.e. all but `workers`, `output` and `fetch`."""
+        settings = asdict(self)
+        for key in ('workers', 'output', 'fetch'):
+            settings.pop(key)
+        settings['ranges'] = [list(r) for r in self.ranges]
+        # Output directories of specs without the setting stay resumable
+        if not self.prewarm:
+            settings.pop('prewarm')
+        return json.loads(canonical_json(settings))
+
+
+def _list(value, name) -> list:
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list) or not value:
+        raise ValueError(f'`{name}` must be a non-empty string or list')
+    return value
+
+
+def _date(value) -> Optional[str]:
+    return None if value in (None, '') else str(value)
+
+
+def load_spec(path: Union[str, os.PathLike]) -> JobSpec:
+    """
+    Parse and check a TOML spec file.
+
+    Strategy names are checked against the registry and the search
+    against `utils.search`, so mistakes fail before any data is loaded.
+
+    Raises:
+        ValueError: Missing or invalid entries.
+        KeyError: Unknown strategy.
+    """
+    from ..strategies import registry
+
+    path = Path(path)
+    with open(path, 'rb') as f:
+        raw = tomllib.load(f)
+    data = raw.get('data', {})
+    if 'symbols' not in data:
+        raise ValueError(f'{path}: [data] needs `symbols`')
+    if 'ranges' in data:
+        ranges = [(_date(start), _date(end)) for start, end in data['ranges']]
+    else:
+        ranges = [(_date(data.get('start')), _date(data.get('end')))]
+
+    strategies = []
+    for entry in _list(raw.get('strategies'), 'strategies'):
+        entry = StrategySpec(entry) if isinstance(entry, str) else StrategySpec(**entry)
+        registry.info(entry.name)
+        if entry.constraint is not None:
+            Constraint(entry.constraint)
+        strategies.append(entry)
+
+    walk_forward = raw.get('walk_forward', {})
+    unknown = set(walk_forward) - set(WindowPlan.__slots__)
+    if unknown:
+        raise ValueError(f'{path}: unknown [walk_forward] settings {sorted(unknown)}')
+    search = dict(raw.get('optimizer', {}))
+    if search.get('search', 'grid') not in SEARCHES:
+        raise ValueError(f'{path}: unknown search {search["search"]!r}; use one of {list(SEARCHES)}')
+
+    maximize = raw.get('maximize', 'Sortino Ratio')
+    if isinstance(maximize, dict):
+        objectives.Penalized(**maximize)
+    output = raw.get('output') or path.with_suffix('.results').name
+    fetch = data.get('fetch')
+    if fetch and fetch != 'yfinance':
+        fetch = str((path.parent / os.path.expanduser(fetch)).resolve())
+    result_store = raw.get('result_store', False)
+    if isinstance(result_store, str):
+        result_store = str((path.parent / os.path.expanduser(result_store)).resolve())
+    return JobSpec(
+        symbols=_list(data['symbols'], 'symbols'),
+        intervals=_list(data.get('intervals', '1d'), 'intervals'),
+        ranges=ranges,
+        strategies=strategies,
+        output=str((path.parent / os.path.expanduser(output)).resolve()),
+        cash=raw.get('cash', 10_000),
+        commission=raw.get('commission', 0.),
+        maximize=maximize,
+        vectorized=raw.get('vectorized', False),
+        prewarm=raw.get('prewarm', False),
+        windows=WindowPlan.from_dict({'train': 3 * 365, **walk_forward}).to_dict(),
+        search=search,
+        workers=raw.get('workers', 1),
+        root=str((path.parent / os.path.expanduser(data['root'])).resolve()) if data.get('root') else None,
+        fetch=fetch,
+        result_store=result_store,
+    )
+
+
+def _fetcher(fetch: Optional[str]):
+    if not fetch:
+        return None
+    if fetch == 'yfinance':
+        return YFinanceFetcher()
+    return CSVFetcher(os.path.expanduser(fetch))
+
+
+def _result_store(spec: JobSpec) -> Optional[ResultStore]:
+    if not spec.result_store:
+        return None
+    if spec.result_store is True:
+        return ResultStore()
+    return ResultStore(os.path.expanduser(spec.result_store))
+
+
+def read_results(output: Union[str, os.PathLike]) -> List[dict]:
+    """Rows of the windows completed so far; a line cut short by an interruption is skipped."""
+    rows = []
+    try:
+        with open(Path(output) / RESULTS, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+def _check_output(spec: JobSpec, restart: bool):
+    output = Path(spec.output)
+    output.mkdir(parents=True, exist_ok=True)
+    settings = spec.settings()
+    saved = output / SPEC
+    if restart:
+        for name in (RESULTS, TABLE):
+            (output / name).unlink(missing_ok=True)
+    elif saved.exists() and (output / RESULTS).exists():
+        with open(saved, encoding='utf-8') as f:
+            if json.load(f) != settings:
+                raise ValueError(f'{output} holds results of a different spec; '
+                                 'use another output directory or restart')
+    with open(saved, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=1)
+
+
+@dataclass
+class _Series:
+    """One (symbol, interval, range) of data with a strategy's walk-forward on it."""
+    label: str
+    symbol: str
+    interval: str
+    start: Optional[str]
+    end: Optional[str]
+    strategy: str
+    walk_forward: WalkForward
+
+
+def _jobs(spec: JobSpec, done: set, log: Callable[[str], None]) -> Tuple[Dict, List, int]:
+    """Walk-forwards keyed like `utils.batch` workers, pending jobs and the number already done."""
+    from ..strategies import registry
+
+    store = MarketDataStore(spec.root)
+    fetcher = _fetcher(spec.fetch)
+    search = get_search(spec.search.get('search'),
+                        **{k: v for k, v in spec.search.items() if k != 'search'})
+    result_store = _result_store(spec)
+    maximize = (objectives.Penalized(**spec.maximize) if isinstance(spec.maximize, dict)
+                else spec.maximize)
+    series: Dict[Tuple[str, str], _Series] = {}
+    jobs, n_done = [], 0
+    for symbol in spec.symbols:
+        for interval in spec.intervals:
+            for start, end in spec.ranges:
+                label = f'{symbol} {interval} {start or ""}:{end or ""}'
+                try:
+                    data = load_data(symbol, start, end, interval, fetcher=fetcher, store=store)
+                except KeyError:
+                    data = ()
+                if not len(data):
+                    log(f'{label}: no data in {store.root}, skipped')
+                    continue
+                for entry in spec.strategies:
+                    constraint = Constraint(entry.constraint) if entry.constraint else None
+                    walk_forward = WalkForward(
+                        data, registry.load(entry.name), spec.cash, spec.commission,
+                        maximize=maximize, constraint=constraint, vectorized=spec.vectorized,
+                        search=search, store=result_store,
+                        plan=WindowPlan.from_dict(spec.windows), keep_equity=False,
+                        prewarm=spec.prewarm)
+                    key = (label, entry.name)
+                    series[key] = _Series(label, symbol, interval, start, end, entry.name, walk_forward)
+                    for window, ((a, b), (c, d)) in enumerate(walk_forward.window_bounds()):
+                        # Series with too little history yield empty windows
+                        if b <= a or d <= c:
+                            continue
+                        if (symbol, interval, start, end, entry.name, window) in done:
+                            n_done += 1
+                        else:
+                            jobs.append((key, window, (b - a) + (d - c)))
+    # Longest jobs first, so the shortest ones fill the gaps at the end
+    jobs.sort(key=lambda job: -job[2])
+    return series, jobs, n_done
+
+
+def _row(series: _Series, result) -> dict:
+    walk_forward = series.walk_forward
+    row = batch.summary_row(series.symbol, series.strategy, result, walk_forward.data.index,
+                         walk_forward.maximize)
+    row.update(interval=series.interval, start=series.start, end=series.end)
+    return json.loads(json.dumps(row, default=_jsonable))
+
+
+def _jsonable(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value)
+
+
+def _duration(seconds: float) -> str:
+    if not math.isfinite(seconds):
+        return '?'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}h{minutes:02d}m' if hours else f'{minutes}m{seconds:02d}s'
+
+
+class _Progress:
+    """Throughput and ETA printed after each finished window."""
+
+    def __init__(self, total: int, done: int, bars: int, log: Callable[[str], None]):
+        self.total = total
+        self.done = done
+        self.remaining_bars = bars
+        self.log = log
+        self.n = self.bars = 0
+        self.started = time.perf_counter()
+
+    def update(self, label: str, strategy: str, window: int, bars: int):
+        self.n += 1
+        self.done += 1
+        self.bars += bars
+        self.remaining_bars -= bars
+        elapsed = time.perf_counter() - self.started
+        rate = self.bars / elapsed if elapsed else math.inf
+        eta = self.remaining_bars / rate if rate else math.inf
+        self.log(f'[{self.done}/{self.total}] {label} {strategy} w{window}  '
+                 f'{self.n / elapsed:.2f} windows/s, {rate:,.0f} bars/s, ETA {_duration(eta)}')
+
+
+def _completed(series, jobs, workers: int) -> Iterator[Tuple[tuple, int, object]]:
+    """Results of `jobs` as they complete, with at most `workers` running at once."""
+    if workers <= 1 or len(jobs) <= 1:
+        for key, window, _ in jobs:
+            yield key, window, series[key].walk_forward.run_window(window)
+        return
+    frames = {}
+    for key, s in series.items():
+        frames.setdefault(key[0], s.walk_forward.data)
+    blocks = {label: SharedOHLCV(frame) for label, frame in frames.items()}
+    try:
+        handles = {label: block.handle for label, block in blocks.items()}
+        detached = {key: s.walk_forward._detached() for key, s in series.items()}
+        # With fork, workers inherit their state instead of unpickling it
+        context = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context,
+                                 initializer=batch.init_worker,
+                                 initargs=(detached, handles)) as pool:
+            queue = iter(jobs)
+            running = {}
+            try:
+                # Submit as slots free up: an interruption leaves nothing queued in the pool
+                for key, window, _ in queue:
+                    running[pool.submit(batch.run_job, key[0], key[1], window)] = key, window
+                    if len(running) < workers:
+                        continue
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield running.pop(future) + (profiling.release(future.result()),)
+                while running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        yield running.pop(future) + (profiling.release(future.result()),)
+            finally:
+                for future in running:
+                    future.cancel()
+    finally:
+        for block in blocks.values():
+            block.close()
+
+
+def run_spec(spec: JobSpec, *, restart: bool = False, workers: Optional[int] = None,
+             log: Callable[[str], None] = print) -> pd.DataFrame:
+    """
+    Run every job of `spec`, resuming from the results already in its output.
+
+    Args:
+        spec: As returned by `load_spec()`.
+        restart: Discard the stored results and run everything again.
+        workers: Override the spec's worker count.
+        log: Called with each progress line.
+
+    Returns:
+        pd.DataFrame: All the spec's results, indexed by
+            ``(symbol, interval, start, end, strategy, window)``; also saved
+            as ``results.csv`` in the output directory.
+    """
+    _check_output(spec, restart)
+    output = Path(spec.output)
+    done = {tuple(row[k] for k in KEY) for row in read_results(output)}
+    series, jobs, n_done = _jobs(spec, done, log)
+
+    workers = spec.workers if workers is None else workers
+    if workers == -1:
+        workers = os.cpu_count() or 1
+    total = n_done + len(jobs)
+    log(f'{total} windows, {n_done} already done, {len(jobs)} to run on {max(1, workers)} worker(s); '
+        f'results in {output}')
+    progress = _Progress(total, n_done, sum(bars for *_, bars in jobs), log)
+    bars = {(key, window): n for key, window, n in jobs}
+    with open(output / RESULTS, 'a', encoding='utf-8') as f:
+        for key, window, result in _completed(series, jobs, workers):
+            s = series[key]
+            f.write(json.dumps(_row(s, result)) + '\n')
+            f.flush()
+            progress.update(s.label, s.strategy, window, bars[key, window])
+
+    table = results_table(output)
+    table.to_csv(output / TABLE)
+    return table
+
+
+def results_table(output: Union[str, os.PathLike]) -> pd.DataFrame:
+    """Results stored in `output` as a DataFrame indexed by the job key."""
+    table = pd.DataFrame(read_results(output))
+    if not len(table):
+        return table
+    table = table.drop_duplicates(list(KEY), keep='last')
+    return table.set_index(list(KEY)).sort_index()
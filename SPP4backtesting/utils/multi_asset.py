@@ -0,0 +1,387 @@
+"""
+Multi-asset backtests for spread and arbitrage strategies.
+
+backtesting.py runs a strategy on a single `self.data`, so a strategy trading
+two legs at once (e.g. USDT-USD against USDC-USD) can't be expressed there.
+This module provides:
+
+- `MultiAssetData`: N OHLCV series aligned on a common index and stored as
+  one contiguous ``(asset, field, bar)`` float64 array, with vectorized
+  spreads between assets;
+- `MultiAssetBacktest`: runs strategies implementing
+  `BaseStrategy.book()`, which return a target position per bar for a
+  weighted book of legs (`Book`). Every change of target is executed as
+  one atomic paired order at the next bar's open: all legs of the old book
+  are closed and all legs of the new one opened together, with relative
+  commission and slippage charged on every leg.
+
+Targets are decided at the close of a bar and filled at the next open, like
+orders placed from `next()`. Units are fractional, so stablecoin legs don't
+need share rounding. The loop runs over position changes, not bars, and
+equity is filled per segment with array operations, so sweeping a
+parameter over a year of minute bars takes seconds.
+
+Stats are the `CORE_STATS` of `utils.vectorized`, computed with the same
+formulas; a trade is one round trip of a book.
+
+Example:
+    >>> data = MultiAssetData({'USDT-USD': usdt, 'USDC-USD': usdc})
+    >>> bt = MultiAssetBacktest(data, UsdtUsdcArbitrage, cash=10_000,
+    ...                         commission=0.0001, slippage=0.00005)
+    >>> stats = bt.run(threshold=0.001)
+    >>> stats, heatmap = bt.optimize(threshold=[0.0005, 0.001, 0.002],
+    ...                              return_heatmap=True)
+"""
+
+from typing import Callable, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .param_space import _Params, compile_space, point_params
+from .vectorized import CORE_STATS, _PeriodInfo, _StrategyResult, core_stats
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+_BOOK_TRADE_DTYPE = np.dtype([
+    ('direction', np.int8),
+    ('entry_bar', np.int64),
+    ('exit_bar', np.int64),
+    ('pnl', float),
+    ('return', float),
+])
+
+
+class MultiAssetData:
+    """
+    OHLCV of several assets aligned on one index.
+
+    Args:
+        frames: Asset name mapped to an OHLCV DataFrame (``Volume``
+            optional).
+        join: ``'inner'`` keeps the bars present for every asset;
+            ``'outer'`` keeps all bars, carrying each asset's last close
+            into its missing bars (as a flat bar with zero volume).
+
+    Attributes:
+        values (np.ndarray): C-contiguous ``(asset, field, bar)`` array,
+            fields in `FIELDS` order.
+        assets (tuple): Asset names, in `values` order.
+        index (pd.Index): Common index.
+    """
+
+    def __init__(self, frames: Mapping[str, pd.DataFrame], join: str = 'inner'):
+        if len(frames) < 1:
+            raise ValueError('Need at least one asset')
+        if join not in ('inner', 'outer'):
+            raise ValueError("`join` must be 'inner' or 'outer'")
+        self.assets = tuple(frames)
+        index = None
+        for frame in frames.values():
+            index = frame.index if index is None else (
+                index.intersection(frame.index) if join == 'inner' else index.union(frame.index))
+        index = index.sort_values()
+        if not len(index):
+            raise ValueError('Assets have no bars in common')
+
+        self.index = index
+        self.values = np.empty((len(frames), len(FIELDS), len(index)))
+        for i, frame in enumerate(frames.values()):
+            frame = frame[~frame.index.duplicated(keep='last')].reindex(index)
+            close = frame['Close'].ffill()
+            for j, field in enumerate(FIELDS):
+                if field == 'Volume':
+                    column = frame[field].fillna(0) if field in frame else 0.
+                else:
+                    column = frame[field].fillna(close)
+                self.values[i, j] = column
+
+    def __len__(self):
+        return self.values.shape[2]
+
+    def __repr__(self):
+        return f'<MultiAssetData: {list(self.assets)}, {len(self)} bars>'
+
+    def asset_index(self, asset: str) -> int:
+        try:
+            return self.assets.index(asset)
+        except ValueError:
+            raise KeyError(f'Unknown asset {asset!r}; have {list(self.assets)}') from None
+
+    def field(self, name: str) -> np.ndarray:
+        """``(asset, bar)`` view of one field, e.g. ``data.field('Close')``."""
+        return self.values[:, FIELDS.index(name)]
+
+    def get(self, asset: str, field: str = 'Close') -> np.ndarray:
+        """One asset's field as a view."""
+        return self.values[self.asset_index(asset), FIELDS.index(field)]
+
+    def frame(self, asset: str) -> pd.DataFrame:
+        """One asset's aligned OHLCV as a DataFrame."""
+        return pd.DataFrame(self.values[self.asset_index(asset)].T, index=self.index,
+                            columns=list(FIELDS))
+
+    def spread(self, a: str, b: str, field: str = 'Close', kind: str = 'ratio') -> np.ndarray:
+        """
+        Spread of asset `a` over asset `b`, for every bar at once.
+
+        Args:
+            kind: ``'ratio'`` for ``a / b - 1``, ``'log'`` for
+                ``log(a / b)``, ``'diff'`` for ``a - b``.
+        """
+        x, y = self.get(a, field), self.get(b, field)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if kind == 'ratio':
+                return x / y - 1
+            if kind == 'log':
+                return np.log(x / y)
+        if kind == 'diff':
+            return x - y
+        raise ValueError("`kind` must be 'ratio', 'log' or 'diff'")
+
+
+def band_positions(spread: np.ndarray, entry: float, exit: float = 0.) -> np.ndarray:
+    """
+    Mean-reversion targets from a spread, with hysteresis.
+
+    Short the spread (-1) when it rises above `entry`, long (+1) when it
+    falls below ``-entry``; a short is closed once the spread is back at or
+    below `exit`, a long at or above ``-exit``. Computed without a loop
+    over bars.
+
+    Returns:
+        np.ndarray: int8 target per bar, 0 while flat.
+    """
+    spread = np.asarray(spread, dtype=float)
+    n = len(spread)
+    positions = np.arange(n)
+
+    def settle(marker):
+        # Forward-fill the last decisive marker (NaN where there is none)
+        last = np.maximum.accumulate(np.where(np.isnan(marker), -1, positions))
+        return np.where(last >= 0, marker[np.maximum(last, 0)], 0)
+
+    with np.errstate(invalid='ignore'):
+        marker = np.full(n, np.nan)
+        marker[np.abs(spread) <= exit] = 0
+        marker[spread > entry] = -1
+        marker[spread < -entry] = 1
+        # Between the exit and entry bands only the opposite-side book closes
+        state = settle(marker)
+        marker[(spread > exit) & (spread <= entry) & (state == 1)] = 0
+        marker[(spread < -exit) & (spread >= -entry) & (state == -1)] = 0
+    return settle(marker).astype(np.int8)
+
+
+def simulate_book(open_: np.ndarray,
+                  close: np.ndarray,
+                  target: np.ndarray,
+                  weights: np.ndarray,
+                  cash: float,
+                  commission: float = .0,
+                  slippage: float = .0):
+    """
+    Simulate a book of legs traded atomically on changes of `target`.
+
+    Args:
+        open_, close: ``(leg, bar)`` price arrays.
+        target: Target per bar (+1 holds `weights`, -1 the opposite,
+            0 flat), decided at the bar's close.
+        weights: Fraction of equity per leg at target +1 (signed; negative
+            legs are short).
+        cash: Initial cash.
+        commission: Relative commission on every leg's fill.
+        slippage: Relative price slippage against every fill.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Equity curve and round trips as a
+            structured array (``direction``, ``entry_bar``, ``exit_bar``,
+            ``pnl``, ``return``).
+    """
+    n = open_.shape[1]
+    target = np.asarray(target, dtype=np.int8)
+    change = np.flatnonzero(np.diff(target[:-1], prepend=0)) if n > 1 else np.array([], int)
+    fills = change + 1
+    new_targets = target[change].tolist()
+    fill_open = open_[:, fills].T.tolist()
+    weights = np.asarray(weights, dtype=float).tolist()
+
+    # Cash, units and open book (direction, entry bar, equity at entry) from
+    # each fill on; row 0 is the initial flat book
+    seg_cash = [float(cash)]
+    seg_units = [[0.] * len(weights)]
+    seg_book = [None]
+    trades = []
+    balance = float(cash)
+    units = book = None
+    for bar, tgt, prices in zip(fills.tolist(), new_targets, fill_open):
+        if units is not None:
+            # Close every leg at once
+            for u, o in zip(units, prices):
+                fill = o * (1 - slippage) if u > 0 else o * (1 + slippage)
+                balance += u * fill - abs(u) * fill * commission
+            direction, entry_bar, entry_value = book
+            trades.append((direction, entry_bar, bar, balance - entry_value,
+                           balance / entry_value - 1))
+            units = book = None
+        if tgt:
+            # Open every leg at once, sized on the equity before costs
+            book = (tgt, bar, balance)
+            units = []
+            for w, o in zip(weights, prices):
+                w *= tgt
+                fill = o * (1 + slippage) if w > 0 else o * (1 - slippage)
+                u = w * book[2] / fill
+                balance -= u * fill + abs(u) * fill * commission
+                units.append(u)
+        seg_cash.append(balance)
+        seg_units.append(units or [0.] * len(weights))
+        seg_book.append(book)
+
+    segment = np.searchsorted(fills, np.arange(n), side='right')
+    equity = (np.asarray(seg_cash)[segment]
+              + np.einsum('bk,kb->b', np.asarray(seg_units)[segment], close))
+
+    # Out of money: backtesting.py closes everything at the bar close and stops
+    broke = np.flatnonzero(equity <= 0)
+    if len(broke):
+        broke = int(broke[0])
+        trades = [t for t in trades if t[2] <= broke]
+        book = seg_book[segment[broke]]
+        if book is not None:
+            direction, entry_bar, entry_value = book
+            trades.append((direction, entry_bar, broke, equity[broke] - entry_value,
+                           equity[broke] / entry_value - 1))
+        equity[broke:] = 0
+    return equity, np.array(trades, dtype=_BOOK_TRADE_DTYPE)
+
+
+class MultiAssetBacktest:
+    """
+    Backtest of a `Book` strategy over `MultiAssetData`.
+
+    Mirrors the `VectorizedBacktest` interface (`run()`, `optimize()`), so
+    results carry `CORE_STATS` plus `_strategy`, `_equity_curve` and
+    `_trades`.
+
+    Args:
+        data: `MultiAssetData`, or a mapping of asset name to OHLCV
+            DataFrame (aligned with ``join='inner'``).
+        strategy: `BaseStrategy` subclass implementing `book()`.
+        cash: Initial cash.
+        commission: Relative commission, charged on every leg's fill.
+        slippage: Relative adverse price move on every leg's fill.
+    """
+
+    def __init__(self,
+                 data: Union[MultiAssetData, Mapping[str, pd.DataFrame]],
+                 strategy,
+                 *,
+                 cash: float = 10_000,
+                 commission: float = .0,
+                 slippage: float = .0):
+        if not isinstance(data, MultiAssetData):
+            data = MultiAssetData(data)
+        if not callable(getattr(strategy, 'book', None)):
+            raise TypeError(f"{strategy.__name__} does not implement book()")
+        self._data = data
+        self._strategy = strategy
+        self._cash = cash
+        self._commission = commission
+        self._slippage = slippage
+        self._period = _PeriodInfo(data.index)
+
+    def _params(self, kwargs) -> _Params:
+        for key in kwargs:
+            if not hasattr(self._strategy, key):
+                raise AttributeError(
+                    f"Strategy '{self._strategy.__name__}' is missing parameter '{key}'.")
+        params = _Params({key: getattr(self._strategy, key)
+                          for key in getattr(self._strategy, 'opt_ranges', {})})
+        params.update(kwargs)
+        return params
+
+    def _simulate(self, params: _Params):
+        data = self._data
+        book = self._strategy.book(data, params)
+        legs = [data.asset_index(asset) for asset in book.legs]
+        weights = np.array(list(book.legs.values()), dtype=float)
+        weights *= book.size / np.abs(weights).sum()
+        values = data.values[legs]
+        return simulate_book(values[:, 0], values[:, 3], book.target, weights,
+                             cash=self._cash, commission=self._commission,
+                             slippage=self._slippage)
+
+    def run(self, **kwargs) -> pd.Series:
+        """
+        Run the strategy with the given parameters.
+
+        Returns:
+            pd.Series: `CORE_STATS` plus `_strategy`, `_equity_curve` and
+                `_trades` (one row per round trip of the book).
+        """
+        params = self._params(kwargs)
+        equity, trades = self._simulate(params)
+        s = core_stats(equity, trades, self._period)
+        index = self._data.index
+        s['_strategy'] = _StrategyResult(self._strategy, params)
+        s['_equity_curve'] = pd.DataFrame({'Equity': equity}, index=index)
+        s['_trades'] = pd.DataFrame({
+            'Direction': trades['direction'],
+            'EntryBar': trades['entry_bar'],
+            'ExitBar': trades['exit_bar'],
+            'PnL': trades['pnl'],
+            'ReturnPct': trades['return'],
+            'EntryTime': index[trades['entry_bar']],
+            'ExitTime': index[trades['exit_bar']],
+        })
+        return pd.Series(s, dtype=object)
+
+    def optimize(self, *,
+                 maximize: Union[str, Callable[[pd.Series], float]] = 'Sortino Ratio',
+                 constraint: Optional[Callable[[dict], bool]] = None,
+                 return_heatmap: bool = False,
+                 **kwargs):
+        """
+        Grid search, with the same selection rules as `Backtest.optimize`.
+
+        Candidates without trades are ignored, and ties go to the first
+        combination in grid order.
+
+        Args:
+            maximize: Key of `CORE_STATS` or a function of the stats Series.
+            constraint: Function of the parameters returning True when
+                admissible.
+            return_heatmap: Also return the objective for every candidate.
+            **kwargs: Parameter names mapped to the values to try.
+        """
+        maximize_key = None
+        if isinstance(maximize, str):
+            if maximize not in CORE_STATS:
+                raise ValueError(f'`maximize` must be one of {CORE_STATS}')
+            maximize_key = maximize
+
+            def maximize(stats, _key=maximize_key):
+                return stats[_key]
+        elif not callable(maximize):
+            raise TypeError('`maximize` must be str or a function that accepts result Series')
+
+        points = compile_space(kwargs, constraint)
+        if not len(points):
+            raise ValueError('No admissible parameter combinations to test')
+        combos = [point_params(points, i) for i in range(len(points))]
+        scores = np.full(len(combos), np.nan)
+        for i, params in enumerate(combos):
+            equity, trades = self._simulate(self._params(params))
+            stats = pd.Series(core_stats(equity, trades, self._period))
+            if stats['# Trades']:
+                scores[i] = maximize(stats)
+
+        best = combos[0] if np.isnan(scores).all() else combos[int(np.nanargmax(scores))]
+        stats = self.run(**best)
+        if return_heatmap:
+            heatmap = pd.Series(scores, name=maximize_key,
+                                index=pd.MultiIndex.from_tuples([tuple(p.values()) for p in combos],
+                                                                names=list(kwargs)))
+            return stats, heatmap
+        return stats
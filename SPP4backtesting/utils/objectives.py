@@ -0,0 +1,304 @@
+"""
+Lightweight optimization objectives, computed from the equity curve alone.
+
+Every candidate of an optimization used to go through backtesting.py's
+`compute_stats`: trade table, drawdown durations, SQN, Kelly, exposure,
+alpha/beta... when the search only looks at one number. The copy of a
+backtest (`Backtest`, `FractionalBacktest`, `VectorizedBacktest`) returned
+by ``scoring(bt, kernel)`` instead returns a small Series with
+``'# Trades'`` and the kernel's ``'Objective'``; `Metrics` computes the
+metrics the kernel reads, and only those, with NumPy over the equity
+array. `VectorizedBacktest` never builds the full stats of a candidate.
+Event-driven backtests still run normally (`compute_stats` included) and
+a `Scorer` hooked through `utils.stats_hook` scores their equity curve,
+so candidates score the same whichever engine runs them.
+
+`optimize_auto`, the `utils.search` strategies and
+`VectorizedBacktest.optimize` score candidates this way whenever
+`maximize` is one of `METRICS` or a `Kernel`; only the winning parameters'
+full stats are kept (and, vectorized, computed). A plain function of the
+stats Series still gets the full stats of every candidate.
+
+Kernels are vectorized: on the exit sweep of `VectorizedBacktest`,
+`Metrics` holds many equity curves (candidates × bars) and each metric is
+an array, so a kernel built from NumPy operations scores them all at once.
+
+Example:
+    >>> stats = optimize_auto(bt, BTSMAStrategy, maximize='Sortino Ratio')   # kernel path
+    >>> stats = optimize_auto(bt, BTSMAStrategy,
+    ...                       maximize=Penalized('Sortino Ratio', per_trade=.02, per_drawdown=.01))
+    >>> stats = optimize_auto(bt, BTSMAStrategy,
+    ...                       maximize=Kernel(lambda m: m['Return [%]'] / (1 - m['Max. Drawdown [%]'])))
+"""
+
+import operator
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .stats_hook import with_stats
+
+# Key of the kernel's value in the results of scoring() backtests
+SCORE = 'Objective'
+
+METRICS = (
+    'Equity Final [$]',
+    'Equity Peak [$]',
+    'Return [%]',
+    'Return (Ann.) [%]',
+    'Volatility (Ann.) [%]',
+    'Sharpe Ratio',
+    'Sortino Ratio',
+    'Calmar Ratio',
+    'Max. Drawdown [%]',
+    '# Trades',
+    'Win Rate [%]',
+)
+
+# Columns `FractionalBacktest.run()` rescales in the trades of a result
+_TRADE_COLUMNS = ('Size', 'EntryPrice', 'ExitPrice', 'TP', 'SL')
+
+
+class Metrics:
+    """
+    Metrics of one equity curve, or of many (one per row), computed on access.
+
+    Keys and formulas are those of `backtesting._stats.compute_stats` (see
+    `METRICS`). With 2-D `equity`, every metric is an array with one value
+    per curve.
+
+    Args:
+        equity: Equity curve(s), bars on the last axis.
+        n_trades: Closed trades of each curve.
+        n_wins: Trades with a positive PnL of each curve.
+        period: `utils.vectorized._PeriodInfo` of the bars' index.
+    """
+
+    def __init__(self, equity: np.ndarray, n_trades, n_wins, period):
+        self._single = np.ndim(equity) == 1
+        self.equity = np.atleast_2d(equity)
+        self.n_trades = np.atleast_1d(n_trades)
+        self.n_wins = np.atleast_1d(n_wins)
+        self.period = period
+        self._values = {}
+
+    def __getitem__(self, key: str):
+        value = self.values(key)
+        return value[0] if self._single else value
+
+    def values(self, key: str) -> np.ndarray:
+        """Metric `key` of every curve, as an array."""
+        if key not in _METRICS:
+            raise KeyError(f'{key!r} is not a kernel metric; use one of {METRICS}')
+        return self._cached(key, lambda: _METRICS[key](self))
+
+    def _cached(self, name: str, compute: Callable):
+        value = self._values.get(name)
+        if value is None:
+            value = self._values[name] = compute()
+        return value
+
+    def _drawdown(self) -> np.ndarray:
+        def compute():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 1 - self.equity / np.maximum.accumulate(self.equity, axis=1)
+        return self._cached('_drawdown', compute)
+
+    def _day_returns(self):
+        """Geometric mean, downside deviation and variance of the period returns."""
+        def compute():
+            n = len(self.equity)
+            gmean = np.zeros(n)
+            downside = variance = np.full(n, np.nan)
+            if self.period.is_datetime:
+                values = self.equity[:, self.period.period_last]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    day_returns = values[:, 1:] / values[:, :-1] - 1
+                    valid = ~np.isnan(day_returns)
+                    count = valid.sum(axis=1)
+                    returns = np.where(valid, day_returns, 0)
+                    growth = returns + 1
+                    log_sum = np.where(valid, np.log(np.where(valid, growth, 1)), 0).sum(axis=1)
+                    gmean = np.exp(log_sum / np.where(count, count, np.nan)) - 1
+                    gmean[(valid & (growth <= 0)).any(axis=1)] = 0
+                    downside = np.sqrt((returns.clip(-np.inf, 0)**2).sum(axis=1) / count)
+                    downside[count == 0] = np.nan
+                    mean = returns.sum(axis=1) / count
+                    variance = (np.where(valid, returns - mean[:, None], 0)**2).sum(axis=1) / (count - 1)
+                    variance[count < 2] = np.nan
+            return gmean, downside, variance
+        return self._cached('_day_returns', compute)
+
+    def _annualized(self) -> np.ndarray:
+        return (1 + self._day_returns()[0])**self.period.annual_trading_days - 1
+
+
+def _volatility(m: Metrics) -> np.ndarray:
+    gmean, _, variance = m._day_returns()
+    days = m.period.annual_trading_days
+    with np.errstate(invalid='ignore'):
+        return np.sqrt((variance + (1 + gmean)**2)**days - (1 + gmean)**(2 * days)) * 100
+
+
+def _sharpe(m: Metrics) -> np.ndarray:
+    volatility = m.values('Volatility (Ann.) [%]')
+    return m.values('Return (Ann.) [%]') / np.where(volatility != 0, volatility, np.nan)
+
+
+def _sortino(m: Metrics) -> np.ndarray:
+    downside = m._day_returns()[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return m._annualized() / (downside * np.sqrt(m.period.annual_trading_days))
+
+
+def _calmar(m: Metrics) -> np.ndarray:
+    max_drawdown = np.nan_to_num(m._drawdown().max(axis=1))
+    return m._annualized() / np.where(max_drawdown != 0, max_drawdown, np.nan)
+
+
+def _win_rate(m: Metrics) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(m.n_trades, m.n_wins / m.n_trades * 100, np.nan)
+
+
+_METRICS = {
+    'Equity Final [$]': lambda m: m.equity[:, -1],
+    'Equity Peak [$]': lambda m: m.equity.max(axis=1),
+    'Return [%]': lambda m: (m.equity[:, -1] - m.equity[:, 0]) / m.equity[:, 0] * 100,
+    'Return (Ann.) [%]': lambda m: m._annualized() * 100,
+    'Volatility (Ann.) [%]': _volatility,
+    'Sharpe Ratio': _sharpe,
+    'Sortino Ratio': _sortino,
+    'Calmar Ratio': _calmar,
+    'Max. Drawdown [%]': lambda m: -np.nan_to_num(m._drawdown().max(axis=1)) * 100,
+    '# Trades': lambda m: m.n_trades,
+    'Win Rate [%]': _win_rate,
+}
+
+
+class Kernel:
+    """
+    Optimization objective computed from `Metrics`, higher is better.
+
+    Args:
+        func: Function of a `Metrics` returning the score, built from NumPy
+            operations so it also scores arrays of candidates.
+    """
+
+    def __init__(self, func: Callable[[Metrics], Union[float, np.ndarray]]):
+        self.func = func
+
+    def __repr__(self):
+        from .result_store import callable_key
+        return f'Kernel({callable_key(self.func)})'
+
+    def __call__(self, metrics: Metrics):
+        return self.func(metrics)
+
+
+class Penalized(Kernel):
+    """
+    A metric minus penalties for trading often or deep drawdowns.
+
+    Score: ``metric - per_trade * trades - per_drawdown * |max drawdown %|``.
+    Candidates with fewer than `min_trades` trades score NaN, so no search
+    picks them.
+
+    Args:
+        metric: One of `METRICS`.
+        per_trade: Penalty per closed trade.
+        per_drawdown: Penalty per percentage point of maximum drawdown.
+        min_trades: Fewest trades for a candidate to count.
+    """
+
+    def __init__(self, metric: str = 'Sortino Ratio', *, per_trade: float = 0.,
+                 per_drawdown: float = 0., min_trades: int = 0):
+        if metric not in METRICS:
+            raise ValueError(f'Unknown metric {metric!r}; use one of {METRICS}')
+        self.metric = metric
+        self.per_trade = per_trade
+        self.per_drawdown = per_drawdown
+        self.min_trades = min_trades
+
+    def __repr__(self):
+        return (f'Penalized({self.metric!r}, per_trade={self.per_trade}, '
+                f'per_drawdown={self.per_drawdown}, min_trades={self.min_trades})')
+
+    def __call__(self, metrics: Metrics):
+        score = metrics[self.metric]
+        # Metrics without a penalty aren't computed
+        if self.per_trade:
+            score = score - self.per_trade * metrics['# Trades']
+        if self.per_drawdown:
+            score = score + self.per_drawdown * metrics['Max. Drawdown [%]']
+        if self.min_trades:
+            score = np.where(metrics['# Trades'] >= self.min_trades, score, np.nan)
+        return score
+
+
+def as_kernel(maximize) -> Optional[Kernel]:
+    """`maximize` as a `Kernel`, or None if it needs the full stats."""
+    if isinstance(maximize, Kernel):
+        return maximize
+    if isinstance(maximize, str) and maximize in METRICS:
+        return Kernel(operator.itemgetter(maximize))
+    return None
+
+
+def score(stats: pd.Series) -> float:
+    """The kernel's value in a result of a `scoring()` backtest."""
+    return stats[SCORE]
+
+
+def scored(metrics: Metrics, strategy, kernel: Kernel) -> pd.Series:
+    """Result of a `scoring()` backtest run: the trade count and `kernel`'s score."""
+    return pd.Series({
+        '# Trades': int(metrics['# Trades']),
+        SCORE: float(kernel(metrics)),
+        '_strategy': strategy,
+        '_trades': pd.DataFrame(columns=_TRADE_COLUMNS, dtype=float),
+    }, dtype=object)
+
+
+class Scorer:
+    """
+    `utils.stats_hook` hook scoring a run with `kernel`: runs the backtest
+    normally, then computes the kernel's metrics from its equity curve.
+
+    The bars' period info is computed once per index, as every candidate
+    of an optimization runs on the same data.
+    """
+
+    def __init__(self, kernel: Kernel):
+        self.kernel = kernel
+        self._period = (None, None)
+
+    def __getstate__(self):
+        return {'kernel': self.kernel, '_period': (None, None)}
+
+    def __call__(self, run: Callable, **params) -> pd.Series:
+        from .vectorized import _PeriodInfo
+        stats = run(**params)
+        equity = stats['_equity_curve']['Equity']
+        index, period = self._period
+        if index is None or not (index is equity.index or index.equals(equity.index)):
+            index = equity.index
+            period = _PeriodInfo(index)
+            self._period = index, period
+        n_wins = int((stats['_trades']['PnL'] > 0).sum())
+        metrics = Metrics(equity.to_numpy(), len(stats['_trades']), n_wins, period)
+        return scored(metrics, stats['_strategy'], self.kernel)
+
+
+def scoring(bt, kernel: Kernel):
+    """
+    Copy of backtest `bt` whose runs return `kernel`'s score instead of their stats.
+
+    Supports `Backtest`, `FractionalBacktest` (scored after each run
+    through `utils.stats_hook`)
+    and `VectorizedBacktest`.
+    """
+    if hasattr(bt, 'scoring'):
+        return bt.scoring(kernel)
+    return with_stats(bt, Scorer(kernel))
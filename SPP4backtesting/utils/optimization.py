@@ -1,36 +1,38 @@
 from backtesting import Backtest
 from backtesting.lib import FractionalBacktest
 import pandas as pd
-from typing import Callable, Optional, Dict, List, Any
+from functools import partial
+from typing import Callable, Optional, Dict, List, Any, Union
+from .vectorized import VectorizedBacktest
+from .search import SearchStrategy, get_search
+from .param_space import is_declarative, plain_params, search_space
+from .pruning import Pruner, Progress, as_pruner
+from .result_store import ResultStore, backtest_key, callable_key, search_key
+from .windows import WindowPlan
+from . import objectives, pools, profiling
 
 def walk_forward(data:pd.DataFrame,
-                 strategy,cash,commission,maximize:str = 'Sortino Ratio',constraint = lambda p: p.n1< p.n2 ):
+                 strategy,cash,commission,maximize:str = 'Sortino Ratio',constraint = lambda p: p.n1< p.n2,
+                 vectorized: bool = False, search=None, store: Optional[ResultStore] = None,
+                 plan: Optional[WindowPlan] = None):
     
-    stats_master = []
-    size_optimization = 1095
-    size_test = int(size_optimization * 0.35)
-    
-    df = data.iloc[size_optimization+size_test:]
-    train = data.iloc[:size_optimization]
-    test = data.iloc[size_optimization:size_optimization+size_test]
-    
-    brocks = [df.iloc[i:i+size_test] for i in range(size_optimization,len(data),size_test) if i < len(df)]
+    # Vectorized mode runs strategies through their signals() hook instead of next()
+    if vectorized:
+        FractionalBacktest_ = partial(VectorizedBacktest, fractional_unit=1 / 100e6)
+    else:
+        FractionalBacktest_ = FractionalBacktest
     
-    bt = FractionalBacktest(train,strategy=strategy,cash=cash)
-    stats = optimize_auto(bt, strategy, maximize, constraint)
-    
-    bt = FractionalBacktest(test, strategy, cash=cash, commission=commission)
-    stats = bt.run(**stats._strategy._params)
-    stats_master.append(stats)
-
-    for i in range(len(brocks)):
+    stats_master = []
+    # Rolling 1095-bar train windows, each tested on the next 35 %
+    plan = plan or WindowPlan(1095)
     
-        bt = FractionalBacktest(brocks[i], strategy, cash=cash, commission=commission)
-        stats = optimize_auto(bt, strategy, maximize, constraint)
-        if i+1<len(brocks):
-            bt = FractionalBacktest(brocks[i+1], strategy, cash=cash, commission=commission)
-            stats = bt.run(**stats._strategy._params)
-            stats_master.append(stats)
+    for window in plan.windows(data.index):
+        bt = FractionalBacktest_(data.iloc[window.train], strategy, cash=cash, commission=commission)
+        stats = optimize_auto(bt, strategy, maximize, constraint, search, store=store)
+        
+        bt = FractionalBacktest_(data.iloc[window.test], strategy, cash=cash, commission=commission)
+        stats = _run(bt, stats._strategy._params, store)
+        stats_master.append(stats)
     
     return stats_master
 
@@ -78,17 +80,90 @@ def _walk_forward(
     return stats_master
 
 
+def _run(bt, params, store: Optional[ResultStore] = None):
+    """`bt.run(**params)`, through `store` when given."""
+    bt = profiling.timed_stats(bt)
+    return store.run(bt, params) if store is not None else bt.run(**params)
+
+
 def optimize_auto(
     bt: Backtest,
     StrategyCls,
     maximize: str = 'Sortino Ratio',
-    constraint: Optional[Callable] = None
+    constraint: Optional[Callable] = None,
+    search: Union[str, SearchStrategy, None] = None,
+    max_tries: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    store: Optional[ResultStore] = None,
+    pruner: Union[Pruner, Callable[[Progress], bool], None] = None,
 ):
+    """
+    Optimize `StrategyCls.opt_space` (or its `opt_ranges`, see
+    `utils.param_space.search_space`) on `bt` and return the best run's stats.
+
+    Without `search` or budgets this is the exhaustive grid, through
+    `bt.optimize()` and its process pool (candidates run in-process inside
+    our own pool workers, see `utils.pools`). Declarative spaces
+    (`utils.param_space`) are compiled to their valid points, which
+    `utils.search.GridSearch` spreads over its own process pool.
+    Otherwise the space is explored by a `utils.search` strategy: ``'grid'``,
+    ``'random'``, ``'halving'`` (successive halving on data prefixes) or
+    ``'tpe'`` (Bayesian), or a `SearchStrategy` instance. `max_tries` and
+    `time_budget` (seconds) bound the searches built from a name.
 
-    ranges = getattr(StrategyCls, 'opt_ranges', None)
+    With a `store` (`utils.result_store.ResultStore`), an optimization
+    already run on the same backtest, data window and setup is not repeated.
+
+    A `pruner` (`utils.pruning.Pruner`, or a rule taking a
+    `utils.pruning.Progress`) aborts hopeless candidates mid-backtest. The
+    candidates of event-driven backtests then run one by one in this
+    process, through the search (the grid by default).
+    `maximize` is a stats key, a `utils.objectives.Kernel` or a function of
+    the stats Series. Metrics in `utils.objectives.METRICS` and kernels are
+    computed for each candidate from its equity curve alone, and the full
+    stats only for the best one.
+
+    Each call is an ``optimize`` span of an active `utils.profiling` session.
+    """
+
+    ranges = search_space(StrategyCls)
     if not ranges:
         raise ValueError(
             f"{StrategyCls.__name__}"
         )
+    pruner = as_pruner(pruner)
     
-    return bt.optimize(**ranges, maximize=maximize, constraint=constraint) 
+    with profiling.span('optimize', strategy=StrategyCls.__name__, bars=len(bt._data)) as record:
+        if store is not None:
+            bt_key = backtest_key(bt)
+            opt_key = search_key(ranges, constraint, maximize, search,
+                                 max_tries=max_tries, time_budget=time_budget,
+                                 **({'pruner': callable_key(pruner)} if pruner is not None else {}))
+            params = store.get_best(bt_key, opt_key)
+            if params is not None:
+                record['cached'] = True
+                return store.run(profiling.timed_stats(bt), params, bt_key)
+        
+        plain_grid = (search is None and max_tries is None and time_budget is None
+                      and pruner is None and not is_declarative(ranges))
+        # Event-driven candidates scored by a kernel go through GridSearch,
+        # which keeps their full stats for the winner only, and so do those
+        # run without Backtest.optimize's pool (utils.pools)
+        if plain_grid and (isinstance(bt, VectorizedBacktest)
+                           or (objectives.as_kernel(maximize) is None and pools.enabled())):
+            params = bt.optimize(**ranges, maximize=maximize, constraint=constraint)._strategy._params
+        else:
+            if search is None:
+                search = 'grid' if max_tries is None and time_budget is None else 'random'
+            search = get_search(search, max_tries=max_tries, time_budget=time_budget)
+            params = search.search(bt, ranges, maximize=maximize, constraint=constraint, pruner=pruner)
+            if pruner is not None:
+                record['pruned'] = int(search.pruned.sum())
+        # Backtest.optimize returns NumPy scalars, the searches Python ones
+        params = plain_params(params)
+        stats = profiling.timed_stats(bt).run(**params)
+        
+        if store is not None:
+            store.put_stats(bt_key, params, stats)
+            store.put_best(bt_key, opt_key, params)
+        return stats
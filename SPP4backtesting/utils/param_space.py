@@ -0,0 +1,388 @@
+"""
+Declarative parameter spaces for `BaseStrategy.opt_space`.
+
+`opt_ranges` stays a dict of plain sequences (``range(2, 51)``, lists),
+which `Backtest.optimize(**opt_ranges)` accepts as is. A strategy may add
+an `opt_space`, preferred by `optimize_auto` (see `search_space()`), whose
+values may also be:
+
+- `Range(start, stop, step)` whose bounds refer to earlier parameters
+  through `Ref`, e.g. ``'n2': Range(Ref('n1') + 1, 51)`` for "n2 from n1+1";
+- `LogRange(start, stop, num)`: log-spaced values (deduplicated integers
+  by default);
+- `When(condition, values, otherwise)`: a parameter only varied when a
+  condition on earlier parameters holds, e.g.
+  ``'profit': When(Ref('use_tp'), range(4, 100, 2), otherwise=0)``.
+
+`compile_space()` enumerates only the valid points, vectorized, into a NumPy
+structured array with one field per parameter, in the same order
+`itertools.product` would visit the plain grid. A `constraint` callable is
+applied to whole columns at once when it is written with array-friendly
+operators (``p.n1 < p.n2``), and per point otherwise. The searches in
+`utils.search` and `VectorizedBacktest.optimize` consume that array.
+
+Example:
+    >>> space = compile_space({'n1': range(2, 51), 'n2': Range(Ref('n1') + 1, 51)})
+    >>> len(space), space.dtype.names
+    (1176, ('n1', 'n2'))
+    >>> describe(Range(Ref('n1') + 1, 51))
+    'Range(n1 + 1, 51)'
+"""
+
+import operator
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+class _Params(dict):
+    """Dict of strategy parameters with attribute access (``p.n1``)."""
+
+    def __getattr__(self, item):
+        try:
+            return self[item]
+        except KeyError:
+            raise AttributeError(item) from None
+
+
+class Ref:
+    """
+    Reference to an earlier parameter, usable in `Range` bounds and `When`.
+
+    Supports arithmetic (``+ - * // /``) and comparisons, producing
+    expressions evaluated on whole columns of the points enumerated so far.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def refs(self):
+        return {self.name}
+
+    def evaluate(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise ValueError(f'Ref({self.name!r}) must refer to a parameter declared before it') from None
+
+    def __repr__(self):
+        return f'Ref({self.name!r})'
+
+    def describe(self) -> str:
+        return self.name
+
+    def _op(self, other, op, symbol, reverse=False):
+        return _Expr(op, (other, self) if reverse else (self, other), symbol)
+
+    def __add__(self, other): return self._op(other, operator.add, '+')
+    def __radd__(self, other): return self._op(other, operator.add, '+', True)
+    def __sub__(self, other): return self._op(other, operator.sub, '-')
+    def __rsub__(self, other): return self._op(other, operator.sub, '-', True)
+    def __mul__(self, other): return self._op(other, operator.mul, '*')
+    def __rmul__(self, other): return self._op(other, operator.mul, '*', True)
+    def __floordiv__(self, other): return self._op(other, operator.floordiv, '//')
+    def __truediv__(self, other): return self._op(other, operator.truediv, '/')
+    def __lt__(self, other): return self._op(other, operator.lt, '<')
+    def __le__(self, other): return self._op(other, operator.le, '<=')
+    def __gt__(self, other): return self._op(other, operator.gt, '>')
+    def __ge__(self, other): return self._op(other, operator.ge, '>=')
+    def __eq__(self, other): return self._op(other, operator.eq, '==')
+    def __ne__(self, other): return self._op(other, operator.ne, '!=')
+    def __and__(self, other): return self._op(other, operator.and_, '&')
+    def __or__(self, other): return self._op(other, operator.or_, '|')
+    def __invert__(self): return _Expr(operator.invert, (self,), '~')
+    __hash__ = object.__hash__
+
+
+class _Expr(Ref):
+    """Operation on `Ref`s and constants."""
+
+    def __init__(self, op: Callable, operands: tuple, symbol: str):
+        self.op = op
+        self.operands = operands
+        self.symbol = symbol
+
+    def refs(self):
+        return set().union(*(o.refs() for o in self.operands if isinstance(o, Ref)))
+
+    def evaluate(self, columns):
+        return self.op(*(o.evaluate(columns) if isinstance(o, Ref) else o for o in self.operands))
+
+    def __repr__(self):
+        if len(self.operands) == 1:
+            return f'{self.symbol}{self.operands[0]!r}'
+        return f'({self.operands[0]!r} {self.symbol} {self.operands[1]!r})'
+
+    def describe(self, nested: bool = False) -> str:
+        operands = [o.describe(True) if isinstance(o, _Expr) else _describe_value(o)
+                    for o in self.operands]
+        if len(operands) == 1:
+            return f'{self.symbol}{operands[0]}'
+        text = f' {self.symbol} '.join(operands)
+        return f'({text})' if nested else text
+
+
+def _describe_value(value) -> str:
+    return value.describe() if isinstance(value, Ref) else repr(value)
+
+
+def _evaluate(value, columns, n):
+    if isinstance(value, Ref):
+        return np.broadcast_to(value.evaluate(columns), n)
+    return np.broadcast_to(value, n)
+
+
+class Dimension:
+    """
+    Base class of declarative `opt_ranges` values.
+
+    `expand()` returns, for each of the `n` points enumerated so far, how
+    many values this parameter takes, and those values concatenated in
+    point order.
+    """
+
+    def refs(self):
+        return set()
+
+    def expand(self, columns: Dict[str, np.ndarray], n: int):
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        """Short declarative form, with `Ref`s by name (see `describe()`)."""
+        return repr(self)
+
+
+class Values(Dimension):
+    """Fixed sequence of values, the same for every point (a plain grid axis)."""
+
+    def __init__(self, values):
+        self.values = _as_array(list(values))
+
+    def __repr__(self):
+        return f'Values({self.values.tolist()!r})'
+
+    def describe(self):
+        values = self.values
+        # Integer steps (ranges wrapped by When) read as the range
+        if len(values) > 2 and values.dtype.kind in 'iu':
+            steps = np.unique(np.diff(values))
+            if len(steps) == 1 and steps[0] > 0:
+                return _describe_sequence(range(values[0], values[-1] + 1, steps[0]))
+        return _describe_sequence(values.tolist())
+
+    def expand(self, columns, n):
+        return np.full(n, len(self.values)), np.tile(self.values, n)
+
+
+class Range(Dimension):
+    """
+    ``range(start, stop, step)`` whose arguments may depend on earlier params.
+
+    Args:
+        start, stop, step: Numbers or `Ref` expressions. ``stop`` is
+            exclusive, as for `range`. Floats are allowed.
+    """
+
+    def __init__(self, start, stop, step=1):
+        if not isinstance(step, Ref) and step == 0:
+            raise ValueError('Range() step must not be zero')
+        self.start, self.stop, self.step = start, stop, step
+
+    def __repr__(self):
+        return f'Range({self.start!r}, {self.stop!r}, {self.step!r})'
+
+    def describe(self):
+        args = [self.start, self.stop] + ([self.step] if isinstance(self.step, Ref) or self.step != 1 else [])
+        return f"Range({', '.join(map(_describe_value, args))})"
+
+    def refs(self):
+        return set().union(*(v.refs() for v in (self.start, self.stop, self.step) if isinstance(v, Ref)))
+
+    def expand(self, columns, n):
+        start = _evaluate(self.start, columns, n)
+        stop = _evaluate(self.stop, columns, n)
+        step = _evaluate(self.step, columns, n)
+        counts = np.maximum(0, np.ceil((stop - start) / step)).astype(np.int64)
+        # Position of each value within its point's run: 0, 1, ..., counts-1
+        total = int(counts.sum())
+        position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        values = np.repeat(start, counts) + position * np.repeat(step, counts)
+        return counts, values
+
+
+class LogRange(Dimension):
+    """
+    `num` log-spaced values from `start` to `stop` inclusive.
+
+    Args:
+        integer: Round to integers and drop duplicates (the default), for
+            periods and lookbacks.
+    """
+
+    def __init__(self, start: float, stop: float, num: int, integer: bool = True):
+        values = np.geomspace(start, stop, num)
+        if integer:
+            values = np.unique(np.rint(values).astype(np.int64))
+        self.values = values
+        self.args = (start, stop, num, integer)
+
+    def __repr__(self):
+        return 'LogRange({!r}, {!r}, {!r}, integer={!r})'.format(*self.args)
+
+    def describe(self):
+        start, stop, num, integer = self.args
+        return f'LogRange({start!r}, {stop!r}, {num!r}{"" if integer else ", integer=False"})'
+
+    def expand(self, columns, n):
+        return np.full(n, len(self.values)), np.tile(self.values, n)
+
+
+class When(Dimension):
+    """
+    Conditional parameter: `values` where `condition` holds, else `otherwise`.
+
+    Args:
+        condition: `Ref` expression on earlier parameters, e.g.
+            ``Ref('mode') == 'trend'``.
+        values: Sequence or `Dimension` used when the condition holds.
+        otherwise: Single value used when it doesn't (the parameter is then
+            inactive, so it isn't varied).
+    """
+
+    def __init__(self, condition: Ref, values, otherwise: Any = None):
+        self.condition = condition
+        self.values = as_dimension(values)
+        self.otherwise = otherwise
+
+    def __repr__(self):
+        return f'When({self.condition!r}, {self.values!r}, otherwise={self.otherwise!r})'
+
+    def describe(self):
+        return (f'When({self.condition.describe()}, {self.values.describe()}, '
+                f'otherwise={self.otherwise!r})')
+
+    def refs(self):
+        return self.condition.refs() | self.values.refs()
+
+    def expand(self, columns, n):
+        mask = np.broadcast_to(np.asarray(self.condition.evaluate(columns), dtype=bool), n)
+        counts, values = self.values.expand(columns, n)
+        point_of_value = np.repeat(np.arange(n), counts)
+        keep = mask[point_of_value]
+        inactive = np.flatnonzero(~mask)
+        points = np.concatenate([point_of_value[keep], inactive])
+        values = np.concatenate([values[keep], _as_array([self.otherwise] * len(inactive))])
+        order = np.argsort(points, kind='stable')
+        return np.where(mask, counts, 1), values[order]
+
+
+def _as_array(values) -> np.ndarray:
+    array = np.asarray(values)
+    if array.ndim != 1:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+    return array
+
+
+def as_dimension(values) -> Dimension:
+    """Wrap plain sequences (ranges, lists) as `Values`."""
+    return values if isinstance(values, Dimension) else Values(values)
+
+
+def _describe_sequence(values) -> str:
+    if isinstance(values, range) and len(values) > 1:
+        step = '' if values.step == 1 else f' step {values.step}'
+        return f'{values[0]}..{values[-1]}{step}'
+    values = list(values)
+    if len(values) > 6:
+        shown = ', '.join(map(repr, values[:3]))
+        return f'[{shown}, ..., {values[-1]!r}] ({len(values)} values)'
+    return repr(values)
+
+
+def describe(values) -> str:
+    """
+    One `opt_ranges` value as short text, declarative ones as declared.
+
+    Example:
+        >>> describe(range(2, 51)), describe(Range(Ref('n1') + 1, 51))
+        ('2..50', 'Range(n1 + 1, 51)')
+    """
+    if isinstance(values, Dimension):
+        return values.describe()
+    return _describe_sequence(values)
+
+
+def is_declarative(ranges: Dict[str, Any]) -> bool:
+    """Whether `ranges` uses any declarative `Dimension` (plain grids return False)."""
+    return any(isinstance(v, Dimension) for v in ranges.values())
+
+
+def search_space(strategy) -> Dict[str, Any]:
+    """`strategy`'s `opt_space` if it declares one, else its `opt_ranges`."""
+    return getattr(strategy, 'opt_space', None) or getattr(strategy, 'opt_ranges', None) or {}
+
+
+def _apply_constraint(points: np.ndarray, constraint: Callable) -> np.ndarray:
+    columns = _Params((name, points[name]) for name in points.dtype.names)
+    try:
+        with np.errstate(all='ignore'):
+            mask = constraint(columns)
+        mask = np.asarray(mask)
+        if mask.dtype == bool and mask.shape == (len(points),):
+            return points[mask]
+    except (TypeError, ValueError):
+        # Written for scalars (`and`, `if`, ...): evaluate point by point
+        pass
+    names = points.dtype.names
+    return points[np.fromiter((bool(constraint(_Params(zip(names, row.tolist()))))
+                               for row in points), dtype=bool, count=len(points))]
+
+
+def compile_space(ranges: Dict[str, Any], constraint: Optional[Callable] = None) -> np.ndarray:
+    """
+    Enumerate the valid points of a parameter space.
+
+    Args:
+        ranges: Parameter names mapped to sequences or `Dimension`s.
+            Dimensions may only refer to parameters declared before them.
+        constraint: Optional function of the parameters (attribute access)
+            returning True for admissible points.
+
+    Returns:
+        np.ndarray: Structured array, one field per parameter, one row per
+            valid point, in grid order.
+    """
+    if not ranges:
+        raise ValueError('Need some strategy parameters to optimize')
+    names = list(ranges)
+    columns: Dict[str, np.ndarray] = {}
+    n = 1
+    for i, name in enumerate(names):
+        dimension = as_dimension(ranges[name])
+        unknown = dimension.refs() - set(names[:i])
+        if unknown:
+            raise ValueError(f'Parameter {name!r} refers to {sorted(unknown)}, '
+                             'which must be declared before it')
+        counts, values = dimension.expand(columns, n)
+        columns = {k: np.repeat(v, counts) for k, v in columns.items()}
+        columns[name] = values
+        n = len(values)
+
+    points = np.empty(n, dtype=[(name, columns[name].dtype) for name in names])
+    for name in names:
+        points[name] = columns[name]
+    if constraint is not None and len(points):
+        points = _apply_constraint(points, constraint)
+    return points
+
+
+def plain_params(params: Dict[str, Any]) -> _Params:
+    """`params` with NumPy scalars (as `Backtest.optimize` picks them) as Python ones."""
+    return _Params((name, value.item() if isinstance(value, np.generic) else value)
+                   for name, value in params.items())
+
+
+def point_params(points: np.ndarray, i: int) -> _Params:
+    """Parameters of row `i` of a compiled space, as Python scalars."""
+    return _Params(zip(points.dtype.names, points[i].tolist()))
@@ -0,0 +1,58 @@
+"""
+Whether optimizations in this process may start a worker pool.
+
+Exhaustive grids of event-driven backtests go through `Backtest.optimize`
+(`optimize_auto`, `utils.search.GridSearch`), which spreads the
+candidates over backtesting.py's process pool, or, for compiled spaces,
+through `GridSearch`'s own pool. Inside the workers of our
+own pools (`WalkForward` windows, `utils.batch` and `utils.jobs` jobs)
+that nested pool must not be started:
+
+- the outer pool already keeps every core busy with one window or job
+  each, so a nested pool per worker starts ``n_jobs × cores`` processes
+  competing for the same cores;
+- each nested pool copies the window's data to shared memory and pickles
+  the backtest to its own workers again, which costs more than the
+  candidates it parallelizes on a window-sized slice.
+
+Worker initializers therefore call `disable()`, and the optimizations
+check `enabled()` to evaluate their candidates in-process, point by
+point, instead of starting either pool. So does a
+`utils.profiling` session with ``serial_optimize``, to record the
+candidates. backtesting.py itself (`backtesting.Pool`) is left as the
+user configured it.
+
+Example:
+    >>> with pools.disabled():     # e.g. to time candidates on one core
+    ...     stats = optimize_auto(bt, BTSMAStrategy)
+"""
+
+from contextlib import contextmanager
+
+from . import profiling
+
+# False in our pool workers (see disable())
+_enabled = True
+
+
+def enabled() -> bool:
+    """Whether optimizations may spread their candidates over a process pool."""
+    profiler = profiling.active
+    return _enabled and (profiler is None or not profiler.serial_optimize)
+
+
+def disable():
+    """Keep every later optimization of this process in-process (pool worker initializers)."""
+    global _enabled
+    _enabled = False
+
+
+@contextmanager
+def disabled():
+    """Keep the optimizations run in the block in-process."""
+    global _enabled
+    saved, _enabled = _enabled, False
+    try:
+        yield
+    finally:
+        _enabled = saved
@@ -0,0 +1,260 @@
+"""
+Indicators computed over the full history, sliced to each walk-forward window.
+
+A backtest on a window slice recomputes every indicator from the window's
+first bar, and loses its first bars to their warmup: up to ~200 bars per
+window for long moving averages, of the train and the test slice alike.
+Inside ``with prewarm.window(data, start, stop):``, backtests of
+``data.iloc[start:stop]`` instead get pre-warmed indicators:
+
+- `BaseStrategy.I()` calls the indicator on the full-history columns
+  (through `indicator_cache`, so each distinct indicator is computed once
+  for every window and candidate) and hands the strategy the window's
+  slice. With no leading NaN left, trading starts on the window's second
+  bar, as with any fully warmed indicator. `resample_apply()` resamples
+  the full history the same way.
+- `VectorizedBacktest` runs `signals()` on the full-history arrays and
+  slices the masks.
+
+Backtests see prices scaled by their `fractional_unit` (`FractionalBacktest`
+multiplies OHLC by it and divides Volume), so the full history is scaled
+the same way before indicators are computed on it: pass the unit of the
+backtests run in the block to `window()`. Columns of a backtest that don't
+match the scaled history (e.g. another unit) aren't traced, and their
+indicators fall back to the window-only computation.
+
+Indicators must be causal (a value only depends on earlier bars), as
+TA-Lib's are; otherwise the window would see later data. Arguments that
+can't be traced back to the data columns or to earlier indicators (e.g.
+arrays computed in `init()`) make that indicator fall back to the
+window-only computation.
+
+`WalkForward(..., prewarm=True)` enables this for all its windows. As
+with `utils.profiling`, the window is process-wide state; forked
+optimization workers inherit it.
+
+Example:
+    >>> with prewarm.window(data, 500, 900):
+    ...     stats = Backtest(data.iloc[500:900], BTSMAStrategy).run()
+    >>> with prewarm.window(data, 500, 900, fractional_unit=1e-8):
+    ...     stats = FractionalBacktest(data.iloc[500:900], BTSMAStrategy, fractional_unit=1e-8).run()
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Window being run, if any (see window())
+active: Optional['Window'] = None
+
+# Arguments `Strategy.I` keeps for itself
+_I_KWARGS = ('name', 'plot', 'overlay', 'color', 'scatter')
+_UNTRACED = object()
+
+
+def _address(array) -> Optional[Tuple[int, int]]:
+    """``(data pointer, length)`` of a contiguous 1-D array, or None."""
+    if isinstance(array, pd.Series):
+        array = array.to_numpy()
+    if not isinstance(array, np.ndarray) or array.ndim != 1 or array.strides[0] != array.itemsize:
+        return None
+    return array.__array_interface__['data'][0], len(array)
+
+
+class Window:
+    """
+    Full history of a window's data and the window's ``[start, stop)`` bars.
+
+    Args:
+        data: Full-history OHLCV DataFrame.
+        start, stop: Bar offsets of the window in `data`.
+        fractional_unit: Unit the window's event-driven backtests scale
+            prices by (`FractionalBacktest`), or None for unscaled prices.
+    """
+
+    def __init__(self, data: pd.DataFrame, start: int, stop: int,
+                 fractional_unit: Optional[float] = None):
+        self.data = data
+        self.start = start
+        self.stop = stop
+        self.fractional_unit = fractional_unit
+        self._frame = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._arrays = {}
+        self._history_key = None
+
+    def __repr__(self):
+        return f'<prewarm.Window [{self.start}, {self.stop}) of {len(self.data)} bars>'
+
+    def matches(self, index: pd.Index) -> bool:
+        """Whether `index` is this window's slice of the history."""
+        return (len(index) == self.stop - self.start and len(index) > 0
+                and index[0] == self.data.index[self.start])
+
+    def frame(self) -> pd.DataFrame:
+        """Full history as the window's backtests see it, scaled as `FractionalBacktest` does."""
+        if self._frame is None:
+            frame = self.data
+            if self.fractional_unit:
+                frame = frame.copy(deep=False)
+                for col in ('Open', 'High', 'Low', 'Close'):
+                    frame[col] = frame[col] * self.fractional_unit
+                frame['Volume'] = frame['Volume'] / self.fractional_unit
+            self._frame = frame
+        return self._frame
+
+    def column(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = self.frame()[name].to_numpy()
+        return column
+
+    def ohlcv(self, fractional_unit: Optional[float] = None):
+        """Full-history `vectorized.OHLCV`, prices scaled as `VectorizedBacktest` does."""
+        arrays = self._arrays.get(fractional_unit)
+        if arrays is None:
+            from .vectorized import OHLCV
+            data = self.data
+            if fractional_unit:
+                data = data.copy(deep=False)
+                for col in ('Open', 'High', 'Low', 'Close'):
+                    data[col] = data[col] * fractional_unit
+            arrays = self._arrays[fractional_unit] = OHLCV(data)
+        return arrays
+
+    def history_key(self) -> str:
+        """Fingerprint of the bars before the window, which prewarmed results depend on."""
+        if self._history_key is None:
+            from .result_store import data_fingerprint
+            self._history_key = data_fingerprint(self.data.iloc[:self.start])
+        return self._history_key
+
+    def slice(self, value: np.ndarray) -> np.ndarray:
+        """The window's bars of a full-history indicator (last axis)."""
+        return value[..., self.start:self.stop]
+
+    def signals(self, signals, n_bars: Optional[int] = None):
+        """Full-history `Signals` restricted to the window (or its first `n_bars`)."""
+        from dataclasses import replace
+        stop = self.stop if n_bars is None else self.start + n_bars
+        return replace(signals, long=signals.long[self.start:stop], short=signals.short[self.start:stop],
+                       warmup=max(0, signals.warmup - self.start))
+
+
+@contextmanager
+def window(data: pd.DataFrame, start: int, stop: int, fractional_unit: Optional[float] = None):
+    """
+    Prewarm the indicators of backtests run on ``data.iloc[start:stop]`` in the block.
+
+    `fractional_unit` is that of the `FractionalBacktest` run in the block,
+    if any.
+    """
+    global active
+    previous = active
+    active = Window(data, start, stop, fractional_unit)
+    try:
+        yield active
+    finally:
+        active = previous
+
+
+def current(index: pd.Index) -> Optional[Window]:
+    """The active window if `index` is its slice, else None."""
+    if active is not None and active.matches(index):
+        return active
+    return None
+
+
+class _Prewarmed:
+    """Indicator function run on the full history, returning the window's slice."""
+
+    def __init__(self, func: Callable, window: Window, args: tuple, kwargs: dict):
+        self.func = func
+        self.window = window
+        self.args = args
+        self.kwargs = kwargs
+        # Keeps `Strategy.I`'s default indicator name
+        self.__name__ = getattr(func, '__name__', type(func).__name__)
+        self.full = None
+
+    def __call__(self, *_, **__):
+        value = self.func(*self.args, **self.kwargs)
+        if isinstance(value, pd.DataFrame):
+            value = value.values.T
+        value = np.asarray(value)
+        if value.shape[-1:] == (len(self.window.data),):
+            self.full = value
+            return self.window.slice(value)
+        # Not a full-history series (e.g. constant output): use as is
+        return value
+
+
+def _sources(strategy) -> Dict[Tuple[int, int], np.ndarray]:
+    """Window arrays of `strategy` mapped to their full-history version."""
+    sources = strategy.__dict__.get('_prewarm_sources')
+    if sources is None:
+        window, data = active, strategy._data
+        sources = strategy.__dict__['_prewarm_sources'] = {}
+        for name in data.df.columns:
+            values = getattr(data, name)
+            address = _address(values)
+            if address is None:
+                continue
+            full = window.column(name)
+            # Another scaling than the window's would mix price scales
+            if np.array_equal(np.asarray(values), window.slice(full)):
+                sources[address] = full
+    return sources
+
+
+def history(strategy, column: str) -> Optional[pd.DataFrame]:
+    """Full-history frame of the active window, if `strategy`'s `column` traces to it."""
+    window = current(strategy._data.index)
+    if window is None or _address(getattr(strategy._data, column)) not in _sources(strategy):
+        return None
+    return window.frame()
+
+
+def _full(value, sources, window):
+    """Full-history version of an argument, or `_UNTRACED`."""
+    address = _address(value)
+    if address is None or address[1] != window.stop - window.start:
+        return value
+    full = sources.get(address)
+    if full is None:
+        return _UNTRACED
+    if isinstance(value, pd.Series):
+        return pd.Series(full, index=window.data.index, name=value.name)
+    return full
+
+
+def indicator(strategy, func: Callable, args: tuple, kwargs: dict) -> Optional[_Prewarmed]:
+    """
+    `func` for `Strategy.I` computing on the full history, if `strategy` runs
+    on the active window and all its window-length arguments can be traced.
+    """
+    window = current(strategy._data.index)
+    if window is None:
+        return None
+    sources = _sources(strategy)
+    full_args = tuple(_full(arg, sources, window) for arg in args)
+    full_kwargs = {key: _full(value, sources, window) for key, value in kwargs.items()
+                   if key not in _I_KWARGS}
+    if any(value is _UNTRACED for value in full_args + tuple(full_kwargs.values())):
+        return None
+    return _Prewarmed(func, window, full_args, full_kwargs)
+
+
+def register(strategy, prewarmed: _Prewarmed, value: np.ndarray):
+    """Map the indicator `value` returned to `strategy` to its full history, for indicators of it."""
+    if prewarmed.full is None:
+        return
+    sources = _sources(strategy)
+    full = np.atleast_2d(prewarmed.full)
+    rows = np.atleast_2d(value)
+    for row, full_row in zip(rows, full):
+        address = _address(row)
+        if address is not None:
+            sources[address] = full_row
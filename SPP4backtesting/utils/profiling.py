@@ -0,0 +1,366 @@
+"""
+Opt-in timing of where backtests, optimizations and walk-forwards spend time.
+
+Inside ``with profile() as prof:`` the following are recorded:
+
+- ``init`` / ``next``: every `BaseStrategy.init()` and ``next()`` call,
+  per strategy class (call counts are runs and bars respectively);
+- ``stats``: the end of each event-driven run made by `optimize_auto`,
+  the `utils.search` strategies and `WalkForward`, from its last
+  ``next()`` to its results: closing trades, the stats and any objective
+  score, timed on the backtests they run (`timed_stats()`);
+- ``optimize``: every `optimize_auto()` call, with the backtest runs it
+  made (the candidates evaluated, plus the final run of the best) and
+  whether a `ResultStore` served it;
+- ``window`` / ``test``: every `WalkForward` window, and its test run;
+- ``pickle``: serializing each window's results in pool workers, i.e.
+  the cost of shipping them back to the parent.
+
+Each span (optimize, window, test, pickle) is kept as an event with its
+wall time, time excluding nested spans and per-call phases (``self``), the
+indicator cache hits/misses during it and the process's peak RSS at its
+end. Per-call phases (init, next, stats) are only aggregated. Windows run
+in forked workers send their events back with their results.
+
+When no profiler is active, strategies aren't wrapped and the hooks reduce
+to one ``is None`` check per run or window, so the cost is nil.
+
+Example:
+    >>> with profile() as prof:
+    ...     wf.run_walk_forward(n_jobs=4)
+    >>> prof.print_summary()
+    >>> prof.to_json('trace.json'); prof.to_csv('trace.csv')
+"""
+
+import json
+import os
+import pickle
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from backtesting import Backtest
+
+from .indicator_cache import indicator_cache
+from .stats_hook import with_stats
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# The running Profiler, if any (see profile())
+active: Optional['Profiler'] = None
+
+
+def _max_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return rss / 2**20 if sys.platform == 'darwin' else rss / 2**10
+
+
+class _NullSpan(dict):
+    """Record handed out by `span()` while profiling is off; drops writes."""
+
+    def __setitem__(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_NULL_CONTEXT = nullcontext(_NULL_SPAN)
+
+
+class Profiler:
+    """
+    Collects the spans and per-call phases of one profiling session.
+
+    Use through `profile()`; `start()` / `stop()` are available for
+    sessions that don't fit a ``with`` block.
+
+    Args:
+        serial_optimize: Run the candidates of exhaustive grids in-process
+            instead of through `Backtest.optimize`'s worker pool (see
+            `utils.pools`), so that their init/next/stats are recorded
+            too. Changes the timings of parallel optimizations accordingly.
+    """
+
+    def __init__(self, serial_optimize: bool = True):
+        self.serial_optimize = serial_optimize
+        self.events: List[dict] = []
+        # (phase, strategy) -> [calls, seconds]
+        self.counters: Dict[tuple, list] = {}
+        self.wall_seconds = 0.
+        self._stack: List[dict] = []
+        self._started = None
+        self._runs = 0
+        # End of the latest timed call, where a run's stats phase starts
+        self._ended = [0.]
+        self._cache_start = (0, 0)
+        self.indicator_hits = self.indicator_misses = 0
+
+    def __repr__(self):
+        return f'<Profiler: {len(self.events)} events, {len(self.counters)} phases>'
+
+    def start(self) -> 'Profiler':
+        global active
+        if active is not None:
+            raise RuntimeError('A profiler is already active')
+        self._started = time.perf_counter()
+        self._cache_start = (indicator_cache.hits, indicator_cache.misses)
+        active = self
+        return self
+
+    def stop(self):
+        global active
+        if active is not self:
+            return
+        active = None
+        self.wall_seconds += time.perf_counter() - self._started
+        self.indicator_hits += indicator_cache.hits - self._cache_start[0]
+        self.indicator_misses += indicator_cache.misses - self._cache_start[1]
+
+    def timed(self, phase: str, strategy: Optional[str], func: Callable) -> Callable:
+        """`func` wrapped to add its calls and time to the (phase, strategy) counter."""
+        counter = self.counters.setdefault((phase, strategy), [0, 0.])
+        stack = self._stack
+        ended = self._ended
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                ended[0] = end = perf_counter()
+                elapsed = end - start
+                counter[0] += 1
+                counter[1] += elapsed
+                if stack:
+                    stack[-1]['_nested'] += elapsed
+        return wrapper
+
+    def stats_hook(self) -> Callable:
+        """
+        `utils.stats_hook` hook adding the time from a run's last timed
+        call (its final ``next()``) to its end to the ``stats`` counter.
+        """
+        counter = self.counters.setdefault(('stats', None), [0, 0.])
+        stack = self._stack
+        ended = self._ended
+        perf_counter = time.perf_counter
+
+        def hook(run, **params):
+            start = perf_counter()
+            try:
+                return run(**params)
+            finally:
+                elapsed = perf_counter() - max(start, ended[0])
+                counter[0] += 1
+                counter[1] += elapsed
+                if stack:
+                    stack[-1]['_nested'] += elapsed
+        return hook
+
+    def instrument(self, strategy):
+        """Time a strategy instance's ``init()`` and ``next()``."""
+        name = type(strategy).__name__
+        self._runs += 1
+        strategy.init = self.timed('init', name, strategy.init)
+        strategy.next = self.timed('next', name, strategy.next)
+
+    @contextmanager
+    def span(self, phase: str, **info):
+        record = {'phase': phase, 'pid': os.getpid(), **info, '_nested': 0.}
+        hits, misses, runs = indicator_cache.hits, indicator_cache.misses, self._runs
+        start = time.perf_counter()
+        self._stack.append(record)
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]['_nested'] += seconds
+            record['start'] = start - self._started
+            record['seconds'] = seconds
+            record['self_seconds'] = seconds - record.pop('_nested')
+            record['runs'] = self._runs - runs
+            record['indicator_hits'] = indicator_cache.hits - hits
+            record['indicator_misses'] = indicator_cache.misses - misses
+            record['max_rss_mb'] = _max_rss_mb()
+            self.events.append(record)
+
+    def absorb(self, trace: dict):
+        """Merge a worker's `_trace()` into this session."""
+        self.events.extend(trace['events'])
+        for key, (calls, seconds) in trace['counters']:
+            counter = self.counters.setdefault(tuple(key), [0, 0.])
+            counter[0] += calls
+            counter[1] += seconds
+        self.indicator_hits += trace['indicator_hits']
+        self.indicator_misses += trace['indicator_misses']
+
+    def _trace(self) -> dict:
+        return {'events': self.events,
+                'counters': [(key, value) for key, value in self.counters.items()],
+                'indicator_hits': self.indicator_hits,
+                'indicator_misses': self.indicator_misses}
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per phase: calls, total and self seconds, mean per call,
+        share of the session's wall time and peak RSS.
+
+        Spans nest (a window contains its optimization, which contains
+        init/next/stats), so ``seconds`` overlap across phases; ``self_s``
+        doesn't. Worker time is summed, so shares can exceed 100 % with
+        parallel runs.
+        """
+        rows = {}
+        for event in self.events:
+            row = rows.setdefault(event['phase'], {'calls': 0, 'seconds': 0., 'self_s': 0.,
+                                                   'runs': 0, 'max_rss_mb': None})
+            row['calls'] += 1
+            row['seconds'] += event['seconds']
+            row['self_s'] += event['self_seconds']
+            row['runs'] += event['runs']
+            if event['max_rss_mb'] is not None:
+                row['max_rss_mb'] = max(row['max_rss_mb'] or 0, event['max_rss_mb'])
+        for (phase, _), (calls, seconds) in self.counters.items():
+            row = rows.setdefault(phase, {'calls': 0, 'seconds': 0., 'self_s': 0.,
+                                          'runs': None, 'max_rss_mb': None})
+            row['calls'] += calls
+            row['seconds'] += seconds
+            row['self_s'] += seconds
+        table = pd.DataFrame.from_dict(rows, orient='index')
+        if not len(table):
+            return table
+        table.index.name = 'phase'
+        table['mean_ms'] = table['seconds'] / table['calls'].where(table['calls'] > 0) * 1e3
+        table['share_%'] = table['self_s'] / (self.wall_seconds or float('nan')) * 100
+        return table[['calls', 'seconds', 'self_s', 'mean_ms', 'share_%', 'runs', 'max_rss_mb']]
+
+    def print_summary(self, file=sys.stdout):
+        total = self.indicator_hits + self.indicator_misses
+        hit_rate = f'{self.indicator_hits / total:.0%}' if total else 'n/a'
+        print(f'Wall time {self.wall_seconds:.3f}s; indicator cache: {self.indicator_hits} hits, '
+              f'{self.indicator_misses} misses ({hit_rate})', file=file)
+        with pd.option_context('display.width', 200, 'display.max_columns', None,
+                               'display.float_format', '{:,.3f}'.format):
+            print(self.summary(), file=file)
+
+    def counters_frame(self) -> pd.DataFrame:
+        """Per-call phases by strategy: calls and seconds."""
+        return pd.DataFrame([{'phase': phase, 'strategy': strategy, 'calls': calls, 'seconds': seconds}
+                             for (phase, strategy), (calls, seconds) in self.counters.items()],
+                            columns=['phase', 'strategy', 'calls', 'seconds'])
+
+    def to_json(self, path: str):
+        """Save the whole trace (totals, summary, counters and events) as JSON."""
+        summary = self.summary()
+        trace = {
+            'wall_seconds': self.wall_seconds,
+            'indicator_hits': self.indicator_hits,
+            'indicator_misses': self.indicator_misses,
+            'summary': summary.reset_index().to_dict(orient='records') if len(summary) else [],
+            'counters': self.counters_frame().to_dict(orient='records'),
+            'events': self.events,
+        }
+        with open(path, 'w') as f:
+            json.dump(trace, f, indent=1, default=str)
+
+    def to_csv(self, path: str):
+        """Save the events and per-call counters as one flat CSV table (``kind`` column)."""
+        events = pd.DataFrame(self.events).assign(kind='event')
+        counters = self.counters_frame().assign(kind='counter')
+        pd.concat([events, counters], ignore_index=True).to_csv(path, index=False)
+
+
+@contextmanager
+def profile(**options):
+    """
+    Profile everything run inside the block.
+
+    Args:
+        **options: Passed to `Profiler`.
+
+    Yields:
+        Profiler: The session, with results available after the block.
+    """
+    profiler = Profiler(**options).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def timed_stats(bt):
+    """
+    `bt`, or while profiling a copy of it recording the end of each run
+    (see `Profiler.stats_hook`) as the ``stats`` phase.
+
+    Applies to event-driven backtests, through `utils.stats_hook`;
+    `VectorizedBacktest` is returned as is.
+    """
+    if active is None or not isinstance(bt, Backtest):
+        return bt
+    return with_stats(bt, active.stats_hook())
+
+
+def span(phase: str, **info):
+    """
+    Record a span of `phase` on the active profiler.
+
+    Yields a dict that extra fields can be written to (ignored when
+    profiling is off).
+    """
+    if active is None:
+        return _NULL_CONTEXT
+    return active.span(phase, **info)
+
+
+class _Captured:
+    """A worker's result, with the profiling trace recorded while computing it."""
+    __slots__ = ('result', 'trace')
+
+    def __init__(self, result, trace):
+        self.result = result
+        self.trace = trace
+
+
+def capture(func: Callable, *args):
+    """
+    ``func(*args)`` in a pool worker, with its trace when profiling.
+
+    Forked workers inherit the parent's active profiler; the call is then
+    recorded in a fresh session (plus the time to pickle its result) and
+    returned with the result. `release()` unpacks it in the parent.
+    """
+    global active
+    if active is None:
+        return func(*args)
+    parent = active
+    active = None
+    worker = Profiler(serial_optimize=parent.serial_optimize).start()
+    worker._started = parent._started
+    try:
+        result = func(*args)
+        with worker.span('pickle') as record:
+            record['bytes'] = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+    finally:
+        worker.stop()
+        active = parent
+    return _Captured(result, worker._trace())
+
+
+def release(result):
+    """The result of a `capture()`, merging its trace into the active profiler."""
+    if isinstance(result, _Captured):
+        if active is not None:
+            active.absorb(result.trace)
+        return result.result
+    return result
@@ -0,0 +1,254 @@
+"""
+Early stopping of hopeless candidates during an optimization.
+
+Most combinations of a sweep are clearly bad long before the last bar, yet
+each one runs `next()` to the end of the window. A pruner passed to
+`optimize_auto(..., pruner=...)` checks every running candidate at regular
+bar intervals and aborts the ones it rules out; they are scored NaN, so no
+search ever selects them, and marked in the search's `pruned` attribute.
+
+- `RulePruner`: a user rule on the candidate's `Progress` (running
+  equity, drawdown, trade count...), e.g. "drawdown above 80 % within the
+  first third of the window";
+- `MedianPruner`: stops a candidate whose running return is below the
+  median of the candidates already finished at the same bar (after a few
+  warm-up candidates), as Optuna's median stopping rule does.
+
+Any callable taking a `Progress` is accepted as a rule. Pruning applies to
+event-driven backtests (`Backtest`, `FractionalBacktest`), whose candidates
+run one by one through `utils.search`; `VectorizedBacktest` candidates
+don't step through bars and are never pruned.
+
+Example:
+    >>> stats = optimize_auto(bt, KAMACrossover,
+    ...                       pruner=lambda p: p.drawdown_pct > 80 and p.fraction < .3)
+    >>> stats = optimize_auto(bt, KAMACrossover, pruner=MedianPruner(n_warmup=10))
+"""
+
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+# Candidate being watched by a pruner, if any (see Pruner.run())
+active: Optional['_Watch'] = None
+
+
+class Pruned(Exception):
+    """Raised from `next()` to abort a pruned candidate's backtest."""
+
+    def __init__(self, progress: 'Progress'):
+        super().__init__(f'Pruned at bar {progress.bar} of {progress.n_bars}')
+        self.progress = progress
+
+
+class Progress:
+    """
+    State of a running candidate at a check.
+
+    Attributes:
+        bar: Bars processed so far.
+        n_bars: Bars in the backtest.
+        fraction: ``bar / n_bars``.
+        time: Index value of the current bar.
+        equity: Current equity.
+        cash: Initial cash.
+        return_pct: Return so far, in percent.
+        peak: Highest equity so far.
+        drawdown_pct: Current drawdown from `peak`, in percent.
+        max_drawdown_pct: Largest drawdown seen at any check so far.
+        trades: Number of closed trades.
+        open_trades: Number of open trades.
+    """
+    __slots__ = ('bar', 'n_bars', 'fraction', 'time', 'equity', 'cash', 'return_pct', 'peak',
+                 'drawdown_pct', 'max_drawdown_pct', 'trades', 'open_trades')
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return (f'<Progress: bar {self.bar}/{self.n_bars}, return {self.return_pct:.2f} %, '
+                f'drawdown {self.drawdown_pct:.2f} %, {self.trades} trades>')
+
+
+class Pruner:
+    """
+    Base class of the pruners.
+
+    Args:
+        check_every: Bars between checks. Defaults to 1 % of the bars of
+            each backtest.
+    """
+
+    def __init__(self, check_every: Optional[int] = None):
+        if check_every is not None and check_every < 1:
+            raise ValueError('`check_every` must be a positive integer')
+        self.check_every = check_every
+        self.n_pruned = 0
+
+    def __repr__(self):
+        return f'{type(self).__name__}(check_every={self.check_every})'
+
+    def reset(self):
+        """Forget previous candidates; called when a search starts."""
+        self.n_pruned = 0
+
+    def should_prune(self, progress: Progress) -> bool:
+        raise NotImplementedError
+
+    def finished(self, checks: Dict[int, Progress]):
+        """Called with the checks of every candidate that ran to the end."""
+
+    def run(self, bt, params: dict):
+        """
+        ``bt.run(**params)``, checking the candidate as it goes.
+
+        Raises:
+            Pruned: The candidate was stopped early.
+        """
+        global active
+        n_bars = len(bt._data)
+        every = self.check_every or max(1, n_bars // 100)
+        watch = _Watch(self, n_bars, every, bt._broker.keywords['cash'])
+        active = watch
+        try:
+            stats = bt.run(**params)
+        except Pruned:
+            self.n_pruned += 1
+            raise
+        finally:
+            active = None
+        self.finished(watch.checks)
+        return stats
+
+
+class RulePruner(Pruner):
+    """
+    Prune candidates for which ``rule(progress)`` is true.
+
+    Args:
+        rule: Function of a `Progress`, e.g.
+            ``lambda p: p.drawdown_pct > 80 and p.trades < 5``.
+        check_every: As for `Pruner`.
+    """
+
+    def __init__(self, rule: Callable[[Progress], bool], check_every: Optional[int] = None):
+        super().__init__(check_every)
+        self.rule = rule
+
+    def __repr__(self):
+        from .result_store import callable_key
+        return f'RulePruner({callable_key(self.rule)}, check_every={self.check_every})'
+
+    def should_prune(self, progress):
+        return bool(self.rule(progress))
+
+
+def _return_pct(progress: Progress) -> float:
+    return progress.return_pct
+
+
+class MedianPruner(Pruner):
+    """
+    Prune candidates doing worse than the median of the finished ones.
+
+    At each check, a candidate's `metric` is compared with that of every
+    finished candidate at the same bar; below their median, it is stopped.
+
+    Args:
+        n_warmup: Finished candidates needed before pruning starts.
+        min_fraction: Share of the bars before which no candidate is
+            pruned, so slow starters get a chance.
+        metric: Function of a `Progress` to compare, higher is better.
+            Defaults to the running return.
+        check_every: As for `Pruner`. Checks fall on the same bars for
+            every candidate of a backtest, so they can be compared.
+    """
+
+    def __init__(self, n_warmup: int = 5, min_fraction: float = .2,
+                 metric: Callable[[Progress], float] = _return_pct,
+                 check_every: Optional[int] = None):
+        super().__init__(check_every)
+        self.n_warmup = n_warmup
+        self.min_fraction = min_fraction
+        self.metric = metric
+        self._n_finished = 0
+        # Bar -> metric of the finished candidates at that bar
+        self._history: Dict[int, List[float]] = {}
+
+    def __repr__(self):
+        from .result_store import callable_key
+        return (f'MedianPruner(n_warmup={self.n_warmup}, min_fraction={self.min_fraction}, '
+                f'metric={callable_key(self.metric)}, check_every={self.check_every})')
+
+    def reset(self):
+        super().reset()
+        self._n_finished = 0
+        self._history = {}
+
+    def should_prune(self, progress):
+        if self._n_finished < self.n_warmup or progress.fraction < self.min_fraction:
+            return False
+        finished = self._history.get(progress.bar)
+        if finished is None or len(finished) < self.n_warmup:
+            return False
+        return self.metric(progress) < np.median(finished)
+
+    def finished(self, checks):
+        self._n_finished += 1
+        for bar, progress in checks.items():
+            self._history.setdefault(bar, []).append(self.metric(progress))
+
+
+class _Watch:
+    """Checks of one candidate's run, hooked into its strategy's `next()`."""
+
+    def __init__(self, pruner: Pruner, n_bars: int, every: int, cash: float):
+        self.pruner = pruner
+        self.n_bars = n_bars
+        self.every = every
+        self.cash = cash
+        self.checks: Dict[int, Progress] = {}
+        self._next_check = every
+        self._seen = 0
+        self._peak = -np.inf
+        self._max_drawdown = 0.
+
+    def instrument(self, strategy):
+        """Check `strategy` after its ``next()`` every `every` bars."""
+        next_ = strategy.next
+
+        def next():
+            next_()
+            bar = len(strategy.data)
+            if bar >= self._next_check:
+                self.check(strategy, bar)
+        strategy.next = next
+
+    def check(self, strategy, bar: int):
+        # Checks on multiples of `every`, whatever bar the strategy starts at
+        self._next_check = (bar // self.every + 1) * self.every
+        equity_curve = strategy._broker._equity
+        if self._seen < bar:
+            self._peak = max(self._peak, np.nanmax(equity_curve[self._seen:bar]))
+            self._seen = bar
+        equity = equity_curve[bar - 1]
+        drawdown = (1 - equity / self._peak) * 100 if self._peak > 0 else 0.
+        self._max_drawdown = max(self._max_drawdown, drawdown)
+        progress = Progress(bar=bar, n_bars=self.n_bars, fraction=bar / self.n_bars,
+                            time=strategy.data.index[-1], equity=equity, cash=self.cash,
+                            return_pct=(equity / self.cash - 1) * 100, peak=self._peak,
+                            drawdown_pct=drawdown, max_drawdown_pct=self._max_drawdown,
+                            trades=len(strategy.closed_trades), open_trades=len(strategy.trades))
+        self.checks[bar] = progress
+        if self.pruner.should_prune(progress):
+            raise Pruned(progress)
+
+
+def as_pruner(pruner: Union[Pruner, Callable[[Progress], bool], None]) -> Optional[Pruner]:
+    """`pruner` as a `Pruner`: rules (plain callables) become a `RulePruner`."""
+    if pruner is None or isinstance(pruner, Pruner):
+        return pruner
+    if callable(pruner):
+        return RulePruner(pruner)
+    raise TypeError('`pruner` must be a Pruner or a function of a Progress')
@@ -0,0 +1,262 @@
+"""
+Persistent on-disk store of backtest and optimization results.
+
+Reruns of a walk-forward sweep repeat the same optimizations on the same
+data windows. `ResultStore` keeps, in a SQLite file:
+
+- the stats of each run, keyed by backtest and parameter combination;
+- the best parameters of each optimization, keyed by backtest and search
+  setup (ranges, constraint, objective, search strategy).
+
+A backtest key covers the engine (`Backtest`, `FractionalBacktest`,
+`VectorizedBacktest` and their settings), cash, commission, the strategy
+class with a hash of its source code (and of its base classes), and a
+fingerprint of the data window. Editing a strategy or changing any bar of
+a window therefore misses the cache, while untouched windows are served
+from it; appending data only recomputes the windows that contain new bars.
+
+Stored stats are pickled with ``_strategy`` reduced to the strategy class
+and parameters, so ``stats._strategy._params`` keeps working.
+
+The default location is ``$SPP4BACKTESTING_CACHE/results.sqlite``, or
+``~/.cache/spp4backtesting/results.sqlite``. The store is safe to share
+with worker processes: each process opens its own connection.
+
+Notes:
+    Searches bounded by `time_budget` aren't deterministic; their first
+    result is reused on later runs.
+
+Example:
+    >>> store = ResultStore()
+    >>> stats = optimize_auto(bt, BTSMAStrategy, store=store)   # computed
+    >>> stats = optimize_auto(bt, BTSMAStrategy, store=store)   # from disk
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+import backtesting
+
+from . import prewarm
+from .vectorized import _StrategyResult
+
+DEFAULT_DIR = Path(os.environ.get('SPP4BACKTESTING_CACHE',
+                                  Path.home() / '.cache' / 'spp4backtesting'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    backtest TEXT NOT NULL,
+    params TEXT NOT NULL,
+    stats BLOB NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (backtest, params)
+);
+CREATE TABLE IF NOT EXISTS optimizations (
+    backtest TEXT NOT NULL,
+    search TEXT NOT NULL,
+    params BLOB NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (backtest, search)
+);
+"""
+
+
+def _digest(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else repr(part).encode())
+    return h.hexdigest()
+
+
+def canonical_json(value) -> str:
+    """`value` as compact JSON with sorted keys, the form keys are computed from."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'),
+                      default=lambda o: o.item() if isinstance(o, np.generic) else repr(o))
+
+
+def _code_key(code) -> tuple:
+    consts = tuple(_code_key(c) if inspect.iscode(c) else repr(c) for c in code.co_consts)
+    return code.co_code, consts, code.co_names
+
+
+def callable_key(func: Optional[Callable]) -> Optional[str]:
+    """Identity of a function by its qualified name and bytecode (lambdas included)."""
+    if func is None or isinstance(func, str):
+        return func
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return f'{type(func).__module__}.{type(func).__qualname__}:{func!r}'
+    cells = tuple(repr(c.cell_contents) for c in (func.__closure__ or ()))
+    return f'{func.__module__}.{func.__qualname__}:{_digest(_code_key(code), cells)}'
+
+
+def strategy_key(strategy) -> str:
+    """Strategy class name with a hash of the source of the modules defining it and its bases."""
+    sources = []
+    for cls in strategy.__mro__:
+        module = sys.modules.get(cls.__module__)
+        if module is None or cls.__module__.split('.')[0] in ('backtesting', 'builtins', 'abc'):
+            continue
+        try:
+            sources.append(inspect.getsource(module))
+        except (OSError, TypeError):
+            sources.append(cls.__qualname__)
+    return f'{strategy.__module__}.{strategy.__qualname__}:{_digest(*dict.fromkeys(sources))}'
+
+
+def data_fingerprint(data: pd.DataFrame) -> str:
+    """Content hash of an OHLCV window (values and index)."""
+    values = np.ascontiguousarray(data.select_dtypes('number').to_numpy(dtype=np.float64))
+    index = data.index
+    if isinstance(index, pd.DatetimeIndex):
+        index = index.as_unit('ns').asi8
+    return _digest(tuple(map(str, data.columns)), values.shape, values.data.tobytes(),
+                   np.ascontiguousarray(np.asarray(index)).data.tobytes())
+
+
+def backtest_key(bt) -> str:
+    """Key of everything a backtest's results depend on, except the parameters."""
+    if isinstance(bt, backtesting.Backtest):
+        broker = {k: (callable_key(v) if callable(v) else v)
+                  for k, v in bt._broker.keywords.items() if k != 'index'}
+        settings = dict(broker, finalize_trades=bt._finalize_trades,
+                        fractional_unit=getattr(bt, '_fractional_unit', None),
+                        engine=f'backtesting {backtesting.__version__}')
+    else:
+        engine_module = sys.modules[type(bt).__module__]
+        settings = dict(cash=bt._cash, commission=bt._commission,
+                        finalize_trades=bt._finalize_trades,
+                        fractional_unit=bt._fractional_unit,
+                        engine=_digest(inspect.getsource(engine_module)))
+    # Prewarmed indicators also depend on the bars before the window
+    window = prewarm.current(bt._data.index)
+    if window is not None:
+        settings['prewarm'] = window.history_key()
+    return _digest(type(bt).__qualname__, canonical_json(settings),
+                   strategy_key(bt._strategy), data_fingerprint(bt._data))
+
+
+def search_key(ranges, constraint, maximize, search=None, **budgets) -> str:
+    """Key of an optimization setup: ranges, constraint, objective, search strategy and budgets."""
+    if isinstance(ranges, np.ndarray):
+        ranges = ('compiled', ranges.dtype.descr, _digest(ranges.tobytes()))
+    else:
+        ranges = {k: repr(v) for k, v in ranges.items()}
+    if search is not None and not isinstance(search, str):
+        search = (type(search).__qualname__,
+                  {k: v for k, v in vars(search).items() if not k.startswith('_') and k not in ('history', 'pruned')})
+    return _digest(canonical_json([ranges, callable_key(constraint), callable_key(maximize), search, budgets]))
+
+
+def storable_stats(stats: pd.Series) -> pd.Series:
+    """
+    Copy of `stats` that pickles without the strategy instance.
+
+    ``_strategy`` is reduced to the strategy class and parameters, so
+    ``stats._strategy._params`` keeps working after unpickling.
+    """
+    stats = stats.copy()
+    strategy = stats.get('_strategy')
+    if strategy is not None and not isinstance(strategy, _StrategyResult):
+        stats['_strategy'] = _StrategyResult(type(strategy), strategy._params)
+    return stats
+
+
+class ResultStore:
+    """
+    SQLite-backed cache of run stats and optimization results.
+
+    Args:
+        path: Database file, or a directory to create ``results.sqlite``
+            in. Defaults to `DEFAULT_DIR`.
+
+    Attributes:
+        hits (int): Lookups served from the store in this process.
+        misses (int): Lookups that had to compute.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike, None] = None):
+        path = Path(path) if path is not None else DEFAULT_DIR
+        if path.suffix not in ('.sqlite', '.db'):
+            path = path / 'results.sqlite'
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+
+    def __repr__(self):
+        return f'<ResultStore {self.path}: {self.hits} hits, {self.misses} misses>'
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_conn'] = state['_pid'] = None
+        return state
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # One connection per process: sqlite connections don't survive fork
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def clear(self):
+        """Delete every stored result."""
+        self.conn.executescript('DELETE FROM runs; DELETE FROM optimizations;')
+
+    def _count(self, found):
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+    def get_stats(self, bt_key: str, params: Dict[str, Any]) -> Optional[pd.Series]:
+        row = self.conn.execute('SELECT stats FROM runs WHERE backtest = ? AND params = ?',
+                                (bt_key, canonical_json(params))).fetchone()
+        return self._count(row and pickle.loads(row[0]))
+
+    def put_stats(self, bt_key: str, params: Dict[str, Any], stats: pd.Series):
+        self.conn.execute('INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)',
+                          (bt_key, canonical_json(params), pickle.dumps(storable_stats(stats)), time.time()))
+
+    def get_best(self, bt_key: str, opt_key: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute('SELECT params FROM optimizations WHERE backtest = ? AND search = ?',
+                                (bt_key, opt_key)).fetchone()
+        return self._count(row and pickle.loads(row[0]))
+
+    def put_best(self, bt_key: str, opt_key: str, params: Dict[str, Any]):
+        self.conn.execute('INSERT OR REPLACE INTO optimizations VALUES (?, ?, ?, ?)',
+                          (bt_key, opt_key, pickle.dumps(dict(params)), time.time()))
+
+    def run(self, bt, params: Dict[str, Any], bt_key: Optional[str] = None) -> pd.Series:
+        """
+        ``bt.run(**params)``, served from the store when already computed.
+
+        `bt_key` is ``backtest_key(bt)``, computed if not given.
+        """
+        bt_key = bt_key or backtest_key(bt)
+        stats = self.get_stats(bt_key, params)
+        if stats is None:
+            stats = bt.run(**params)
+            self.put_stats(bt_key, params, stats)
+        return stats
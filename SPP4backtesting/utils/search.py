@@ -0,0 +1,532 @@
+"""
+Parameter search strategies for `optimize_auto`.
+
+`Backtest.optimize` tries every admissible combination of `opt_ranges`,
+which becomes prohibitive for strategies with large spaces (e.g. the 1.2M
+candidates of `MacdAdxEmaStrategy`). The searches here evaluate a bounded
+number of candidates, by count (`max_tries`) and/or wall time
+(`time_budget`, seconds):
+
+- `GridSearch`: exhaustive, delegated to `bt.optimize()` (parallel in
+  event-driven mode); declarative spaces are compiled to their valid
+  points, evaluated over a process pool. With `max_tries` it becomes a
+  randomized grid.
+- `RandomSearch`: uniform sampling of admissible candidates.
+- `SuccessiveHalving`: scores many candidates on a prefix of the data and
+  keeps the best ``1 / eta`` on longer and longer prefixes.
+- `TPESearch`: Tree-structured Parzen Estimator, a sequential Bayesian
+  search modelling good and bad regions of each parameter.
+
+Every search works with `Backtest`, `FractionalBacktest` and
+`VectorizedBacktest`, and `optimize_auto` returns the stats of the best
+candidate run on the full data, so ``stats._strategy._params`` is used by
+the walk-forward loops as before.
+
+Example:
+    >>> from SPP4backtesting.utils.optimization import optimize_auto
+    >>> from SPP4backtesting.utils.search import TPESearch
+    >>> stats = optimize_auto(bt, MacdAdxEmaStrategy, search=TPESearch(max_tries=300))
+    >>> stats = optimize_auto(bt, MacdAdxEmaStrategy, search='random', max_tries=500)
+"""
+
+import math
+import multiprocessing as mp
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from backtesting import Backtest
+from backtesting.lib import FractionalBacktest
+
+from . import objectives, pools, profiling
+from .param_space import _Params, compile_space, is_declarative, point_params
+from .pruning import Pruned, Pruner
+from .shared_data import SharedOHLCV, attach
+from .stats_hook import with_stats
+
+
+def _recipe(bt: Backtest) -> tuple:
+    """What `bt` was built from, as ``(class, strategy, kwargs, hooks)`` (see `_build()`)."""
+    kwargs = {k: v for k, v in bt._broker.keywords.items() if k != 'index'}
+    kwargs['finalize_trades'] = bt._finalize_trades
+    cls = getattr(type(bt), '_base', type(bt))
+    if issubclass(cls, FractionalBacktest):
+        kwargs['fractional_unit'] = bt._fractional_unit
+    return cls, bt._strategy, kwargs, getattr(bt, '_hooks', ())
+
+
+def _build(recipe: tuple, data: pd.DataFrame) -> Backtest:
+    """A new backtest of `recipe` (see `_recipe()`) on `data`, with the same hooks."""
+    cls, strategy, kwargs, hooks = recipe
+    with warnings.catch_warnings():
+        # Already reported when the original backtest was built
+        warnings.simplefilter('ignore')
+        bt = cls(data, strategy, **kwargs)
+    for hook in hooks:
+        bt = with_stats(bt, hook)
+    return bt
+
+
+def head(bt, n_bars: int):
+    """
+    Copy of backtest `bt` restricted to its first `n_bars` bars.
+
+    Supports `VectorizedBacktest` and backtesting.py's `Backtest` and
+    `FractionalBacktest` (built again, with the same arguments and
+    `utils.stats_hook` hooks, on the first bars).
+    """
+    if hasattr(bt, 'head'):
+        return bt.head(n_bars)
+    if not isinstance(bt, Backtest):
+        raise TypeError(f'Cannot truncate {type(bt).__name__}')
+    return _build(_recipe(bt), bt._data.iloc[:n_bars])
+
+
+class Objective:
+    """
+    Score of parameter combinations on a backtest, optionally on a data prefix.
+
+    Candidates without trades score NaN, as `Backtest.optimize` ignores them,
+    and so do candidates stopped early by `pruner`. Objectives that
+    `utils.objectives` can compute from the equity curve skip the full
+    stats of each candidate.
+
+    Args:
+        bt: Backtest to run candidates on.
+        maximize: Stats key, `utils.objectives.Kernel` or function of the
+            stats Series.
+        pruner: Optional `utils.pruning.Pruner` watching each run.
+
+    Attributes:
+        pruned (set): Parameter values (tuples) of the pruned candidates.
+    """
+
+    def __init__(self, bt, maximize: Union[str, Callable[[pd.Series], float]] = 'Sortino Ratio',
+                 pruner: Optional[Pruner] = None):
+        self.bt = bt
+        self.n_bars = len(bt._data)
+        self.maximize = maximize
+        self.kernel = objectives.as_kernel(maximize)
+        # Vectorized candidates don't step through bars: nothing to prune
+        self.pruner = pruner if isinstance(bt, Backtest) else None
+        self.n_evals = 0
+        self.pruned = set()
+        # Candidates run on a copy of `bt` returning the kernel's score
+        self._bt = profiling.timed_stats(objectives.scoring(bt, self.kernel)
+                                         if self.kernel is not None else bt)
+        self._heads = {}
+
+    def __call__(self, params: Dict, fraction: float = 1.) -> float:
+        bt = self._bt
+        if fraction < 1:
+            n_bars = max(2, int(self.n_bars * fraction))
+            bt = self._heads.get(n_bars)
+            if bt is None:
+                bt = self._heads[n_bars] = head(self._bt, n_bars)
+        self.n_evals += 1
+        if self.pruner is None:
+            stats = bt.run(**params)
+        else:
+            try:
+                stats = self.pruner.run(bt, params)
+            except Pruned:
+                self.pruned.add(tuple(params.values()))
+                return np.nan
+        if not stats['# Trades']:
+            return np.nan
+        if self.kernel is not None:
+            return float(objectives.score(stats))
+        value = self.maximize(stats) if callable(self.maximize) else stats[self.maximize]
+        return float(value)
+
+
+class SearchStrategy:
+    """
+    Base class of the parameter searches.
+
+    Args:
+        max_tries: Maximum number of candidates to evaluate (or, for
+            `SuccessiveHalving`, to start with). None means no limit.
+        time_budget: Stop launching evaluations after this many seconds.
+        random_state: Seed for the searches that sample.
+
+    Attributes:
+        history (pd.Series): Score of every candidate evaluated on the full
+            data by the last `search()`, indexed by parameter values.
+        pruned (pd.Series): Whether each candidate of `history` was
+            stopped early by the pruner (all False without one).
+    """
+
+    def __init__(self,
+                 max_tries: Optional[int] = None,
+                 time_budget: Optional[float] = None,
+                 random_state: Optional[int] = None):
+        if max_tries is not None and max_tries < 1:
+            raise ValueError('`max_tries` must be a positive integer')
+        self.max_tries = max_tries
+        self.time_budget = time_budget
+        self.random_state = random_state
+        self.history = None
+        self.pruned = None
+        self._deadline = None
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(max_tries={self.max_tries}, '
+                f'time_budget={self.time_budget})')
+
+    def _start_clock(self):
+        self._deadline = None if self.time_budget is None else time.monotonic() + self.time_budget
+
+    def _out_of_time(self) -> bool:
+        return self._deadline is not None and time.monotonic() > self._deadline
+
+    def search(self, bt, ranges: Union[Dict[str, Sequence], np.ndarray], maximize='Sortino Ratio',
+               constraint: Optional[Callable] = None, pruner: Optional[Pruner] = None) -> Dict:
+        """
+        Search `ranges` on backtest `bt`.
+
+        `ranges` is an `opt_ranges`-like dict (plain or declarative, see
+        `utils.param_space`), or a space already compiled by
+        `compile_space()`, in which case `constraint` is ignored. A
+        `pruner` (`utils.pruning`) stops hopeless candidates early.
+
+        Returns:
+            dict: Best parameter combination found.
+        """
+        if not len(ranges):
+            raise ValueError('Need some strategy parameters to optimize')
+        points = ranges if isinstance(ranges, np.ndarray) else compile_space(ranges, constraint)
+        if not len(points):
+            raise ValueError('No admissible parameter combinations to test')
+        self._start_clock()
+        if pruner is not None:
+            pruner.reset()
+        space = _Space(points, np.random.default_rng(self.random_state))
+        objective = Objective(bt, maximize, pruner)
+        keys, scores = self._search(space, objective)
+        if not keys:
+            raise ValueError('No admissible parameter combinations to test')
+        index = pd.MultiIndex.from_tuples([tuple(space.params(key).values()) for key in keys],
+                                          names=space.names)
+        self.history = pd.Series(scores, dtype=float, name='score', index=index)
+        self.pruned = pd.Series([values in objective.pruned for values in index],
+                                dtype=bool, name='pruned', index=index)
+        scores = np.asarray(scores, dtype=float)
+        best = 0 if np.isnan(scores).all() else int(np.nanargmax(scores))
+        return space.params(keys[best])
+
+    def _search(self, space: '_Space', objective: Objective) -> Tuple[List[int], List[float]]:
+        raise NotImplementedError
+
+    def _evaluate_all(self, space, objective, keys, fraction=1.):
+        """Score `keys` in order, until the time budget runs out."""
+        done, scores = [], []
+        for key in keys:
+            if done and self._out_of_time():
+                break
+            scores.append(objective(space.params(key), fraction))
+            done.append(key)
+        return done, scores
+
+
+class _Space:
+    """Compiled parameter space; candidates are row indices into `points`."""
+
+    def __init__(self, points: np.ndarray, rng: np.random.Generator):
+        self.points = points
+        self.names = list(points.dtype.names)
+        self.rng = rng
+
+    @property
+    def size(self) -> int:
+        return len(self.points)
+
+    def params(self, key: int) -> _Params:
+        return point_params(self.points, key)
+
+    def sample(self, n: int, exclude=()) -> List[int]:
+        """Up to `n` distinct points, uniformly at random."""
+        available = self.size
+        if exclude:
+            available = np.setdiff1d(np.arange(self.size), np.fromiter(exclude, dtype=np.int64))
+        count = min(n, available if isinstance(available, int) else len(available))
+        return self.rng.choice(available, count, replace=False).tolist()
+
+    @cached_property
+    def codes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Position of each point's value among the sorted values of each parameter, and their counts."""
+        codes, sizes = [], []
+        for name in self.names:
+            try:
+                uniques, inverse = np.unique(self.points[name], return_inverse=True)
+            except TypeError:
+                # Mixed object values (e.g. `When(..., otherwise=None)`) don't sort
+                inverse, uniques = pd.factorize(self.points[name])
+            codes.append(inverse.ravel())
+            sizes.append(len(uniques))
+        return np.column_stack(codes), np.array(sizes)
+
+
+def _picklable(obj) -> bool:
+    try:
+        pickle.dumps(obj)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+# (search, space, objective) of a GridSearch pool worker (see _init_grid_worker)
+_worker_grid = None
+# Shared-memory view the worker's backtest reads from
+_worker_shared = None
+
+
+def _init_grid_worker(search, points, recipe, maximize, handle):
+    global _worker_grid, _worker_shared
+    _worker_shared = attach(handle)
+    objective = Objective(_build(recipe, _worker_shared.frame()), maximize)
+    _worker_grid = search, _Space(points, np.random.default_rng()), objective
+
+
+def _grid_task(keys):
+    search, space, objective = _worker_grid
+    return search._evaluate_all(space, objective, keys)[1]
+
+
+class GridSearch(SearchStrategy):
+    """
+    Exhaustive search through `bt.optimize()`.
+
+    With `max_tries`, a random subset of the grid is evaluated.
+    `time_budget` is not supported, since the grid runs in one call.
+    Declarative or precompiled spaces are compiled to their valid points,
+    which event-driven backtests evaluate directly: slices of the points
+    are spread over a process pool whose workers read the data from shared
+    memory (`utils.shared_data`). Runs with a pruner, kernels that don't
+    pickle (lambdas) for `Backtest.optimize`'s workers and grids inside our
+    own pool workers (`utils.pools`) are evaluated point by point in this
+    process.
+
+    Args:
+        n_jobs: Worker processes for compiled spaces; None for all cores.
+    """
+
+    def __init__(self, max_tries: Optional[int] = None, time_budget=None, random_state=None,
+                 n_jobs: Optional[int] = None):
+        if time_budget is not None:
+            raise ValueError('GridSearch does not support `time_budget`; use another search')
+        super().__init__(max_tries=max_tries, random_state=random_state)
+        self.n_jobs = n_jobs
+
+    def search(self, bt, ranges, maximize='Sortino Ratio', constraint=None, pruner=None):
+        if isinstance(ranges, np.ndarray) or (isinstance(bt, Backtest) and (
+                pruner is not None or not pools.enabled() or is_declarative(ranges))):
+            return super().search(bt, ranges, maximize, constraint, pruner)
+        kernel = objectives.as_kernel(maximize)
+        # VectorizedBacktest.optimize() applies kernels itself (on its exit sweep)
+        scoring = isinstance(bt, Backtest) and kernel is not None
+        if scoring:
+            if not _picklable(kernel):
+                # Backtest.optimize ships the scoring backtest to its workers
+                return super().search(bt, ranges, maximize, constraint, pruner)
+            bt, maximize = objectives.scoring(bt, kernel), objectives.score
+        stats, heatmap = bt.optimize(**ranges, maximize=maximize, constraint=constraint,
+                                     max_tries=self.max_tries, random_state=self.random_state,
+                                     return_heatmap=True)
+        self.history = heatmap.rename('score')
+        self.pruned = pd.Series(False, index=heatmap.index, name='pruned')
+        return dict(stats._strategy._params)
+
+    def _search(self, space, objective):
+        keys = range(space.size) if self.max_tries is None else sorted(space.sample(self.max_tries))
+        if isinstance(objective.bt, Backtest) and objective.pruner is None and pools.enabled():
+            return self._evaluate_pool(space, objective, list(keys))
+        return self._evaluate_all(space, objective, keys)
+
+    def _evaluate_pool(self, space, objective, keys):
+        """Score `keys` in order, in slices spread over a process pool."""
+        n_jobs = min(self.n_jobs or os.cpu_count() or 1, len(keys))
+        # With fork, workers inherit their state instead of unpickling it
+        context = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+        if n_jobs < 2 or (context is None and not _picklable(objective.maximize)):
+            return self._evaluate_all(space, objective, keys)
+        # A few slices per worker even out slow and fast candidates
+        slices = [chunk.tolist() for chunk in np.array_split(keys, 4 * n_jobs) if len(chunk)]
+        with SharedOHLCV(objective.bt._data) as shared, \
+                ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                                    initializer=_init_grid_worker,
+                                    initargs=(self, space.points, _recipe(objective.bt),
+                                              objective.maximize, shared.handle)) as pool:
+            scores = [score for chunk in pool.map(_grid_task, slices) for score in chunk]
+        objective.n_evals += len(keys)
+        return keys, scores
+
+
+class RandomSearch(SearchStrategy):
+    """
+    Evaluate `max_tries` distinct admissible candidates drawn uniformly.
+
+    Defaults to 100 candidates.
+    """
+
+    def __init__(self, max_tries: Optional[int] = 100, time_budget=None, random_state=None):
+        super().__init__(max_tries, time_budget, random_state)
+
+    def _search(self, space, objective):
+        n = self.max_tries if self.max_tries is not None else space.size
+        return self._evaluate_all(space, objective, space.sample(n))
+
+
+class SuccessiveHalving(SearchStrategy):
+    """
+    Successive halving over growing prefixes of the data.
+
+    `max_tries` random candidates are scored on the first
+    ``min_fraction`` of the bars; the best ``1 / eta`` of them move on to a
+    prefix `eta` times longer (geometrically), until the survivors are
+    scored on the full data. Candidates without trades on a prefix are
+    dropped first.
+
+    Args:
+        max_tries: Candidates in the first rung. Defaults to 81.
+        eta: Reduction factor between rungs.
+        min_fraction: Share of the bars used in the first rung. Keep it
+            long enough for the slowest indicators to warm up and trade.
+    """
+
+    def __init__(self, max_tries: Optional[int] = 81, time_budget=None, random_state=None,
+                 eta: int = 3, min_fraction: float = .25):
+        super().__init__(max_tries, time_budget, random_state)
+        if eta < 2:
+            raise ValueError('`eta` must be at least 2')
+        if not 0 < min_fraction <= 1:
+            raise ValueError('`min_fraction` must be in (0, 1]')
+        self.eta = eta
+        self.min_fraction = min_fraction
+
+    def _search(self, space, objective):
+        n = self.max_tries if self.max_tries is not None else space.size
+        keys = space.sample(n)
+        n_rungs = max(1, int(math.log(max(len(keys), 1), self.eta)))
+        for rung in range(n_rungs):
+            fraction = self.min_fraction ** ((n_rungs - rung) / n_rungs)
+            keys_done, scores = self._evaluate_all(space, objective, keys, fraction)
+            if self._out_of_time() or len(keys_done) <= 1:
+                keys = keys_done or keys[:1]
+                break
+            # NaNs (no trades) sort last; stable, so ties keep sampling order
+            order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind='stable')
+            keep = max(1, len(keys_done) // self.eta)
+            keys = [keys_done[i] for i in order[:keep]]
+        self._deadline = None  # Always score the survivors on the full data
+        return self._evaluate_all(space, objective, keys)
+
+
+class TPESearch(SearchStrategy):
+    """
+    Tree-structured Parzen Estimator (Bergstra et al., 2011).
+
+    After `n_startup` random candidates, observed candidates are split into
+    the best ``gamma`` quantile and the rest. For each parameter, a kernel
+    density over its value positions is fit to both groups; the next
+    candidate is the one, out of `n_candidates` valid points drawn from the
+    good density, maximizing the ratio good / bad.
+
+    Args:
+        max_tries: Total candidates to evaluate. Defaults to 100.
+        n_startup: Random candidates before modelling. Defaults to
+            ``max(10, max_tries // 5)``.
+        gamma: Share of observations considered good.
+        n_candidates: Draws from the good density per step.
+    """
+
+    def __init__(self, max_tries: Optional[int] = 100, time_budget=None, random_state=None,
+                 n_startup: Optional[int] = None, gamma: float = .25, n_candidates: int = 24):
+        super().__init__(max_tries, time_budget, random_state)
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+
+    @staticmethod
+    def _log_density(observed: np.ndarray, size: int) -> np.ndarray:
+        """Log kernel density of `observed` positions over ``range(size)``, with a uniform prior."""
+        positions = np.arange(size)
+        bandwidth = max(1., size / 10)
+        density = np.full(size, 1. / size)
+        if len(observed):
+            kernels = np.exp(-.5 * ((positions[:, None] - observed[None, :]) / bandwidth) ** 2)
+            kernels /= kernels.sum(axis=0)
+            density = density + kernels.sum(axis=1)
+        return np.log(density / density.sum())
+
+    def _suggest(self, space, keys, scores, seen) -> Optional[int]:
+        values = np.nan_to_num(np.asarray(scores, dtype=float), nan=-np.inf)
+        order = np.argsort(-values, kind='stable')
+        n_good = max(1, int(math.ceil(self.gamma * len(keys))))
+        codes, sizes = space.codes
+        observed = codes[keys]
+        good, bad = observed[order[:n_good]], observed[order[n_good:]]
+
+        # Densities of every valid point under the good (l) and bad (g) models
+        log_l = np.zeros(space.size)
+        log_g = np.zeros(space.size)
+        for d, size in enumerate(sizes):
+            log_l += self._log_density(good[:, d], size)[codes[:, d]]
+            log_g += self._log_density(bad[:, d], size)[codes[:, d]]
+
+        weights = np.exp(log_l - log_l.max())
+        weights[list(seen)] = 0
+        total = weights.sum()
+        if not total:
+            return None
+        candidates = space.rng.choice(space.size, self.n_candidates, p=weights / total)
+        return int(candidates[np.argmax((log_l - log_g)[candidates])])
+
+    def _search(self, space, objective):
+        n = self.max_tries if self.max_tries is not None else space.size
+        n_startup = self.n_startup if self.n_startup is not None else max(10, n // 5)
+        keys, scores = self._evaluate_all(space, objective, space.sample(min(n, n_startup)))
+        seen = set(keys)
+        while len(keys) < min(n, space.size) and not self._out_of_time():
+            key = self._suggest(space, keys, scores, seen)
+            if key is None:
+                break
+            seen.add(key)
+            keys.append(key)
+            scores.append(objective(space.params(key)))
+        return keys, scores
+
+
+SEARCHES = {
+    'grid': GridSearch,
+    'random': RandomSearch,
+    'halving': SuccessiveHalving,
+    'tpe': TPESearch,
+}
+
+
+def get_search(search: Union[str, SearchStrategy, None] = None, **kwargs) -> SearchStrategy:
+    """
+    Resolve `search` to a `SearchStrategy` instance.
+
+    Args:
+        search: Instance, or one of ``'grid'`` (default), ``'random'``,
+            ``'halving'``, ``'tpe'``.
+        **kwargs: Constructor arguments (``max_tries``, ``time_budget``,
+            ``random_state``...) when `search` is a name. Those set to None
+            keep the search's defaults.
+    """
+    if isinstance(search, SearchStrategy):
+        return search
+    search = search or 'grid'
+    try:
+        cls = SEARCHES[search]
+    except KeyError:
+        raise ValueError(f'Unknown search {search!r}; use one of {list(SEARCHES)}') from None
+    return cls(**{k: v for k, v in kwargs.items() if v is not None})
@@ -0,0 +1,159 @@
+"""
+Shared-memory OHLCV handoff to worker processes.
+
+Parallel walk-forward workers would otherwise each receive pickled copies of
+their DataFrame slices, multiplying resident memory by the number of workers.
+`SharedOHLCV` copies the full dataset once into a single
+`multiprocessing.shared_memory` block; workers attach to it by name and build
+zero-copy DataFrame views for any ``[start, stop)`` range of bars.
+
+The owner unlinks the block deterministically: on leaving the ``with`` block
+(also when an exception propagates), on `close()`, or at interpreter exit
+via `weakref.finalize` as a last resort. Workers attach untracked, so their
+exit never unlinks memory still in use by the owner.
+
+Example:
+    >>> with SharedOHLCV(data) as shared:
+    ...     handle = shared.handle            # small and picklable
+    ...     # in a worker process:
+    ...     with attach(handle) as view:
+    ...         window = view.frame(0, 500)   # pd.DataFrame, no copy
+"""
+
+import weakref
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class SharedOHLCVHandle:
+    """Picklable description of a `SharedOHLCV` block, used to attach to it."""
+    name: str
+    columns: Tuple[str, ...]
+    length: int
+    datetime_index: bool
+    tz: Optional[str]
+
+
+def _layout(handle: SharedOHLCVHandle, buf):
+    """Values as a (columns × bars) float64 array, index as int64, both over `buf`."""
+    n_cols, n = len(handle.columns), handle.length
+    values = np.ndarray((n_cols, n), dtype=np.float64, buffer=buf)
+    index = np.ndarray((n,), dtype=np.int64, buffer=buf, offset=values.nbytes)
+    return values, index
+
+
+class _SharedView:
+    """Zero-copy DataFrame factory over a shared block."""
+
+    def __init__(self, handle: SharedOHLCVHandle, shm: shared_memory.SharedMemory):
+        self.handle = handle
+        self._shm = shm
+        self._values, self._index = _layout(handle, shm.buf)
+
+    def __len__(self):
+        return self.handle.length
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def frame(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """
+        DataFrame of bars ``[start, stop)`` backed by the shared block.
+
+        The column data is a view, not a copy; the (small) index is rebuilt.
+        The returned frame is only valid while the block is attached.
+        """
+        values = self._values[:, start:stop]
+        index = self._index[start:stop]
+        if self.handle.datetime_index:
+            index = pd.DatetimeIndex(index.view('M8[ns]'))
+            if self.handle.tz:
+                index = index.tz_localize('UTC').tz_convert(self.handle.tz)
+        else:
+            index = pd.Index(index)
+        # (n, columns) transpose of a C-ordered block: pandas keeps it as is
+        return pd.DataFrame(values.T, index=index, columns=list(self.handle.columns), copy=False)
+
+    def close(self):
+        """Release this process' mapping of the block."""
+        if self._shm is not None:
+            self._values = self._index = None
+            _close(self._shm)
+            self._shm = None
+
+
+class SharedOHLCV(_SharedView):
+    """
+    Owner of a shared-memory copy of an OHLCV DataFrame.
+
+    Args:
+        data: DataFrame with a DatetimeIndex or integer index. Only numeric
+            columns are shared (OHLCV and any numeric extras), as float64.
+
+    Attributes:
+        handle (SharedOHLCVHandle): Pass this to workers and `attach()` it.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        data = data.select_dtypes('number')
+        datetime_index = isinstance(data.index, pd.DatetimeIndex)
+        tz = None
+        if datetime_index:
+            tz = str(data.index.tz) if data.index.tz is not None else None
+            index = data.index.as_unit('ns')
+            if tz:
+                index = index.tz_convert('UTC').tz_localize(None)
+            index = index.asi8
+        else:
+            index = np.asarray(data.index, dtype=np.int64)
+
+        n_cols, n = data.shape[1], len(data)
+        size = max(1, (n_cols + 1) * n * 8)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        handle = SharedOHLCVHandle(name=shm.name, columns=tuple(map(str, data.columns)),
+                                   length=n, datetime_index=datetime_index, tz=tz)
+        super().__init__(handle, shm)
+        self._finalizer = weakref.finalize(self, _release, shm)
+        self._values[:] = data.to_numpy(dtype=np.float64).T
+        self._index[:] = index
+
+    def close(self):
+        """Unlink the block. Frames already handed out keep their mapping until freed."""
+        self._values = self._index = None
+        self._shm = None
+        self._finalizer()
+
+
+def _close(shm: shared_memory.SharedMemory):
+    try:
+        shm.close()
+    except BufferError:
+        # Frames handed out still reference the mapping; it goes away with them
+        pass
+
+
+def _release(shm: shared_memory.SharedMemory):
+    _close(shm)
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def attach(handle: SharedOHLCVHandle) -> _SharedView:
+    """
+    Attach to a block created by `SharedOHLCV` in another process.
+
+    Returns a view with the same `frame()` method; `close()` it (or use it
+    as a context manager) when done. Closing never unlinks the block.
+    """
+    shm = shared_memory.SharedMemory(name=handle.name, track=False)
+    return _SharedView(handle, shm)
@@ -0,0 +1,73 @@
+"""
+Backtests whose results go through functions passed to them.
+
+`with_stats(bt, hook)` returns a copy of `bt` whose ``run(**params)``
+returns ``hook(run, **params)``, where ``run`` is the copy's plain
+`Backtest.run`: the hook runs the backtest normally and turns (or times)
+its stats. backtesting.py itself is never modified, so other backtests,
+threads and worker processes are unaffected, and hooks nest (`utils.profiling`
+timing the scorer of `utils.objectives`): the last one added is outermost.
+
+The copy's class derives from `bt`'s, so subclasses such as
+`FractionalBacktest` still apply their own ``run()`` around the hooks.
+Copies pickle (as `Backtest.optimize` does to ship them to its workers)
+when their hooks do.
+
+Example:
+    >>> scoring = with_stats(bt, objectives.Scorer(kernel))
+    >>> scoring.run(n1=10, n2=30)['Objective']
+"""
+
+from copy import copy
+from functools import lru_cache, partial
+from typing import Callable
+
+from backtesting import Backtest
+
+
+class _Hooked(Backtest):
+    """`Backtest` whose ``run()`` goes through its instance's `_hooks`."""
+
+    _hooks = ()
+
+    def run(self, **kwargs):
+        run = super().run
+        for hook in self._hooks:
+            run = partial(hook, run)
+        return run(**kwargs)
+
+    def __reduce__(self):
+        return _restore, (type(self)._base, self.__dict__)
+
+
+@lru_cache(maxsize=None)
+def _hooked_class(cls: type) -> type:
+    if cls is Backtest:
+        hooked = type('Backtest', (_Hooked,), {'__module__': Backtest.__module__})
+    else:
+        # MRO: cls ... -> _Hooked -> Backtest, so cls.run() still wraps the hooks
+        hooked = type(cls.__name__, (cls, _Hooked), {'__module__': cls.__module__,
+                                                     '__qualname__': cls.__qualname__})
+    hooked._base = cls
+    return hooked
+
+
+def _restore(cls: type, state: dict):
+    bt = Backtest.__new__(_hooked_class(cls))
+    bt.__dict__.update(state)
+    return bt
+
+
+def with_stats(bt: Backtest, hook: Callable) -> Backtest:
+    """
+    Copy of `bt` whose runs return ``hook(run, **params)``.
+
+    `hook` gets the copy's plain run (its hooks added earlier included)
+    and the run's parameters, and returns the run's results.
+    """
+    if not isinstance(bt, Backtest):
+        raise TypeError(f'Cannot hook the stats of {type(bt).__name__}')
+    hooked = copy(bt)
+    hooked.__class__ = _hooked_class(getattr(type(bt), '_base', type(bt)))
+    hooked._hooks = (*getattr(bt, '_hooks', ()), hook)
+    return hooked
@@ -0,0 +1,953 @@
+"""
+Bar-by-bar (live or replayed) runs of strategies, with O(1) indicator updates.
+
+`Backtest.run` computes each indicator over the whole dataset in `init()`
+and reveals it gradually. A live or paper-trading process can't: bars
+arrive one at a time, and recomputing ``talib.SMA`` over the history on
+every new bar costs O(bars) per bar. `StreamRunner` drives an unmodified
+`BaseStrategy` subclass from bars pushed to it (a replayed file, a
+`queue.Queue` filled by a connector thread, any iterable):
+
+- its ``self.I()`` and ``self.resample_apply()`` indicators are fed one bar
+  at a time by incremental versions of the TA-Lib functions (`SMA`, `EMA`,
+  `KAMA`, `MACD`, `ADX`, `MOM`, `LINEARREG`, `LINEARREG_SLOPE`), which keep
+  a constant-size state and reproduce TA-Lib's seeding and warm-up. Other
+  functions are recomputed over the history on each bar, with a warning;
+- orders go through backtesting.py's own broker, so fills, SL/TP and
+  commissions follow the rules of a backtest, and replaying a dataset gives
+  the trades and stats of ``Backtest.run`` on it.
+
+`check_against_talib()` compares every incremental indicator with TA-Lib's
+batch output on a dataset.
+
+Example:
+    >>> runner = StreamRunner(SmaCross, {'n1': 10, 'n2': 30}, cash=10_000, commission=.002)
+    >>> runner.run(replay('BTC-USD_1h.csv'))
+    >>> runner.position, runner.stats()['Return [%]']
+    >>> print(check_against_talib(data))
+"""
+
+import os
+import time as _time
+import warnings
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import backtesting.backtesting as _backtesting
+import numpy as np
+import pandas as pd
+import talib
+from backtesting import Strategy
+from backtesting._util import _Array, _Indicator
+from backtesting.lib import OHLCV_AGG
+from pandas.tseries.frequencies import to_offset
+
+from .data_loader import COLUMNS, _normalize_frame
+
+_NAN = float('nan')
+# TA-Lib's TA_IS_ZERO() tolerance (KAMA's efficiency ratio, ADX's DI)
+_ZERO = 1e-14
+
+
+def _period(value, minimum: int, name: str = 'timeperiod') -> int:
+    period = int(value)
+    if period != value or period < minimum:
+        raise ValueError(f'`{name}` must be an integer >= {minimum}, got {value!r}')
+    return period
+
+
+class Incremental:
+    """
+    Base of the O(1) indicators.
+
+    `update()` takes one new bar's inputs and returns the indicator at that
+    bar (a tuple for multi-output indicators), NaN while warming up, as the
+    TA-Lib function of the same name returns at that position of the whole
+    series. Calling the instance does the same, skipping the leading bars
+    where an input is NaN, as TA-Lib's Python wrapper does (e.g. for an
+    indicator of another indicator).
+
+    Attributes:
+        n_inputs: Input series per bar, e.g. 3 (high, low, close) for ADX.
+        n_outputs: Values returned by `update()`.
+        lookback: Leading bars of NaN output.
+    """
+    n_inputs = 1
+    n_outputs = 1
+    lookback = 0
+    _started = False
+
+    def __repr__(self):
+        params = ', '.join(f'{key}={value!r}' for key, value in vars(self).items()
+                           if not key.startswith('_') and key != 'lookback')
+        return f'{type(self).__name__}({params})'
+
+    def update(self, *values):
+        raise NotImplementedError
+
+    @property
+    def _missing(self):
+        return _NAN if (self.n_outputs or 1) == 1 else (_NAN,) * self.n_outputs
+
+    def __call__(self, *values):
+        if not self._started:
+            if any(value != value for value in values):
+                return self._missing
+            self._started = True
+        return self.update(*values)
+
+
+class SMA(Incremental):
+    """Simple moving average: running sum of a ring of the last `timeperiod` values."""
+
+    def __init__(self, timeperiod: int = 30):
+        self.timeperiod = _period(timeperiod, 2)
+        self.lookback = self.timeperiod - 1
+        self._window = deque(maxlen=self.timeperiod)
+        self._total = 0.
+
+    def update(self, value):
+        # Same operation order as TA-Lib: add the new value, divide, drop the oldest
+        self._total += value
+        self._window.append(value)
+        if len(self._window) < self.timeperiod:
+            return _NAN
+        result = self._total / self.timeperiod
+        self._total -= self._window[0]
+        return result
+
+
+class EMA(Incremental):
+    """Exponential moving average, seeded with the SMA of the first `timeperiod` values."""
+
+    def __init__(self, timeperiod: int = 30):
+        # 1 is allowed for MACD's signal line, unlike in talib.EMA
+        self.timeperiod = _period(timeperiod, 1)
+        self.lookback = self.timeperiod - 1
+        self._k = 2. / (self.timeperiod + 1)
+        self._n = 0
+        self._value = 0.
+
+    def update(self, value):
+        if self._n < self.timeperiod:
+            self._n += 1
+            self._value += value
+            if self._n < self.timeperiod:
+                return _NAN
+            self._value /= self.timeperiod
+            return self._value
+        self._value = (value - self._value) * self._k + self._value
+        return self._value
+
+
+class KAMA(Incremental):
+    """Kaufman adaptive moving average (fast/slow constants of 2 and 30 bars, as TA-Lib)."""
+    _SLOWEST = 2. / (30 + 1)
+    _SPAN = 2. / (2 + 1) - _SLOWEST
+
+    def __init__(self, timeperiod: int = 30):
+        self.timeperiod = _period(timeperiod, 2)
+        self.lookback = self.timeperiod
+        self._window = deque(maxlen=self.timeperiod + 1)
+        self._sum_roc = 0.
+        self._trailing = 0.
+        self._value = 0.
+
+    def update(self, value):
+        window = self._window
+        n = len(window)
+        if n < self.timeperiod:
+            if n:
+                self._sum_roc += abs(window[-1] - value)
+            window.append(value)
+            return _NAN
+        if n == self.timeperiod:
+            # First value: the previous bar seeds the average
+            self._sum_roc += abs(window[-1] - value)
+            self._value = window[-1]
+            trailing = window[0]
+        else:
+            trailing = window[1]
+            self._sum_roc -= abs(self._trailing - trailing)
+            self._sum_roc += abs(value - window[-1])
+        self._trailing = trailing
+        window.append(value)
+        change = value - trailing
+        sum_roc = self._sum_roc
+        if sum_roc <= change or -_ZERO < sum_roc < _ZERO:
+            ratio = 1.
+        else:
+            ratio = abs(change / sum_roc)
+        factor = ratio * self._SPAN + self._SLOWEST
+        factor *= factor
+        self._value = (value - self._value) * factor + self._value
+        return self._value
+
+
+class MACD(Incremental):
+    """
+    MACD line, signal and histogram.
+
+    As in TA-Lib, both EMAs start on the bar the slow one is seeded, i.e.
+    the fast EMA is seeded from the `fastperiod` values before it, and
+    nothing is returned before the signal line is.
+    """
+    n_outputs = 3
+
+    def __init__(self, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9):
+        fastperiod = _period(fastperiod, 2, 'fastperiod')
+        slowperiod = _period(slowperiod, 2, 'slowperiod')
+        self.fastperiod, self.slowperiod = sorted((fastperiod, slowperiod))
+        self.signalperiod = _period(signalperiod, 1, 'signalperiod')
+        self.lookback = self.slowperiod - 1 + self.signalperiod - 1
+        self._fast = EMA(self.fastperiod)
+        self._slow = EMA(self.slowperiod)
+        self._signal = EMA(self.signalperiod)
+        self._skip = self.slowperiod - self.fastperiod
+
+    def update(self, value):
+        slow = self._slow.update(value)
+        if self._skip:
+            self._skip -= 1
+            return self._missing
+        fast = self._fast.update(value)
+        if slow != slow:
+            return self._missing
+        macd = fast - slow
+        signal = self._signal.update(macd)
+        if signal != signal:
+            return self._missing
+        return macd, signal, macd - signal
+
+
+class ADX(Incremental):
+    """Average directional index, with Wilder's smoothing of +DM, -DM and true range."""
+    n_inputs = 3
+
+    def __init__(self, timeperiod: int = 14):
+        self.timeperiod = _period(timeperiod, 2)
+        self.lookback = 2 * self.timeperiod - 1
+        self._n = 0
+        self._high = self._low = self._close = 0.
+        self._plus_dm = self._minus_dm = self._true_range = 0.
+        self._sum_dx = 0.
+        self._value = _NAN
+
+    def _dx(self) -> Optional[float]:
+        true_range = self._true_range
+        if -_ZERO < true_range < _ZERO:
+            return None
+        minus_di = 100. * (self._minus_dm / true_range)
+        plus_di = 100. * (self._plus_dm / true_range)
+        total = minus_di + plus_di
+        if -_ZERO < total < _ZERO:
+            return None
+        return 100. * (abs(minus_di - plus_di) / total)
+
+    def update(self, high, low, close):
+        n = self._n
+        self._n += 1
+        period = self.timeperiod
+        if not n:
+            self._high, self._low, self._close = high, low, close
+            return _NAN
+        up = high - self._high
+        down = self._low - low
+        true_range = max(high - low, abs(high - self._close), abs(low - self._close))
+        self._high, self._low, self._close = high, low, close
+        if n >= period:
+            self._minus_dm -= self._minus_dm / period
+            self._plus_dm -= self._plus_dm / period
+        if down > 0 and up < down:
+            self._minus_dm += down
+        elif up > 0 and up > down:
+            self._plus_dm += up
+        if n < period:
+            self._true_range += true_range
+            return _NAN
+        self._true_range = self._true_range - self._true_range / period + true_range
+        dx = self._dx()
+        if n < 2 * period - 1:
+            if dx is not None:
+                self._sum_dx += dx
+            return _NAN
+        if n == 2 * period - 1:
+            if dx is not None:
+                self._sum_dx += dx
+            self._value = self._sum_dx / period
+        elif dx is not None:
+            self._value = (self._value * (period - 1) + dx) / period
+        return self._value
+
+
+class MOM(Incremental):
+    """Momentum: change over the last `timeperiod` bars."""
+
+    def __init__(self, timeperiod: int = 10):
+        self.timeperiod = _period(timeperiod, 1)
+        self.lookback = self.timeperiod
+        self._window = deque(maxlen=self.timeperiod + 1)
+
+    def update(self, value):
+        self._window.append(value)
+        if len(self._window) <= self.timeperiod:
+            return _NAN
+        return value - self._window[0]
+
+
+class LINEARREG(Incremental):
+    """
+    Least-squares line over the last `timeperiod` values, at the current bar.
+
+    The sums of the fit slide in O(1) per bar, and are recomputed from the
+    window every `timeperiod` bars (amortized O(1)) so rounding doesn't
+    drift over long streams.
+    """
+
+    def __init__(self, timeperiod: int = 14):
+        self.timeperiod = n = _period(timeperiod, 2)
+        self.lookback = n - 1
+        self._window = deque(maxlen=n)
+        self._sum_x = n * (n - 1) * .5
+        self._divisor = self._sum_x * self._sum_x - n * (n * (n - 1) * (2 * n - 1) // 6)
+        # Sums over the window, x being the age of each value in bars
+        self._sum_y = self._sum_xy = 0.
+        self._since_sync = 0
+
+    def _fit(self, value) -> Tuple[float, float]:
+        window = self._window
+        n = self.timeperiod
+        if len(window) == n:
+            oldest = window[0]
+            self._sum_xy += self._sum_y - n * oldest
+            self._sum_y += value - oldest
+        else:
+            self._sum_xy += self._sum_y
+            self._sum_y += value
+        window.append(value)
+        if len(window) < n:
+            return _NAN, _NAN
+        self._since_sync += 1
+        if self._since_sync >= n:
+            self._since_sync = 0
+            self._sum_y = self._sum_xy = 0.
+            for age, y in zip(range(n - 1, -1, -1), window):
+                self._sum_y += y
+                self._sum_xy += age * y
+        slope = (n * self._sum_xy - self._sum_x * self._sum_y) / self._divisor
+        intercept = (self._sum_y - slope * self._sum_x) / n
+        return slope, intercept
+
+    def update(self, value):
+        slope, intercept = self._fit(value)
+        return intercept + slope * (self.timeperiod - 1)
+
+
+class LINEARREG_SLOPE(LINEARREG):
+    """Slope of the least-squares line over the last `timeperiod` values."""
+
+    def update(self, value):
+        return self._fit(value)[0]
+
+
+# TA-Lib function name -> incremental version
+INCREMENTAL: Dict[str, type] = {cls.__name__: cls for cls in (
+    SMA, EMA, KAMA, MACD, ADX, MOM, LINEARREG, LINEARREG_SLOPE)}
+
+
+def incremental(func: Callable, *args, **kwargs) -> Optional[Incremental]:
+    """
+    The incremental version of TA-Lib function `func` with parameters
+    ``*args, **kwargs`` (the non-series arguments, as passed to `func`),
+    or None if there's none.
+    """
+    cls = INCREMENTAL.get(getattr(func, '__name__', None))
+    if cls is None or not str(getattr(func, '__module__', '')).startswith('talib'):
+        return None
+    return cls(*args, **kwargs)
+
+
+class Recompute(Incremental):
+    """
+    Fallback for functions without an incremental version.
+
+    Keeps every input and calls ``func(*inputs, *args, **kwargs)`` on the
+    whole history at each update, which costs O(bars) per bar.
+    """
+    n_outputs = None
+
+    def __init__(self, func: Callable, *args, n_inputs: int = 1, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.n_inputs = n_inputs
+        self._inputs = np.empty((n_inputs, 256))
+        self._n = 0
+
+    def update(self, *values):
+        n = self._n
+        if n == self._inputs.shape[1]:
+            self._inputs = np.concatenate([self._inputs, np.empty_like(self._inputs)], axis=1)
+        self._inputs[:, n] = values
+        self._n = n + 1
+        result = self.func(*self._inputs[:, :n + 1], *self.args, **self.kwargs)
+        if isinstance(result, pd.DataFrame):
+            result = result.values.T
+        elif isinstance(result, tuple):
+            result = np.vstack([np.asarray(r, dtype=float) for r in result])
+        last = np.asarray(result, dtype=float)[..., -1]
+        return float(last) if last.ndim == 0 else tuple(last)
+
+    __call__ = update
+
+
+def run_incremental(indicator: Incremental, *inputs) -> np.ndarray:
+    """
+    Feed whole input arrays through `indicator`, bar by bar.
+
+    Returns:
+        np.ndarray: One value per bar, or ``(n_outputs, bars)`` for
+            multi-output indicators, as the TA-Lib function returns them.
+    """
+    inputs = [np.asarray(series, dtype=float) for series in inputs]
+    values = [indicator(*bar) for bar in zip(*inputs)]
+    return np.array(values, dtype=float).T if values else np.empty(0)
+
+
+class _Stream:
+    """One indicator of a streaming run: how to update it, and its outputs so far."""
+
+    def __init__(self, name, update: Callable, n_outputs: Optional[int], capacity: int, opts: dict):
+        self.name = name
+        self.scatter = bool(opts.get('scatter', False))
+        self._update = update
+        self._capacity = capacity
+        self._opts = {'plot': True, 'overlay': None, 'color': None, **opts,
+                      'scatter': self.scatter, 'index': None, 'stream': self}
+        self.values: Optional[np.ndarray] = None
+        self._array: Optional[_Indicator] = None
+        # Bar of the first non-NaN value of each output, then the last of them
+        self._first: List[Optional[int]] = []
+        self.warmup: Optional[int] = None
+        if n_outputs is not None:
+            self._allocate(n_outputs)
+
+    def __repr__(self):
+        return f'<Stream {self.name}>'
+
+    def _allocate(self, n_outputs: int):
+        self.values = np.full((n_outputs, self._capacity), np.nan)
+        self._first = [None] * n_outputs
+        self._wrap()
+
+    def _wrap(self):
+        values = self.values[0] if len(self.values) == 1 else self.values
+        self._array = _Indicator(values, name=self.name, **self._opts)
+
+    def grow(self, capacity: int):
+        self._capacity = capacity
+        if self.values is not None:
+            values = np.full((len(self.values), capacity), np.nan)
+            values[:, :self.values.shape[1]] = self.values
+            self.values = values
+            self._wrap()
+
+    def view(self, length: int) -> _Indicator:
+        """The outputs up to bar ``length - 1``, as the strategy sees them."""
+        if self._array is None:
+            return _Indicator(np.empty(0), name=self.name, **self._opts)
+        return self._array[..., :length]
+
+    def step(self, i: int):
+        value = self._update()
+        if self.values is None:
+            if np.ndim(value) == 0 and value != value:
+                # Number of outputs still unknown (Recompute), and nothing to store
+                return
+            self._allocate(1 if np.ndim(value) == 0 else len(value))
+        column = self.values[:, i]
+        column[:] = value
+        if self.warmup is None:
+            first = self._first
+            for row, v in enumerate(column):
+                if first[row] is None and v == v:
+                    first[row] = i
+            if None not in first:
+                self.warmup = max(first)
+
+
+class _Resampler:
+    """Bins of one column on a fixed-width higher timeframe, fed to an indicator as they close."""
+    _AGG = {'first': lambda acc, v: acc, 'last': lambda acc, v: v, 'max': max, 'min': min,
+            'sum': lambda acc, v: acc + v}
+
+    def __init__(self, data: 'StreamData', rule: str, row: int, agg: str, indicator: Incremental):
+        self._data = data
+        self._row = row
+        self._agg = agg
+        self._combine = self._AGG[agg]
+        self._indicator = indicator
+        self._width = _fixed_width(rule)
+        self._origin = None
+        self._bin = None
+        self._acc = _NAN
+        self._last = indicator._missing
+
+    def __call__(self):
+        data = self._data
+        time = data._times[len(data) - 1]
+        value = data._values[self._row, len(data) - 1]
+        if self._origin is None:
+            # Bins start at midnight of the first bar, as pandas' default origin
+            self._origin = data.index[-1].normalize().value
+        k = (int(time) - self._origin) // self._width
+        if k != self._bin:
+            if self._bin is not None:
+                self._last = self._indicator(self._acc)
+                if self._agg == 'sum':
+                    # Empty bins sum to 0 and stay in the resampled series
+                    for _ in range(k - self._bin - 1):
+                        self._last = self._indicator(0.)
+            self._bin = k
+            self._acc = value
+        else:
+            self._acc = self._combine(self._acc, value)
+        return self._last
+
+
+def _fixed_width(rule: str) -> Optional[int]:
+    """Width of `rule` in nanoseconds, or None if it isn't a fixed-width frequency."""
+    offset = to_offset(rule)
+    if isinstance(offset, pd.offsets.Tick):
+        return pd.Timedelta(offset).value
+    if type(offset) is pd.offsets.Day:
+        return pd.Timedelta(days=offset.n).value
+    return None
+
+
+_warned = set()
+
+
+def _warn_recompute(name: str):
+    if name not in _warned:
+        _warned.add(name)
+        warnings.warn(f'{name} has no incremental version; in streaming runs it is recomputed '
+                      'over the whole history on every bar', stacklevel=4)
+
+
+class StreamData:
+    """
+    OHLCV of a streaming run, growing one bar at a time.
+
+    Stands in for backtesting.py's `_Data` (a strategy's ``self.data``):
+    columns are NumPy views of the bars so far, the last element being the
+    current bar. Buffers double when full, so appending is amortized O(1).
+    It also holds the run's indicators (see `indicator()`).
+
+    Args:
+        capacity: Initial number of bars the buffers hold.
+    """
+    _ROWS = {column: row for row, column in enumerate(COLUMNS)}
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = max(1, int(capacity))
+        self._n = 0
+        self._values = np.full((len(COLUMNS), self._capacity), np.nan)
+        self._times = np.zeros(self._capacity, dtype=np.int64)
+        self._tz = None
+        self._cache: Dict[str, np.ndarray] = {}
+        self._pip: Optional[float] = None
+        self.streams: List[_Stream] = []
+
+    def __repr__(self):
+        if not self._n:
+            return '<StreamData (empty)>'
+        items = ', '.join(f'{column}={self._current_value(column)}' for column in COLUMNS)
+        return f'<StreamData i={self._n - 1} ({self.index[-1]}) {items}>'
+
+    def __len__(self):
+        return self._n
+
+    def __getattr__(self, item):
+        if item in self._ROWS:
+            return self._column(item)
+        raise AttributeError(f"Column '{item}' not in data")
+
+    def __getitem__(self, item):
+        return self._column(item)
+
+    def _column(self, column: str) -> np.ndarray:
+        array = self._cache.get(column)
+        if array is None:
+            array = self._cache[column] = _Array(self._values[self._ROWS[column], :self._n],
+                                                 name=column)
+        return array
+
+    def _current_value(self, column: str):
+        return self._values[self._ROWS[column], self._n - 1]
+
+    @property
+    def Open(self) -> np.ndarray:
+        return self._column('Open')
+
+    @property
+    def High(self) -> np.ndarray:
+        return self._column('High')
+
+    @property
+    def Low(self) -> np.ndarray:
+        return self._column('Low')
+
+    @property
+    def Close(self) -> np.ndarray:
+        return self._column('Close')
+
+    @property
+    def Volume(self) -> np.ndarray:
+        return self._column('Volume')
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        index = self._cache.get('__index')
+        if index is None:
+            index = pd.DatetimeIndex(self._times[:self._n].view('M8[ns]'), copy=False)
+            if self._tz is not None:
+                index = index.tz_localize('UTC').tz_convert(self._tz)
+            self._cache['__index'] = index
+        return index
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """The bars so far, as a DataFrame (a copy, O(bars))."""
+        return pd.DataFrame({column: self._values[row, :self._n].copy()
+                             for column, row in self._ROWS.items()}, index=self.index)
+
+    @property
+    def pip(self) -> float:
+        if self._pip is None and self._n:
+            self._pip = float(10**-np.median([len(s.partition('.')[-1])
+                                              for s in self.Close.astype(str)]))
+        return self._pip
+
+    def append(self, time, open, high, low, close, volume=_NAN):
+        """Add a bar; `time` must be later than the previous bar's."""
+        time = pd.Timestamp(time)
+        if not self._n:
+            self._tz = time.tz
+        elif time.value <= self._times[self._n - 1]:
+            raise ValueError(f'Bar at {time} does not follow the previous one '
+                             f'({self.index[-1]}); bars must arrive in time order')
+        if self._n == self._capacity:
+            self._grow()
+        self._times[self._n] = time.value
+        self._values[:, self._n] = open, high, low, close, volume
+        self._n += 1
+        self._cache.clear()
+
+    def _grow(self):
+        capacity = 2 * self._capacity
+        values = np.full((len(COLUMNS), capacity), np.nan)
+        values[:, :self._n] = self._values[:, :self._n]
+        times = np.zeros(capacity, dtype=np.int64)
+        times[:self._n] = self._times[:self._n]
+        self._values, self._times, self._capacity = values, times, capacity
+        for stream in self.streams:
+            stream.grow(capacity)
+
+    def _source(self, series, name: str) -> Callable:
+        """Per-bar reader of an indicator input: a data column or another indicator."""
+        stream = series._opts.get('stream') if isinstance(series, _Indicator) else None
+        if stream is not None:
+            row = 0
+            if series.ndim == 1 and stream.values is not None and len(stream.values) > 1:
+                offset = series.__array_interface__['data'][0] - stream.values.ctypes.data
+                row = offset // stream.values.strides[0]
+            return lambda: (stream.values[row, self._n - 1] if stream.values is not None
+                            else _NAN)
+        column = getattr(series, 'name', None)
+        start = self._values.ctypes.data
+        if (column in self._ROWS and isinstance(series, np.ndarray)
+                and start <= series.ctypes.data < start + self._values.nbytes):
+            row = self._ROWS[column]
+            return lambda: self._values[row, self._n - 1]
+        raise ValueError(f'Indicator {name}: streaming runs take data columns or other '
+                         f'indicators as input series, not {type(series).__name__}')
+
+    def indicator(self, func: Callable, args: tuple, kwargs: dict, rule: Optional[str] = None):
+        """
+        Declare an indicator updated on every new bar; backs
+        `BaseStrategy.I()` (and `resample_apply()`, with `rule`) in
+        streaming runs.
+
+        Leading array arguments are the input series (data columns or
+        indicators declared before), the other arguments are passed to
+        `func`'s incremental version (see `incremental()`), or to `func`
+        itself when there's none.
+
+        Returns:
+            np.ndarray: Empty view of the indicator; `StreamRunner` sets
+                the strategy attribute it's assigned to to the values up
+                to the current bar before each ``next()``.
+        """
+        kwargs = dict(kwargs)
+        opts = {key: kwargs.pop(key) for key in ('name', 'plot', 'overlay', 'color', 'scatter')
+                if key in kwargs}
+        agg = kwargs.pop('agg', None)
+        func_name = getattr(func, '__name__', repr(func))
+        n_series = next((i for i, arg in enumerate(args) if not isinstance(arg, np.ndarray)),
+                        len(args))
+        series, params = args[:n_series], args[n_series:]
+        name = (opts.pop('name', None)
+                or f"{func_name}({','.join(map(str, (*params, *kwargs.values())))})")
+        if not series:
+            raise ValueError(f'Indicator {name} takes no data series; streaming runs need the '
+                             'series passed to I() as arguments')
+        sources = [self._source(s, name) for s in series]
+
+        indicator = incremental(func, *params, **kwargs)
+        if rule is not None:
+            column = getattr(series[0], 'name', None)
+            width = _fixed_width(rule)
+            if len(series) != 1 or column not in self._ROWS or width is None:
+                raise ValueError(f'Indicator {name}: streaming resample_apply() needs one data '
+                                 f'column and a fixed-width rule, got {rule!r}')
+            agg = agg or OHLCV_AGG.get(column, 'last')
+            if agg not in _Resampler._AGG:
+                raise ValueError(f'Indicator {name}: unsupported streaming `agg` {agg!r}')
+            if indicator is None:
+                _warn_recompute(func_name)
+                indicator = Recompute(func, *params, **kwargs)
+            update = _Resampler(self, rule, self._ROWS[column], agg, indicator)
+        else:
+            if indicator is None:
+                _warn_recompute(func_name)
+                indicator = Recompute(func, *params, n_inputs=len(sources), **kwargs)
+            if len(sources) == 1:
+                source = sources[0]
+                update = lambda: indicator(source())  # noqa: E731
+            else:
+                update = lambda: indicator(*[source() for source in sources])  # noqa: E731
+        stream = _Stream(name, update, indicator.n_outputs, self._capacity, opts)
+        self.streams.append(stream)
+        return stream.view(0)
+
+
+class Bar(NamedTuple):
+    """One OHLCV bar, as taken by `StreamRunner.on_bar()`."""
+    time: pd.Timestamp
+    Open: float
+    High: float
+    Low: float
+    Close: float
+    Volume: float = _NAN
+
+
+class StreamRunner:
+    """
+    Runs a strategy on bars pushed one at a time.
+
+    Before each bar's ``next()``, pending orders are processed by
+    backtesting.py's broker on the bar's prices, as in `Backtest.run`.
+    ``next()`` is first called once every indicator assigned to the
+    strategy has produced a value, plus one bar, as in a backtest.
+
+    Args:
+        strategy: `BaseStrategy` subclass.
+        params: Parameter values; class attributes are the defaults.
+        cash, spread, commission, margin, trade_on_close, hedging,
+            exclusive_orders: As for `backtesting.Backtest`.
+        capacity: Bars preallocated; buffers double beyond it.
+
+    Attributes:
+        data: The `StreamData` of the bars so far.
+        strategy: The strategy instance.
+        start: Bar of the first ``next()`` call, once known.
+        stopped: Whether the account ran out of money, ending the run.
+    """
+
+    def __init__(self, strategy: type, params: Optional[dict] = None, *,
+                 cash: float = 10_000, spread: float = 0., commission=0., margin: float = 1.,
+                 trade_on_close: bool = False, hedging: bool = False,
+                 exclusive_orders: bool = False, capacity: int = 1024):
+        if not (isinstance(strategy, type) and issubclass(strategy, Strategy)):
+            raise TypeError('`strategy` must be a Strategy subclass')
+        if strategy.I is Strategy.I:
+            raise TypeError(f'{strategy.__name__} must derive from BaseStrategy to run on a stream')
+        self.data = StreamData(capacity)
+        self._broker = _backtesting._Broker(
+            data=self.data, cash=cash, spread=spread, commission=commission, margin=margin,
+            trade_on_close=trade_on_close, hedging=hedging, exclusive_orders=exclusive_orders,
+            index=range(self.data._capacity))
+        self.strategy = strategy(self._broker, self.data, params or {})
+        self.strategy.init()
+        self._attrs = [(attr, value._opts['stream']) for attr, value in vars(self.strategy).items()
+                       if isinstance(value, _Indicator) and 'stream' in value._opts]
+        self._warming = [stream for _, stream in self._attrs if not stream.scatter]
+        self.start: Optional[int] = None
+        self.stopped = False
+
+    def __repr__(self):
+        return f'<StreamRunner {self.strategy}: {len(self.data)} bars, equity {self.equity:.2f}>'
+
+    def on_bar(self, bar) -> bool:
+        """
+        Process one new bar: update the indicators, then, once they're warm,
+        fill pending orders and call the strategy's ``next()``.
+
+        Args:
+            bar: `Bar`, or sequence ``(time, open, high, low, close[, volume])``.
+
+        Returns:
+            bool: Whether ``next()`` ran on this bar.
+        """
+        if self.stopped:
+            raise RuntimeError('The account ran out of money; the run is over')
+        data = self.data
+        data.append(*bar)
+        broker = self._broker
+        if len(broker._equity) < data._capacity:
+            equity = np.full(data._capacity, np.nan)
+            equity[:len(broker._equity)] = broker._equity
+            broker._equity = equity
+        i = len(data) - 1
+        for stream in data.streams:
+            stream.step(i)
+        if self.start is None:
+            if any(stream.warmup is None for stream in self._warming):
+                return False
+            self.start = 1 + max((stream.warmup for stream in self._warming), default=0)
+        if i < self.start:
+            return False
+        strategy = self.strategy
+        for attr, stream in self._attrs:
+            setattr(strategy, attr, stream.view(i + 1))
+        with np.errstate(invalid='ignore'):
+            try:
+                broker.next()
+            except _backtesting._OutOfMoneyError:
+                self.stopped = True
+                return False
+            strategy.next()
+        return True
+
+    def run(self, feed: Iterable) -> 'StreamRunner':
+        """Process every bar of `feed` (e.g. `replay()`), until it ends or money runs out."""
+        for bar in feed:
+            self.on_bar(bar)
+            if self.stopped:
+                break
+        return self
+
+    @property
+    def equity(self) -> float:
+        return self._broker.equity
+
+    @property
+    def position(self):
+        return self._broker.position
+
+    @property
+    def orders(self) -> tuple:
+        return tuple(self._broker.orders)
+
+    @property
+    def trades(self) -> tuple:
+        return tuple(self._broker.trades)
+
+    @property
+    def closed_trades(self) -> tuple:
+        return tuple(self._broker.closed_trades)
+
+    def stats(self) -> pd.Series:
+        """
+        Statistics of the run so far, as `Backtest.run` returns them
+        (open trades left out, as with ``finalize_trades=False``).
+        """
+        n = len(self.data)
+        for attr, stream in self._attrs:
+            setattr(self.strategy, attr, stream.view(n))
+        equity = pd.Series(self._broker._equity[:n]).bfill().fillna(self._broker._cash).values
+        with np.errstate(invalid='ignore'):
+            return _backtesting.compute_stats(trades=self._broker.closed_trades, equity=equity,
+                                              ohlc_data=self.data.df, risk_free_rate=0.,
+                                              strategy_instance=self.strategy)
+
+
+def _read(path) -> pd.DataFrame:
+    path = os.fspath(path)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.parquet':
+        return pd.read_parquet(path)
+    if ext in ('.pkl', '.pickle'):
+        return pd.read_pickle(path)
+    return pd.read_csv(path, index_col=0)
+
+
+def replay(source, start=None, end=None, delay: float = 0.) -> Iterator[Bar]:
+    """
+    Bars of a DataFrame or a file (CSV, Parquet or pickle), oldest first.
+
+    Args:
+        source: OHLCV DataFrame, or path of a file holding one (the index,
+            i.e. the first CSV column, being the bar times).
+        start: First bar time to replay.
+        end: Bar time to stop before.
+        delay: Seconds to sleep after each bar, to pace the replay like a
+            live feed.
+    """
+    data = _normalize_frame(source if isinstance(source, pd.DataFrame) else _read(source))
+    if start is not None:
+        data = data[data.index >= pd.Timestamp(start)]
+    if end is not None:
+        data = data[data.index < pd.Timestamp(end)]
+    columns = [data[column].to_numpy(dtype=float) for column in COLUMNS]
+    for bar in zip(data.index, *columns):
+        yield Bar(*bar)
+        if delay:
+            _time.sleep(delay)
+
+
+def queue_feed(queue, stop=None, timeout: Optional[float] = None) -> Iterator:
+    """
+    Bars put on `queue` (e.g. by a thread reading a websocket), until `stop` is put.
+
+    Raises:
+        queue.Empty: No bar came within `timeout` seconds.
+    """
+    while True:
+        bar = queue.get(timeout=timeout)
+        if bar is stop:
+            return
+        yield bar
+
+
+def check_against_talib(data: pd.DataFrame, timeperiod: int = 14) -> pd.DataFrame:
+    """
+    Compare every incremental indicator with TA-Lib's batch output on `data`.
+
+    Args:
+        data: OHLCV DataFrame.
+        timeperiod: Period of the single-period indicators (MACD uses
+            TA-Lib's defaults).
+
+    Returns:
+        pd.DataFrame: Per indicator, the largest absolute and relative
+            (to ``max(|value|, 1)``) difference, and whether the warm-up
+            NaNs fall on the same bars.
+    """
+    high, low, close = (np.asarray(data[column], dtype=float) for column in ('High', 'Low', 'Close'))
+    rows = {}
+    for name, cls in INCREMENTAL.items():
+        inputs = (high, low, close) if cls.n_inputs == 3 else (close,)
+        params = {} if name == 'MACD' else {'timeperiod': timeperiod}
+        expected = np.atleast_2d(np.asarray(getattr(talib, name)(*inputs, **params)))
+        got = np.atleast_2d(run_incremental(cls(**params), *inputs))
+        error = np.abs(got - expected)
+        valid = ~np.isnan(expected) & ~np.isnan(got)
+        rows[name] = {
+            'max_abs_error': float(error[valid].max()) if valid.any() else 0.,
+            'max_rel_error': (float((error / np.maximum(np.abs(expected), 1))[valid].max())
+                              if valid.any() else 0.),
+            'nan_match': bool(np.array_equal(np.isnan(expected), np.isnan(got))),
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
@@ -0,0 +1,171 @@
+"""
+Higher-timeframe views of a dataset, computed once and shared by candidates.
+
+`backtesting.lib.resample_apply` resamples the data, applies the indicator
+and reindexes the result back to the bars on every `Strategy.init()`, i.e.
+once per optimization candidate, although the resampled series never depends
+on the strategy parameters. `MultiTimeframe` does each of these steps once
+per dataset (or walk-forward window):
+
+- the higher-timeframe OHLCV of each rule is resampled once;
+- the mapping from every bar to its latest completed higher-timeframe bar is
+  computed once per rule and column;
+- indicator outputs (e.g. EMAs of each period) are cached and returned as
+  forward-filled NumPy arrays aligned with the bars.
+
+Results are identical to `resample_apply`: bins are labelled on their right
+edge, so a bar only sees higher-timeframe values that were complete at its
+time. `timeframes()` returns the instance of a dataset, so every candidate
+of a sweep shares it; `BaseStrategy.resample_apply()` is the drop-in used
+from `init()`.
+
+Example:
+    >>> mtf = timeframes(data)
+    >>> weekly = mtf.resample('7d')             # pd.DataFrame, OHLCV
+    >>> ema = mtf.ema('7d', 20)                 # np.ndarray, len(data)
+    >>> macd = mtf.apply('7d', talib.MACD, 12, 26, 9)   # (3, len(data))
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Union
+
+import numpy as np
+import pandas as pd
+import talib
+from backtesting.lib import OHLCV_AGG
+
+from .indicator_cache import indicator_cache
+
+# Datasets whose MultiTimeframe is kept by timeframes() (least recently used evicted)
+MAX_DATASETS = 16
+
+
+class MultiTimeframe:
+    """
+    Resampled views and aligned higher-timeframe indicators of one dataset.
+
+    Args:
+        data: OHLCV DataFrame with a `DatetimeIndex`, or an object exposing
+            the columns as arrays plus an `index` (`utils.vectorized.OHLCV`).
+    """
+
+    def __init__(self, data):
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame({column: getattr(data, column) for column in OHLCV_AGG
+                                 if hasattr(data, column)}, index=data.index)
+        if not isinstance(data.index, pd.DatetimeIndex):
+            raise TypeError('MultiTimeframe needs data with a DatetimeIndex')
+        self.data = data
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._positions: Dict[tuple, np.ndarray] = {}
+        self._arrays: Dict[Hashable, np.ndarray] = {}
+
+    def __repr__(self):
+        return (f'<MultiTimeframe: {len(self.data)} bars, rules {list(self._frames)}, '
+                f'{len(self._arrays)} indicators>')
+
+    def resample(self, rule: str) -> pd.DataFrame:
+        """
+        OHLCV resampled to `rule`, labelled on the right edge of each bin.
+
+        Empty bins are kept (as NaN); each column is dropped of them when
+        used, as `resample_apply` does with a single series.
+        """
+        frame = self._frames.get(rule)
+        if frame is None:
+            agg = {column: OHLCV_AGG.get(column, 'last') for column in self.data.columns}
+            frame = self._frames[rule] = self.data.resample(rule, label='right').agg(agg)
+        return frame
+
+    def _column(self, rule: str, column: str) -> pd.Series:
+        series = self.resample(rule)[column].dropna()
+        series.name = f'{column}[{rule}]'
+        return series
+
+    def positions(self, rule: str, column: str = 'Close') -> np.ndarray:
+        """
+        For each bar, the row of ``resample(rule)[column].dropna()`` in effect.
+
+        That is the last higher-timeframe label at or before the bar, or -1
+        before the first one.
+        """
+        key = (rule, column)
+        positions = self._positions.get(key)
+        if positions is None:
+            labels = self._column(rule, column).index
+            positions = np.searchsorted(labels.asi8, self.data.index.asi8, side='right') - 1
+            self._positions[key] = positions
+        return positions
+
+    def align(self, rule: str, values, column: str = 'Close') -> np.ndarray:
+        """
+        Forward-fill higher-timeframe `values` (one per resampled row, or
+        2-D with outputs first) onto the bars.
+        """
+        values = np.asarray(values, dtype=float)
+        positions = self.positions(rule, column)
+        aligned = values[..., np.maximum(positions, 0)]
+        aligned[..., positions < 0] = np.nan
+        return aligned
+
+    def apply(self, rule: str, func: Callable, *args, column: str = 'Close', **kwargs) -> np.ndarray:
+        """
+        ``func(resampled column, *args, **kwargs)`` aligned with the bars.
+
+        Equivalent to ``resample_apply(rule, func, data[column], *args,
+        **kwargs)``. The result is cached on this instance when `func` and
+        its arguments are cacheable (see `utils.indicator_cache`).
+
+        Returns:
+            np.ndarray: Read-only array of ``len(data)`` values, or
+                ``(outputs, len(data))`` for multi-output indicators.
+        """
+        key = indicator_cache.key(func, (rule, column) + args, kwargs)
+        aligned = self._arrays.get(key) if key is not None else None
+        if aligned is None:
+            resampled = self._column(rule, column)
+            result = func(resampled, *args, **kwargs)
+            if isinstance(result, pd.DataFrame):
+                result = result.values.T
+            elif isinstance(result, tuple):
+                result = np.vstack([np.asarray(r, dtype=float) for r in result])
+            aligned = self.align(rule, result, column)
+            aligned.setflags(write=False)
+            if key is not None:
+                self._arrays[key] = aligned
+        return aligned
+
+    def ema(self, rule: str, period: int, column: str = 'Close') -> np.ndarray:
+        """TA-Lib EMA of `column` on the `rule` timeframe, aligned with the bars."""
+        return self.apply(rule, talib.EMA, period, column=column)
+
+
+_datasets: "OrderedDict[Hashable, MultiTimeframe]" = OrderedDict()
+
+
+def timeframes(data: Union[pd.DataFrame, object]) -> MultiTimeframe:
+    """
+    The `MultiTimeframe` of a dataset, shared by every caller passing the same data.
+
+    Datasets are identified by content (index and OHLCV columns), so
+    candidates of an optimization, which each get a fresh shallow copy of
+    the data, all reuse one instance.
+    """
+    frame = data if isinstance(data, pd.DataFrame) else None
+    columns = [column for column in OHLCV_AGG
+               if (column in frame if frame is not None else hasattr(data, column))]
+    values = [np.asarray(frame[column] if frame is not None else getattr(data, column))
+              for column in columns]
+    if not isinstance(data.index, pd.DatetimeIndex):
+        raise TypeError('MultiTimeframe needs data with a DatetimeIndex')
+    index = np.asarray(data.index.values).view(np.int64)
+    key = (tuple(columns), indicator_cache.fingerprint(index),
+           tuple(indicator_cache.fingerprint(v) for v in values))
+    mtf = _datasets.get(key)
+    if mtf is None:
+        mtf = _datasets[key] = MultiTimeframe(data)
+        while len(_datasets) > MAX_DATASETS:
+            _datasets.popitem(last=False)
+    else:
+        _datasets.move_to_end(key)
+    return mtf
@@ -0,0 +1,870 @@
+"""
+Vectorized execution mode for strategies that implement `BaseStrategy.signals()`.
+
+Instead of calling `next()` bar by bar through backtesting.py, the strategy
+computes its entry masks once from the indicators, and `simulate()` walks the
+resulting trades (not the bars) reproducing the broker rules of
+backtesting.py for full-equity market orders:
+
+- orders decided on bar ``i`` fill at the open of bar ``i + 1``,
+- SL/TP are checked against each bar's low/high, SL first, including the bar
+  the trade was opened on, but after any signal-driven close of that bar,
+- relative commission is charged on entry and exit,
+- with ``finalize_trades=True`` open trades are closed at the last bar's open.
+
+The core stats (`Return [%]`, `Sortino Ratio`, `Max. Drawdown [%]`,
+`# Trades`, ...) are computed with the same formulas as
+`backtesting._stats.compute_stats`, so results can be used interchangeably
+with `Backtest.run()` in `optimize_auto` and `WalkForward`.
+
+Example:
+    >>> from SPP4backtesting.utils.vectorized import VectorizedBacktest
+    >>> bt = VectorizedBacktest(data, BTSMAStrategy, cash=10000, commission=0.001)
+    >>> stats = bt.run(n1=10, n2=30, stop=5)
+    >>> stats = bt.optimize(**BTSMAStrategy.opt_ranges, maximize='Sortino Ratio',
+    ...                     constraint=lambda p: p.n1 < p.n2)
+
+Strategies declaring `exit_params` (parameters that only set SL/TP levels)
+are optimized with `simulate_exits()`: entries are derived once per
+combination of the remaining parameters and every SL/TP setting is
+evaluated against them together, so the cost grows with the number of
+signal parameter sets rather than with the full grid.
+"""
+
+import sys
+from copy import copy
+from functools import cached_property
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from . import objectives, prewarm
+from .param_space import _Params, compile_space, point_params
+
+# Same default order size as `Strategy.buy()` / `Strategy.sell()`
+_FULL_EQUITY = 1 - sys.float_info.epsilon
+
+# Equity cells (combinations × bars) simulated at once by the exit sweep
+_SWEEP_CELLS = 2**22
+
+CORE_STATS = (
+    'Equity Final [$]',
+    'Equity Peak [$]',
+    'Return [%]',
+    'Return (Ann.) [%]',
+    'Sortino Ratio',
+    'Max. Drawdown [%]',
+    '# Trades',
+    'Win Rate [%]',
+)
+
+
+class OHLCV:
+    """
+    Read-only OHLCV arrays of one dataset.
+
+    Exposes the columns as contiguous float64 arrays, so TA-Lib can consume
+    them directly in `BaseStrategy.signals()`.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.index = data.index
+        self.Open = np.ascontiguousarray(data['Open'].values, dtype=float)
+        self.High = np.ascontiguousarray(data['High'].values, dtype=float)
+        self.Low = np.ascontiguousarray(data['Low'].values, dtype=float)
+        self.Close = np.ascontiguousarray(data['Close'].values, dtype=float)
+        volume = data['Volume'] if 'Volume' in data else np.nan
+        self.Volume = np.ascontiguousarray(np.broadcast_to(volume, len(data)), dtype=float)
+
+    def __len__(self):
+        return len(self.Close)
+
+
+class _StrategyResult:
+    """
+    Stand-in for the `_strategy` entry of event-driven stats.
+
+    Only carries the class and the parameters the run used, so
+    ``stats._strategy._params`` works the same as with `Backtest.run()`.
+    """
+    __slots__ = ('_class', '_params')
+
+    def __init__(self, strategy_cls, params):
+        self._class = strategy_cls
+        self._params = dict(params)
+
+    def __repr__(self):
+        params_str = ", ".join([f"{k}={v}" for k, v in self._params.items()])
+        return f"{self._class.__name__}({params_str})"
+
+
+def _next_at(positions: np.ndarray, bar: int) -> Optional[int]:
+    """First entry of the sorted `positions` array that is >= `bar`."""
+    j = np.searchsorted(positions, bar)
+    return int(positions[j]) if j < len(positions) else None
+
+
+def _first_true(mask: np.ndarray) -> Optional[int]:
+    """Index of the first True in `mask`, or None."""
+    j = int(mask.argmax()) if len(mask) else 0
+    return j if len(mask) and mask[j] else None
+
+
+def simulate(open_: np.ndarray,
+             high: np.ndarray,
+             low: np.ndarray,
+             close: np.ndarray,
+             signals,
+             cash: float,
+             commission: float = .0,
+             finalize_trades: bool = False):
+    """
+    Simulate full-equity trading of `signals` over OHLC arrays.
+
+    Loops over trades, not bars: each trade's exit is located with array
+    searches (next opposite signal, first SL/TP touch) and its equity
+    segment is filled in one vectorized assignment.
+
+    Args:
+        open_, high, low, close: Price arrays of equal length.
+        signals: `Signals` instance returned by `BaseStrategy.signals()`.
+        cash: Initial cash.
+        commission: Relative commission, applied on entry and on exit.
+        finalize_trades: Close trades still open at the end on the last
+            bar's open, as `Backtest(..., finalize_trades=True)` does.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Equity curve (one value per bar) and
+            closed trades as a structured array with fields ``size``,
+            ``entry_bar``, ``exit_bar``, ``entry_price``, ``exit_price``
+            and ``pnl`` (net of commissions).
+    """
+    n = len(close)
+    start = signals.warmup + 1
+    direction = np.zeros(n, dtype=np.int8)
+    direction[signals.short] = -1
+    direction[signals.long] = 1
+    direction[:start] = 0
+
+    any_signal = np.flatnonzero(direction)
+    by_direction = {1: np.flatnonzero(direction == 1), -1: np.flatnonzero(direction == -1)}
+    is_cross = signals.mode == 'cross'
+    sl_pct, tp_pct = signals.sl, signals.tp
+
+    equity = np.empty(n)
+    equity[:] = cash
+    trades = []
+    balance = float(cash)
+
+    def fill_bar(signal_bar):
+        # Orders decided on the last bar are only filled by finalize_trades' extra pass
+        if signal_bar is None:
+            return None
+        if signal_bar + 1 < n:
+            return signal_bar + 1
+        return n - 1 if finalize_trades else None
+
+    # Trade state
+    size = 0
+    entry_bar = entry_price = sl_price = tp_price = None
+    opened_at_end = False
+    # First bar whose next() decision hasn't been simulated yet
+    decision_from = start
+
+    while True:
+        if not size:
+            signal_bar = _next_at(any_signal, decision_from)
+            bar = fill_bar(signal_bar)
+            if bar is None:
+                break
+            decision_from = signal_bar + 1
+            is_long = direction[signal_bar] > 0
+            price = open_[bar]
+            frac_commission = (_FULL_EQUITY * price * commission) / _FULL_EQUITY
+            units = int((max(0, balance) * 1. * _FULL_EQUITY) // (price + frac_commission))
+            if not units:
+                # Broker cancels the order for insufficient margin
+                continue
+            size = units if is_long else -units
+            balance -= abs(size) * price * commission
+            entry_bar, entry_price = bar, price
+            opened_at_end = signal_bar == n - 1
+            ref = close[signal_bar]
+            sl_price = tp_price = None
+            if sl_pct:
+                sl_price = ref - ref * sl_pct if is_long else ref + ref * sl_pct
+            if tp_pct:
+                tp_price = ref + ref * tp_pct if is_long else ref - ref * tp_pct
+
+        # Decision closing the trade, and the bar its order gets filled
+        if is_cross:
+            signal_bar = _next_at(any_signal, decision_from)
+        else:
+            signal_bar = _next_at(by_direction[-1 if size > 0 else 1], decision_from)
+        close_bar = fill_bar(signal_bar)
+        finalizing = False
+        if close_bar is None and finalize_trades and not opened_at_end:
+            close_bar, finalizing = n - 1, True
+        # Close orders are queued ahead of SL/TP, so a signal-driven close
+        # pre-empts them on its fill bar; the finalize pass runs after them
+        last = (n - 1 if finalizing or close_bar is None or close_bar == signal_bar
+                else close_bar - 1)
+
+        # First SL/TP touch within the trade's lifetime; SL is processed first
+        seg = slice(entry_bar, last + 1)
+        hit_bar = exit_price = None
+        if sl_price is not None or tp_price is not None:
+            sl_hit = np.zeros(last + 1 - entry_bar, dtype=bool)
+            tp_hit = np.zeros_like(sl_hit)
+            if sl_price is not None:
+                sl_hit = low[seg] <= sl_price if size > 0 else high[seg] >= sl_price
+            if tp_price is not None:
+                tp_hit = high[seg] >= tp_price if size > 0 else low[seg] <= tp_price
+            hit = _first_true(sl_hit | tp_hit)
+            if hit is not None:
+                hit_bar = entry_bar + hit
+                o = open_[hit_bar]
+                if sl_hit[hit]:
+                    exit_price = min(o, sl_price) if size > 0 else max(o, sl_price)
+                else:
+                    exit_price = max(o, tp_price) if size > 0 else min(o, tp_price)
+
+        exit_bar = hit_bar if hit_bar is not None else close_bar
+        held_until = exit_bar if exit_bar is not None else n
+        unrealized = close[entry_bar:held_until] * size - size * entry_price
+        equity[entry_bar:held_until] = balance + unrealized
+
+        # Out of money: backtesting.py closes everything at the bar close and stops
+        broke = _first_true(equity[entry_bar:held_until] <= 0)
+        if broke is not None:
+            broke += entry_bar
+            price = close[broke]
+            trades.append((size, entry_bar, broke, entry_price, price,
+                           size * (price - entry_price) - abs(size) * (entry_price + price) * commission))
+            equity[broke:] = 0
+            return equity, _trades_array(trades)
+
+        if exit_bar is None:
+            # Trade still open at the end, not counted in the stats
+            break
+
+        if exit_price is None:
+            exit_price = open_[exit_bar]
+        balance += size * (exit_price - entry_price) - abs(size) * exit_price * commission
+        trades.append((size, entry_bar, exit_bar, entry_price, exit_price,
+                       size * (exit_price - entry_price)
+                       - abs(size) * (entry_price + exit_price) * commission))
+        equity[exit_bar:] = balance
+        size = 0
+
+        if finalizing or opened_at_end:
+            # The finalize pass is the last one
+            break
+        if hit_bar is not None:
+            # SL/TP orders go first, so a crossover decided on the previous bar
+            # still opens its trade on the SL/TP bar
+            decision_from = hit_bar if not is_cross or signal_bar is None else min(hit_bar, signal_bar)
+        else:
+            # Crossovers reverse on the same fill; level signals only close
+            decision_from = signal_bar if is_cross else signal_bar + 1
+
+    return equity, _trades_array(trades)
+
+
+def _next_at_many(positions: np.ndarray, bars: np.ndarray) -> np.ndarray:
+    """`_next_at` for many bars at once; -1 where there is no next position."""
+    j = np.searchsorted(positions, bars)
+    found = j < len(positions)
+    return np.where(found, positions[np.minimum(j, len(positions) - 1)] if len(positions) else -1, -1)
+
+
+def _first_touch(running: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """
+    First index where the non-decreasing `running` reaches each of `levels`.
+
+    Returns ``len(running)`` where it never does, or the level is NaN.
+    """
+    hit = np.searchsorted(running, levels, side='left')
+    hit[np.isnan(levels)] = len(running)
+    return hit
+
+
+def simulate_exits(open_: np.ndarray,
+                   high: np.ndarray,
+                   low: np.ndarray,
+                   close: np.ndarray,
+                   signals,
+                   sl: np.ndarray,
+                   tp: np.ndarray,
+                   cash: float,
+                   commission: float = .0,
+                   finalize_trades: bool = False):
+    """
+    `simulate()` of one set of entry signals under many SL/TP settings.
+
+    The K stop-loss / take-profit combinations are stepped through their
+    trades in lockstep. Combinations that entered on the same signal bar
+    share one running minimum of the lows and maximum of the highs from the
+    entry on, and each one's first SL and TP touch is a binary search into
+    those. Equity segments are then filled with array assignments, so the
+    Python work grows with the number of trades, not with K.
+
+    Args:
+        open_, high, low, close: Price arrays of equal length.
+        signals: `Signals` instance; its own `sl`/`tp` are ignored.
+        sl, tp: Stop-loss and take-profit fractions, one per combination.
+            NaN, None or 0 disable them.
+        cash, commission, finalize_trades: As for `simulate()`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Equity curves
+            (K × bars), and the number of closed trades and of winning
+            trades of each combination. Row ``k`` equals what `simulate()`
+            returns with ``signals.sl = sl[k]`` and ``signals.tp = tp[k]``.
+    """
+    n = len(close)
+    start = signals.warmup + 1
+    direction = np.zeros(n, dtype=np.int8)
+    direction[signals.short] = -1
+    direction[signals.long] = 1
+    direction[:start] = 0
+
+    any_signal = np.flatnonzero(direction)
+    longs = np.flatnonzero(direction == 1)
+    shorts = np.flatnonzero(direction == -1)
+    is_cross = signals.mode == 'cross'
+
+    def levels(pct):
+        pct = np.array([np.nan if v is None else v for v in np.atleast_1d(pct)], dtype=float)
+        pct[pct == 0] = np.nan
+        return pct
+
+    sl_pct, tp_pct = np.broadcast_arrays(levels(sl), levels(tp))
+    K = len(sl_pct)
+
+    def fill_bar(signal_bar):
+        # -1 for no signal, or an order only the finalize pass would fill
+        bar = np.where(signal_bar + 1 < n, signal_bar + 1, n - 1 if finalize_trades else -1)
+        return np.where(signal_bar < 0, -1, bar)
+
+    equity = np.empty((K, n))
+    in_trade = np.zeros((K, n), dtype=bool)
+    n_trades = np.zeros(K, dtype=np.int64)
+    n_wins = np.zeros(K, dtype=np.int64)
+    balance = np.full(K, float(cash))
+    decision_from = np.full(K, start, dtype=np.int64)
+    broke_at = np.full(K, n, dtype=np.int64)
+    # Balance after each exit, which the equity curve holds until the next entry
+    flat_rows, flat_bars, flat_values = [], [], []
+    alive = np.arange(K)
+
+    while len(alive):
+        # Open the next trade
+        signal_bar = _next_at_many(any_signal, decision_from[alive])
+        bar = fill_bar(signal_bar)
+        alive, signal_bar, bar = alive[bar >= 0], signal_bar[bar >= 0], bar[bar >= 0]
+        if not len(alive):
+            break
+        decision_from[alive] = signal_bar + 1
+        is_long = direction[signal_bar] > 0
+        price = open_[bar]
+        frac_commission = (_FULL_EQUITY * price * commission) / _FULL_EQUITY
+        units = (np.maximum(0, balance[alive]) * 1. * _FULL_EQUITY) // (price + frac_commission)
+        # Broker cancels orders for insufficient margin; those retry on the next signal
+        k = units > 0
+        retry = alive[~k]
+        ks, signal_bar, entry_bar, price, units, is_long = (
+            alive[k], signal_bar[k], bar[k], price[k], units[k], is_long[k])
+        if not len(ks):
+            alive = retry
+            continue
+        size = np.where(is_long, units, -units)
+        balance[ks] -= np.abs(size) * price * commission
+        ref = close[signal_bar]
+        sl_price = np.where(is_long, ref - ref * sl_pct[ks], ref + ref * sl_pct[ks])
+        tp_price = np.where(is_long, ref + ref * tp_pct[ks], ref - ref * tp_pct[ks])
+
+        # Decision closing the trade, and the bar its order gets filled
+        if is_cross:
+            exit_signal = _next_at_many(any_signal, decision_from[ks])
+        else:
+            exit_signal = np.where(is_long, _next_at_many(shorts, decision_from[ks]),
+                                   _next_at_many(longs, decision_from[ks]))
+        close_bar = fill_bar(exit_signal)
+        finalizing = (close_bar < 0) & finalize_trades & (signal_bar != n - 1)
+        close_bar[finalizing] = n - 1
+        last = np.where(finalizing | (close_bar < 0) | (close_bar == exit_signal),
+                        n - 1, close_bar - 1)
+
+        # First SL/TP touch: trades opened on the same signal share their
+        # price path, so one running low/high serves all their levels
+        hit = np.full(len(ks), n, dtype=np.int64)
+        sl_first = np.zeros(len(ks), dtype=bool)
+        has_levels = ~(np.isnan(sl_price) & np.isnan(tp_price))
+        for bar0 in np.unique(signal_bar[has_levels]):
+            group = np.flatnonzero(has_levels & (signal_bar == bar0))
+            bar0 = entry_bar[group[0]]
+            seg = slice(bar0, last[group[0]] + 1)
+            running_low = -np.minimum.accumulate(low[seg])
+            running_high = np.maximum.accumulate(high[seg])
+            sign = 1 if is_long[group[0]] else -1
+            if sign > 0:
+                sl_at = _first_touch(running_low, -sl_price[group])
+                tp_at = _first_touch(running_high, tp_price[group])
+            else:
+                sl_at = _first_touch(running_high, sl_price[group])
+                tp_at = _first_touch(running_low, -tp_price[group])
+            first = np.minimum(sl_at, tp_at)
+            touched = first < len(running_low)
+            hit[group[touched]] = bar0 + first[touched]
+            sl_first[group] = sl_at <= tp_at
+        is_hit = hit < n
+        o = open_[np.minimum(hit, n - 1)]
+        hit_price = np.where(sl_first,
+                             np.where(is_long, np.minimum(o, sl_price), np.maximum(o, sl_price)),
+                             np.where(is_long, np.maximum(o, tp_price), np.minimum(o, tp_price)))
+
+        exit_bar = np.where(is_hit, hit, close_bar)
+        held_until = np.where(exit_bar >= 0, exit_bar, n)
+
+        # Mark-to-market over each trade's lifetime, all trades in one assignment
+        lengths = held_until - entry_bar
+        offsets = np.cumsum(lengths) - lengths
+        row = np.repeat(np.arange(len(ks)), lengths)
+        bars = np.arange(lengths.sum()) - np.repeat(offsets, lengths) + np.repeat(entry_bar, lengths)
+        value = balance[ks][row] + (close[bars] * size[row] - size[row] * price[row])
+        equity[ks[row], bars] = value
+        in_trade[ks[row], bars] = True
+
+        # Out of money: backtesting.py closes everything at the bar close and stops
+        broke = np.zeros(len(ks), dtype=bool)
+        negative = np.flatnonzero(value <= 0)
+        if len(negative):
+            trade, first = np.unique(row[negative], return_index=True)
+            broke[trade] = True
+            broke_bar = bars[negative[first]]
+            broke_at[ks[trade]] = broke_bar
+            exit_price = close[broke_bar]
+            pnl = (size[trade] * (exit_price - price[trade])
+                   - np.abs(size[trade]) * (price[trade] + exit_price) * commission)
+            n_trades[ks[trade]] += 1
+            n_wins[ks[trade]] += pnl > 0
+
+        # Close the rest; trades still open at the end aren't counted in the stats
+        done = ~broke & (exit_bar >= 0)
+        i, kd = np.flatnonzero(done), ks[done]
+        exit_price = np.where(is_hit[i], hit_price[i], open_[exit_bar[i]])
+        pl = size[i] * (exit_price - price[i])
+        balance[kd] += pl - np.abs(size[i]) * exit_price * commission
+        n_trades[kd] += 1
+        n_wins[kd] += (pl - np.abs(size[i]) * (price[i] + exit_price) * commission) > 0
+        flat_rows.append(kd)
+        flat_bars.append(exit_bar[i])
+        flat_values.append(balance[kd])
+
+        # SL/TP orders go first, so a crossover decided on the previous bar
+        # still opens its trade on the SL/TP bar; crossovers reverse on the
+        # same fill, level signals only close
+        signal_exit = np.where(is_cross, exit_signal, exit_signal + 1)
+        if is_cross:
+            hit_next = np.where(exit_signal[i] >= 0, np.minimum(hit[i], exit_signal[i]), hit[i])
+        else:
+            hit_next = hit[i]
+        decision_from[kd] = np.where(is_hit[i], hit_next, signal_exit[i])
+        # The finalize pass is the last one
+        alive = np.concatenate([retry, kd[~(finalizing[i] | (signal_bar[i] == n - 1))]])
+
+    # Between trades the equity is the balance after the last exit
+    flat = np.full((K, n), np.nan)
+    flat[:, 0] = cash
+    if flat_rows:
+        rows, bars, values = map(np.concatenate, (flat_rows, flat_bars, flat_values))
+        # A reversal stopped out on its entry bar exits twice on that bar; keep the later exit
+        cell = (rows * n + bars)[::-1]
+        _, latest = np.unique(cell, return_index=True)
+        latest = len(cell) - 1 - latest
+        flat[rows[latest], bars[latest]] = values[latest]
+    filled = np.where(np.isnan(flat), 0, np.arange(n))
+    np.maximum.accumulate(filled, axis=1, out=filled)
+    flat = np.take_along_axis(flat, filled, axis=1)
+    equity = np.where(in_trade, equity, flat)
+    equity[np.arange(n) >= broke_at[:, None]] = 0
+    return equity, n_trades, n_wins
+
+
+_TRADE_DTYPE = np.dtype([
+    ('size', float),
+    ('entry_bar', np.int64),
+    ('exit_bar', np.int64),
+    ('entry_price', float),
+    ('exit_price', float),
+    ('pnl', float),
+])
+
+
+def _trades_array(trades) -> np.ndarray:
+    return np.array(trades, dtype=_TRADE_DTYPE)
+
+
+def _geometric_mean(returns: np.ndarray) -> float:
+    returns = np.nan_to_num(returns, nan=0) + 1
+    if np.any(returns <= 0):
+        return 0
+    return np.exp(np.log(returns).sum() / (len(returns) or np.nan)) - 1
+
+
+class _PeriodInfo:
+    """
+    Per-dataset calendar information needed by the annualized metrics.
+
+    Mirrors what `compute_stats` derives from the index on every call, so it
+    can be computed once and reused across all candidates.
+    """
+
+    def __init__(self, index: pd.Index):
+        self.is_datetime = isinstance(index, pd.DatetimeIndex)
+        self.annual_trading_days = np.nan
+        self.period_last = None
+        if self.is_datetime:
+            freq_days = pd.Series(index[-100:]).diff().dropna().median().days
+            have_weekends = index.dayofweek.to_series().between(5, 6).mean() > 2 / 7 * .6
+            self.annual_trading_days = (
+                52 if freq_days == 7 else
+                12 if freq_days == 31 else
+                1 if freq_days == 365 else
+                (365 if have_weekends else 252))
+            freq = {7: 'W', 31: 'ME', 365: 'YE'}.get(freq_days, 'D')
+            positions = pd.Series(np.arange(len(index), dtype=float), index=index)
+            self.period_last = positions.resample(freq).last().dropna().values.astype(np.int64)
+
+
+def core_stats(equity: np.ndarray, trades: np.ndarray, period: _PeriodInfo) -> dict:
+    """
+    Compute `CORE_STATS` from an equity curve and closed trades.
+
+    Uses the same formulas as `backtesting._stats.compute_stats`.
+    """
+    s = {}
+    dd = 1 - equity / np.maximum.accumulate(equity)
+    s['Equity Final [$]'] = equity[-1]
+    s['Equity Peak [$]'] = equity.max()
+    s['Return [%]'] = (equity[-1] - equity[0]) / equity[0] * 100
+
+    gmean_day_return = 0
+    day_returns = np.array(np.nan)
+    annual_trading_days = period.annual_trading_days
+    if period.is_datetime:
+        values = equity[period.period_last]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            day_returns = values[1:] / values[:-1] - 1
+        day_returns = day_returns[~np.isnan(day_returns)]
+        gmean_day_return = _geometric_mean(day_returns)
+
+    annualized_return = (1 + gmean_day_return)**annual_trading_days - 1
+    s['Return (Ann.) [%]'] = annualized_return * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        downside = np.sqrt(np.mean(day_returns.clip(-np.inf, 0)**2)) if day_returns.size else np.nan
+        s['Sortino Ratio'] = annualized_return / (downside * np.sqrt(annual_trading_days))
+    s['Max. Drawdown [%]'] = -np.nan_to_num(dd.max()) * 100
+    s['# Trades'] = n_trades = len(trades)
+    s['Win Rate [%]'] = np.nan if not n_trades else (trades['pnl'] > 0).mean() * 100
+    return s
+
+
+def core_stats_many(equity: np.ndarray, n_trades: np.ndarray, n_wins: np.ndarray,
+                    period: _PeriodInfo) -> pd.DataFrame:
+    """
+    `core_stats()` of many equity curves at once (one per row of `equity`).
+
+    Takes trade counts instead of trade lists, as `simulate_exits()`
+    returns them.
+    """
+    metrics = objectives.Metrics(equity, n_trades, n_wins, period)
+    return pd.DataFrame({key: metrics.values(key) for key in CORE_STATS}, columns=list(CORE_STATS))
+
+
+class VectorizedBacktest:
+    """
+    Drop-in replacement for `Backtest` / `FractionalBacktest` in optimization.
+
+    Runs strategies through their `signals()` hook and `simulate()`, and
+    returns a `pd.Series` of `CORE_STATS` plus `_strategy`, `_equity_curve`
+    and `_trades`, so ``stats._strategy._params`` keeps working.
+
+    Only market orders of full equity are modelled, which is what the
+    strategies supporting vectorized mode use.
+
+    Args:
+        data: OHLCV DataFrame, as for `Backtest`.
+        strategy: `BaseStrategy` subclass implementing `signals()`.
+        cash: Initial cash.
+        commission: Relative commission rate, applied on entry and exit.
+        finalize_trades: Close open trades at the end so they count in stats.
+        fractional_unit: If set, scale prices like `FractionalBacktest`
+            (e.g. ``1 / 100e6`` for satoshis).
+    """
+
+    def __init__(self,
+                 data: pd.DataFrame,
+                 strategy,
+                 *,
+                 cash: float = 10_000,
+                 commission: float = .0,
+                 finalize_trades: bool = False,
+                 fractional_unit: Optional[float] = None):
+        if not callable(getattr(strategy, 'signals', None)):
+            raise TypeError(f"{strategy.__name__} does not support vectorized signals()")
+        if not isinstance(commission, (int, float)):
+            raise TypeError("VectorizedBacktest only supports a relative `commission` rate")
+        if len(data) == 0:
+            raise ValueError('OHLC `data` is empty')
+
+        self._strategy = strategy
+        self._cash = cash
+        self._commission = commission
+        self._finalize_trades = bool(finalize_trades)
+        self._fractional_unit = fractional_unit
+
+        self._data = data
+        scaled = data
+        if fractional_unit:
+            scaled = data.copy(deep=False)
+            for col in ('Open', 'High', 'Low', 'Close'):
+                scaled[col] = scaled[col] * fractional_unit
+        self._arrays = OHLCV(scaled)
+        # Signals come from the full history in a utils.prewarm window
+        self._window = prewarm.current(data.index) if prewarm.active is not None else None
+        # Kernel scoring the runs, if any (see scoring())
+        self._kernel = None
+
+    @cached_property
+    def _period(self) -> _PeriodInfo:
+        return _PeriodInfo(self._data.index)
+
+    def head(self, n_bars: int) -> 'VectorizedBacktest':
+        """Same backtest restricted to the first `n_bars` bars, sharing the arrays."""
+        bt = copy(self)
+        bt.__dict__.pop('_period', None)
+        bt._data = self._data.iloc[:n_bars]
+        bt._arrays = copy(self._arrays)
+        for col in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            setattr(bt._arrays, col, getattr(self._arrays, col)[:n_bars])
+        bt._arrays.index = self._arrays.index[:n_bars]
+        return bt
+
+    def scoring(self, kernel: 'objectives.Kernel') -> 'VectorizedBacktest':
+        """Same backtest, whose runs return `kernel`'s score (`utils.objectives.scoring()`)."""
+        bt = copy(self)
+        bt._kernel = kernel
+        return bt
+
+    def _params(self, kwargs) -> _Params:
+        for key in kwargs:
+            if not hasattr(self._strategy, key):
+                raise AttributeError(
+                    f"Strategy '{self._strategy.__name__}' is missing parameter '{key}'. "
+                    "Strategy class should define parameters as class variables before they "
+                    "can be optimized or run with.")
+        params = _Params({key: getattr(self._strategy, key)
+                          for key in getattr(self._strategy, 'opt_ranges', {})})
+        params.update(kwargs)
+        return params
+
+    def _signals(self, params: _Params):
+        if self._window is None:
+            return self._strategy.signals(self._arrays, params)
+        history = self._window.ohlcv(self._fractional_unit)
+        return self._window.signals(self._strategy.signals(history, params), len(self._arrays))
+
+    def _simulate(self, params: _Params):
+        a = self._arrays
+        signals = self._signals(params)
+        return simulate(a.Open, a.High, a.Low, a.Close, signals,
+                        cash=self._cash, commission=self._commission,
+                        finalize_trades=self._finalize_trades)
+
+    def _sweep_exits(self, points: np.ndarray, exit_names, kernel: 'objectives.Kernel') -> np.ndarray:
+        """Objective of every point, simulating signals once per signal-parameter tuple."""
+        a = self._arrays
+        signal_names = [name for name in points.dtype.names if name not in exit_names]
+        if signal_names:
+            codes = pd.DataFrame({name: points[name] for name in signal_names}).groupby(
+                signal_names, sort=False, dropna=False).ngroup().to_numpy()
+        else:
+            codes = np.zeros(len(points), dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1)
+        # Bound the (combinations × bars) work arrays
+        chunk = max(1, _SWEEP_CELLS // len(a))
+
+        scores = np.full(len(points), np.nan)
+        for rows in groups:
+            signals = self._signals(self._params(point_params(points, rows[0])))
+            levels = np.array([self._strategy.exit_levels(self._params(point_params(points, i)))
+                               for i in rows], dtype=float).reshape(len(rows), 2)
+            for j in range(0, len(rows), chunk):
+                part = slice(j, j + chunk)
+                equity, n_trades, n_wins = simulate_exits(
+                    a.Open, a.High, a.Low, a.Close, signals, levels[part, 0], levels[part, 1],
+                    cash=self._cash, commission=self._commission,
+                    finalize_trades=self._finalize_trades)
+                score = kernel(objectives.Metrics(equity, n_trades, n_wins, self._period))
+                scores[rows[part]] = np.where(n_trades > 0, np.asarray(score, dtype=float), np.nan)
+        return scores
+
+    def run(self, **kwargs) -> pd.Series:
+        """
+        Run the strategy with the given parameters.
+
+        On a `scoring()` copy, only the objective is computed.
+
+        Returns:
+            pd.Series: `CORE_STATS` plus `_strategy`, `_equity_curve` and
+                `_trades` entries.
+        """
+        params = self._params(kwargs)
+        equity, trades = self._simulate(params)
+        if self._kernel is not None:
+            n_wins = int((trades['pnl'] > 0).sum())
+            return objectives.scored(objectives.Metrics(equity, len(trades), n_wins, self._period),
+                                     _StrategyResult(self._strategy, params), self._kernel)
+        s = core_stats(equity, trades, self._period)
+
+        unit = self._fractional_unit or 1
+        index = self._data.index
+        s['_strategy'] = _StrategyResult(self._strategy, params)
+        s['_equity_curve'] = pd.DataFrame({'Equity': equity}, index=index)
+        s['_trades'] = pd.DataFrame({
+            'Size': trades['size'] * unit,
+            'EntryBar': trades['entry_bar'],
+            'ExitBar': trades['exit_bar'],
+            'EntryPrice': trades['entry_price'] / unit,
+            'ExitPrice': trades['exit_price'] / unit,
+            'PnL': trades['pnl'],
+            'EntryTime': index[trades['entry_bar']],
+            'ExitTime': index[trades['exit_bar']],
+        })
+        return pd.Series(s, dtype=object)
+
+    def optimize(self, *,
+                 maximize: Union[str, 'objectives.Kernel', Callable[[pd.Series], float]] = 'Sortino Ratio',
+                 constraint: Optional[Callable[[dict], bool]] = None,
+                 max_tries: Optional[Union[int, float]] = None,
+                 random_state: Optional[int] = None,
+                 return_heatmap: bool = False,
+                 exit_sweep: bool = True,
+                 **kwargs):
+        """
+        Grid search, with the same selection rules as `Backtest.optimize`.
+
+        Candidates without trades are ignored, and ties go to the first
+        combination in grid order.
+
+        Parameters listed in the strategy's `exit_params` only set SL/TP
+        levels, so their values are swept with `simulate_exits()` once per
+        combination of the other (signal) parameters, instead of one full
+        simulation per grid point.
+
+        Args:
+            maximize: One of `utils.objectives.METRICS`, a
+                `utils.objectives.Kernel` (both scored from the equity
+                curve alone, see `utils.objectives`) or a function of the
+                stats Series.
+            constraint: Function of the parameter combination (attribute
+                access) returning True when admissible.
+            max_tries: Evaluate only this many admissible combinations (or
+                this fraction of them, if in (0, 1]), chosen at random.
+            random_state: Seed for the `max_tries` subset.
+            return_heatmap: Also return the objective for every candidate.
+            exit_sweep: Use the exit sweep when possible (`maximize` given
+                as a metric or a kernel). Set False to simulate every point
+                on its own.
+            **kwargs: Parameter names mapped to the values to try.
+
+        Returns:
+            pd.Series: Stats of the best run (and the heatmap if requested).
+        """
+        if not kwargs:
+            raise ValueError('Need some strategy parameters to optimize')
+        maximize_key = maximize if isinstance(maximize, str) else None
+        kernel = objectives.as_kernel(maximize)
+        if kernel is not None:
+            maximize = objectives.score
+        elif isinstance(maximize, str):
+            raise ValueError(f'`maximize` must be one of {objectives.METRICS} in vectorized mode')
+        elif not callable(maximize):
+            raise TypeError('`maximize` must be str, a `Kernel` or a function that accepts result Series')
+
+        points = compile_space(kwargs, constraint)
+        if not len(points):
+            raise ValueError('No admissible parameter combinations to test')
+        if max_tries is not None:
+            if 0 < max_tries <= 1:
+                max_tries = max(1, int(max_tries * len(points)))
+            keep = np.random.default_rng(random_state).permutation(len(points))[:int(max_tries)]
+            points = points[np.sort(keep)]
+        combos = [point_params(points, i) for i in range(len(points))]
+
+        heatmap = pd.Series(np.nan, name=maximize_key,
+                            index=pd.MultiIndex.from_tuples([tuple(p.values()) for p in combos],
+                                                            names=list(kwargs)))
+        exit_names = [name for name in getattr(self._strategy, 'exit_params', ()) if name in kwargs]
+        if exit_sweep and exit_names and kernel is not None:
+            scores = self._sweep_exits(points, exit_names, kernel)
+        else:
+            scores = heatmap.values.copy()
+            bt = self.scoring(kernel) if kernel is not None else self
+            for i, params in enumerate(combos):
+                stats = bt.run(**params)
+                if stats['# Trades']:
+                    scores[i] = maximize(stats)
+        heatmap[:] = scores
+
+        if np.isnan(scores).all():
+            stats = self.run(**combos[0])
+        else:
+            stats = self.run(**combos[int(np.nanargmax(scores))])
+        if return_heatmap:
+            return stats, heatmap
+        return stats
+
+
+def compare_with_event_driven(data: pd.DataFrame,
+                              strategy,
+                              *,
+                              cash: float = 10_000,
+                              commission: float = .0,
+                              finalize_trades: bool = False,
+                              fractional_unit: Optional[float] = None,
+                              **params) -> pd.DataFrame:
+    """
+    Parity check of vectorized mode against backtesting.py.
+
+    Runs the same parameters through `Backtest` (or `FractionalBacktest`)
+    and `VectorizedBacktest` and lines up `CORE_STATS`.
+
+    Returns:
+        pd.DataFrame: Columns ``event``, ``vectorized`` and ``match``,
+            indexed by stat name.
+    """
+    from backtesting import Backtest
+    from backtesting.lib import FractionalBacktest
+
+    if fractional_unit:
+        bt = FractionalBacktest(data, strategy, cash=cash, commission=commission,
+                                finalize_trades=finalize_trades,
+                                fractional_unit=fractional_unit)
+    else:
+        bt = Backtest(data, strategy, cash=cash, commission=commission,
+                      finalize_trades=finalize_trades)
+    event = bt.run(**params)[list(CORE_STATS)].astype(float)
+    vectorized = VectorizedBacktest(data, strategy, cash=cash, commission=commission,
+                                    finalize_trades=finalize_trades,
+                                    fractional_unit=fractional_unit
+                                    ).run(**params)[list(CORE_STATS)].astype(float)
+    return pd.DataFrame({
+        'event': event,
+        'vectorized': vectorized,
+        'match': np.isclose(event, vectorized, rtol=1e-9, equal_nan=True),
+    })
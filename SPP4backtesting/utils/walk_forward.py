@@ -1,65 +1,392 @@
+import os
+import copy
+import contextlib
+import pickle
+import multiprocessing as mp
 import pandas as pd
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+from typing import Dict, Optional, Sequence
+import numpy as np
 from backtesting import Backtest
 from backtesting.lib import FractionalBacktest
+from .vectorized import CORE_STATS, VectorizedBacktest
+from .optimization import _run, optimize_auto
+from .result_store import ResultStore, storable_stats
+from .shared_data import SharedOHLCV, attach
+from .windows import WindowPlan
+from . import pools as _pools, prewarm as _prewarm, profiling
+
+# WalkForward instance inherited by pool workers (see _init_worker)
+_worker_walk_forward = None
+
+
+def _init_worker(walk_forward, handle):
+    global _worker_walk_forward
+    _worker_walk_forward = walk_forward
+    walk_forward._shared = attach(handle)
+    # Windows already run one per core (see utils.pools)
+    _pools.disable()
+
+
+def _run_window_task(i):
+    return profiling.capture(_worker_walk_forward.run_window, i)
+
+
+def _run_window_shared(walk_forward, handle, i):
+    # The executor's workers already run one window each (see utils.pools)
+    with attach(handle) as shared, _pools.disabled():
+        walk_forward._shared = shared
+        return profiling.capture(walk_forward.run_window, i)
+
+
+def _n1_lt_n2(p):
+    # Default constraint; a named function so WalkForward objects can be pickled
+    return p.n1 < p.n2
+
+
+def _scalars(stats: pd.Series) -> Dict:
+    """The metrics of `stats`, without its equity curve, trades and strategy."""
+    return {key: value for key, value in stats.items() if not key.startswith('_')}
+
+
+class WindowResult:
+    """
+    What is kept of one walk-forward window.
+    
+    A full backtesting.py `Stats` holds the equity curve and trades frames
+    and the strategy instance with all its indicator arrays; for long
+    intraday walk-forwards, a pair of them per window adds up to gigabytes.
+    This keeps the chosen parameters, the scalar metrics of both runs and,
+    optionally, the test equity as float32.
+    
+    Attributes:
+        window: Position in the walk-forward.
+        train_bounds, test_bounds: ``(start, stop)`` bar offsets into the
+            walk-forward's data.
+        params: Parameters chosen on the train slice.
+        train, test: Scalar metrics of the best train run and of the test
+            run (``'Return [%]'``, ``'Sortino Ratio'``...).
+        equity: Test equity curve values (float32), or None.
+        stats: ``(stats_train, stats_test)`` full `Stats`, only if asked for.
+    """
+    __slots__ = ('window', 'train_bounds', 'test_bounds', 'params', 'train', 'test', 'equity', 'stats')
+    
+    def __init__(self, window: int, bounds, stats_train: pd.Series, stats_test: pd.Series,
+                 keep_equity: bool = True, keep_stats: bool = False):
+        self.window = window
+        self.train_bounds, self.test_bounds = bounds
+        self.params = dict(stats_train._strategy._params)
+        self.train = _scalars(stats_train)
+        self.test = _scalars(stats_test)
+        self.equity = (stats_test['_equity_curve']['Equity'].to_numpy(np.float32)
+                       if keep_equity else None)
+        self.stats = (stats_train, stats_test) if keep_stats else None
+    
+    def __repr__(self):
+        return (f'<WindowResult {self.window}: {self.params}, '
+                f'test return {self.test.get("Return [%]", np.nan):.2f} %>')
+    
+    def __getstate__(self):
+        stats = self.stats and tuple(storable_stats(s) for s in self.stats)
+        return {name: (stats if name == 'stats' else getattr(self, name)) for name in self.__slots__}
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+    
+    def row(self, index: pd.Index, maximize=None, metrics: Sequence[str] = CORE_STATS) -> Dict:
+        """
+        The window as a table row: dates (from `index`, the walk-forward's
+        data index), bar count, params, the train objective `maximize` and
+        the test `metrics`.
+        """
+        (a, b), (c, d) = self.train_bounds, self.test_bounds
+        row = {
+            'window': self.window,
+            'train_start': index[a],
+            'train_end': index[b - 1],
+            'test_start': index[c],
+            'test_end': index[d - 1],
+            'bars': (b - a) + (d - c),
+            'params': dict(self.params),
+        }
+        if isinstance(maximize, str):
+            row[f'train {maximize}'] = self.train.get(maximize)
+        row.update((key, self.test.get(key)) for key in metrics)
+        return row
+
 
 class WalkForward:
     def __init__(self,data:pd.DataFrame,
                  strategy,cash,commission,maximize:str = 'Sortino Ratio',
-                 constraint = lambda p: p.n1< p.n2 ):
+                 constraint = _n1_lt_n2, vectorized: bool = False, search=None,
+                 store: Optional[ResultStore] = None, checkpoint: Optional[str] = None,
+                 size_optimization: int = 3*365, size_test: Optional[int] = None,
+                 plan: Optional[WindowPlan] = None, keep_equity: bool = True, keep_stats: bool = False,
+                 prewarm: bool = False):
         self.data=data
         self.strategy = strategy
         self.cash = cash
         self.commission = commission
         self.maximize = maximize
         self.constraint = constraint
+        # Parameter search of each window (see utils.search); None is the full grid
+        self.search = search
+        # On-disk cache of window results (see utils.result_store)
+        self.store = store
+        # What each window's WindowResult keeps besides params and metrics
+        self.keep_equity = keep_equity
+        self.keep_stats = keep_stats
         #5*365
-        self.size_optimization = 3*365
-        self.size_test = int(self.size_optimization * 0.35)
+        self.size_optimization = size_optimization
+        # Test windows default to 35 % of the train window
+        self.size_test = size_test or int(self.size_optimization * 0.35)
+        # Windows as bar offsets; slices are only taken when a window runs.
+        # A given plan replaces the two sizes above
+        self.plan = plan or WindowPlan(self.size_optimization, self.size_test)
+        # Indicators computed on the full history and sliced to each window,
+        # so windows don't lose their first bars to warmup (see utils.prewarm)
+        self.prewarm = prewarm
         
         self.stats_master = []
         self.stats_train = []
         self.stats_test = []
     
         self.Backtest = Backtest
-        self.FractionalBacktest = FractionalBacktest
-        self.train = self.data.iloc[:self.size_optimization]
-        self.test = self.data.iloc[self.size_optimization:self.size_optimization+self.size_test]
-        self.out_of_sample_data = self.data.iloc[self.size_optimization+self.size_test:]
-        self.walk = [self.out_of_sample_data[i:i+self.size_test] for i in range(self.size_optimization,len(self.out_of_sample_data),self.size_test) if i < len(self.out_of_sample_data)]
+        # Prices of the windows' backtests are scaled by this unit (satoshis)
+        self.fractional_unit = 1 / 100e6
+        self.FractionalBacktest = partial(FractionalBacktest, fractional_unit=self.fractional_unit)
+        # Vectorized mode: strategies run through signals() instead of next()
+        if vectorized:
+            self.Backtest = VectorizedBacktest
+            self.FractionalBacktest = partial(VectorizedBacktest, fractional_unit=self.fractional_unit)
+        self._plan_windows()
+        # Shared-memory view of self.data, set inside pool workers
+        self._shared = None
+        # WindowResult of each window of the last run, in order
+        self.results = []
+        # File the completed windows are saved to after each run (see save())
+        self.checkpoint = checkpoint
+        
+    def _plan_windows(self):
+        self._windows = self.plan.windows(self.data.index)
         
     def optimize_auto(self,bt,strategy,maximize: str = 'Sortino Ratio', constraint = lambda p: p.n1< p.n2):
 
-        ranges = getattr(strategy, 'opt_ranges', None)
-        if not ranges:
-            raise ValueError(
-                f"{StrategyCls.__name__}"
-            )
-        
-        return bt.optimize(**ranges, maximize=maximize, constraint=constraint) 
+        return optimize_auto(bt, strategy, maximize, constraint, search=self.search, store=self.store)
         
         
-    def run_walk_forward(self):
+    def windows(self):
+        """(train, test) DataFrame pairs, in walk-forward order."""
+        return [(self.data.iloc[w.train], self.data.iloc[w.test]) for w in self._windows]
     
+    def window_bounds(self):
+        """Bar offsets ``((train_start, train_stop), (test_start, test_stop))`` of each window."""
+        return [((w.train_start, w.train_end), (w.test_start, w.test_end)) for w in self._windows]
     
-        bt = self.FractionalBacktest(self.train,self.strategy,cash=self.cash,commission=self.commission,finalize_trades=True)
-        self.stats_train = self.optimize_auto(bt, self.strategy, self.maximize, self.constraint)
-        
-        bt = self.FractionalBacktest(self.test,self.strategy,cash=self.cash,commission=self.commission,finalize_trades=True)
-        self.stats_test = bt.run(**self.stats_train._strategy._params)
+    def _detached(self):
+        """Copy without the DataFrames, for workers reading from shared memory."""
+        worker = copy.copy(self)
+        worker.data = None
+        worker.stats_master = worker.results = []
+        worker.stats_train = worker.stats_test = []
+        return worker
+    
+    def run_window(self, i) -> WindowResult:
+        """Optimize on window `i`'s train slice and run the best params on its test slice."""
+        window = self._windows[i]
+        bounds = (window.train_start, window.train_end), (window.test_start, window.test_end)
+        if self._shared is not None:
+            train = self._shared.frame(window.train_start, window.train_end)
+            test = self._shared.frame(window.test_start, window.test_end)
+        else:
+            train, test = self.data.iloc[window.train], self.data.iloc[window.test]
+        if self.prewarm:
+            full = self.data if self._shared is None else self._shared.frame()
+            prewarmed = partial(_prewarm.window, full, fractional_unit=self.fractional_unit)
+        else:
+            prewarmed = lambda start, stop: contextlib.nullcontext()
         
-        self.stats_master.append([self.stats_train,self.stats_test])
-
-        for i in range(len(self.walk)):
+        with profiling.span('window', strategy=self.strategy.__name__, window=i,
+                            train_bars=len(train), test_bars=len(test)):
+            with prewarmed(window.train_start, window.train_end):
+                bt = self.FractionalBacktest(train,self.strategy,cash=self.cash,commission=self.commission,finalize_trades=True)
+                stats_train = self.optimize_auto(bt, self.strategy, self.maximize, self.constraint)
             
-            bt = self.FractionalBacktest(self.walk[i], self.strategy, cash=self.cash, commission=self.commission,finalize_trades=True)
-            self.stats_train = self.optimize_auto(bt, self.strategy, self.maximize, self.constraint)
-            
-            if i+1<len(self.walk):
-            
-                bt = self.FractionalBacktest(self.walk[i+1], self.strategy, cash=self.cash, commission=self.commission,finalize_trades=True)
-                
-                self.stats_test = bt.run(**self.stats_train._strategy._params)
-                self.stats_master.append([self.stats_train,self.stats_test])
+            with profiling.span('test', strategy=self.strategy.__name__, window=i, bars=len(test)), \
+                    prewarmed(window.test_start, window.test_end):
+                bt = self.FractionalBacktest(test,self.strategy,cash=self.cash,commission=self.commission,finalize_trades=True)
+                stats_test = _run(bt, stats_train._strategy._params, self.store)
+        
+        return WindowResult(i, bounds, stats_train, stats_test, self.keep_equity, self.keep_stats)
+        
+    def run_walk_forward(self, n_jobs: int = 1, executor: Optional[Executor] = None):
+        """
+        Run every window and collect their `WindowResult` in `stats_master`.
+        
+        Results keep the params, the scalar metrics and (with `keep_equity`)
+        the test equity of each window; the full backtesting.py `Stats` are
+        only kept in their `stats` with `keep_stats`. `stats_train` and
+        `stats_test` are those of the last window: full `Stats` with
+        `keep_stats`, otherwise Series of its metrics.
+        
+        Windows are independent, so with ``n_jobs > 1`` (or -1 for all cores)
+        they are fanned out over a process pool. Each worker then evaluates
+        its grids in-process, without `Backtest.optimize`'s own pool, to
+        avoid oversubscribing the machine (see `utils.pools`).
+        Results are identical to the serial run and kept in window order.
+        They're also kept in `results`, which `extend()` updates, and saved
+        to `checkpoint` if set.
+        
+        Workers don't receive DataFrame copies: the full OHLCV is placed once
+        in shared memory (`utils.shared_data.SharedOHLCV`) and each window is
+        a zero-copy view by bar offsets. The block is unlinked when the run
+        finishes or raises.
+        
+        Args:
+            n_jobs: Number of worker processes. 1 runs serially.
+            executor: Existing `concurrent.futures.Executor` to use instead of
+                creating a pool. The WalkForward object (without its data) is
+                then pickled to the workers, so `constraint` must be
+                picklable (no lambdas).
+        """
+        results = self._run_windows(range(len(self.window_bounds())), n_jobs, executor)
+        self.results = results
+        self.stats_master = list(results)
+        self._set_last()
+        self._save_checkpoint()
         
         return self.stats_master
-
+    
+    def _run_windows(self, windows, n_jobs: int = 1, executor: Optional[Executor] = None):
+        windows = list(windows)
+        if n_jobs == -1:
+            n_jobs = os.cpu_count() or 1
+        
+        if executor is not None or (n_jobs > 1 and len(windows) > 1):
+            with SharedOHLCV(self.data) as shared:
+                worker = self._detached()
+                if executor is not None:
+                    return [profiling.release(r) for r in executor.map(
+                        _run_window_shared, repeat(worker), repeat(shared.handle), windows)]
+                # With fork, workers inherit their state instead of unpickling it
+                context = mp.get_context('fork') if 'fork' in mp.get_all_start_methods() else None
+                with ProcessPoolExecutor(max_workers=min(n_jobs, len(windows)), mp_context=context,
+                                         initializer=_init_worker,
+                                         initargs=(worker, shared.handle)) as pool:
+                    return [profiling.release(r) for r in pool.map(_run_window_task, windows)]
+        return [self.run_window(i) for i in windows]
+    
+    def extend(self, new_bars: pd.DataFrame, n_jobs: int = 1, executor: Optional[Executor] = None):
+        """
+        Append `new_bars` and run only the windows they change.
+        
+        Windows whose train and test bars are all unchanged keep their
+        results; the rest (typically the newest, still incomplete window,
+        plus any window completed by the new bars) are optimized and tested
+        again. A bar of `new_bars` with a timestamp already in `data`
+        replaces it, e.g. a daily bar that was still in progress.
+        
+        Args:
+            new_bars: OHLCV rows to add, after (or at) the last stored bar.
+            n_jobs, executor: As in `run_walk_forward()`.
+        
+        Returns:
+            Tuple[pd.Series, list]: Stitched out-of-sample equity
+                (`oos_equity()`) and the `WindowResult` of every window,
+                which also replace `stats_master`.
+        """
+        new_bars = new_bars.sort_index()
+        if not len(new_bars):
+            return self.oos_equity(), self.stats_master
+        old_bounds = self.window_bounds()
+        self.data = pd.concat([self.data[~self.data.index.isin(new_bars.index)], new_bars]).sort_index()
+        first_changed = int(self.data.index.searchsorted(new_bars.index[0]))
+        self._plan_windows()
+        
+        bounds = self.window_bounds()
+        keep = 0
+        while (keep < min(len(self.results), len(bounds)) and bounds[keep] == old_bounds[keep]
+               and bounds[keep][1][1] <= first_changed):
+            keep += 1
+        
+        results = self.results[:keep] + self._run_windows(range(keep, len(bounds)), n_jobs, executor)
+        self.results = results
+        self.stats_master = list(results)
+        self._set_last()
+        self._save_checkpoint()
+        return self.oos_equity(), self.stats_master
+    
+    def _set_last(self):
+        last = self.results[-1] if self.results else None
+        if last is None:
+            self.stats_train = self.stats_test = []
+        elif last.stats is not None:
+            self.stats_train, self.stats_test = last.stats
+        else:
+            self.stats_train, self.stats_test = pd.Series(last.train), pd.Series(last.test)
+    
+    def oos_equity(self) -> pd.Series:
+        """
+        Out-of-sample equity curve stitched from the test windows.
+        
+        Each test run starts from `cash`; its curve is rescaled to continue
+        from where the previous window ended, as if the capital were
+        carried over.
+        
+        Raises:
+            ValueError: Results were run with ``keep_equity=False``.
+        """
+        if any(result.equity is None for result in self.results):
+            raise ValueError('Window equity was not kept; run with `keep_equity=True`')
+        pieces, scale = [], 1.
+        for result in self.results:
+            c, d = result.test_bounds
+            equity = result.equity.astype(float)
+            pieces.append(pd.Series(equity * scale, index=self.data.index[c:d]))
+            scale *= equity[-1] / self.cash
+        if not pieces:
+            return pd.Series(dtype=float, name='Equity')
+        equity = pd.concat(pieces)
+        return equity[~equity.index.duplicated(keep='last')].rename('Equity')
+    
+    def summary(self, metrics: Sequence[str] = CORE_STATS) -> pd.DataFrame:
+        """
+        One row per window of the last run: dates, bar count, chosen
+        params, the train objective and the test `metrics`.
+        """
+        table = pd.DataFrame([result.row(self.data.index, self.maximize, metrics)
+                              for result in self.results])
+        return table.set_index('window') if len(table) else table
+    
+    def save(self, path: str):
+        """
+        Save the walk-forward, including completed window results, to `path`.
+        
+        Kept `Stats` are saved with ``_strategy`` reduced to the class and
+        params. The strategy class and the constraint must be importable
+        (no lambdas) for `load()` to restore them.
+        """
+        state = self._detached()
+        state.data = self.data
+        state.checkpoint = self.checkpoint
+        state.results = list(self.results)
+        state.stats_master = list(self.stats_master)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    
+    @classmethod
+    def load(cls, path: str) -> 'WalkForward':
+        """Restore a walk-forward saved by `save()`, ready to be `extend()`-ed."""
+        with open(path, 'rb') as f:
+            walk_forward = pickle.load(f)
+        walk_forward._set_last()
+        return walk_forward
+    
+    def _save_checkpoint(self):
+        if self.checkpoint:
+            self.save(self.checkpoint)
@@ -0,0 +1,239 @@
+"""
+Walk-forward window plans as integer bar ranges.
+
+A `WindowPlan` describes how a history is cut into (train, test) windows
+without slicing any data: applied to an index (or a bar count), it yields
+``Window(train_start, train_end, test_start, test_end)`` tuples of
+``[start, end)`` bar offsets, computed with a few NumPy operations. Workers
+slice their windows from the full OHLCV (e.g. a zero-copy view of
+`utils.shared_data.SharedOHLCV`) only when they run them.
+
+Schemes:
+
+- ``'rolling'``: a train window of fixed length slides forward by `step`;
+- ``'anchored'`` (or ``'expanding'``): every train window starts at the
+  first bar and grows with each step.
+
+A `gap` leaves bars out between the end of each train window and the start
+of its test window (purging), so features or labels looking a few bars
+ahead can't leak test data into the optimization.
+
+Sizes are bar counts (ints) or calendar spans: anything `pd.Timedelta`
+parses (``'365D'``, ``'12h'``, ``'52W'``) or a pandas offset alias with
+calendar months or years (``'6MS'``, ``'1YS'``). Calendar plans need a
+DatetimeIndex and don't depend on the bars being regular, e.g. with
+weekend or exchange-holiday gaps.
+
+Plans are small, immutable values: they compare equal by their settings,
+pickle, and round-trip through `to_dict()` / `from_dict()` (JSON-safe).
+
+Example:
+    >>> plan = WindowPlan(train=1095, test=383)                       # bars
+    >>> plan = WindowPlan('3YS', '6MS', scheme='anchored', gap='5D')  # calendar
+    >>> for w in plan.windows(data.index):
+    ...     train, test = data.iloc[w.train_start:w.train_end], data.iloc[w.test_start:w.test_end]
+    >>> WindowPlan.from_dict(plan.to_dict()) == plan
+    True
+"""
+
+import datetime
+from typing import Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+SCHEMES = ('rolling', 'anchored')
+_ALIASES = {'expanding': 'anchored'}
+
+Size = Union[int, str, pd.Timedelta, datetime.timedelta, pd.DateOffset]
+
+
+class Window(NamedTuple):
+    """``[start, end)`` bar offsets of a train window and its test window."""
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+    @property
+    def train(self) -> slice:
+        return slice(self.train_start, self.train_end)
+
+    @property
+    def test(self) -> slice:
+        return slice(self.test_start, self.test_end)
+
+
+def _size(value: Size, name: str) -> Union[int, str]:
+    """`value` as a bar count or a calendar span string, checked."""
+    if isinstance(value, (bool, np.bool_)):
+        raise TypeError(f'`{name}` must be a bar count or a calendar span, not {value!r}')
+    if isinstance(value, (int, np.integer)):
+        if value < 0:
+            raise ValueError(f'`{name}` must not be negative')
+        return int(value)
+    if isinstance(value, (pd.Timedelta, datetime.timedelta)):
+        value = str(pd.Timedelta(value))
+    elif isinstance(value, pd.DateOffset):
+        value = value.freqstr
+    if not isinstance(value, str):
+        raise TypeError(f'`{name}` must be a bar count or a calendar span, not {value!r}')
+    span = _span(value, name)
+    if (span <= pd.Timedelta(0)) if isinstance(span, pd.Timedelta) else span.n <= 0:
+        raise ValueError(f'`{name}` must be a positive span, got {value!r}')
+    return value
+
+
+def _span(value: str, name: str = 'size') -> Union[pd.Timedelta, pd.DateOffset]:
+    # Offset aliases first: pd.Timedelta would read '3MS' as milliseconds
+    try:
+        offset = pd.tseries.frequencies.to_offset(value)
+    except ValueError:
+        offset = None
+    if offset is not None and not isinstance(offset, (pd.offsets.Tick, pd.offsets.Day, pd.offsets.Week)):
+        return offset
+    try:
+        return pd.Timedelta(value)
+    except ValueError:
+        raise ValueError(f'`{name}`: {value!r} is neither a bar count nor a calendar span') from None
+
+
+class WindowPlan:
+    """
+    How a walk-forward cuts its history into windows.
+
+    The first test window starts after `train` (plus `gap`); each next one
+    starts `step` later, until the data runs out. The last test window may
+    be shorter than `test` (e.g. the current, still incomplete period);
+    with ``partial=False`` it is left out.
+
+    Args:
+        train: Length of each train window (of the first one with the
+            anchored scheme).
+        test: Length of each test window. Defaults to 35 % of `train`
+            (bars only).
+        scheme: ``'rolling'`` or ``'anchored'`` (alias ``'expanding'``).
+        step: Distance between consecutive test windows. Defaults to
+            `test`, i.e. test windows tile the history.
+        gap: Bars (or span) purged between each train and test window.
+        partial: Keep a last, incomplete test window.
+    """
+    __slots__ = ('train', 'test', 'scheme', 'step', 'gap', 'partial')
+
+    def __init__(self, train: Size, test: Optional[Size] = None, *, scheme: str = 'rolling',
+                 step: Optional[Size] = None, gap: Size = 0, partial: bool = True):
+        scheme = _ALIASES.get(scheme, scheme)
+        if scheme not in SCHEMES:
+            raise ValueError(f'Unknown scheme {scheme!r}; use one of {SCHEMES + tuple(_ALIASES)}')
+        train = _size(train, 'train')
+        if test is None:
+            if not isinstance(train, int):
+                raise ValueError('`test` is required with a calendar `train`')
+            test = int(train * 0.35)
+        test = _size(test, 'test')
+        step = test if step is None else _size(step, 'step')
+        gap = _size(gap, 'gap')
+        sizes = {'train': train, 'test': test, 'step': step, 'gap': gap}
+        calendar = [isinstance(value, str) for name, value in sizes.items() if value or name != 'gap']
+        if any(calendar) and not all(calendar):
+            raise ValueError('`train`, `test`, `step` and `gap` must all be bar counts or all '
+                             f'calendar spans, got {sizes}')
+        if not any(calendar) and min(train, test, step) < 1:
+            raise ValueError('`train`, `test` and `step` must be at least one bar')
+        for name, value in (('train', train), ('test', test), ('scheme', scheme),
+                            ('step', step), ('gap', gap), ('partial', bool(partial))):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('WindowPlan is immutable')
+
+    def __repr__(self):
+        return (f'WindowPlan(train={self.train!r}, test={self.test!r}, scheme={self.scheme!r}, '
+                f'step={self.step!r}, gap={self.gap!r}, partial={self.partial})')
+
+    def __eq__(self, other):
+        return isinstance(other, WindowPlan) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple(self.to_dict().values()))
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def calendar(self) -> bool:
+        """Whether sizes are calendar spans rather than bar counts."""
+        return isinstance(self.train, str)
+
+    def to_dict(self) -> Dict:
+        """Settings as plain JSON types; `from_dict()` restores the plan."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, settings: Dict) -> 'WindowPlan':
+        return cls(**settings)
+
+    def bounds(self, index: Union[pd.Index, int]) -> np.ndarray:
+        """
+        Windows over `index` (or over that many bars), as an int64 array of
+        ``(train_start, train_end, test_start, test_end)`` rows.
+        """
+        if self.calendar:
+            if not isinstance(index, pd.DatetimeIndex):
+                raise TypeError('Calendar window plans need a DatetimeIndex')
+            return self._calendar_bounds(index)
+        n = index if isinstance(index, (int, np.integer)) else len(index)
+        test_start = np.arange(self.train + self.gap, n, self.step, dtype=np.int64)
+        test_end = np.minimum(test_start + self.test, n)
+        train_end = test_start - self.gap
+        train_start = (np.zeros_like(test_start) if self.scheme == 'anchored'
+                       else train_end - self.train)
+        return self._keep(np.column_stack([train_start, train_end, test_start, test_end]),
+                          test_start + self.test > n)
+
+    def _calendar_bounds(self, index: pd.DatetimeIndex) -> np.ndarray:
+        train, test, step = _span(self.train), _span(self.test), _span(self.step)
+        gap = _span(self.gap) if self.gap else pd.Timedelta(0)
+        if not len(index):
+            return np.empty((0, 4), dtype=np.int64)
+        last = index[-1]
+        # Test windows start `step` apart in time; calendar offsets (months,
+        # years) aren't multiples of a fixed span, so those step one by one
+        start = index[0] + train + gap
+        if isinstance(step, pd.Timedelta):
+            starts = start + step * np.arange(max(0, (last - start) // step + 1))
+        else:
+            starts = []
+            while start <= last:
+                starts.append(start)
+                start += step
+        starts = pd.DatetimeIndex(starts, dtype=index.dtype)
+        ends = starts + test
+        train_end = index.searchsorted(starts - gap)
+        train_start = (np.zeros(len(starts), dtype=np.int64) if self.scheme == 'anchored'
+                       else index.searchsorted(starts - gap - train))
+        bounds = np.column_stack([train_start, train_end, index.searchsorted(starts),
+                                  index.searchsorted(ends)]).astype(np.int64)
+        # A test window is incomplete when its span reaches past the last bar
+        return self._keep(bounds, np.asarray(ends > last + _bar(index)))
+
+    def _keep(self, bounds: np.ndarray, incomplete: np.ndarray) -> np.ndarray:
+        # Windows without train or test bars (e.g. in a data gap) are dropped
+        keep = (bounds[:, 1] > bounds[:, 0]) & (bounds[:, 3] > bounds[:, 2])
+        if not self.partial:
+            keep &= ~incomplete
+        return bounds[keep]
+
+    def windows(self, index: Union[pd.Index, int]) -> List[Window]:
+        """`bounds()` as a list of `Window` tuples."""
+        return [Window(*map(int, row)) for row in self.bounds(index)]
+
+
+def _bar(index: pd.DatetimeIndex) -> pd.Timedelta:
+    """Typical bar length of `index`, so a span ending on the last bar's close counts as complete."""
+    if len(index) < 2:
+        return pd.Timedelta(0)
+    return pd.Series(index[-100:]).diff().median()
@@ -0,0 +1,23 @@
+"""
+Benchmarks of strategies, optimizers and walk-forward runs.
+
+Run from the repository root::
+
+    python -m benchmarks                       # every case, 1k/10k/1m bars
+    python -m benchmarks --sizes 1k 10k --strategies BTSMAStrategy
+    python -m benchmarks --compare             # last two runs on this machine
+
+Cases (see `benchmarks.suite`):
+
+- ``run``: `Backtest.run` of every strategy in `strategies/`, reported as
+  bars/sec;
+- ``optimize``: `optimize_auto` over a fixed small grid per strategy,
+  reported as candidates/sec;
+- ``walk_forward``: `WalkForward.run_walk_forward` end to end.
+
+Every case also reports its peak traced memory. Data comes from
+`SPP4backtesting.utils.synthetic.synthetic_ohlcv`, which is
+deterministic, so runs on the same machine are comparable across commits. Results are appended to
+``benchmarks/results/<machine>.jsonl`` with the commit and library
+versions they were measured with.
+"""
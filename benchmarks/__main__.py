@@ -0,0 +1,62 @@
+"""
+Command line of the benchmark suite: ``python -m benchmarks --help``.
+"""
+
+import argparse
+import sys
+
+from . import results
+from .data import SIZES
+from .suite import CASES, benchmarks, run_all
+
+
+def _progress(bench, row):
+    # A single run evaluates no candidates
+    candidates = ('' if bench.case == 'run' else f"{row['candidates_per_sec']:>9,.2f} cand/s")
+    print(f"{bench.name:<50} {row['seconds']:>9.3f}s {row['bars_per_sec']:>14,.0f} bars/s "
+          f"{candidates:>16} {row['peak_mb']:>9.1f} MB", flush=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time strategies, optimizers and walk-forward runs.')
+    parser.add_argument('--cases', nargs='+', choices=CASES, help='cases to run (default: all)')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES),
+                        help="data sizes (default: each case's own)")
+    parser.add_argument('--strategies', nargs='+', metavar='NAME',
+                        help='strategy class names (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed repeats, best kept (default: 3)')
+    parser.add_argument('--no-save', action='store_true', help="don't store the results")
+    parser.add_argument('--compare', nargs='?', const='', metavar='RUN',
+                        help='compare the last stored run against RUN (run id or commit prefix; '
+                             'default: the run before it), without running anything')
+    parser.add_argument('--threshold', type=float, default=results.REGRESSION_THRESHOLD,
+                        help='slowdown ratio flagged as a regression (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.compare is not None:
+        runs = results.load_runs()
+        if len(runs) < (1 if args.compare else 2):
+            print(f'Not enough stored runs for {results.machine_id()}', file=sys.stderr)
+            return 1
+        current = runs[-1]
+        baseline = results.find_run(runs[:-1], args.compare) if args.compare else runs[-2]
+        print(f'baseline: {results.describe(baseline)}\ncurrent:  {results.describe(current)}')
+        table = results.compare(baseline, current, args.threshold)
+        results.print_table(table)
+        return int(table['regression'].any())
+
+    rows = run_all(benchmarks(args.sizes, args.cases, args.strategies), args.repeat, _progress)
+    if not rows:
+        print('No benchmarks to run', file=sys.stderr)
+        return 1
+    print()
+    results.print_table(results.summary(rows))
+    if not args.no_save:
+        run_id = results.save_run(rows)
+        print(f'\nSaved run {run_id} for {results.machine_id()}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
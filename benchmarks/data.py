@@ -0,0 +1,11 @@
+"""
+Data of the benchmarks: named sizes of the synthetic OHLCV they run on
+(`SPP4backtesting.utils.synthetic`).
+"""
+
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+# Named sizes accepted by the benchmark CLI
+SIZES = {'1k': 1_000, '10k': 10_000, '1m': 1_000_000}
+
+__all__ = ['SIZES', 'synthetic_ohlcv']
@@ -0,0 +1,145 @@
+"""
+Storage and comparison of benchmark results.
+
+Each run appends its rows to ``benchmarks/results/<machine>.jsonl``,
+tagged with a run id, the commit, whether the tree was dirty, and the
+Python/library versions. Timings are only meaningful against runs of the
+same machine, so each machine gets its own file.
+
+Example:
+    >>> runs = load_runs()                      # this machine's file
+    >>> print(compare(runs[-2], runs[-1]))
+"""
+
+import hashlib
+import json
+import os
+import platform
+import re
+import secrets
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import backtesting
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+# Slowdown (relative to the baseline run) flagged as a regression
+REGRESSION_THRESHOLD = .10
+
+
+def machine_id() -> str:
+    """Host name plus a short hash of the CPU, OS and core count."""
+    spec = '|'.join([platform.machine(), platform.processor(), platform.system(),
+                     str(os.cpu_count())])
+    host = re.sub(r'[^A-Za-z0-9_.-]', '_', platform.node()) or 'unknown'
+    return f'{host}-{hashlib.sha1(spec.encode()).hexdigest()[:8]}'
+
+
+def _git(*args) -> Optional[str]:
+    try:
+        out = subprocess.run(['git', *args], capture_output=True, text=True, timeout=10,
+                             cwd=os.path.dirname(RESULTS_DIR))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def environment() -> dict:
+    """Commit and versions the current results are measured with."""
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(status) if status is not None else None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'backtesting': backtesting.__version__,
+        'machine': machine_id(),
+    }
+
+
+def _path(machine: Optional[str]) -> str:
+    return os.path.join(RESULTS_DIR, f'{machine or machine_id()}.jsonl')
+
+
+def save_run(rows: List[dict], machine: Optional[str] = None) -> str:
+    """
+    Append one run's result rows to the machine's file.
+
+    Returns:
+        str: The run id, ``<UTC timestamp>-<commit>-<random suffix>``.
+    """
+    env = environment()
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    run_id = f"{stamp}-{env['commit'] or 'nogit'}-{secrets.token_hex(2)}"
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(_path(machine), 'a') as f:
+        for row in rows:
+            f.write(json.dumps({'run': run_id, **env, **row}) + '\n')
+    return run_id
+
+
+def load_runs(machine: Optional[str] = None) -> List[pd.DataFrame]:
+    """This machine's runs, oldest first, one DataFrame (indexed by name) each."""
+    path = _path(machine)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        frame = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    return [rows.set_index('name') for _, rows in frame.groupby('run', sort=False)]
+
+
+def find_run(runs: List[pd.DataFrame], ref: str) -> pd.DataFrame:
+    """Latest run whose id or commit starts with `ref`."""
+    for run in reversed(runs):
+        first = run.iloc[0]
+        if first['run'].startswith(ref) or str(first['commit']).startswith(ref):
+            return run
+    raise KeyError(f'No stored benchmark run matches {ref!r}')
+
+
+def compare(baseline: pd.DataFrame, current: pd.DataFrame,
+            threshold: float = REGRESSION_THRESHOLD) -> pd.DataFrame:
+    """
+    Per-benchmark timings of two runs, with regressions flagged.
+
+    Returns:
+        pd.DataFrame: Indexed by benchmark name (those in both runs), with
+            both timings, their ratio and a ``regression`` column, slowest
+            ratio first.
+    """
+    common = baseline.index.intersection(current.index)
+    table = pd.DataFrame({
+        'baseline_s': baseline.loc[common, 'seconds'],
+        'current_s': current.loc[common, 'seconds'],
+        'baseline_mb': baseline.loc[common, 'peak_mb'],
+        'current_mb': current.loc[common, 'peak_mb'],
+    })
+    table['ratio'] = table['current_s'] / table['baseline_s']
+    table['regression'] = table['ratio'] > 1 + threshold
+    return table.sort_values('ratio', ascending=False)
+
+
+def summary(rows: List[dict]) -> pd.DataFrame:
+    """Result rows as a table for printing."""
+    columns = ['seconds', 'bars_per_sec', 'candidates_per_sec', 'peak_mb']
+    table = pd.DataFrame(rows).set_index('name')
+    # Single runs evaluate no candidates
+    table['candidates_per_sec'] = table['candidates_per_sec'].where(table['case'] != 'run')
+    return table[columns]
+
+
+def describe(run: pd.DataFrame) -> str:
+    first = run.iloc[0]
+    dirty = '+dirty' if first.get('dirty') else ''
+    return f"{first['run']} ({first['commit']}{dirty}, backtesting {first['backtesting']})"
+
+
+def print_table(table: pd.DataFrame, file=sys.stdout):
+    with pd.option_context('display.width', 200, 'display.max_rows', None,
+                           'display.max_columns', None, 'display.float_format', '{:,.3f}'.format):
+        print(table, file=file)
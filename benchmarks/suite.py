@@ -0,0 +1,249 @@
+"""
+Benchmark cases and the harness that times them.
+
+Each `Benchmark` wraps one call (a backtest run, an optimization, a
+walk-forward) on deterministic synthetic data. `measure()` times it as the
+best of a few repeats, then runs it once more under `tracemalloc` for the
+peak memory, so tracing doesn't skew the timings. Process-wide caches
+(`utils.indicator_cache`, `utils.timeframes`) are cleared before every
+repeat, so each one pays for its indicators like a fresh run would.
+
+Optimizations run in-process (`SPP4backtesting.utils.pools.disabled()`),
+so candidates/sec measure one core and are comparable on machines
+with different core counts.
+
+Example:
+    >>> from benchmarks.suite import benchmarks, measure
+    >>> for bench in benchmarks(sizes=['1k'], cases=['run']):
+    ...     print(bench.name, measure(bench))
+"""
+
+import time
+import tracemalloc
+import warnings
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from backtesting import Backtest
+
+from SPP4backtesting.strategies import registry
+from SPP4backtesting.utils import pools, timeframes as mtf
+from SPP4backtesting.utils.indicator_cache import indicator_cache
+from SPP4backtesting.utils.optimization import optimize_auto
+from SPP4backtesting.utils.param_space import compile_space, is_declarative, search_space
+from SPP4backtesting.utils.walk_forward import WalkForward
+
+from .data import SIZES, synthetic_ohlcv
+
+CASES = ('run', 'optimize', 'walk_forward')
+# Sizes each case runs at by default: optimizations on 1M bars would take hours
+CASE_SIZES = {
+    'run': ('1k', '10k', '1m'),
+    'optimize': ('1k', '10k'),
+    'walk_forward': ('10k',),
+}
+# Candidates of the fixed grid each strategy is optimized over
+GRID_BUDGET = 27
+CASH = 100_000
+COMMISSION = .001
+
+
+@dataclass
+class Benchmark:
+    """
+    One timed call.
+
+    Attributes:
+        name: Unique ``case[strategy-size]`` name, the key results are
+            compared by.
+        func: The call to time.
+        bars: Bars processed per call, for bars/sec.
+        candidates: Parameter sets evaluated per call, for candidates/sec.
+    """
+    name: str
+    case: str
+    strategy: str
+    size: str
+    func: Callable[[], object]
+    bars: int
+    candidates: int = 1
+
+
+def discover_strategies() -> Dict[str, type]:
+    """
+    Strategy classes of `strategies/` (see `strategies.registry`), by name.
+
+    Modules that fail to import, and strategies that can't run under
+    `Backtest` (multi-asset books), are left out.
+    """
+    found = {}
+    for name, info in registry.scan().items():
+        if info.multi_asset or not info.opt_ranges:
+            continue
+        try:
+            found[name] = registry.load(name)
+        except ImportError:
+            continue
+    probe = synthetic_ohlcv(300)
+    for name, strategy in list(found.items()):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                Backtest(probe, strategy, cash=CASH).run()
+        except NotImplementedError:
+            del found[name]
+    return dict(sorted(found.items()))
+
+
+def small_grid(ranges: dict, budget: int = GRID_BUDGET) -> Dict[str, list]:
+    """
+    Fixed plain grid of at most `budget` candidates spanning `ranges`.
+
+    Each parameter gets evenly spaced values from its range (declarative
+    dimensions are compiled first). Trailing parameters are pinned to their
+    middle value until the grid fits the budget.
+    """
+    if is_declarative(ranges):
+        space = compile_space(ranges)
+        axes = {name: np.unique(space[name]).tolist() for name in space.dtype.names}
+    else:
+        axes = {name: list(values) for name, values in ranges.items()}
+    per_axis = max(2, round(budget ** (1 / len(axes))))
+    counts = {name: min(per_axis, len(values)) for name, values in axes.items()}
+    for name in reversed(list(axes)):
+        if np.prod(list(counts.values())) <= budget:
+            break
+        counts[name] = 1
+    grid = {}
+    for name, values in axes.items():
+        if counts[name] == 1:
+            grid[name] = [values[len(values) // 2]]
+        else:
+            grid[name] = [values[i] for i in np.linspace(0, len(values) - 1, counts[name]).round().astype(int)]
+    return grid
+
+
+def _grid_strategy(strategy: type) -> type:
+    # Same strategy, optimized over its small grid
+    return type(strategy.__name__, (strategy,), {'opt_ranges': small_grid(search_space(strategy)),
+                                                 'opt_space': None,
+                                                 '__module__': strategy.__module__})
+
+
+def _n_candidates(strategy: type) -> int:
+    return int(np.prod([len(values) for values in strategy.opt_ranges.values()]))
+
+
+def benchmarks(sizes: Optional[Sequence[str]] = None,
+               cases: Optional[Sequence[str]] = None,
+               strategies: Optional[Sequence[str]] = None) -> List[Benchmark]:
+    """
+    The benchmarks to run.
+
+    Args:
+        sizes: Named sizes (keys of `SIZES`). Default: each case's
+            `CASE_SIZES`. Walk-forwards on data too short for one window
+            are skipped with a warning.
+        cases: Subset of `CASES`.
+        strategies: Strategy class names. Default: all discovered.
+    """
+    # Built up front, so skip warnings are raised here rather than mid-run
+    return list(_benchmarks(sizes, cases, strategies))
+
+
+def _benchmarks(sizes, cases, strategies) -> Iterator[Benchmark]:
+    available = discover_strategies()
+    selected = {name: available[name] for name in (strategies or available)}
+    data = {}
+    for case in cases or CASES:
+        for size in (sizes or CASE_SIZES[case]):
+            if size not in data:
+                data[size] = synthetic_ohlcv(SIZES[size])
+            frame = data[size]
+            for name, strategy in selected.items():
+                label = f'{case}[{name}-{size}]'
+                if case == 'run':
+                    bt = Backtest(frame, strategy, cash=CASH, commission=COMMISSION)
+                    yield Benchmark(label, case, name, size, bt.run, len(frame))
+                elif case == 'optimize':
+                    gridded = _grid_strategy(strategy)
+                    bt = Backtest(frame, gridded, cash=CASH, commission=COMMISSION)
+                    yield Benchmark(label, case, name, size,
+                                    lambda bt=bt, s=gridded: optimize_auto(bt, s),
+                                    len(frame) * _n_candidates(gridded), _n_candidates(gridded))
+                elif case == 'walk_forward':
+                    gridded = _grid_strategy(strategy)
+                    walk_forward = WalkForward(frame, gridded, CASH, COMMISSION, constraint=None)
+                    n_windows = len(walk_forward.window_bounds())
+                    if not n_windows:
+                        # Timing a walk-forward without windows would store a bogus
+                        # result. Level 3 is the caller of benchmarks()
+                        warnings.warn(f'Skipping {label}: {len(frame)} bars are too few for '
+                                      f'one walk-forward window', stacklevel=3)
+                        continue
+                    bars = sum((b - a) * _n_candidates(gridded) + (d - c)
+                               for (a, b), (c, d) in walk_forward.window_bounds())
+                    yield Benchmark(label, case, name, size,
+                                    lambda wf=walk_forward: _fresh(wf).run_walk_forward(),
+                                    bars, n_windows * _n_candidates(gridded))
+                else:
+                    raise ValueError(f'Unknown benchmark case {case!r}, expected one of {CASES}')
+
+
+def _fresh(walk_forward: WalkForward) -> WalkForward:
+    # run_walk_forward() accumulates into stats_master: time each repeat from scratch
+    walk_forward.stats_master = []
+    return walk_forward
+
+
+def _clear_caches():
+    indicator_cache.clear()
+    mtf._datasets.clear()
+
+
+def measure(bench: Benchmark, repeat: int = 3) -> dict:
+    """
+    Time `bench` (best of `repeat`) and trace its peak memory.
+
+    Returns:
+        dict: ``seconds``, ``bars_per_sec``, ``candidates_per_sec`` and
+            ``peak_mb``.
+    """
+    with pools.disabled(), warnings.catch_warnings():
+        # Open trades at the end etc. are expected on synthetic data
+        warnings.simplefilter('ignore', UserWarning)
+        times = []
+        for _ in range(repeat):
+            _clear_caches()
+            start = time.perf_counter()
+            bench.func()
+            times.append(time.perf_counter() - start)
+        _clear_caches()
+        tracemalloc.start()
+        try:
+            bench.func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    seconds = min(times)
+    return {
+        'seconds': seconds,
+        'bars_per_sec': bench.bars / seconds,
+        'candidates_per_sec': bench.candidates / seconds,
+        'peak_mb': peak / 2**20,
+    }
+
+
+def run_all(benches: Sequence[Benchmark], repeat: int = 3,
+            progress: Optional[Callable[[Benchmark, dict], None]] = None) -> List[dict]:
+    """`measure()` every benchmark, as result rows."""
+    rows = []
+    for bench in benches:
+        row = {'name': bench.name, 'case': bench.case, 'strategy': bench.strategy,
+               'size': bench.size, 'bars': bench.bars, 'candidates': bench.candidates}
+        row.update(measure(bench, repeat))
+        rows.append(row)
+        if progress is not None:
+            progress(bench, row)
+    return rows
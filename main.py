@@ -1,6 +1,7 @@
 from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
 from SPP4backtesting.utils.optimization import walk_forward
-import yfinance as yf
+from SPP4backtesting.utils.result_store import ResultStore
+from SPP4backtesting.utils.data_loader import YFinanceFetcher, load_data
 import datetime as dt
 
 SYMBOL = "BTC-USD"
@@ -9,18 +10,14 @@ END_DATE = dt.datetime(2025, 12, 31)
 INTERVAL = "1d"
 
 
-BTC = yf.Ticker(SYMBOL)
-btc = BTC.history(start=START_DATE, end=END_DATE, interval=INTERVAL)
-
-
-btc.head()
-df = btc
-print(walk_forward(df,BTSMAStrategy,17,0.01))
-    
 def main():
-    print("Hello from spp4backtesting!")
+    # Served from the local store; yfinance is only asked for the bars it's missing
+    btc = load_data(SYMBOL, START_DATE, END_DATE, INTERVAL, fetcher=YFinanceFetcher())
+    # Windows already optimized on identical data are read back from the store
+    print(walk_forward(btc, BTSMAStrategy, 17, 0.01, store=ResultStore()))
+
 
-"""
+# Batches of symbols and strategies run from a spec file instead:
+#     python -m SPP4backtesting run spec.toml
 if __name__ == "__main__":
     main()
-    """
@@ -0,0 +1,67 @@
+"""
+`utils.batch.run_batch` against one walk-forward at a time.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import pandas as pd
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.strategies.linear_regression_strategies import LinearRegressionStrategy
+from SPP4backtesting.utils.batch import run_batch, split_symbols
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.walk_forward import WalkForward
+
+STRATEGIES = (KamaStrategy, LinearRegressionStrategy)
+METRICS = ['Return [%]', 'Sortino Ratio', '# Trades', 'Max. Drawdown [%]']
+
+
+def _sequential(frames):
+    """Rows of every (symbol, strategy, window), from plain WalkForward runs."""
+    rows = {}
+    for symbol, frame in frames.items():
+        for strategy in STRATEGIES:
+            walk_forward = WalkForward(frame, strategy, 10_000, .001, constraint=None)
+            for result in walk_forward.run_walk_forward():
+                rows[symbol, strategy.__name__, result.window] = (
+                    result.params, [result.test[m] for m in METRICS])
+    return rows
+
+
+class RunBatchTest(unittest.TestCase):
+    """Batched windows give the params and metrics of sequential walk-forwards."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.frames = {'AAA': synthetic_ohlcv(2_000, seed=1, freq='D'),
+                      'BBB': synthetic_ohlcv(1_700, seed=2, freq='D')}
+        cls.expected = _sequential(cls.frames)
+        assert len(cls.expected) > len(cls.frames) * len(STRATEGIES)
+
+    def _check(self, table):
+        self.assertEqual(sorted(table.index), sorted(self.expected))
+        for key, (params, metrics) in self.expected.items():
+            row = table.loc[key]
+            self.assertEqual(row['params'], params, key)
+            pd.testing.assert_series_equal(row[METRICS].astype(float),
+                                           pd.Series(metrics, index=METRICS, dtype=float),
+                                           check_names=False)
+
+    def test_serial(self):
+        self._check(run_batch(self.frames, STRATEGIES, 10_000, .001))
+
+    def test_pool(self):
+        self._check(run_batch(self.frames, STRATEGIES, 10_000, .001, n_jobs=2))
+
+    def test_multiindex_frame(self):
+        frame = pd.concat(self.frames, axis=1)
+        self.assertEqual(list(split_symbols(frame)), list(self.frames))
+        self.assertTrue(split_symbols(frame)['BBB'].equals(self.frames['BBB']))
+        stacked = pd.concat(self.frames)
+        self.assertTrue(split_symbols(stacked)['AAA'].equals(self.frames['AAA']))
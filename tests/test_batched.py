@@ -0,0 +1,64 @@
+"""
+Batched multi-period indicators of `utils.batched` against TA-Lib.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+import talib
+
+from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
+from SPP4backtesting.utils import batched
+from SPP4backtesting.utils.indicator_cache import indicator_cache
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.vectorized import VectorizedBacktest
+
+PERIODS = [2, 3, 7, 14, 30, 50, 120]
+
+
+class BatchedTest(unittest.TestCase):
+    """Every row of a batch is TA-Lib's indicator for that period."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = synthetic_ohlcv(2_000, seed=6, freq='D')
+
+    def test_rows_match_talib(self):
+        high, low, close = (self.data[column].to_numpy() for column in ('High', 'Low', 'Close'))
+        for name, func in batched.BATCHED.items():
+            inputs = (high, low, close) if name == 'ADX' else (close,)
+            got = func(*inputs, PERIODS)
+            self.assertEqual(got.shape, (len(PERIODS), len(close)))
+            for row, n in enumerate(PERIODS):
+                with self.subTest(name=name, period=n):
+                    expected = getattr(talib, name)(*inputs, timeperiod=n)
+                    np.testing.assert_array_equal(np.isnan(got[row]), np.isnan(expected))
+                    np.testing.assert_allclose(got[row], expected, rtol=1e-9, atol=1e-8,
+                                               equal_nan=True)
+
+    def test_check_against_talib(self):
+        table = batched.check_against_talib(self.data)
+        self.assertEqual(set(table.index), set(batched.BATCHED))
+        self.assertTrue(table['nan_match'].all(), table)
+        self.assertLess(table['max_rel_error'].max(), 1e-9, table)
+
+    def test_get_shares_one_batch(self):
+        indicator_cache.clear()
+        close = self.data.Close.to_numpy()
+        rows = [batched.get(talib.SMA, close, timeperiod=n, periods=range(2, 51)) for n in (5, 20)]
+        self.assertEqual(indicator_cache.misses, 1)
+        np.testing.assert_allclose(rows[1], talib.SMA(close, 20), rtol=1e-12, equal_nan=True)
+        with self.assertRaises(ValueError):
+            batched.get(talib.SMA, close, timeperiod=60, periods=range(2, 51))
+
+    def test_sma_sweep_reads_the_batch(self):
+        warnings.simplefilter('ignore')
+        indicator_cache.clear()
+        bt = VectorizedBacktest(self.data, BTSMAStrategy, cash=10_000, commission=.001)
+        bt.optimize(n1=[5, 10], n2=[20, 40], stop=[5])
+        self.assertEqual(indicator_cache.misses, 1)
@@ -0,0 +1,153 @@
+"""
+On-disk partitions of `utils.data_loader.MarketDataStore` and its loaders.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from SPP4backtesting.utils import data_loader
+from SPP4backtesting.utils.data_loader import COLUMNS, CSVFetcher, MarketDataStore, load_data
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+
+def _bars(n_bars, seed=0, start='2020-01-01', freq='D'):
+    data = synthetic_ohlcv(n_bars, seed=seed, freq=freq, start=start)
+    data.index = data.index.tz_localize('UTC').as_unit('ns')
+    return data
+
+
+class MarketDataStoreTest(unittest.TestCase):
+    """Appends land in place, reloads give the bars back, partitions stay apart."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.store = MarketDataStore(self.root)
+        self.data = _bars(300)
+
+    def _assert_stored(self, expected, symbol='BTC-USD', interval='1d'):
+        loaded = self.store.load(symbol, interval)
+        pd.testing.assert_frame_equal(loaded, expected[list(COLUMNS)], check_freq=False)
+
+    def test_append_and_reload(self):
+        self.assertEqual(self.store.append('BTC-USD', '1d', self.data.iloc[:200]), 200)
+        self.assertEqual(self.store.append('BTC-USD', '1d', self.data.iloc[150:]), 100)
+        self._assert_stored(self.data)
+        # One flat column file per field, sized to the stored bars
+        directory = self.store._dir('BTC-USD', '1d')
+        self.assertEqual((directory / 'index.bin').stat().st_size, 300 * 8)
+        self.assertEqual((directory / 'Close.bin').stat().st_size, 300 * 8)
+        # A fresh store on the same root reads the same bars
+        pd.testing.assert_frame_equal(MarketDataStore(self.root).load('BTC-USD'),
+                                      self.store.load('BTC-USD'))
+
+    def test_last_bar_is_replaced(self):
+        self.store.append('BTC-USD', '1d', self.data.iloc[:100])
+        update = self.data.iloc[99:101].copy()
+        update.iloc[0, update.columns.get_loc('Close')] += 1
+        self.assertEqual(self.store.append('BTC-USD', '1d', update), 1)
+        expected = pd.concat([self.data.iloc[:99], update])
+        self._assert_stored(expected)
+
+    def test_earlier_bars_are_merged(self):
+        self.store.append('BTC-USD', '1d', self.data.iloc[100:])
+        self.assertEqual(self.store.append('BTC-USD', '1d', self.data.iloc[:120]), 100)
+        self._assert_stored(self.data)
+
+    def test_load_range(self):
+        self.store.append('BTC-USD', '1d', self.data)
+        start, end = self.data.index[50], self.data.index[80]
+        loaded = self.store.load('BTC-USD', '1d', start, end, columns=['Close'], dtype='float32')
+        self.assertEqual(list(loaded.columns), ['Close'])
+        self.assertEqual(loaded.dtypes['Close'], np.float32)
+        self.assertTrue(loaded.index.equals(self.data.index[50:80]))
+        # Naive bounds are taken in the partition's timezone
+        naive = self.store.load('BTC-USD', '1d', '2020-02-20', '2020-03-22')
+        self.assertTrue(naive.index.equals(self.data.loc['2020-02-20':'2020-03-21'].index))
+
+    def test_meta(self):
+        self.assertIsNone(self.store.meta('BTC-USD', '1d'))
+        self.store.append('BTC-USD', '1d', self.data.tz_convert('US/Eastern'))
+        meta = json.loads((self.store._dir('BTC-USD', '1d') / 'meta.json').read_text())
+        self.assertEqual(meta, self.store.meta('BTC-USD', '1d'))
+        self.assertEqual((meta['symbol'], meta['interval'], meta['length'], meta['dtype'], meta['tz']),
+                         ('BTC-USD', '1d', 300, 'float64', 'US/Eastern'))
+        self.assertIsNone(meta['covered_from'])
+        self.store.mark_covered('BTC-USD', '1d', self.data.index[0] - pd.Timedelta(days=30))
+        self.assertEqual(self.store.meta('BTC-USD', '1d')['covered_from'],
+                         (self.data.index[0] - pd.Timedelta(days=30)).value)
+        self.assertEqual(str(self.store.load('BTC-USD').index.tz), 'US/Eastern')
+
+    def test_partitions_by_symbol_and_interval(self):
+        hourly = _bars(48, seed=1, freq='h')
+        self.store.append('BTC-USD', '1d', self.data)
+        self.store.append('BTC-USD', '1h', hourly)
+        self.store.append('ETH/USD', '1d', self.data.iloc[:10])
+        self.assertEqual(self.store.symbols(), {'BTC-USD': ['1d', '1h'], 'ETH_USD': ['1d']})
+        self._assert_stored(self.data, 'BTC-USD', '1d')
+        self._assert_stored(hourly, 'BTC-USD', '1h')
+        self._assert_stored(self.data.iloc[:10], 'ETH/USD', '1d')
+        with self.assertRaises(KeyError):
+            self.store.load('BTC-USD', '1wk')
+
+    def test_float32_partitions(self):
+        store = MarketDataStore(self.root, dtype='float32')
+        store.append('BTC-USD', '1d', self.data)
+        self.assertEqual((store._dir('BTC-USD', '1d') / 'Close.bin').stat().st_size, 300 * 4)
+        self.assertEqual(store.load('BTC-USD').dtypes['Close'], np.float32)
+
+
+class _Recent(data_loader.Fetcher):
+    """Fetcher of the last 400 days, counting its instances and calls."""
+    instances = 0
+
+    def __init__(self):
+        type(self).instances += 1
+        self.calls = 0
+
+    def fetch(self, symbol, interval, start, end):
+        self.calls += 1
+        today = pd.Timestamp.now(tz='UTC').normalize()
+        return _bars(400, start=str((today - pd.Timedelta(days=399)).date()))
+
+
+class LoadDataTest(unittest.TestCase):
+    """Loaders fill the store's gaps from their fetcher."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.store = MarketDataStore(self.root)
+
+    def test_csv_fetcher_fills_the_store(self):
+        data = _bars(200)
+        data.to_csv(f'{self.root}/BTC-USD_1d.csv')
+        fetcher = CSVFetcher(self.root)
+        loaded = load_data('BTC-USD', '2020-01-01', '2020-04-01', fetcher=fetcher, store=self.store)
+        self.assertTrue(loaded.index.equals(data.loc[:'2020-03-31'].index))
+        # Later ranges read the rest of the file into the same partition
+        load_data('BTC-USD', '2020-04-01', None, fetcher=fetcher, store=self.store)
+        self.assertEqual(self.store.meta('BTC-USD', '1d')['length'], 200)
+
+    def test_load_crypto_data_builds_its_fetcher_per_call(self):
+        _Recent.instances = 0
+        with mock.patch.object(data_loader, 'YFinanceFetcher', _Recent):
+            first = data_loader.load_crypto_data('BTC-USD', period='6mo', store=self.store)
+            data_loader.load_crypto_data('BTC-USD', period='6mo', store=self.store)
+            self.assertEqual(_Recent.instances, 2)
+            offline = data_loader.load_crypto_data('BTC-USD', period='6mo', store=self.store,
+                                                   offline=True)
+            self.assertEqual(_Recent.instances, 2)
+        self.assertIsNone(first.index.tz)
+        self.assertTrue(offline.equals(first))
+        self.assertGreater(len(first), 150)
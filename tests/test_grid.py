@@ -0,0 +1,88 @@
+"""
+Lots of `utils.grid.GridBacktest`, and its sweeps against single runs.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from SPP4backtesting.strategies.grid_strategies import GridStrategy
+from SPP4backtesting.utils.grid import GridBacktest
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+# Levels 90 and 80 (take-profits 99 and 88) below the first close of 100
+BARS = pd.DataFrame({
+    'Open':  [100., 95., 92., 85., 86.],
+    'High':  [100., 96., 100., 90., 87.],
+    'Low':   [100., 89., 79., 85., 86.],
+    'Close': [100., 92., 85., 88., 86.],
+}, index=pd.date_range('2024-01-01', periods=5, freq='D'))
+
+
+class LotsTest(unittest.TestCase):
+    """Every level trades its own lot, worked out by hand."""
+
+    def test_lots(self):
+        stats = GridBacktest(BARS, GridStrategy, cash=1_000).run(grid_profit=10, grid_buy=2)
+        lots = stats['_lots']
+        # Level 1 bought at 90 on bar 1 and sold at 99 on bar 2; level 2 bought
+        # at 80 on bar 2 and sold at 88 on bar 3; level 1 bought again on bar
+        # 3, at its open of 85 since it gapped below 90, and still open
+        self.assertEqual(lots[['Level', 'EntryBar', 'ExitBar']].values.tolist(),
+                         [[1, 1, 2], [2, 2, 3], [1, 3, -1]])
+        np.testing.assert_allclose(lots['EntryPrice'], [90, 80, 85])
+        np.testing.assert_allclose(lots['ExitPrice'], [99, 88, np.nan])
+        np.testing.assert_allclose(lots['Size'], [500 / 90, 500 / 80, 500 / 85])
+        np.testing.assert_allclose(lots['PnL'], [50, 50, np.nan])
+
+        self.assertEqual(len(stats['_trades']), 2)
+        self.assertEqual(stats['# Trades'], 2)
+        np.testing.assert_allclose(stats['_equity_curve']['Equity'], [
+            1_000,
+            500 + 500 / 90 * 92,
+            550 + 500 / 80 * 85,
+            600 + 500 / 85 * 88,
+            600 + 500 / 85 * 86,
+        ])
+
+    def test_commission(self):
+        stats = GridBacktest(BARS, GridStrategy, cash=1_000, commission=.01).run(grid_profit=10, grid_buy=2)
+        size = 500 / (90 * 1.01)
+        self.assertAlmostEqual(stats['_lots']['Size'].iloc[0], size)
+        self.assertAlmostEqual(stats['_trades']['PnL'].iloc[0], size * 99 * .99 - 500)
+
+
+class SweepTest(unittest.TestCase):
+    """`optimize()` scores all combinations at once, as `run()` would one by one."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bt = GridBacktest(synthetic_ohlcv(3_000, seed=8), GridStrategy,
+                              cash=10_000, commission=.001)
+        cls.grid = dict(grid_profit=[1, 2, 3], grid_buy=[3, 5, 10])
+
+    def test_heatmap_matches_run(self):
+        for maximize in ('Return [%]', 'Sortino Ratio', 'Win Rate [%]', 'Max. Drawdown [%]'):
+            stats, heatmap = self.bt.optimize(**self.grid, maximize=maximize, return_heatmap=True)
+            for (grid_profit, grid_buy), score in heatmap.items():
+                with self.subTest(maximize=maximize, grid_profit=grid_profit, grid_buy=grid_buy):
+                    run = self.bt.run(grid_profit=grid_profit, grid_buy=grid_buy)
+                    expected = run[maximize] if run['# Trades'] else np.nan
+                    np.testing.assert_allclose(score, expected, rtol=1e-9, equal_nan=True)
+            self.assertAlmostEqual(stats[maximize], heatmap.max())
+
+    def test_callable_maximize(self):
+        def ratio(stats):
+            return stats['Return [%]'] / (1 - stats['Max. Drawdown [%]'])
+        _, heatmap = self.bt.optimize(**self.grid, maximize=ratio, return_heatmap=True)
+        _, by_key = self.bt.optimize(**self.grid, return_heatmap=True, maximize='Return [%]')
+        self.assertIsNone(heatmap.name)
+        self.assertTrue(heatmap.index.equals(by_key.index))
+        for (grid_profit, grid_buy), score in heatmap.items():
+            np.testing.assert_allclose(score, ratio(self.bt.run(grid_profit=grid_profit, grid_buy=grid_buy)),
+                                       rtol=1e-9)
@@ -0,0 +1,88 @@
+"""
+Hits, keys and byte-bounded eviction of `utils.indicator_cache`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+import talib
+from backtesting import Backtest
+
+from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
+from SPP4backtesting.utils.indicator_cache import IndicatorCache, indicator_cache
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+CALLS = []
+
+
+def _counted_sma(values, period):
+    CALLS.append(period)
+    return talib.SMA(values, period)
+
+
+class IndicatorCacheTest(unittest.TestCase):
+    """Repeated indicators are served from the cache until evicted."""
+
+    def setUp(self):
+        CALLS.clear()
+        self.close = synthetic_ohlcv(1_000, seed=1, freq='D').Close.to_numpy()
+
+    def test_hits_on_equal_content(self):
+        cache = IndicatorCache()
+        first = cache.get(_counted_sma, self.close, 20)
+        # Same values in another array, same period: a hit
+        second = cache.get(_counted_sma, self.close.copy(), 20)
+        self.assertIs(second, first)
+        cache.get(_counted_sma, self.close, 30)
+        self.assertEqual(CALLS, [20, 30])
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 2))
+        self.assertFalse(first.flags.writeable)
+
+    def test_changed_input_misses(self):
+        cache = IndicatorCache()
+        cache.get(_counted_sma, self.close, 20)
+        changed = self.close.copy()
+        changed[-1] += 1
+        cache.get(_counted_sma, changed, 20)
+        self.assertEqual(cache.misses, 2)
+
+    def test_evicts_least_recently_used_by_bytes(self):
+        size = self.close.nbytes
+        cache = IndicatorCache(max_bytes=2 * size)
+        cache.get(_counted_sma, self.close, 10)
+        cache.get(_counted_sma, self.close, 20)
+        cache.get(_counted_sma, self.close, 10)     # 10 is now the most recent
+        cache.get(_counted_sma, self.close, 30)     # evicts 20
+        self.assertEqual((len(cache), cache.nbytes), (2, 2 * size))
+        cache.get(_counted_sma, self.close, 10)
+        cache.get(_counted_sma, self.close, 20)
+        self.assertEqual(CALLS, [10, 20, 30, 20])
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+
+    def test_outputs_larger_than_the_cache_are_not_kept(self):
+        cache = IndicatorCache(max_bytes=self.close.nbytes - 1)
+        cache.get(_counted_sma, self.close, 10)
+        cache.get(_counted_sma, self.close, 10)
+        self.assertEqual((len(cache), cache.nbytes, cache.misses), (0, 0, 2))
+
+    def test_disabled_and_uncacheable_calls_compute(self):
+        IndicatorCache(max_bytes=0).get(_counted_sma, self.close, 10)
+        cache = IndicatorCache()
+        cache.get(lambda values, period: _counted_sma(values, period), self.close, 10)
+        self.assertEqual(CALLS, [10, 10])
+        self.assertEqual(len(cache), 0)
+
+    def test_optimization_candidates_share_indicators(self):
+        warnings.simplefilter('ignore')
+        indicator_cache.clear()
+        bt = Backtest(synthetic_ohlcv(500, seed=2, freq='D'), BTSMAStrategy, cash=10_000)
+        for n2 in (20, 30, 40):
+            bt.run(n1=10, n2=n2)
+        # SMA(10) is computed once and shared by the three runs
+        self.assertEqual(indicator_cache.misses, 4)
+        self.assertEqual(indicator_cache.hits, 2)
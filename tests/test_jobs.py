@@ -0,0 +1,89 @@
+"""
+Spec files of `utils.jobs`, loaded and run from another directory.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+from pathlib import Path
+
+from SPP4backtesting.utils import jobs
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+SPEC = '''
+output = "out"
+cash = 10_000
+commission = 0.001
+result_store = "cache/results.db"
+
+[data]
+symbols = ["SYN"]
+intervals = ["1d"]
+root = "store"
+fetch = "csv"
+
+[walk_forward]
+train = 200
+test = 100
+
+[[strategies]]
+name = "KamaStrategy"
+constraint = "period >= 10 and period % 2 == 1"
+'''
+
+
+class SpecPathsTest(unittest.TestCase):
+    """Relative paths of a spec resolve next to the spec, whatever the cwd."""
+
+    def setUp(self):
+        warnings.simplefilter('ignore')
+        self.spec_dir = Path(tempfile.mkdtemp()).resolve()
+        self.cwd = Path(tempfile.mkdtemp()).resolve()
+        for directory in (self.spec_dir, self.cwd):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        (self.spec_dir / 'csv').mkdir()
+        synthetic_ohlcv(500, seed=4, freq='D').to_csv(self.spec_dir / 'csv' / 'SYN_1d.csv')
+        (self.spec_dir / 'majors.toml').write_text(SPEC)
+        saved = os.getcwd()
+        os.chdir(self.cwd)
+        self.addCleanup(os.chdir, saved)
+
+    def test_paths_are_relative_to_the_spec(self):
+        spec = jobs.load_spec(self.spec_dir / 'majors.toml')
+        self.assertEqual(spec.output, str(self.spec_dir / 'out'))
+        self.assertEqual(spec.root, str(self.spec_dir / 'store'))
+        self.assertEqual(spec.fetch, str(self.spec_dir / 'csv'))
+        self.assertEqual(spec.result_store, str(self.spec_dir / 'cache' / 'results.db'))
+
+    def test_run_writes_next_to_the_spec(self):
+        table = jobs.run_spec(jobs.load_spec(self.spec_dir / 'majors.toml'), log=lambda line: None)
+        self.assertGreater(len(table), 1)
+        self.assertTrue((self.spec_dir / 'out' / jobs.RESULTS).exists())
+        self.assertTrue((self.spec_dir / 'cache' / 'results.db').exists())
+        self.assertEqual(list(self.cwd.iterdir()), [])
+        # The constraint held for every window's parameters
+        for params in table['params']:
+            self.assertGreaterEqual(params['period'], 10)
+            self.assertEqual(params['period'] % 2, 1)
+
+
+class ConstraintTest(unittest.TestCase):
+    """Constraint expressions are limited to comparisons, arithmetic and names."""
+
+    def test_evaluates_expressions(self):
+        constraint = jobs.Constraint('n1 < n2 and (n2 - n1) % 2 == 0 or not n1')
+        self.assertTrue(constraint({'n1': 2, 'n2': 6}))
+        self.assertFalse(constraint({'n1': 2, 'n2': 5}))
+        self.assertTrue(constraint({'n1': 0, 'n2': 5}))
+
+    def test_rejects_other_syntax(self):
+        for expression in ('__import__("os").system("true")', 'n1.__class__', 'params[0]',
+                           'len(n1) > 1', 'lambda: 1', '"a" < n1', 'n1 <'):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                jobs.Constraint(expression)
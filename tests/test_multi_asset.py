@@ -0,0 +1,84 @@
+"""
+`utils.multi_asset.MultiAssetBacktest` on a spread small enough to work out by hand.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from SPP4backtesting.strategies.base_strategies import BaseStrategy, Book
+from SPP4backtesting.utils.multi_asset import MultiAssetBacktest, MultiAssetData
+
+INDEX = pd.date_range('2024-01-01', periods=5, freq='D')
+
+
+def _frame(open_, close):
+    return pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close),
+                         'Low': np.minimum(open_, close), 'Close': close}, index=INDEX)
+
+
+FRAMES = {
+    'A': _frame([100., 100., 100., 104., 110.], [100., 100., 102., 105., 110.]),
+    'B': _frame([50., 50., 50., 49., 45.], [50., 50., 49., 48., 45.]),
+}
+
+
+class _Spread(BaseStrategy):
+    """Long A / short B decided at the close of bar 1, closed at the close of bar 3."""
+    side = 1
+    opt_ranges = {'side': [-1, 1]}
+
+    @classmethod
+    def book(cls, data, p):
+        return Book(target=np.array([0, 1, 1, 0, 0]) * p.side, legs={'A': 1., 'B': -1.})
+
+    def init(self):
+        pass
+
+    def next(self):
+        pass
+
+
+class SpreadTest(unittest.TestCase):
+    """One round trip of a two-leg book: in at bar 2's open, out at bar 4's open."""
+
+    def test_commission(self):
+        stats = MultiAssetBacktest(FRAMES, _Spread, cash=1_000, commission=.001).run()
+        # Bar 2 open: 5 A at 100 (500 + .5 commission), -10 B at 50 (-500 + .5)
+        cash = 1_000 - (500 + .5) - (-500 + .5)
+        self.assertAlmostEqual(cash, 999.)
+        # Bar 4 open: sell 5 A at 110 (550 - .55), buy back 10 B at 45 (450 + .45)
+        final = cash + (550 - .55) - (450 + .45)
+        np.testing.assert_allclose(stats['_equity_curve']['Equity'],
+                                   [1_000, 1_000, cash + 5 * 102 - 10 * 49,
+                                    cash + 5 * 105 - 10 * 48, final])
+        self.assertAlmostEqual(stats['Equity Final [$]'], 1_098.)
+        self.assertAlmostEqual(stats['Return [%]'], 9.8)
+        self.assertEqual(stats['# Trades'], 1)
+        trades = stats['_trades']
+        self.assertEqual(trades[['Direction', 'EntryBar', 'ExitBar']].values.tolist(), [[1, 2, 4]])
+        self.assertAlmostEqual(trades['PnL'].iloc[0], 98.)
+        self.assertAlmostEqual(trades['ReturnPct'].iloc[0], .098)
+        self.assertEqual(trades['EntryTime'].iloc[0], INDEX[2])
+
+    def test_slippage_reversed(self):
+        stats = MultiAssetBacktest(FRAMES, _Spread, cash=1_000, slippage=.01).run(side=-1)
+        # Short 500 of A filled at 99, long 500 of B filled at 50.5
+        a, b = -500 / 99, 500 / 50.5
+        # Out at bar 4's open: buy A back at 111.1, sell B at 44.55
+        final = 1_000 + a * (111.1 - 99) + b * (44.55 - 50.5)
+        self.assertAlmostEqual(stats['Equity Final [$]'], final)
+        self.assertEqual(stats['_trades']['Direction'].tolist(), [-1])
+        self.assertLess(stats['Return [%]'], 0)
+
+    def test_optimize_heatmap_matches_run(self):
+        bt = MultiAssetBacktest(MultiAssetData(FRAMES), _Spread, cash=1_000, commission=.001)
+        stats, heatmap = bt.optimize(side=[-1, 1], maximize='Return [%]', return_heatmap=True)
+        self.assertEqual(stats['_strategy']._params['side'], 1)
+        for side, score in heatmap.items():
+            self.assertAlmostEqual(score, bt.run(side=side)['Return [%]'])
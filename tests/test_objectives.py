@@ -0,0 +1,73 @@
+"""
+Kernel scoring of `utils.objectives` on event-driven backtests.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import pickle
+import threading
+import unittest
+import warnings
+
+import backtesting.backtesting as _backtesting
+import numpy as np
+from backtesting.lib import FractionalBacktest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils import objectives
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+UNIT = 1 / 100e6
+PARAMS = dict(period=20)
+
+
+class ScoringTest(unittest.TestCase):
+    """Scoring copies return the kernel's score and leave backtesting.py alone."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_000, seed=5, freq='D')
+        cls.bt = FractionalBacktest(cls.data, KamaStrategy, cash=10_000, commission=.001,
+                                    finalize_trades=True, fractional_unit=UNIT)
+        cls.stats = cls.bt.run(**PARAMS)
+
+    def test_scores_match_full_stats(self):
+        for metric in objectives.METRICS:
+            scoring = objectives.scoring(self.bt, objectives.as_kernel(metric))
+            result = scoring.run(**PARAMS)
+            self.assertTrue(np.isclose(objectives.score(result), float(self.stats[metric]),
+                                       equal_nan=True), metric)
+
+    def test_backtesting_is_not_patched(self):
+        compute_stats = _backtesting.compute_stats
+        scoring = objectives.scoring(self.bt, objectives.as_kernel('Return [%]'))
+        scoring.run(**PARAMS)
+        self.assertIs(_backtesting.compute_stats, compute_stats)
+        self.assertIn('SQN', self.bt.run(**PARAMS))
+        self.assertIsInstance(scoring, FractionalBacktest)
+
+    def test_concurrent_runs_keep_their_own_stats(self):
+        scoring = objectives.scoring(self.bt, objectives.as_kernel('Sharpe Ratio'))
+        results = {}
+
+        def run(name, bt):
+            results[name] = [bt.run(**PARAMS) for _ in range(3)]
+        threads = [threading.Thread(target=run, args=args)
+                   for args in (('full', self.bt), ('scored', scoring))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(all('SQN' in stats for stats in results['full']))
+        self.assertTrue(all(objectives.SCORE in stats for stats in results['scored']))
+
+    def test_pickles_for_pool_workers(self):
+        scoring = objectives.scoring(self.bt, objectives.Penalized('Sortino Ratio', per_trade=.1))
+        restored = pickle.loads(pickle.dumps(scoring))
+        self.assertIs(type(restored)._base, type(scoring)._base)
+        self.assertIsInstance(restored, FractionalBacktest)
+        self.assertEqual(objectives.score(restored.run(**PARAMS)),
+                         objectives.score(scoring.run(**PARAMS)))
@@ -0,0 +1,45 @@
+"""
+Plain `opt_ranges` next to declarative `opt_space` (`utils.param_space`).
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+from backtesting import Backtest
+
+from SPP4backtesting.strategies import registry
+from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
+from SPP4backtesting.utils.param_space import compile_space, describe, is_declarative, search_space
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+
+class SearchSpaceTest(unittest.TestCase):
+    """`opt_ranges` stay plain iterables; `optimize_auto` searches `opt_space`."""
+
+    def test_opt_ranges_are_plain(self):
+        for name, info in registry.scan().items():
+            with self.subTest(strategy=name):
+                self.assertFalse(is_declarative(info.opt_ranges))
+
+    def test_backtest_optimize_takes_opt_ranges(self):
+        warnings.simplefilter('ignore')
+        bt = Backtest(synthetic_ohlcv(400, seed=3, freq='D'), BTSMAStrategy, cash=10_000)
+        stats = bt.optimize(**BTSMAStrategy.opt_ranges, constraint=lambda p: p.n1 < p.n2,
+                            max_tries=8, random_state=0)
+        self.assertLess(stats._strategy.n1, stats._strategy.n2)
+
+    def test_search_space_prefers_opt_space(self):
+        space = compile_space(search_space(BTSMAStrategy))
+        self.assertTrue((space['n1'] < space['n2']).all())
+        self.assertEqual(len(space), 49 * 48 // 2 * 78)
+        self.assertIs(search_space(BTSMAStrategy), BTSMAStrategy.opt_space)
+
+    def test_registry_reads_opt_space(self):
+        info = registry.info('BTSMAStrategy')
+        self.assertEqual({k: describe(v) for k, v in info.search_space.items()},
+                         {k: describe(v) for k, v in BTSMAStrategy.opt_space.items()})
+        self.assertIsNone(registry.info('KamaStrategy').opt_space)
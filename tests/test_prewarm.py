@@ -0,0 +1,84 @@
+"""
+Parity of `utils.prewarm` windows with plain window backtests.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+import talib
+from backtesting import Backtest
+from backtesting.lib import FractionalBacktest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils import prewarm
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.walk_forward import WalkForward
+
+UNIT = 1 / 100e6
+STATS = ['Equity Final [$]', 'Return [%]', '# Trades', 'Max. Drawdown [%]']
+
+
+def _fractional(data):
+    return FractionalBacktest(data, KamaStrategy, cash=10_000, commission=.001,
+                              finalize_trades=True, fractional_unit=UNIT)
+
+
+class FractionalPrewarmTest(unittest.TestCase):
+    """Prewarmed indicators of `FractionalBacktest` are on its price scale."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_500, seed=3, freq='D')
+
+    def test_full_history_window_matches_prewarm_off(self):
+        off = _fractional(self.data).run()
+        with prewarm.window(self.data, 0, len(self.data), fractional_unit=UNIT):
+            on = _fractional(self.data).run()
+        self.assertGreater(off['# Trades'], 0)
+        np.testing.assert_array_equal(on[STATS].astype(float), off[STATS].astype(float))
+
+    def test_window_indicator_is_scaled_history(self):
+        start, stop = 500, 900
+        with prewarm.window(self.data, start, stop, fractional_unit=UNIT):
+            stats = _fractional(self.data.iloc[start:stop]).run()
+        strategy = stats._strategy
+        # FractionalBacktest rescales overlay indicators back to prices in results
+        expected = talib.KAMA(self.data.Close.to_numpy() * UNIT, strategy.period)[start:stop] / UNIT
+        np.testing.assert_allclose(strategy._indicators[0], expected, rtol=1e-12)
+        self.assertGreater(stats['# Trades'], 0)
+
+    def test_window_matches_unscaled_backtest(self):
+        start, stop = 500, 900
+        window = self.data.iloc[start:stop]
+        with prewarm.window(self.data, start, stop, fractional_unit=UNIT):
+            fractional = _fractional(window).run()
+        with prewarm.window(self.data, start, stop):
+            plain = Backtest(window, KamaStrategy, cash=10_000, commission=.001,
+                             finalize_trades=True).run()
+        np.testing.assert_array_equal(fractional._trades.EntryBar, plain._trades.EntryBar)
+        np.testing.assert_array_equal(fractional._trades.ExitBar, plain._trades.ExitBar)
+
+    def test_other_unit_falls_back_to_window(self):
+        start, stop = 500, 900
+        window = self.data.iloc[start:stop]
+        off = _fractional(window).run()
+        with prewarm.window(self.data, start, stop):
+            on = _fractional(window).run()
+        np.testing.assert_array_equal(on[STATS].astype(float), off[STATS].astype(float))
+
+    def test_walk_forward_windows_trade(self):
+        walk_forward = WalkForward(self.data, KamaStrategy, 10_000, .001, constraint=None,
+                                   size_optimization=400, size_test=200, prewarm=True)
+        walk_forward.run_walk_forward()
+        for result in walk_forward.results:
+            self.assertGreater(result.test['# Trades'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
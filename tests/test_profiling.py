@@ -0,0 +1,113 @@
+"""
+Spans and per-call counters of `utils.profiling` over walk-forward runs.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import warnings
+
+from backtesting import Backtest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils import profiling
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.walk_forward import WalkForward
+
+GRID = len(KamaStrategy.opt_ranges['period'])
+
+
+def _sortino(stats):
+    return stats['Sortino Ratio']
+
+
+class WalkForwardProfileTest(unittest.TestCase):
+    """Every window records its spans, in-process or in pool workers."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_000, seed=11, freq='D')
+        cls.serial = cls._profile(n_jobs=1)
+        cls.n_windows = len(cls._walk_forward().window_bounds())
+
+    @classmethod
+    def _walk_forward(cls):
+        return WalkForward(cls.data, KamaStrategy, cash=10_000, commission=.001,
+                           maximize=_sortino, constraint=None, size_optimization=300, size_test=100)
+
+    @classmethod
+    def _profile(cls, n_jobs):
+        with profiling.profile() as prof:
+            cls._walk_forward().run_walk_forward(n_jobs=n_jobs)
+        return prof
+
+    def _events(self, prof, phase):
+        return [event for event in prof.events if event['phase'] == phase]
+
+    def test_spans(self):
+        prof = self.serial
+        windows = self._events(prof, 'window')
+        self.assertEqual([event['window'] for event in windows], list(range(self.n_windows)))
+        self.assertEqual([event['window'] for event in self._events(prof, 'test')],
+                         list(range(self.n_windows)))
+        # The grid's candidates plus the final run of the best
+        self.assertEqual([event['runs'] for event in self._events(prof, 'optimize')],
+                         [GRID + 1] * self.n_windows)
+        self.assertEqual([event['runs'] for event in windows], [GRID + 2] * self.n_windows)
+        self.assertFalse(self._events(prof, 'pickle'))
+
+        # Optimize and test spans nest in their window's, in recording order
+        for optimize, test, window in zip(*[iter(prof.events)] * 3):
+            self.assertEqual((optimize['phase'], test['phase'], window['phase']),
+                             ('optimize', 'test', 'window'))
+            self.assertAlmostEqual(window['self_seconds'],
+                                   window['seconds'] - optimize['seconds'] - test['seconds'])
+            self.assertLessEqual(optimize['self_seconds'], optimize['seconds'])
+            self.assertGreaterEqual(optimize['start'], window['start'])
+
+    def test_counters(self):
+        runs = self.n_windows * (GRID + 2)
+        counters = self.serial.counters
+        self.assertEqual(counters['init', 'KamaStrategy'][0], runs)
+        self.assertEqual(counters['stats', None][0], runs)
+        self.assertGreater(counters['next', 'KamaStrategy'][0], runs * 100)
+        summary = self.serial.summary()
+        self.assertEqual(summary.loc['window', 'runs'], runs)
+        self.assertEqual(summary.loc['stats', 'calls'], runs)
+
+    def test_pool_workers_send_their_trace(self):
+        prof = self._profile(n_jobs=2)
+        pickles = self._events(prof, 'pickle')
+        self.assertEqual(len(pickles), self.n_windows)
+        self.assertTrue(all(event['bytes'] > 0 for event in pickles))
+        self.assertNotIn(os.getpid(), {event['pid'] for event in prof.events})
+        self.assertEqual(sorted(event['window'] for event in self._events(prof, 'window')),
+                         list(range(self.n_windows)))
+        self.assertEqual({key: calls for key, (calls, _) in prof.counters.items()},
+                         {key: calls for key, (calls, _) in self.serial.counters.items()})
+
+    def test_to_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.json')
+            self.serial.to_json(path)
+            with open(path) as f:
+                trace = json.load(f)
+        self.assertEqual(len(trace['events']), 3 * self.n_windows)
+        self.assertEqual({row['phase'] for row in trace['summary']},
+                         {'optimize', 'test', 'window', 'stats', 'init', 'next'})
+
+    def test_off(self):
+        self.assertIsNone(profiling.active)
+        with profiling.span('window') as record:
+            record['ignored'] = 1
+        self.assertEqual(record, {})
+        bt = Backtest(self.data, KamaStrategy, finalize_trades=True)
+        self.assertIs(profiling.timed_stats(bt), bt)
+        strategy = bt.run()._strategy
+        self.assertNotIn('init', vars(strategy))
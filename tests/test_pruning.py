@@ -0,0 +1,86 @@
+"""
+Candidates stopped early by `utils.pruning` pruners during `utils.search` searches.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+from backtesting import Backtest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils.optimization import optimize_auto
+from SPP4backtesting.utils.pruning import MedianPruner, RulePruner
+from SPP4backtesting.utils.search import GridSearch
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+RANGES = {'period': range(5, 50, 5)}
+# Past every warm-up, so checks fall on multiples of it up to bar 600 of 620
+EVERY = 50
+
+
+class PruningTest(unittest.TestCase):
+    """Pruned candidates score NaN and are marked in `search.pruned`."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.bt = Backtest(synthetic_ohlcv(620, seed=5, freq='D'), KamaStrategy,
+                          cash=10_000, commission=.001, finalize_trades=True)
+        cls.unpruned = GridSearch()
+        cls.unpruned.search(cls.bt, RANGES, 'Return [%]')
+
+    def test_rule(self):
+        pruner = RulePruner(lambda p: p.return_pct < -5, check_every=EVERY)
+        search = GridSearch()
+        params = search.search(self.bt, RANGES, 'Return [%]', pruner=pruner)
+
+        # Pruned: more than 5 % down at any check
+        expected = {}
+        for (period,) in self.unpruned.history.index:
+            equity = self.bt.run(period=period)['_equity_curve']['Equity'].to_numpy()
+            expected[period] = bool((equity[EVERY - 1:600:EVERY] < 9_500).any())
+        self.assertTrue(0 < sum(expected.values()) < len(expected))
+        self.assertEqual({period: pruned for (period,), pruned in search.pruned.items()}, expected)
+        self.assertEqual(pruner.n_pruned, search.pruned.sum())
+
+        self.assertTrue(search.history[search.pruned].isna().all())
+        survivors = ~search.pruned
+        np.testing.assert_array_equal(search.history[survivors],
+                                      self.unpruned.history[survivors.to_numpy()])
+        self.assertFalse(expected[params['period']])
+
+    def test_all_pruned(self):
+        search = GridSearch()
+        params = search.search(self.bt, RANGES, 'Return [%]',
+                               pruner=RulePruner(lambda p: p.fraction > .5, check_every=EVERY))
+        self.assertTrue(search.pruned.all())
+        self.assertTrue(search.history.isna().all())
+        # As Backtest.optimize with no valid candidate: the first one
+        self.assertEqual(params, {'period': 5})
+
+    def test_median(self):
+        pruner = MedianPruner(n_warmup=3, min_fraction=.2, check_every=EVERY)
+        search = GridSearch()
+        search.search(self.bt, RANGES, 'Return [%]', pruner=pruner)
+        # Warm-up candidates always finish
+        self.assertFalse(search.pruned.iloc[:3].any())
+        self.assertTrue(search.pruned.any())
+        self.assertTrue(search.history[search.pruned].isna().all())
+        self.assertEqual(pruner.n_pruned, search.pruned.sum())
+        # A second search starts from a clean history
+        again = GridSearch()
+        again.search(self.bt, RANGES, 'Return [%]', pruner=pruner)
+        self.assertTrue(again.pruned.equals(search.pruned))
+
+    def test_optimize_auto(self):
+        rule = lambda p: p.return_pct < -5
+        search = GridSearch()
+        params = search.search(self.bt, RANGES, 'Return [%]', pruner=RulePruner(rule))
+        stats = optimize_auto(self.bt, KamaStrategy, 'Return [%]', pruner=rule)
+        self.assertEqual(stats['_strategy']._params, params)
+        self.assertEqual(stats['Return [%]'], search.history.max())
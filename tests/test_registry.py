@@ -0,0 +1,93 @@
+"""
+`strategies.registry` against the strategy classes it reads from source.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import subprocess
+import sys
+import unittest
+
+from SPP4backtesting import strategies
+from SPP4backtesting.strategies import registry
+from SPP4backtesting.strategies.base_strategies import BaseStrategy
+from SPP4backtesting.utils.param_space import describe
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lists every strategy and its spaces, then reports the heavy modules it loaded
+_LIST = """
+import json, sys
+from SPP4backtesting.strategies import registry
+from SPP4backtesting.utils.param_space import describe
+listed = {name: {param: describe(values) for param, values in info.search_space.items()}
+          for name, info in registry.scan().items()}
+heavy = sorted(m for m in ('talib', 'backtesting', 'bokeh', 'pandas') if m in sys.modules)
+print(json.dumps({'strategies': listed, 'heavy': heavy}))
+"""
+
+
+def _spaces(values):
+    return {param: describe(space) for param, space in values.items()}
+
+
+class RegistryTest(unittest.TestCase):
+    """The registry lists every strategy, as its class defines it, without importing it."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.classes = {}
+        package = os.path.dirname(strategies.__file__)
+        for module_info in pkgutil.iter_modules([package]):
+            if module_info.name == 'registry':
+                continue
+            module = importlib.import_module(f'{strategies.__name__}.{module_info.name}')
+            for name, obj in vars(module).items():
+                if (inspect.isclass(obj) and issubclass(obj, BaseStrategy) and obj is not BaseStrategy
+                        and obj.__module__ == module.__name__):
+                    cls.classes[name] = obj
+
+    def test_lists_every_strategy(self):
+        self.assertEqual(registry.names(), sorted(self.classes))
+        for name, strategy in self.classes.items():
+            with self.subTest(strategy=name):
+                info = registry.info(name)
+                self.assertEqual(info.module, strategy.__module__)
+                self.assertIs(registry.load(name), strategy)
+                self.assertIs(getattr(strategies, name), strategy)
+
+    def test_matches_classes(self):
+        for name, strategy in self.classes.items():
+            with self.subTest(strategy=name):
+                info = registry.info(name)
+                self.assertEqual(_spaces(info.opt_ranges), _spaces(strategy.opt_ranges))
+                self.assertEqual(info.opt_space is None, strategy.opt_space is None)
+                if strategy.opt_space is not None:
+                    self.assertEqual(_spaces(info.opt_space), _spaces(strategy.opt_space))
+                for param, value in info.params.items():
+                    self.assertEqual(getattr(strategy, param), value, param)
+                for param in strategy.opt_ranges:
+                    self.assertIn(param, info.params)
+                self.assertEqual(info.vectorized, strategy.signals.__func__ is not BaseStrategy.signals.__func__)
+                self.assertEqual(info.multi_asset, strategy.book.__func__ is not BaseStrategy.book.__func__)
+
+    def test_unknown(self):
+        with self.assertRaises(KeyError):
+            registry.info('NoSuchStrategy')
+        with self.assertRaises(AttributeError):
+            strategies.NoSuchStrategy
+
+    def test_listing_skips_talib(self):
+        result = subprocess.run([sys.executable, '-c', _LIST], cwd=ROOT, capture_output=True,
+                                text=True, check=True)
+        listed = json.loads(result.stdout)
+        self.assertEqual(listed['heavy'], [])
+        self.assertEqual(listed['strategies'],
+                         {name: _spaces(registry.info(name).search_space) for name in sorted(self.classes)})
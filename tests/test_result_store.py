@@ -0,0 +1,95 @@
+"""
+Round-trips and cache hits of `utils.result_store.ResultStore`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import multiprocessing as mp
+import shutil
+import tempfile
+import unittest
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from backtesting.lib import FractionalBacktest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils.result_store import ResultStore, backtest_key
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+DATA = synthetic_ohlcv(600, seed=9, freq='D')
+SETTINGS = dict(cash=10_000, commission=.001, finalize_trades=True, fractional_unit=1 / 100e6)
+
+
+def _backtest(data=DATA):
+    return FractionalBacktest(data, KamaStrategy, **SETTINGS)
+
+
+def _run_in_worker(path, params):
+    # A separate process, with its own connection to the same file
+    warnings.simplefilter('ignore')
+    store = ResultStore(path)
+    stats = store.run(_backtest(), params)
+    return store.hits, store.misses, float(stats['Return [%]'])
+
+
+class ResultStoreTest(unittest.TestCase):
+    """Stored stats come back intact and are shared between processes."""
+
+    def setUp(self):
+        warnings.simplefilter('ignore')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.store = ResultStore(directory)
+        self.addCleanup(self.store.close)
+
+    def test_stats_round_trip(self):
+        bt = _backtest()
+        stats = bt.run(period=20)
+        key = backtest_key(bt)
+        self.store.put_stats(key, {'period': 20}, stats)
+        loaded = self.store.get_stats(key, {'period': 20})
+        scalars = [k for k in stats.index if not k.startswith('_')]
+        pd.testing.assert_series_equal(loaded[scalars], stats[scalars])
+        pd.testing.assert_frame_equal(loaded['_equity_curve'], stats['_equity_curve'])
+        pd.testing.assert_frame_equal(loaded['_trades'], stats['_trades'])
+        self.assertEqual(loaded._strategy._params, {'period': 20})
+        self.assertIsNone(self.store.get_stats(key, {'period': 25}))
+        self.assertEqual((self.store.hits, self.store.misses), (1, 1))
+
+    def test_best_params_round_trip(self):
+        self.store.put_best('bt', 'search', {'n1': np.int64(5), 'n2': 20})
+        self.assertEqual(self.store.get_best('bt', 'search'), {'n1': 5, 'n2': 20})
+        self.assertIsNone(self.store.get_best('bt', 'other'))
+
+    def test_run_computes_once(self):
+        bt = _backtest()
+        first = self.store.run(bt, {'period': 20})
+        second = self.store.run(bt, {'period': 20})
+        self.assertEqual((self.store.hits, self.store.misses), (1, 1))
+        self.assertEqual(second['Return [%]'], first['Return [%]'])
+        self.assertEqual(self.store.run(bt, {'period': 20}, backtest_key(bt))['# Trades'],
+                         first['# Trades'])
+
+    def test_backtest_key_follows_the_data(self):
+        self.assertEqual(backtest_key(_backtest()), backtest_key(_backtest(DATA.copy())))
+        changed = DATA.copy()
+        changed.iloc[-1, changed.columns.get_loc('Close')] *= 1.01
+        self.assertNotEqual(backtest_key(_backtest()), backtest_key(_backtest(changed)))
+
+    def test_hits_across_processes(self):
+        expected = float(self.store.run(_backtest(), {'period': 20})['Return [%]'])
+        context = mp.get_context('spawn')
+        with ProcessPoolExecutor(1, mp_context=context) as pool:
+            # Computed in this process, served to the worker
+            self.assertEqual(pool.submit(_run_in_worker, self.store.path, {'period': 20}).result(),
+                             (1, 0, expected))
+            # Computed in the worker, served to this process
+            _, misses, other = pool.submit(_run_in_worker, self.store.path, {'period': 30}).result()
+        self.assertEqual(misses, 1)
+        self.assertEqual(float(self.store.run(_backtest(), {'period': 30})['Return [%]']), other)
+        self.assertEqual((self.store.hits, self.store.misses), (1, 1))
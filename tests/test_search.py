@@ -0,0 +1,83 @@
+"""
+Compiled spaces of `utils.search.GridSearch` over its process pool, and
+`utils.search.head()`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+from backtesting.lib import FractionalBacktest
+
+from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
+from SPP4backtesting.utils import objectives, pools
+from SPP4backtesting.utils.param_space import Range, Ref, compile_space
+from SPP4backtesting.utils.search import GridSearch, head
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+RANGES = {'n1': range(5, 30, 4), 'n2': Range(Ref('n1') + 1, 40, 5), 'stop': range(2, 20, 8)}
+
+
+class PooledGridTest(unittest.TestCase):
+    """Pooled grids score every compiled point as the in-process loop does."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        data = synthetic_ohlcv(600, seed=2, freq='D')
+        cls.bt = FractionalBacktest(data, BTSMAStrategy, cash=10_000, commission=.001,
+                                    finalize_trades=True, fractional_unit=1 / 100e6)
+
+    def _both(self, ranges, maximize='Sortino Ratio', **kwargs):
+        pooled = GridSearch(n_jobs=2, **kwargs)
+        serial = GridSearch(**kwargs)
+        params = pooled.search(self.bt, ranges, maximize)
+        with pools.disabled():
+            self.assertEqual(serial.search(self.bt, ranges, maximize), params)
+        self.assertTrue(pooled.history.index.equals(serial.history.index))
+        np.testing.assert_allclose(pooled.history, serial.history, equal_nan=True)
+        return pooled
+
+    def test_declarative_space(self):
+        search = self._both(RANGES)
+        self.assertEqual(len(search.history), len(compile_space(RANGES)))
+
+    def test_compiled_space_and_custom_objective(self):
+        self._both(compile_space(RANGES), maximize=lambda stats: stats['Equity Final [$]'])
+
+    def test_max_tries_samples_the_same_points(self):
+        search = self._both(RANGES, max_tries=15, random_state=1)
+        self.assertEqual(len(search.history), 15)
+
+
+class HeadTest(unittest.TestCase):
+    """`head()` builds the backtest again on its first bars."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(600, seed=2, freq='D')
+        cls.settings = dict(cash=10_000, commission=.001, finalize_trades=True,
+                            fractional_unit=1 / 100e6)
+        cls.bt = FractionalBacktest(cls.data, BTSMAStrategy, **cls.settings)
+
+    def test_head_matches_a_backtest_of_the_first_bars(self):
+        short = head(self.bt, 300)
+        self.assertIsInstance(short, FractionalBacktest)
+        expected = FractionalBacktest(self.data.iloc[:300], BTSMAStrategy, **self.settings).run()
+        got = short.run()
+        self.assertEqual(len(got._equity_curve), 300)
+        np.testing.assert_array_equal(got._equity_curve.Equity, expected._equity_curve.Equity)
+        np.testing.assert_array_equal(got._trades.EntryPrice, expected._trades.EntryPrice)
+        # The original keeps all its bars
+        self.assertEqual(len(self.bt.run()._equity_curve), 600)
+
+    def test_head_keeps_scoring_hooks(self):
+        kernel = objectives.as_kernel('Return [%]')
+        short = head(objectives.scoring(self.bt, kernel), 300)
+        expected = FractionalBacktest(self.data.iloc[:300], BTSMAStrategy, **self.settings).run()
+        self.assertAlmostEqual(objectives.score(short.run()), expected['Return [%]'])
@@ -0,0 +1,89 @@
+"""
+Lifetime of the shared-memory blocks of `utils.shared_data`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import multiprocessing as mp
+import unittest
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils import walk_forward as walk_forward_module
+from SPP4backtesting.utils.shared_data import SharedOHLCV, attach
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.walk_forward import WalkForward
+
+
+def _exists(name: str) -> bool:
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    return True
+
+
+def _close_sum(handle):
+    # Worker: read through the block, then detach
+    with attach(handle) as view:
+        return float(view.frame(10, 20)['Close'].sum())
+
+
+class _Recorded(SharedOHLCV):
+    """`SharedOHLCV` remembering the names of the blocks it creates."""
+    names = []
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.names.append(self.handle.name)
+
+
+class SharedOHLCVTest(unittest.TestCase):
+    """Blocks are unlinked by their owner, never by attached workers."""
+
+    def setUp(self):
+        self.data = synthetic_ohlcv(1_000, seed=11, freq='D')
+
+    def test_frames_are_views_of_the_data(self):
+        with SharedOHLCV(self.data.tz_localize('UTC')) as shared:
+            frame = shared.frame(100, 200)
+            pd.testing.assert_frame_equal(frame, self.data.iloc[100:200].tz_localize('UTC'),
+                                          check_freq=False, check_index_type=False)
+
+    def test_unlinked_on_exit_and_on_error(self):
+        with SharedOHLCV(self.data) as shared:
+            name = shared.handle.name
+            self.assertTrue(_exists(name))
+        self.assertFalse(_exists(name))
+        with self.assertRaises(RuntimeError):
+            with SharedOHLCV(self.data) as shared:
+                name = shared.handle.name
+                raise RuntimeError
+        self.assertFalse(_exists(name))
+
+    def test_workers_detach_without_unlinking(self):
+        with SharedOHLCV(self.data) as shared, \
+                ProcessPoolExecutor(2, mp_context=mp.get_context('spawn')) as pool:
+            sums = list(pool.map(_close_sum, [shared.handle] * 4))
+            self.assertTrue(_exists(shared.handle.name))
+            self.assertEqual(float(shared.frame(10, 20)['Close'].sum()), sums[0])
+        np.testing.assert_allclose(sums, self.data.Close.iloc[10:20].sum())
+
+    def test_walk_forward_pool_unlinks_its_block(self):
+        warnings.simplefilter('ignore')
+        _Recorded.names = []
+        walk_forward = WalkForward(self.data, KamaStrategy, cash=10_000, commission=.001,
+                                   constraint=None, size_optimization=300, size_test=100)
+        with mock.patch.object(walk_forward_module, 'SharedOHLCV', _Recorded):
+            walk_forward.run_walk_forward(n_jobs=2)
+        self.assertEqual(len(_Recorded.names), 1)
+        self.assertFalse(_exists(_Recorded.names[0]))
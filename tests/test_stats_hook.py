@@ -0,0 +1,82 @@
+"""
+Hooks of `utils.stats_hook` around plain `Backtest.run` calls.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import pickle
+import unittest
+import warnings
+
+import numpy as np
+from backtesting import Backtest
+from backtesting.lib import FractionalBacktest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils import stats_hook
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+PARAMS = dict(period=20)
+STATS = ['Equity Final [$]', 'Return [%]', '# Trades', 'Max. Drawdown [%]', 'Sortino Ratio']
+
+
+class _Recording:
+    """Hook that records its calls and passes the stats through."""
+
+    def __init__(self, name='hook', calls=None):
+        self.name = name
+        self.calls = [] if calls is None else calls
+
+    def __call__(self, run, **params):
+        self.calls.append((self.name, params))
+        return run(**params)
+
+
+class StatsHookTest(unittest.TestCase):
+    """Hooked runs are plain runs passed through their hooks."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(800, seed=7, freq='D')
+        cls.bt = FractionalBacktest(cls.data, KamaStrategy, cash=10_000, commission=.001,
+                                    finalize_trades=True, fractional_unit=1 / 100e6)
+        cls.stats = cls.bt.run(**PARAMS)
+
+    def test_hooked_run_matches_plain_run(self):
+        hook = _Recording()
+        hooked = stats_hook.with_stats(self.bt, hook)
+        stats = hooked.run(**PARAMS)
+        self.assertEqual(hook.calls, [('hook', PARAMS)])
+        self.assertIsInstance(hooked, FractionalBacktest)
+        np.testing.assert_array_equal(stats[STATS].astype(float), self.stats[STATS].astype(float))
+        # FractionalBacktest.run() still rescales the trades around the hooks
+        np.testing.assert_array_equal(stats._trades.Size, self.stats._trades.Size)
+
+    def test_hooks_nest_last_outermost(self):
+        calls = []
+        hooked = stats_hook.with_stats(stats_hook.with_stats(self.bt, _Recording('inner', calls)),
+                                       _Recording('outer', calls))
+        hooked.run(**PARAMS)
+        self.assertEqual([name for name, _ in calls], ['outer', 'inner'])
+        self.assertIs(type(hooked), type(stats_hook.with_stats(self.bt, _Recording())))
+
+    def test_hook_results_are_returned(self):
+        def trade_count(run, **params):
+            return run(**params)['# Trades']
+        bt = Backtest(self.data, KamaStrategy, cash=10_000, commission=.001, finalize_trades=True)
+        self.assertEqual(stats_hook.with_stats(bt, trade_count).run(**PARAMS),
+                         bt.run(**PARAMS)['# Trades'])
+
+    def test_pickles_with_hooks(self):
+        hooked = stats_hook.with_stats(self.bt, _Recording())
+        restored = pickle.loads(pickle.dumps(hooked))
+        self.assertIs(type(restored), type(hooked))
+        self.assertEqual(restored.run(**PARAMS)['# Trades'], self.stats['# Trades'])
+        self.assertEqual(len(restored._hooks[0].calls), 1)
+
+    def test_rejects_other_backtests(self):
+        with self.assertRaises(TypeError):
+            stats_hook.with_stats(object(), _Recording())
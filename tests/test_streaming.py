@@ -0,0 +1,71 @@
+"""
+Incremental indicators and replays of `utils.streaming` against batch runs.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+import talib
+from backtesting import Backtest
+
+from SPP4backtesting.strategies.kama_strategies import KAMACrossover
+from SPP4backtesting.strategies.macd_strategies import MacdStrategy
+from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
+from SPP4backtesting.utils import streaming
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+
+STATS = ['Equity Final [$]', 'Return [%]', '# Trades', 'Max. Drawdown [%]']
+
+
+class IncrementalTest(unittest.TestCase):
+    """Incremental indicators reproduce TA-Lib's batch outputs."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = synthetic_ohlcv(1_500, seed=4, freq='D')
+
+    def test_matches_talib(self):
+        for timeperiod in (2, 5, 14, 30, 90):
+            with self.subTest(timeperiod=timeperiod):
+                table = streaming.check_against_talib(self.data, timeperiod)
+                self.assertTrue(table['nan_match'].all(), table)
+                self.assertLess(table['max_rel_error'].max(), 1e-9, table)
+
+    def test_macd_periods(self):
+        close = self.data.Close.to_numpy()
+        for periods in ((5, 13, 4), (8, 34, 11), (20, 50, 15)):
+            with self.subTest(periods=periods):
+                expected = np.array(talib.MACD(close, *periods))
+                got = streaming.run_incremental(streaming.MACD(*periods), close)
+                np.testing.assert_array_equal(np.isnan(got), np.isnan(expected))
+                np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-9)
+
+
+class ReplayTest(unittest.TestCase):
+    """Replaying a dataset through `StreamRunner` trades as `Backtest.run` does."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_000, seed=9, freq='D')
+
+    def test_same_trades_as_backtest(self):
+        cases = [(BTSMAStrategy, dict(n1=10, n2=30, stop=5)),
+                 (KAMACrossover, dict(n1=11, n2=22, stop=10, profit=20)),
+                 (MacdStrategy, dict(fast=8, slow=30, signal=7))]
+        for strategy, params in cases:
+            with self.subTest(strategy=strategy.__name__):
+                expected = Backtest(self.data, strategy, cash=10_000, commission=.001).run(**params)
+                runner = streaming.StreamRunner(strategy, params, cash=10_000, commission=.001)
+                stats = runner.run(streaming.replay(self.data)).stats()
+                self.assertGreater(expected['# Trades'], 0)
+                for column in ('EntryBar', 'ExitBar', 'Size', 'EntryPrice', 'ExitPrice'):
+                    np.testing.assert_allclose(stats._trades[column], expected._trades[column],
+                                               err_msg=column)
+                np.testing.assert_allclose(stats[STATS].astype(float),
+                                           expected[STATS].astype(float))
@@ -0,0 +1,87 @@
+"""
+`utils.timeframes.MultiTimeframe` against `backtesting.lib.resample_apply`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+import talib
+from backtesting import Backtest, Strategy
+from backtesting.lib import resample_apply
+
+from SPP4backtesting.strategies.base_strategies import BaseStrategy
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.timeframes import MultiTimeframe, timeframes
+
+# (rule, indicator, args, column)
+CASES = [
+    ('4h', talib.EMA, (20,), 'Close'),
+    ('1D', talib.SMA, (10,), 'Close'),
+    ('7D', talib.RSI, (14,), 'Close'),
+    ('1D', talib.MACD, (12, 26, 9), 'Close'),
+    ('1D', talib.SMA, (5,), 'Volume'),
+]
+
+
+class _Both(Strategy):
+    """Computes every case both ways in `init()`; results kept on the class."""
+    results = []
+
+    def init(self):
+        mtf = MultiTimeframe(self.data.df)
+        type(self).results = [
+            (resample_apply(rule, func, getattr(self.data, column), *args),
+             mtf.apply(rule, func, *args, column=column))
+            for rule, func, args, column in CASES]
+
+    def next(self):
+        pass
+
+
+class _Shared(BaseStrategy):
+    """`BaseStrategy.resample_apply()` next to the backtesting.py one."""
+    results = None
+
+    def init(self):
+        type(self).results = (resample_apply('1D', talib.EMA, self.data.Close, 10),
+                              self.resample_apply('1D', talib.EMA, self.data.Close, 10))
+
+    def next(self):
+        pass
+
+
+class MultiTimeframeTest(unittest.TestCase):
+    """Higher-timeframe indicators equal `resample_apply`, bar for bar."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        data = synthetic_ohlcv(3_000, seed=6, freq='h')
+        # A gap leaves empty bins, which resample_apply drops
+        cls.data = data.drop(data.index[700:800])
+
+    def _assert_equal(self, expected, got):
+        self.assertEqual(np.shape(got), np.shape(expected))
+        np.testing.assert_allclose(np.asarray(got), np.asarray(expected), rtol=1e-12, equal_nan=True)
+
+    def test_apply_matches_resample_apply(self):
+        Backtest(self.data, _Both, cash=10_000).run()
+        for (rule, func, args, column), (expected, got) in zip(CASES, _Both.results):
+            with self.subTest(rule=rule, func=func.__name__, args=args, column=column):
+                self._assert_equal(expected, got)
+                self.assertFalse(got.flags.writeable)
+
+    def test_base_strategy_resample_apply(self):
+        Backtest(self.data, _Shared, cash=10_000).run()
+        self._assert_equal(*_Shared.results)
+
+    def test_shared_per_dataset(self):
+        first = timeframes(self.data)
+        self.assertIs(timeframes(self.data.copy()), first)
+        self.assertIs(first.ema('1D', 10), first.ema('1D', 10))
+        self.assertIsNot(timeframes(self.data.iloc[:-1]), first)
@@ -0,0 +1,87 @@
+"""
+Parity of `utils.vectorized` with backtesting.py's event-driven results.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from SPP4backtesting.strategies.kama_strategies import KAMACrossover
+from SPP4backtesting.strategies.macd_strategies import MacdStrategy
+from SPP4backtesting.strategies.momentum_strategies import MomentumStrategy
+from SPP4backtesting.strategies.sma_strategies import BTSMAStrategy
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.objectives import Penalized
+from SPP4backtesting.utils.vectorized import VectorizedBacktest, compare_with_event_driven
+
+CASES = [
+    (BTSMAStrategy, dict(n1=11, n2=22, stop=5)),
+    (BTSMAStrategy, dict(n1=5, n2=40, stop=2)),
+    (KAMACrossover, dict(n1=11, n2=22, stop=10, profit=20)),
+    (KAMACrossover, dict(n1=7, n2=30, stop=4, profit=8)),
+    (MacdStrategy, dict(fast=12, slow=26, signal=9)),
+    (MacdStrategy, dict(fast=8, slow=34, signal=11)),
+    (MomentumStrategy, dict(period=14, threshold=0)),
+    (MomentumStrategy, dict(period=25, threshold=0)),
+]
+
+# Grids with more than one exit level per signal combination
+SWEEP_GRIDS = [
+    (BTSMAStrategy, dict(n1=[5, 11], n2=[22, 40], stop=[2, 5, 10])),
+    (KAMACrossover, dict(n1=[7, 11], n2=[22, 30], stop=[4, 10], profit=[8, 20])),
+]
+
+
+class ParityTest(unittest.TestCase):
+    """`VectorizedBacktest` matches `Backtest` on `CORE_STATS`."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_000, seed=11, freq='D')
+
+    def test_core_stats_match(self):
+        for strategy, params in CASES:
+            for commission in (0, .001):
+                for fractional_unit in (None, 1 / 100e6):
+                    for finalize_trades in (False, True):
+                        with self.subTest(strategy=strategy.__name__, params=params,
+                                          commission=commission, fractional_unit=fractional_unit,
+                                          finalize_trades=finalize_trades):
+                            table = compare_with_event_driven(
+                                self.data, strategy, cash=10_000, commission=commission,
+                                finalize_trades=finalize_trades, fractional_unit=fractional_unit,
+                                **params)
+                            self.assertGreater(table.loc['# Trades', 'event'], 0)
+                            self.assertTrue(table['match'].all(), table[~table['match']])
+
+
+class ExitSweepTest(unittest.TestCase):
+    """The exit sweep scores every grid point as its own simulation does."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_000, seed=11, freq='D')
+
+    def test_heatmaps_match(self):
+        for strategy, grid in SWEEP_GRIDS:
+            for maximize in ('Sortino Ratio', 'Return [%]', Penalized('Sharpe Ratio', per_trade=.01)):
+                with self.subTest(strategy=strategy.__name__, maximize=maximize):
+                    bt = VectorizedBacktest(self.data, strategy, cash=10_000, commission=.001,
+                                            finalize_trades=True, fractional_unit=1 / 100e6)
+                    swept, swept_map = bt.optimize(**grid, maximize=maximize, return_heatmap=True)
+                    single, single_map = bt.optimize(**grid, maximize=maximize, return_heatmap=True,
+                                                     exit_sweep=False)
+                    self.assertGreater(single_map.notna().sum(), 1)
+                    # 2-D reductions over the sweep can differ in the last bits
+                    pd.testing.assert_series_equal(swept_map, single_map, rtol=1e-9)
+                    self.assertEqual(swept._strategy._params, single._strategy._params)
+                    np.testing.assert_array_equal(swept._equity_curve.Equity,
+                                                  single._equity_curve.Equity)
@@ -0,0 +1,129 @@
+"""
+Parallel `WalkForward` runs against the serial run, and `extend()` with a
+`ResultStore`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import multiprocessing as mp
+import shutil
+import tempfile
+import unittest
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from backtesting import Backtest
+
+from SPP4backtesting.strategies.kama_strategies import KamaStrategy
+from SPP4backtesting.utils import pools
+from SPP4backtesting.utils.result_store import ResultStore
+from SPP4backtesting.utils.synthetic import synthetic_ohlcv
+from SPP4backtesting.utils.walk_forward import WalkForward
+
+
+def _sortino(stats):
+    # A stats function rather than a kernel: with pools enabled, windows
+    # would hand their grid to Backtest.optimize and its process pool
+    return stats['Sortino Ratio']
+
+
+def _nested_pool(*args, **kwargs):
+    raise AssertionError('A window started Backtest.optimize inside a pool worker')
+
+
+class ParallelWalkForwardTest(unittest.TestCase):
+    """Windows fanned out over a pool give the serial run's params and metrics."""
+
+    @classmethod
+    def setUpClass(cls):
+        warnings.simplefilter('ignore')
+        cls.data = synthetic_ohlcv(1_000, seed=11, freq='D')
+        with pools.disabled():
+            cls.serial = cls._walk_forward().run_walk_forward()
+        assert len(cls.serial) > 2
+
+    @classmethod
+    def _walk_forward(cls):
+        return WalkForward(cls.data, KamaStrategy, cash=10_000, commission=.001,
+                           maximize=_sortino, constraint=None, size_optimization=300, size_test=100)
+
+    def _check(self, results):
+        self.assertEqual([r.window for r in results], [r.window for r in self.serial])
+        for got, expected in zip(results, self.serial):
+            self.assertEqual(got.params, expected.params)
+            for field in ('train', 'test'):
+                pd.testing.assert_series_equal(pd.Series(getattr(got, field)),
+                                               pd.Series(getattr(expected, field)))
+            np.testing.assert_array_equal(got.equity, expected.equity)
+
+    def test_worker_pool_matches_serial(self):
+        # Forked workers inherit the patch: a nested pool would fail the run
+        with mock.patch.object(Backtest, 'optimize', _nested_pool):
+            self._check(self._walk_forward().run_walk_forward(n_jobs=2))
+
+    def test_caller_executor_matches_serial(self):
+        with mock.patch.object(Backtest, 'optimize', _nested_pool), \
+                ProcessPoolExecutor(2, mp_context=mp.get_context('fork')) as executor:
+            self._check(self._walk_forward().run_walk_forward(executor=executor))
+            # The executor's workers get their pools back after each window
+            self.assertTrue(executor.submit(pools.enabled).result())
+        self.assertTrue(pools.enabled())
+
+    def test_rerun_replaces_results(self):
+        walk_forward = self._walk_forward()
+        with pools.disabled():
+            walk_forward.run_walk_forward()
+            results = walk_forward.run_walk_forward()
+        self.assertEqual(len(results), len(self.serial))
+        self.assertEqual(walk_forward.stats_master, walk_forward.results)
+        self.assertIsNot(walk_forward.stats_master, walk_forward.results)
+
+
+class ExtendTest(unittest.TestCase):
+    """`extend()` only runs the windows new bars change; stored ones are reused."""
+
+    def setUp(self):
+        warnings.simplefilter('ignore')
+        self.data = synthetic_ohlcv(1_000, seed=11, freq='D')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.store = ResultStore(directory)
+        self.addCleanup(self.store.close)
+
+    def _walk_forward(self, data):
+        return WalkForward(data, KamaStrategy, cash=10_000, commission=.001, constraint=None,
+                           store=self.store, size_optimization=300, size_test=100)
+
+    def test_extend_runs_only_changed_windows(self):
+        walk_forward = self._walk_forward(self.data.iloc[:800])
+        with pools.disabled():
+            walk_forward.run_walk_forward()
+            old_bounds = walk_forward.window_bounds()
+            ran = []
+            run_window = WalkForward.run_window
+
+            def recording(wf, i):
+                ran.append(i)
+                return run_window(wf, i)
+            with mock.patch.object(WalkForward, 'run_window', recording):
+                walk_forward.extend(self.data.iloc[800:])
+        bounds = walk_forward.window_bounds()
+        changed = [i for i, b in enumerate(bounds)
+                   if i >= len(old_bounds) or b != old_bounds[i] or b[1][1] > 800]
+        self.assertTrue(changed)
+        self.assertLess(len(changed), len(bounds))
+        self.assertEqual(ran, changed)
+        self.assertEqual(walk_forward.stats_master, walk_forward.results)
+
+        # The same walk-forward run from scratch comes entirely from the store
+        misses, hits = self.store.misses, self.store.hits
+        with pools.disabled():
+            fresh = self._walk_forward(self.data).run_walk_forward()
+        self.assertEqual(self.store.misses, misses)
+        self.assertEqual(self.store.hits - hits, 3 * len(bounds))
+        self.assertEqual([r.params for r in fresh], [r.params for r in walk_forward.results])
@@ -0,0 +1,124 @@
+"""
+Window boundaries of `utils.windows.WindowPlan`.
+
+Run from the repository root::
+
+    python -m unittest discover tests
+"""
+
+import pickle
+import unittest
+
+import pandas as pd
+
+from SPP4backtesting.utils.windows import Window, WindowPlan
+
+
+class BarPlanTest(unittest.TestCase):
+    """Plans in bars, over 25 bars."""
+
+    def _windows(self, *args, **kwargs):
+        return [tuple(w) for w in WindowPlan(*args, **kwargs).windows(25)]
+
+    def test_rolling(self):
+        self.assertEqual(self._windows(10, 4), [(0, 10, 10, 14), (4, 14, 14, 18),
+                                                (8, 18, 18, 22), (12, 22, 22, 25)])
+
+    def test_anchored(self):
+        expected = [(0, 10, 10, 14), (0, 14, 14, 18), (0, 18, 18, 22), (0, 22, 22, 25)]
+        self.assertEqual(self._windows(10, 4, scheme='anchored'), expected)
+        self.assertEqual(self._windows(10, 4, scheme='expanding'), expected)
+
+    def test_gap(self):
+        self.assertEqual(self._windows(10, 4, gap=2), [(0, 10, 12, 16), (4, 14, 16, 20),
+                                                       (8, 18, 20, 24), (12, 22, 24, 25)])
+        self.assertEqual(self._windows(10, 4, gap=2, scheme='anchored')[-1], (0, 22, 24, 25))
+
+    def test_partial(self):
+        self.assertEqual(self._windows(10, 4, partial=False), [(0, 10, 10, 14), (4, 14, 14, 18),
+                                                               (8, 18, 18, 22)])
+        # A last window ending on the last bar is complete
+        self.assertEqual(self._windows(11, 7, partial=False), [(0, 11, 11, 18), (7, 18, 18, 25)])
+
+    def test_step(self):
+        self.assertEqual(self._windows(10, 4, step=5), [(0, 10, 10, 14), (5, 15, 15, 19),
+                                                        (10, 20, 20, 24)])
+
+    def test_default_test(self):
+        self.assertEqual(WindowPlan(20).test, 7)
+
+    def test_too_short(self):
+        self.assertEqual(self._windows(30, 4), [])
+        self.assertEqual(WindowPlan(10, 4).bounds(pd.RangeIndex(12)).tolist(), [[0, 10, 10, 12]])
+
+    def test_window_slices(self):
+        window = Window(0, 10, 12, 16)
+        self.assertEqual(list(range(25))[window.test], [12, 13, 14, 15])
+        self.assertEqual(window.train, slice(0, 10))
+
+
+class CalendarPlanTest(unittest.TestCase):
+    """Plans in calendar spans, over daily bars."""
+
+    def setUp(self):
+        self.days = pd.date_range('2024-01-01', '2024-06-30', freq='D')
+
+    def _at(self, *dates):
+        return tuple(int(self.days.searchsorted(pd.Timestamp(date))) for date in dates)
+
+    def test_days(self):
+        plan = WindowPlan('10D', '5D')
+        self.assertEqual([tuple(w) for w in plan.windows(self.days[:30])],
+                         [(0, 10, 10, 15), (5, 15, 15, 20), (10, 20, 20, 25), (15, 25, 25, 30)])
+
+    def test_months(self):
+        windows = [tuple(w) for w in WindowPlan('2MS', '1MS').windows(self.days)]
+        self.assertEqual(windows, [
+            self._at('2024-01-01', '2024-03-01', '2024-03-01', '2024-04-01'),
+            self._at('2024-02-01', '2024-04-01', '2024-04-01', '2024-05-01'),
+            self._at('2024-03-01', '2024-05-01', '2024-05-01', '2024-06-01'),
+            self._at('2024-04-01', '2024-06-01', '2024-06-01', '2024-07-01'),
+        ])
+
+    def test_anchored_gap(self):
+        plan = WindowPlan('60D', '30D', gap='7D', scheme='anchored')
+        # The last test window would run past June 30: partial
+        self.assertEqual([tuple(w) for w in plan.windows(self.days)],
+                         [(0, 60, 67, 97), (0, 90, 97, 127), (0, 120, 127, 157), (0, 150, 157, 182)])
+        complete = WindowPlan('60D', '30D', gap='7D', scheme='anchored', partial=False)
+        self.assertEqual(len(complete.windows(self.days)), 3)
+
+    def test_data_gap(self):
+        # No bars in April and May: windows without train or test bars are dropped
+        index = self.days[~self.days.month.isin([4, 5])]
+        windows = WindowPlan('30D', '30D').windows(index)
+        self.assertTrue(all(w.test_end > w.test_start and w.train_end > w.train_start for w in windows))
+        tested = [index[w.test_start] for w in windows]
+        self.assertFalse({4, 5} & {date.month for date in tested})
+        self.assertLess(len(windows), len(WindowPlan('30D', '30D').windows(self.days)))
+
+    def test_needs_datetime_index(self):
+        with self.assertRaises(TypeError):
+            WindowPlan('10D', '5D').bounds(100)
+
+
+class SettingsTest(unittest.TestCase):
+    """Plans are checked, immutable values."""
+
+    def test_invalid(self):
+        for args, kwargs in [((10, '5D'), {}), ((10, 4), {'scheme': 'sliding'}), ((-1, 4), {}),
+                             ((10, 0), {}), (('0D', '5D'), {}), (('10D',), {}), ((10, 4), {'gap': '1D'})]:
+            with self.subTest(args=args, kwargs=kwargs), self.assertRaises(ValueError):
+                WindowPlan(*args, **kwargs)
+        with self.assertRaises(TypeError):
+            WindowPlan(True, 4)
+
+    def test_value(self):
+        plan = WindowPlan('3YS', '6MS', scheme='anchored', gap=pd.Timedelta('5D'))
+        self.assertEqual(plan.gap, '5 days 00:00:00')
+        self.assertEqual(WindowPlan.from_dict(plan.to_dict()), plan)
+        self.assertEqual(pickle.loads(pickle.dumps(plan)), plan)
+        self.assertEqual(hash(WindowPlan(10, 4)), hash(WindowPlan(10, 4, step=4)))
+        self.assertNotEqual(WindowPlan(10, 4), WindowPlan(10, 4, partial=False))
+        with self.assertRaises(AttributeError):
+            plan.train = '1YS'